@@ -0,0 +1,448 @@
+# -*- coding: utf-8 -*-
+"""
+AkShare函数映射配置
+手工维护的核心指标 -> AkShare函数映射表，由 mapping_registry 统一加载
+自动生成的扩展映射见 enhanced_mapping_config.py
+"""
+
+AKSHARE_MAPPINGS = {
+    # ===== 宏观经济指标 =====
+    'CN_CPI_MONTHLY': {
+        'func': 'macro_china_cpi_monthly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_CPI_YEARLY': {
+        'func': 'macro_china_cpi_yearly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_CPI_MONTHLY': {
+        'func': 'macro_usa_cpi_monthly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    
+    # PPI相关
+    'CN_PPI_YEARLY': {
+        'func': 'macro_china_ppi_yearly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    
+    # 货币供应量
+    'CN_M1_YEARLY': {
+        'func': 'macro_china_m1_yearly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_M2_YEARLY': {
+        'func': 'macro_china_m2_yearly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    
+    # PMI指标
+    'CN_PMI_MFG': {
+        'func': 'macro_china_pmi_yearly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_PMI_NON_MFG': {
+        'func': 'macro_china_non_man_pmi',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_PMI_CAIXIN_MFG': {
+        'func': 'index_pmi_man_cx',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '数值',
+        'data_type': 'index',
+        'frequency': 'M'
+    },
+    
+    # GDP相关
+    'CN_GDP_YEARLY': {
+        'func': 'macro_china_gdp_yearly',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'Q'
+    },
+    'CN_INDUSTRIAL_ADDED_VALUE': {
+        'func': 'macro_china_industrial_added_value',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    
+    # 贸易数据
+    'CN_EXPORTS_YOY': {
+        'func': 'macro_china_exports_yoy',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_IMPORTS_YOY': {
+        'func': 'macro_china_imports_yoy',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_TRADE_BALANCE': {
+        'func': 'macro_china_trade_balance',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_FDI': {
+        'func': 'macro_china_fdi',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    
+    # 社融与信贷
+    'CN_SOCIAL_FINANCING': {
+        'func': 'macro_china_shrzgm',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '社会融资规模存量',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_NEW_RMB_LOAN': {
+        'func': 'macro_rmb_loan',
+        'params': {},
+        'date_col': '月份',
+        'value_col': '新增人民币贷款',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'CN_NEW_FINANCIAL_CREDIT': {
+        'func': 'macro_china_new_financial_credit',
+        'params': {},
+        'date_col': '月份',
+        'value_col': '当月',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    
+    # 利率指标
+    'CN_SHIBOR': {
+        'func': 'macro_china_shibor_all',
+        'params': {},
+        'date_col': '日期',
+        'value_col': 'Shibor隔夜',
+        'data_type': 'rate',
+        'frequency': 'D'
+    },
+    'CN_LPR': {
+        'func': 'rate_interbank',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '1年期LPR',
+        'data_type': 'rate',
+        'frequency': 'M'
+    },
+    
+    # ===== 美国经济指标 =====
+    'US_UNEMPLOYMENT': {
+        'func': 'macro_usa_unemployment_rate',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_PMI_MFG': {
+        'func': 'macro_usa_pmi',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_INITIAL_JOBLESS': {
+        'func': 'macro_usa_initial_jobless',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'W'
+    },
+    'US_ADP_EMPLOYMENT': {
+        'func': 'macro_usa_adp_employment',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_DURABLE_GOODS': {
+        'func': 'macro_usa_durable_goods_orders',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_RETAIL_SALES': {
+        'func': 'macro_usa_retail_sales',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_EXIST_HOME_SALES': {
+        'func': 'macro_usa_exist_home_sales',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_HOUSE_STARTS': {
+        'func': 'macro_usa_house_starts',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_MICHIGAN_SENTIMENT': {
+        'func': 'macro_usa_michigan_consumer_sentiment',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_LMCI': {
+        'func': 'macro_usa_lmci',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'macro',
+        'frequency': 'M'
+    },
+    'US_EIA_CRUDE': {
+        'func': 'macro_usa_eia_crude_rate',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'commodity',
+        'frequency': 'W'
+    },
+    'US_API_CRUDE': {
+        'func': 'macro_usa_api_crude_stock',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '今值',
+        'data_type': 'commodity',
+        'frequency': 'W'
+    },
+    
+    # ===== 股票指数 =====
+    'SSE_INDEX': {
+        'func': 'index_zh_a_hist',
+        'params': {'symbol': '000001', 'period': 'daily'},
+        'date_col': '日期',
+        'value_col': '收盘',
+        'data_type': 'index',
+        'frequency': 'D'
+    },
+    'SZSE_INDEX': {
+        'func': 'index_zh_a_hist',
+        'params': {'symbol': '399001', 'period': 'daily'},
+        'date_col': '日期',
+        'value_col': '收盘',
+        'data_type': 'index',
+        'frequency': 'D'
+    },
+    'CHINEXT_INDEX': {
+        'func': 'index_zh_a_hist',
+        'params': {'symbol': '399006', 'period': 'daily'},
+        'date_col': '日期',
+        'value_col': '收盘',
+        'data_type': 'index',
+        'frequency': 'D'
+    },
+    'CSI300_INDEX': {
+        'func': 'index_zh_a_hist',
+        'params': {'symbol': '000300', 'period': 'daily'},
+        'date_col': '日期',
+        'value_col': '收盘',
+        'data_type': 'index',
+        'frequency': 'D'
+    },
+    'CSI500_INDEX': {
+        'func': 'index_zh_a_hist',
+        'params': {'symbol': '000905', 'period': 'daily'},
+        'date_col': '日期',
+        'value_col': '收盘',
+        'data_type': 'index',
+        'frequency': 'D'
+    },
+    'SSE50_INDEX': {
+        'func': 'index_zh_a_hist',
+        'params': {'symbol': '000016', 'period': 'daily'},
+        'date_col': '日期',
+        'value_col': '收盘',
+        'data_type': 'index',
+        'frequency': 'D'
+    },
+    
+    # ===== 资金流数据 =====
+    'NORTHBOUND_CAPITAL': {
+        'func': 'stock_connect_hist_sina',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '北向资金',
+        'data_type': 'capital_flow',
+        'frequency': 'D'
+    },
+    'SOUTHBOUND_CAPITAL': {
+        'func': 'stock_connect_hist_sina',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '南向资金',
+        'data_type': 'capital_flow',
+        'frequency': 'D'
+    },
+    
+    # ===== 估值指标 =====
+    'A_SHARE_PE': {
+        'func': 'stock_zh_valuation_baidu',
+        'params': {},
+        'date_col': '日期',
+        'value_col': 'PE',
+        'data_type': 'valuation',
+        'frequency': 'D'
+    },
+    'A_SHARE_PB': {
+        'func': 'stock_zh_valuation_baidu',
+        'params': {},
+        'date_col': '日期',
+        'value_col': 'PB',
+        'data_type': 'valuation',
+        'frequency': 'D'
+    },
+    
+    # ===== 政策相关 =====
+    'CN_BOND_10Y': {
+        'func': 'bond_zh_us_rate',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '中国国债收益率10年',
+        'data_type': 'bond',
+        'frequency': 'D'
+    },
+    'CN_BOND_1Y': {
+        'func': 'bond_zh_us_rate',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '中国国债收益率1年',
+        'data_type': 'bond',
+        'frequency': 'D'
+    },
+    'CN_BOND_5Y': {
+        'func': 'bond_zh_us_rate',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '中国国债收益率5年',
+        'data_type': 'bond',
+        'frequency': 'D'
+    },
+    'CN_RRR': {
+        'func': 'tool_china_rrr',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '存款准备金率',
+        'data_type': 'policy',
+        'frequency': 'M'
+    },
+    
+    # ===== 大宗商品 =====
+    'GOLD_PRICE': {
+        'func': 'macro_cons_gold',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '库存总量',
+        'data_type': 'commodity',
+        'frequency': 'D'
+    },
+    'LME_STOCK': {
+        'func': 'macro_euro_lme_stock',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '库存',
+        'data_type': 'commodity',
+        'frequency': 'D'
+    },
+    
+    # ===== 情绪指标 =====
+    'VIX_INDEX': {
+        'func': 'index_vix',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '收盘价',
+        'data_type': 'sentiment',
+        'frequency': 'D'
+    },
+    
+    # ===== 全球市场 =====
+    'GLOBAL_INDICES': {
+        'func': 'index_global_spot_em',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '最新价',
+        'data_type': 'global_index',
+        'frequency': 'D'
+    },
+    'HK_INDICES': {
+        'func': 'stock_hk_index_spot_sina',
+        'params': {},
+        'date_col': '日期',
+        'value_col': '现价',
+        'data_type': 'hk_index',
+        'frequency': 'D'
+    }
+}
@@ -0,0 +1,305 @@
+# -*- coding: utf-8 -*-
+"""
+异常值检测
+在数据入库后对每个指标的时间序列做向量化检测，维护 IndicatorData.is_anomaly：
+- 跳变检测：当前变化量相对前 window 期变化量的稳健Z分数
+- 滚动稳健Z分数：当前值相对前 window 期中位数/MAD 的偏离，用于区分尖峰与回落：
+  前一期已是水平异常时，本期的反向跳变视为回落而不标记；
+  只有水平偏离而没有异常跳变（随机游走式的逐步漂移）也不标记
+- 停滞检测：日度/周度序列连续 stale_run 期及以上数值完全不变（月度及以上的政策类指标常长期不变，不做此项检测）
+
+增量运行时只评估上次检测之后的新数据，所需的滚动窗口尾部保存在 Indicator.metadata 中（只更新本模块的键）
+"""
+
+import logging
+import time
+import warnings
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import Indicator, IndicatorData
+from .frequency import normalize_frequency
+
+logger = logging.getLogger(__name__)
+
+# Indicator.metadata 中保存检测状态的键
+STATE_KEY = 'anomaly_detection'
+
+# 单次查询的指标数量上限
+QUERY_CHUNK_SIZE = 200
+
+# 做停滞检测的频率
+STALE_CHECK_FREQUENCIES = ('D', 'W')
+
+
+@dataclass
+class AnomalyDetectionConfig:
+    """异常检测参数"""
+    window: int = 24              # 滚动窗口期数
+    min_periods: int = 8          # 计算Z分数所需的最少历史期数
+    z_threshold: float = 5.0      # 水平值稳健Z分数阈值
+    jump_threshold: float = 6.0   # 变化量稳健Z分数阈值
+    stale_run: int = 6            # 连续不变期数阈值
+
+    @property
+    def signature(self) -> List:
+        return [self.window, self.min_periods, self.z_threshold, self.jump_threshold, self.stale_run]
+
+    @property
+    def tail_length(self) -> int:
+        """增量检测需要保留的历史尾部长度"""
+        return max(self.window + 1, self.stale_run)
+
+
+@dataclass
+class AnomalyDetectionResult:
+    """异常检测运行结果"""
+    indicators_evaluated: int = 0
+    indicators_skipped: int = 0
+    points_evaluated: int = 0
+    anomalies_found: int = 0
+    flags_changed: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def _rolling_robust_z(x: np.ndarray, window: int, min_periods: int) -> np.ndarray:
+    """每个点相对其前 window 个点的稳健Z分数（历史不足时为NaN）"""
+    n = len(x)
+    if n == 0:
+        return np.empty(0)
+
+    padded = np.concatenate([np.full(window, np.nan), x])
+    windows = sliding_window_view(padded[:-1], window)  # 第 i 行为 x[i-window:i]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # 全NaN窗口
+        median = np.nanmedian(windows, axis=1)
+        mad = np.nanmedian(np.abs(windows - median[:, None]), axis=1) * 1.4826
+
+    enough = np.count_nonzero(~np.isnan(windows), axis=1) >= min_periods
+    with np.errstate(divide='ignore', invalid='ignore'):
+        z = np.abs(x - median) / mad
+    return np.where(enough & (mad > 0), z, np.nan)
+
+
+def _stale_mask(x: np.ndarray, stale_run: int) -> np.ndarray:
+    """标记连续不变超过 stale_run-1 期之后的点"""
+    n = len(x)
+    if n == 0:
+        return np.zeros(0, dtype=bool)
+
+    starts = np.ones(n, dtype=bool)
+    starts[1:] = x[1:] != x[:-1]
+    run_start = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+    position_in_run = np.arange(n) - run_start
+    return position_in_run >= stale_run - 1
+
+
+def detect_anomalies(values: np.ndarray,
+                     config: AnomalyDetectionConfig,
+                     check_stale: bool = True) -> np.ndarray:
+    """
+    对单个时间序列做异常检测
+
+    Args:
+        values: 按日期升序的数值数组
+        config: 检测参数
+        check_stale: 是否做停滞检测
+
+    Returns:
+        np.ndarray: 与 values 等长的布尔数组
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    flags = ~np.isfinite(x)
+    if n < 2:
+        return flags
+
+    level_z = _rolling_robust_z(x, config.window, config.min_periods)
+
+    jump_z = np.full(n, np.nan)
+    jump_z[1:] = _rolling_robust_z(np.diff(x), config.window, config.min_periods)
+
+    with np.errstate(invalid='ignore'):
+        level_outlier = level_z > config.z_threshold
+        jump_outlier = jump_z > config.jump_threshold
+    # 跳变点本身偏离水平时为尖峰/跳升；前一期是水平异常而本期不是时为回落
+    after_outlier = np.zeros(n, dtype=bool)
+    after_outlier[1:] = level_outlier[:-1]
+    flags |= jump_outlier & (level_outlier | ~after_outlier)
+    if check_stale:
+        flags |= _stale_mask(x, config.stale_run)
+    return flags
+
+
+class AnomalyDetector:
+    """批量异常检测器"""
+
+    def __init__(self, config: AnomalyDetectionConfig = None, batch_size: int = 1000):
+        self.config = config or AnomalyDetectionConfig()
+        self.batch_size = batch_size
+
+    def run(self, indicator_codes: Iterable[str] = None, full: bool = False) -> AnomalyDetectionResult:
+        """
+        执行异常检测并批量回写 is_anomaly
+
+        Args:
+            indicator_codes: 指标代码列表，None表示所有启用指标
+            full: 是否忽略已保存的状态，对全部历史重新检测
+
+        Returns:
+            AnomalyDetectionResult: 运行结果
+        """
+        started = time.time()
+        result = AnomalyDetectionResult()
+
+        indicators = self._select_indicators(indicator_codes, full, result)
+        ids = list(indicators.keys())
+
+        for i in range(0, len(ids), QUERY_CHUNK_SIZE):
+            chunk = {pk: indicators[pk] for pk in ids[i:i + QUERY_CHUNK_SIZE]}
+            try:
+                self._process_chunk(chunk, result)
+            except Exception as e:
+                logger.error(f"异常检测批次处理失败: {e}")
+                result.errors.append({'indicators': [s['code'] for s in chunk.values()], 'error': str(e)})
+
+        result.execution_time = time.time() - started
+        logger.info(
+            f"异常检测完成: 评估 {result.indicators_evaluated} 个指标 / {result.points_evaluated} 个数据点, "
+            f"异常 {result.anomalies_found} 个, 标记变更 {result.flags_changed} 个, "
+            f"耗时 {result.execution_time:.2f}秒"
+        )
+        return result
+
+    def _select_indicators(self,
+                           indicator_codes: Optional[Iterable[str]],
+                           full: bool,
+                           result: AnomalyDetectionResult) -> Dict[int, Dict]:
+        """选择有新采集数据的指标，并解析其检测状态"""
+        queryset = Indicator.objects.all()
+        if indicator_codes is not None:
+            queryset = queryset.filter(code__in=list(indicator_codes))
+        else:
+            queryset = queryset.filter(is_active=True)
+
+        rows = queryset.order_by().annotate(
+            last_collected=Max('data_points__collection_time')
+        ).values('id', 'code', 'frequency', 'metadata', 'last_collected')
+
+        selected = {}
+        for row in rows:
+            if row['last_collected'] is None:
+                result.indicators_skipped += 1
+                continue
+
+            state = None if full else self._load_state(row['metadata'])
+            if state is not None and state['evaluated_at'] >= row['last_collected']:
+                result.indicators_skipped += 1
+                continue
+
+            row['state'] = state
+            selected[row['id']] = row
+        return selected
+
+    def _load_state(self, metadata) -> Optional[Dict]:
+        """解析保存的检测状态，参数变化或格式不符时返回None（触发全量检测）"""
+        state = (metadata or {}).get(STATE_KEY)
+        if not isinstance(state, dict) or state.get('params') != self.config.signature:
+            return None
+        try:
+            return {
+                'last_date': date.fromisoformat(state['last_date']),
+                'evaluated_at': datetime.fromisoformat(state['evaluated_at']),
+                'tail': np.array([np.nan if v is None else v for v in state['tail']], dtype=np.float64),
+            }
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def _process_chunk(self, indicators: Dict[int, Dict], result: AnomalyDetectionResult):
+        """检测一批指标并回写标记与状态"""
+        condition = Q()
+        for pk, info in indicators.items():
+            if info['state'] is None:
+                condition |= Q(indicator_id=pk)
+            else:
+                condition |= Q(indicator_id=pk, date__gt=info['state']['last_date'])
+
+        rows = list(
+            IndicatorData.objects.filter(condition)
+            .order_by('indicator_id', 'date')
+            .values_list('indicator_id', 'id', 'date', 'value', 'is_anomaly')
+        )
+        evaluated_at = timezone.now()
+
+        changed: List[IndicatorData] = []
+        state_updates: Dict[int, Dict] = {}
+
+        if rows:
+            indicator_ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+            bounds = np.concatenate([[0], np.flatnonzero(np.diff(indicator_ids)) + 1, [len(rows)]])
+        else:
+            bounds = np.array([0])
+
+        seen = set()
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            part = rows[start:end]
+            pk = part[0][0]
+            seen.add(pk)
+            info = indicators[pk]
+
+            values = np.array([r[3] for r in part], dtype=np.float64)
+            tail = info['state']['tail'] if info['state'] else np.empty(0)
+            check_stale = normalize_frequency(info['frequency']) in STALE_CHECK_FREQUENCIES
+            flags = detect_anomalies(
+                np.concatenate([tail, values]), self.config, check_stale
+            )[len(tail):]
+
+            current = np.array([r[4] for r in part], dtype=bool)
+            for index in np.flatnonzero(flags != current):
+                changed.append(IndicatorData(id=part[index][1], is_anomaly=bool(flags[index])))
+
+            combined_tail = np.concatenate([tail, values])[-self.config.tail_length:]
+            state_updates[pk] = self._build_state(part[-1][2], combined_tail, evaluated_at)
+
+            result.indicators_evaluated += 1
+            result.points_evaluated += len(part)
+            result.anomalies_found += int(flags.sum())
+
+        # 没有新数据点的指标（如仅重新采集了旧日期）只刷新检测时间
+        for pk, info in indicators.items():
+            if pk not in seen:
+                result.indicators_skipped += 1
+                if info['state'] is not None:
+                    state_updates[pk] = self._build_state(
+                        info['state']['last_date'], info['state']['tail'], evaluated_at
+                    )
+
+        with transaction.atomic():
+            if changed:
+                IndicatorData.objects.bulk_update(changed, ['is_anomaly'], batch_size=self.batch_size)
+            Indicator.update_metadata_key(STATE_KEY, state_updates, batch_size=self.batch_size)
+        result.flags_changed += len(changed)
+
+    def _build_state(self, last_date: date, tail: np.ndarray, evaluated_at) -> Dict:
+        """构造保存在指标元数据中的检测状态"""
+        return {
+            'params': self.config.signature,
+            'last_date': last_date.isoformat(),
+            'evaluated_at': evaluated_at.isoformat(),
+            # JSON不支持NaN，以None保存
+            'tail': [float(v) if np.isfinite(v) else None for v in tail],
+        }
+
+
+def run_anomaly_detection(indicator_codes: Iterable[str] = None, full: bool = False) -> AnomalyDetectionResult:
+    """执行异常检测的便捷函数"""
+    return AnomalyDetector().run(indicator_codes=indicator_codes, full=full)
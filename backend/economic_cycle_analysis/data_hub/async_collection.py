@@ -0,0 +1,528 @@
+# -*- coding: utf-8 -*-
+"""
+异步采集运行时
+在单个进程内用 asyncio 编排大量采集任务，阻塞的 AkShare / WindPy 调用交给有界线程池：
+1. 抓取：按上游请求去重（同一AkShare函数与参数、同一Wind请求类型的代码批次只请求一次），
+   受并发上限、各数据源限速与上游熔断约束，每个任务有独立的截止时间
+2. 清洗：小数据在线程池中清洗，行数较多的数据交给进程池
+3. 写入：清洗结果进入有界队列，由单个写入协程按批在同一事务中写库，
+   每个指标使用独立的保存点，单个指标写入失败只回滚该指标
+4. 进度：每个指标的开始、抓取、保存、失败、跳过、超时、取消都以 CollectionEvent 通知调用方
+5. 变更检测：返回完整历史的AkShare数据与上次指纹一致时不清洗、不写库（unchanged 事件）
+
+注意：线程中的阻塞调用无法被中断，超时或取消只是不再等待其结果，线程会在SDK返回后自行结束
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from django.db import connection, transaction
+
+from .circuit_breaker import akshare_circuit_key, get_circuit_breakers, wind_circuit_key
+from .fingerprint import SeriesChange, config_hash, frame_hash, load_fingerprints
+
+logger = logging.getLogger(__name__)
+
+# 同时进行的抓取任务上限
+MAX_IN_FLIGHT = 128
+
+# 各数据源每秒请求数上限（令牌桶），Wind调用由会话串行化，不另外限速
+SOURCE_RATE_LIMITS = {'akshare': 10.0, 'wind': None}
+
+# 单个抓取任务的截止时间（秒）
+TASK_TIMEOUT = 120
+
+# 行数达到该值的数据交给进程池清洗
+PROCESS_CLEAN_MIN_ROWS = 20000
+
+# 每批写入的指标数
+WRITE_BATCH_SIZE = 20
+
+# 等待写入的指标数上限（队列满时抓取任务等待，形成背压）
+WRITE_QUEUE_SIZE = 256
+
+EVENT_KINDS = ('started', 'fetched', 'saved', 'unchanged', 'failed', 'skipped', 'timeout', 'cancelled')
+
+
+@dataclass
+class CollectionEvent:
+    """采集进度事件"""
+    kind: str
+    indicator_code: str
+    source: str = ''
+    records: int = 0
+    message: str = ''
+    elapsed: float = 0.0
+    timestamp: str = field(default_factory=lambda: datetime.now().isoformat())
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+@dataclass
+class AsyncCollectionResult:
+    """异步采集结果"""
+    total_indicators: int = 0
+    successful_indicators: int = 0
+    unchanged_indicators: int = 0
+    failed_indicators: int = 0
+    skipped_indicators: int = 0
+    timed_out_indicators: int = 0
+    cancelled_indicators: int = 0
+    total_data_points: int = 0
+    fetch_requests: int = 0
+    execution_time: float = 0.0
+    cancelled: bool = False
+    errors: List[Dict] = field(default_factory=list)
+
+
+@dataclass
+class FetchTask:
+    """一次上游请求及依赖其结果的指标"""
+    source: str
+    circuit_key: str
+    indicator_codes: List[str]
+    request: Tuple
+
+
+class AsyncRateLimiter:
+    """令牌桶限速"""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_worker_cleaners: Dict[str, object] = {}
+
+
+def _clean_in_worker(source: str, data_df, config: Dict):
+    """进程池中的清洗（每个工作进程复用一个采集器实例）"""
+    cleaner = _worker_cleaners.get(source)
+    if cleaner is None:
+        if source == 'wind':
+            from .wind_data_collector import WindDataCollector
+            cleaner = WindDataCollector()
+        else:
+            from .enhanced_data_collector_methods import EnhancedDataCollectorMethods
+            cleaner = EnhancedDataCollectorMethods()
+        _worker_cleaners[source] = cleaner
+    return cleaner._clean_and_standardize_data(data_df, config)
+
+
+class AsyncCollectionRuntime:
+    """异步采集运行时"""
+
+    def __init__(self,
+                 akshare_collector=None,
+                 wind_collector=None,
+                 max_in_flight: int = MAX_IN_FLIGHT,
+                 rate_limits: Dict[str, Optional[float]] = None,
+                 task_timeout: float = TASK_TIMEOUT,
+                 process_clean_min_rows: int = PROCESS_CLEAN_MIN_ROWS,
+                 process_workers: Optional[int] = None,
+                 write_batch_size: int = WRITE_BATCH_SIZE,
+                 on_event: Callable[[CollectionEvent], None] = None):
+        """
+        Args:
+            akshare_collector: AkShare采集器，默认 EnhancedDataCollectorMethods
+            wind_collector: Wind采集器，不指定则只采集AkShare指标
+            max_in_flight: 同时进行的抓取任务上限
+            rate_limits: 各数据源每秒请求数上限，None表示不限速
+            task_timeout: 单个抓取任务的截止时间（秒）
+            process_clean_min_rows: 行数达到该值的数据交给进程池清洗，0表示不使用进程池
+            process_workers: 清洗进程数，默认为CPU核数
+            write_batch_size: 每批写入的指标数
+            on_event: 进度事件回调
+        """
+        if akshare_collector is None:
+            from .enhanced_data_collector_methods import EnhancedDataCollectorMethods
+            akshare_collector = EnhancedDataCollectorMethods()
+        self.collectors = {'akshare': akshare_collector}
+        if wind_collector is not None:
+            self.collectors['wind'] = wind_collector
+
+        self.max_in_flight = max_in_flight
+        self.rate_limits = {**SOURCE_RATE_LIMITS, **(rate_limits or {})}
+        self.task_timeout = task_timeout
+        self.process_clean_min_rows = process_clean_min_rows
+        self.process_workers = process_workers
+        self.write_batch_size = write_batch_size
+        self.on_event = on_event
+        self.circuit_breakers = get_circuit_breakers()
+
+        self._tasks: List[asyncio.Task] = []
+        self._cancel_requested = False
+
+    def cancel(self):
+        """取消进行中的采集（已抓取的数据仍会写入）"""
+        self._cancel_requested = True
+        for task in self._tasks:
+            task.cancel()
+
+    def run(self, indicator_codes: List[str], start_date: str = None, end_date: str = None) -> AsyncCollectionResult:
+        """同步入口：在新的事件循环中执行采集"""
+        return asyncio.run(self.collect(indicator_codes, start_date, end_date))
+
+    async def collect(self,
+                      indicator_codes: List[str],
+                      start_date: str = None,
+                      end_date: str = None) -> AsyncCollectionResult:
+        """
+        采集一组指标
+
+        Args:
+            indicator_codes: 指标代码列表
+            start_date: 开始日期，格式：YYYY-MM-DD
+            end_date: 结束日期，格式：YYYY-MM-DD
+
+        Returns:
+            AsyncCollectionResult: 采集结果
+        """
+        started = time.monotonic()
+        result = AsyncCollectionResult(total_indicators=len(indicator_codes))
+        self._result = result
+        self._cancel_requested = False
+
+        loop = asyncio.get_running_loop()
+        self._fetch_pool = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix='collect-fetch')
+        self._db_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='collect-db')
+        self._process_pool = None
+        if self.process_clean_min_rows:
+            # 在启动任何线程之前创建清洗进程，避免 fork 时复制其他线程持有的锁
+            self._start_process_pool()
+        self._limiters = {
+            source: AsyncRateLimiter(rate) for source, rate in self.rate_limits.items() if rate
+        }
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
+
+        try:
+            self._indicators = await loop.run_in_executor(
+                self._db_pool, self._load_indicators, indicator_codes
+            )
+            self._fingerprints = await loop.run_in_executor(
+                self._db_pool, load_fingerprints, [indicator.id for indicator in self._indicators.values()]
+            )
+            fetch_tasks = self._plan(indicator_codes, start_date, end_date)
+            result.fetch_requests = len(fetch_tasks)
+            logger.info(f"异步采集 {len(indicator_codes)} 个指标，合并为 {len(fetch_tasks)} 个上游请求")
+
+            writer = asyncio.create_task(self._writer())
+            self._tasks = [asyncio.create_task(self._run_fetch(task)) for task in fetch_tasks]
+            try:
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+            except asyncio.CancelledError:
+                # 外部取消：停止抓取，已进入队列的数据继续写入
+                self.cancel()
+                await asyncio.gather(*self._tasks, return_exceptions=True)
+                result.cancelled = True
+                raise
+            finally:
+                await self._queue.put(None)
+                await writer
+        finally:
+            result.cancelled = result.cancelled or self._cancel_requested
+            result.execution_time = time.monotonic() - started
+            self._shutdown()
+
+        logger.info(
+            f"异步采集完成: 成功 {result.successful_indicators}, 失败 {result.failed_indicators}, "
+            f"跳过 {result.skipped_indicators}, 超时 {result.timed_out_indicators}, "
+            f"取消 {result.cancelled_indicators}, 耗时 {result.execution_time:.2f}秒"
+        )
+        return result
+
+    def _load_indicators(self, indicator_codes: List[str]) -> Dict:
+        from .models import Indicator
+        return Indicator.objects.in_bulk(indicator_codes, field_name='code')
+
+    def _plan(self, indicator_codes: List[str], start_date: str, end_date: str) -> List[FetchTask]:
+        """按上游请求合并指标"""
+        akshare = self.collectors['akshare']
+        wind = self.collectors.get('wind')
+        tasks: Dict[Tuple, FetchTask] = {}
+
+        for code in indicator_codes:
+            if code not in self._indicators:
+                self._emit(CollectionEvent('failed', code, message=f"指标不存在: {code}"))
+                continue
+
+            config = akshare.akshare_mappings.get(code)
+            if config is not None:
+                params = tuple(sorted((config.get('params') or {}).items()))
+                key = ('akshare', config['func'], params)
+                if key not in tasks:
+                    tasks[key] = FetchTask(
+                        'akshare', akshare_circuit_key(config['func']), [], (config, start_date, end_date)
+                    )
+                tasks[key].indicator_codes.append(code)
+                continue
+
+            config = wind.wind_mappings.get(code) if wind is not None else None
+            request_type = wind._request_type(config) if config is not None else None
+            if request_type is None:
+                self._emit(CollectionEvent('skipped', code, message=f"未找到指标 {code} 的数据源映射配置"))
+                continue
+            key = ('wind', *request_type)
+            if key not in tasks:
+                tasks[key] = FetchTask('wind', wind_circuit_key(*request_type), [], request_type)
+            tasks[key].indicator_codes.append(code)
+
+        # Wind按请求类型分批，每批一次多代码请求
+        from .wind_data_collector import MAX_CODES_PER_REQUEST
+
+        planned = []
+        for task in tasks.values():
+            if task.source != 'wind':
+                planned.append(task)
+                continue
+            start, end = wind._default_date_range(start_date, end_date)
+            for i in range(0, len(task.indicator_codes), MAX_CODES_PER_REQUEST):
+                planned.append(FetchTask(
+                    'wind', task.circuit_key, task.indicator_codes[i:i + MAX_CODES_PER_REQUEST],
+                    (*task.request, start, end)
+                ))
+        return planned
+
+    async def _run_fetch(self, task: FetchTask):
+        codes = task.indicator_codes
+        try:
+            async with self._semaphore:
+                if self._cancel_requested:
+                    raise asyncio.CancelledError()
+                limiter = self._limiters.get(task.source)
+                if limiter is not None:
+                    await limiter.acquire()
+                if not self._circuit_allows(task):
+                    for code in codes:
+                        self._emit(CollectionEvent(
+                            'skipped', code, task.source, message=f"上游 {task.circuit_key} 熔断中"
+                        ))
+                    return
+
+                for code in codes:
+                    self._emit(CollectionEvent('started', code, task.source))
+                started = time.monotonic()
+                frames = await asyncio.wait_for(self._fetch(task), timeout=self.task_timeout)
+                elapsed = time.monotonic() - started
+
+            changes = await self._detect_changes(task, frames)
+            for code in codes:
+                data_df = frames.get(code)
+                if data_df is None or data_df.empty:
+                    self._emit(CollectionEvent(
+                        'failed', code, task.source, message=f"指标 {code} 未获取到数据", elapsed=elapsed
+                    ))
+                    continue
+                self._emit(CollectionEvent('fetched', code, task.source, records=len(data_df), elapsed=elapsed))
+                change = changes.get(code)
+                if change is not None and change.unchanged:
+                    self._emit(CollectionEvent('unchanged', code, task.source))
+                    continue
+                cleaned = await self._clean(task.source, code, data_df)
+                if cleaned is None or cleaned.empty:
+                    self._emit(CollectionEvent('failed', code, task.source, message=f"指标 {code} 清洗后数据为空"))
+                    continue
+                await self._queue.put((task.source, code, cleaned, change))
+
+        except asyncio.TimeoutError:
+            for code in codes:
+                self._emit(CollectionEvent(
+                    'timeout', code, task.source, message=f"超过 {self.task_timeout} 秒未返回"
+                ))
+        except asyncio.CancelledError:
+            for code in codes:
+                self._emit(CollectionEvent('cancelled', code, task.source))
+        except Exception as e:
+            for code in codes:
+                self._emit(CollectionEvent('failed', code, task.source, message=str(e)))
+
+    def _circuit_allows(self, task: FetchTask) -> bool:
+        # AkShare请求在此占用半开试探名额，Wind批量请求由采集器自行判断
+        if task.source == 'akshare':
+            return self.circuit_breakers.allow(task.circuit_key)
+        return not self.circuit_breakers.is_open(task.circuit_key)
+
+    async def _fetch(self, task: FetchTask) -> Dict[str, object]:
+        """在线程池中执行阻塞的上游请求，返回 指标代码 -> 原始数据"""
+        loop = asyncio.get_running_loop()
+        collector = self.collectors[task.source]
+
+        if task.source == 'akshare':
+            config, start_date, end_date = task.request
+            data_df = await loop.run_in_executor(
+                self._fetch_pool, collector._fetch_data_from_akshare, config, start_date, end_date
+            )
+            return {code: data_df for code in task.indicator_codes}
+
+        function, field_name, start_date, end_date = task.request
+        wind_codes = {code: collector.wind_mappings[code]['wind_code'] for code in task.indicator_codes}
+        frames = await loop.run_in_executor(
+            self._fetch_pool, collector._fetch_group_from_wind,
+            function, field_name, list(dict.fromkeys(wind_codes.values())), start_date, end_date
+        )
+        return {code: frames.get(wind_code.upper()) for code, wind_code in wind_codes.items()}
+
+    async def _detect_changes(self, task: FetchTask, frames: Dict[str, object]) -> Dict[str, SeriesChange]:
+        """AkShare完整历史请求：计算原始数据摘要并与各指标的上次指纹比较"""
+        if task.source != 'akshare':
+            return {}
+        _, start_date, end_date = task.request
+        collector = self.collectors['akshare']
+        if not hasattr(collector, '_detect_change') or (
+            start_date and end_date and collector.supports_date_range(task.indicator_codes[0])
+        ):
+            # 按日期区间请求的结果随区间变化，不做变更检测
+            return {}
+
+        data_df = next((frame for frame in frames.values() if frame is not None and not frame.empty), None)
+        if data_df is None:
+            return {}
+        loop = asyncio.get_running_loop()
+        raw_hash = await loop.run_in_executor(self._fetch_pool, frame_hash, data_df)
+        return {
+            code: SeriesChange(
+                raw_hash,
+                self._fingerprints.get(self._indicators[code].id),
+                config_hash(collector.akshare_mappings[code]),
+            )
+            for code in task.indicator_codes
+        }
+
+    async def _clean(self, source: str, code: str, data_df):
+        loop = asyncio.get_running_loop()
+        collector = self.collectors[source]
+        config = collector.akshare_mappings[code] if source == 'akshare' else collector.wind_mappings[code]
+
+        pool = self._process_pool
+        if pool is not None and len(data_df) >= self.process_clean_min_rows:
+            return await loop.run_in_executor(pool, _clean_in_worker, source, data_df, config)
+        return await loop.run_in_executor(self._fetch_pool, collector._clean_and_standardize_data, data_df, config)
+
+    def _start_process_pool(self):
+        # 工作进程只做pandas清洗，使用 fork 避免在子进程中重新初始化Django
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            return
+        self._process_pool = ProcessPoolExecutor(
+            max_workers=self.process_workers, mp_context=multiprocessing.get_context('fork')
+        )
+        self._process_pool.submit(int).result()
+
+    async def _writer(self):
+        """批量写库：攒够一批或队列暂时为空时写入"""
+        loop = asyncio.get_running_loop()
+        finished = False
+        while not finished:
+            batch = [await self._queue.get()]
+            while len(batch) < self.write_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if batch[-1] is None:
+                batch.pop()
+                finished = True
+            if not batch:
+                continue
+
+            try:
+                saved = await loop.run_in_executor(self._db_pool, self._write_batch, batch)
+            except Exception as e:
+                logger.error(f"批量写入失败: {str(e)}")
+                for source, code, *_ in batch:
+                    self._emit(CollectionEvent('failed', code, source, message=f"写入失败: {str(e)}"))
+                continue
+            for (source, code, *_), (records, error) in zip(batch, saved):
+                if error is None:
+                    self._emit(CollectionEvent('saved', code, source, records=records))
+                else:
+                    self._emit(CollectionEvent('failed', code, source, message=f"写入失败: {error}"))
+
+    def _write_batch(self, batch: List[Tuple]) -> List[Tuple[int, Optional[str]]]:
+        """
+        写库线程：一批指标在同一事务中写入，每个指标一个保存点
+
+        Returns:
+            List[(保存的记录数, 错误信息)]，与 batch 一一对应，成功时错误信息为None
+        """
+        saved = []
+        with transaction.atomic():
+            for source, code, cleaned, change in batch:
+                collector, indicator = self.collectors[source], self._indicators[code]
+                try:
+                    with transaction.atomic():
+                        if change is None:
+                            records = collector._write_series(indicator, cleaned)
+                        else:
+                            records = collector._write_series(indicator, cleaned, change)
+                    saved.append((records, None))
+                except Exception as e:
+                    logger.error(f"指标 {code} 写入失败: {str(e)}")
+                    saved.append((0, str(e)))
+        return saved
+
+    def _emit(self, event: CollectionEvent):
+        result = self._result
+        if event.kind == 'saved':
+            result.successful_indicators += 1
+            result.total_data_points += event.records
+        elif event.kind == 'unchanged':
+            result.successful_indicators += 1
+            result.unchanged_indicators += 1
+        elif event.kind == 'failed':
+            result.failed_indicators += 1
+        elif event.kind == 'skipped':
+            result.skipped_indicators += 1
+        elif event.kind == 'timeout':
+            result.timed_out_indicators += 1
+        elif event.kind == 'cancelled':
+            result.cancelled_indicators += 1
+        if event.kind in ('failed', 'skipped', 'timeout'):
+            result.errors.append({
+                'indicator_code': event.indicator_code,
+                'source': event.source,
+                'error': event.message,
+                'timestamp': event.timestamp,
+            })
+
+        if self.on_event is not None:
+            try:
+                self.on_event(event)
+            except Exception as e:
+                logger.warning(f"进度回调出错: {str(e)}")
+
+    def _shutdown(self):
+        # 写库线程持有独立的数据库连接，结束前关闭
+        self._db_pool.submit(lambda: connection.close()).result()
+        self._db_pool.shutdown(wait=True)
+        # 超时或取消的抓取线程可能仍在等待SDK返回，不阻塞调用方
+        self._fetch_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=True)
+        self._tasks = []
+
+
+def collect_indicators_async(indicator_codes: List[str],
+                             start_date: str = None,
+                             end_date: str = None,
+                             **kwargs) -> AsyncCollectionResult:
+    """异步采集一组指标（同步调用，参数同 AsyncCollectionRuntime）"""
+    return AsyncCollectionRuntime(**kwargs).run(indicator_codes, start_date, end_date)
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+"""
+信号回测
+对由已存储（或派生）指标构成的信号规则，例如股权风险溢价
+"(1/CSI300_PE) - (CN_10Y_BOND_YIELD/100) > 阈值 → 超配股票"，
+在已采集的指数序列（index_zh_a_hist，如 CSI300_INDEX）上评估收益、胜率与回撤
+
+参数网格（阈值 × 执行滞后）在一次矩阵运算中向量化评估，网格较大时按列分块交给进程池；
+结果按 (规则, 参数, 数据版本) 缓存，重复扫描只需读取缓存
+"""
+
+import hashlib
+import json
+import logging
+import multiprocessing
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.core.cache import cache
+
+from .frequency import forward_fill
+from .series_matrix import PERIODS_PER_YEAR, AlignedMatrix, align_series, indicator_profiles
+from .series_store import data_version, load_series_arrays, load_vintage_arrays
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FREQUENCIES = ('D', 'W', 'M')
+DIRECTIONS = ('above', 'below')
+MODES = ('long_flat', 'long_short')
+
+DEFAULT_BENCHMARK = 'CSI300_INDEX'
+
+# 每个工作进程至少分到的参数组合数，网格小于该值的两倍时直接在当前进程计算
+MIN_CHUNK_SIZE = 64
+
+# 信号输入缺失（如发布间隔）时最多向前沿用的期数
+SIGNAL_FILL_LIMIT = {'D': 25, 'W': 5, 'M': 1}
+
+CACHE_TIMEOUT = 60 * 60 * 24
+
+METRICS = (
+    'total_return', 'annual_return', 'volatility', 'sharpe', 'max_drawdown',
+    'hit_rate', 'exposure', 'trades',
+)
+
+_CODE_PATTERN = re.compile(r'\b[A-Z][A-Z0-9_]*\b')
+
+_SAFE_FUNCTIONS = {
+    'abs': np.abs, 'log': np.log, 'exp': np.exp, 'sqrt': np.sqrt,
+    'maximum': np.maximum, 'minimum': np.minimum,
+}
+
+
+@dataclass
+class SignalRule:
+    """
+    信号规则：expression 与阈值比较得到持仓信号
+
+    direction='above' 表示表达式高于阈值时持有基准（超配），'below' 相反；
+    mode='long_short' 时信号不成立则做空，'long_flat' 时空仓
+    """
+    expression: str
+    benchmark: str = DEFAULT_BENCHMARK
+    direction: str = 'above'
+    mode: str = 'long_flat'
+    frequency: str = 'M'
+    name: str = ''
+
+    def validate(self):
+        if self.direction not in DIRECTIONS:
+            raise ValueError(f"不支持的信号方向: {self.direction}")
+        if self.mode not in MODES:
+            raise ValueError(f"不支持的持仓模式: {self.mode}")
+        if self.frequency not in SUPPORTED_FREQUENCIES:
+            raise ValueError(f"回测不支持频率: {self.frequency}")
+        if not self.codes:
+            raise ValueError(f"表达式中没有指标代码: {self.expression}")
+
+    @property
+    def codes(self) -> List[str]:
+        """表达式引用的指标代码"""
+        return sorted(set(_CODE_PATTERN.findall(self.expression)) - set(_SAFE_FUNCTIONS))
+
+
+@dataclass
+class BacktestResult:
+    """参数网格回测结果"""
+    rule: Dict
+    thresholds: List[float]
+    lags: List[int]
+    start_date: Optional[str] = None
+    end_date: Optional[str] = None
+    periods: int = 0
+    metrics: Dict[str, List[float]] = field(default_factory=dict)
+    benchmark: Dict[str, float] = field(default_factory=dict)
+    version: str = ''
+    execution_time: float = 0.0
+
+    def rows(self, sort_by: str = 'sharpe', limit: Optional[int] = None) -> List[Dict]:
+        """按参数组合展开并排序（无效值排在最后）"""
+        rows = [
+            {'threshold': threshold, 'lag': lag, **{name: self.metrics[name][i] for name in METRICS}}
+            for i, (threshold, lag) in enumerate(zip(self.thresholds, self.lags))
+        ]
+        rows.sort(key=lambda row: (row[sort_by] is None, -(row[sort_by] or 0.0)))
+        return rows[:limit] if limit else rows
+
+
+def evaluate_expression(expression: str, columns: Dict[str, np.ndarray]) -> np.ndarray:
+    """在对齐后的列上计算信号表达式"""
+    namespace = {'__builtins__': {}, **_SAFE_FUNCTIONS, **columns}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        values = eval(expression, namespace)
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 0:
+        raise ValueError(f"表达式结果不是序列: {expression}")
+    return np.where(np.isfinite(values), values, np.nan)
+
+
+def evaluate_grid(signal: np.ndarray,
+                  returns: np.ndarray,
+                  thresholds: np.ndarray,
+                  lags: np.ndarray,
+                  direction: str,
+                  mode: str,
+                  periods_per_year: int) -> Dict[str, np.ndarray]:
+    """
+    向量化评估参数网格（每列一个参数组合）
+
+    Args:
+        signal: 信号表达式序列，shape = (T,)，NaN 视为信号不成立
+        returns: 基准每期收益，shape = (T,)，第t期为 t-1 期末到 t 期末的收益
+        thresholds: 各组合的阈值，shape = (P,)
+        lags: 各组合的执行滞后期数（>=1，第t期末的信号从 t+lag 期开始持有）
+        direction: above/below
+        mode: long_flat/long_short
+
+    Returns:
+        Dict: 指标名 -> shape = (P,) 的数组
+    """
+    n_periods = len(signal)
+    with np.errstate(invalid='ignore'):
+        if direction == 'above':
+            active = signal[:, None] > thresholds[None, :]
+        else:
+            active = signal[:, None] < thresholds[None, :]
+    flat = -1.0 if mode == 'long_short' else 0.0
+    raw = np.where(active, 1.0, flat)
+    raw[~np.isfinite(signal)] = 0.0
+
+    # 第 t 期持仓取 t-lag 期末的信号
+    rows = np.arange(n_periods)[:, None] - lags[None, :]
+    positions = np.take_along_axis(raw, np.maximum(rows, 0), axis=0)
+    positions[rows < 0] = 0.0
+
+    period_returns = positions * np.nan_to_num(returns)[:, None]
+    equity = np.cumprod(1.0 + period_returns, axis=0)
+    drawdown = equity / np.maximum.accumulate(equity, axis=0) - 1.0
+
+    invested = positions != 0
+    n_invested = invested.sum(axis=0)
+    mean = period_returns.mean(axis=0)
+    std = period_returns.std(axis=0, ddof=1) if n_periods > 1 else np.zeros(len(thresholds))
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        total_return = equity[-1] - 1.0
+        annual_return = np.where(equity[-1] > 0, equity[-1] ** (periods_per_year / n_periods) - 1.0, -1.0)
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+        hit_rate = np.where(n_invested > 0, ((period_returns > 0) & invested).sum(axis=0) / n_invested, np.nan)
+
+    return {
+        'total_return': total_return,
+        'annual_return': annual_return,
+        'volatility': std * np.sqrt(periods_per_year),
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min(axis=0),
+        'hit_rate': hit_rate,
+        'exposure': n_invested / n_periods,
+        'trades': (np.diff(positions, axis=0) != 0).sum(axis=0).astype(np.float64),
+    }
+
+
+def _evaluate_chunk(args) -> Dict[str, np.ndarray]:
+    return evaluate_grid(*args)
+
+
+def evaluate_grid_parallel(signal: np.ndarray,
+                           returns: np.ndarray,
+                           thresholds: np.ndarray,
+                           lags: np.ndarray,
+                           direction: str,
+                           mode: str,
+                           periods_per_year: int,
+                           workers: int = 1) -> Dict[str, np.ndarray]:
+    """将参数网格按列分块，使用进程池并行评估"""
+    n_chunks = min(workers, len(thresholds) // MIN_CHUNK_SIZE)
+    if n_chunks < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+        return evaluate_grid(signal, returns, thresholds, lags, direction, mode, periods_per_year)
+
+    chunks = [
+        (signal, returns, t, l, direction, mode, periods_per_year)
+        for t, l in zip(np.array_split(thresholds, n_chunks), np.array_split(lags, n_chunks))
+    ]
+    # 工作进程只做NumPy计算，使用 fork 避免在子进程中重新初始化Django
+    with ProcessPoolExecutor(max_workers=n_chunks, mp_context=multiprocessing.get_context('fork')) as pool:
+        parts = list(pool.map(_evaluate_chunk, chunks))
+    return {name: np.concatenate([part[name] for part in parts]) for name in METRICS}
+
+
+def load_backtest_matrix(profiles: Dict[str, Dict], frequency: str, as_of=None) -> AlignedMatrix:
+    """
+    加载回测所需指标的对齐矩阵（按指标自身频率与发布时滞协调）
+
+    Args:
+        profiles: indicator_profiles 的返回值
+        as_of: 时点，给定时使用该时点可见的数据版本，None表示最新数据
+    """
+    ids = [profile['id'] for profile in profiles.values()]
+    if as_of is None:
+        series = load_series_arrays(ids)
+    else:
+        series = load_vintage_arrays(ids, as_of)
+
+    return align_series(
+        {code: series.get(profile['id']) for code, profile in profiles.items()},
+        frequency,
+        'last',
+        source_frequencies={code: profile['frequency'] for code, profile in profiles.items()},
+        publication_lags={code: profile['publication_lag'] for code, profile in profiles.items()},
+    )
+
+
+def _cache_key(rule: SignalRule, thresholds, lags, version: str, as_of) -> str:
+    key_source = json.dumps([asdict(rule), list(thresholds), list(lags), version, as_of], default=str)
+    return f"backtest:{hashlib.md5(key_source.encode('utf-8')).hexdigest()}"
+
+
+def _clean(values: np.ndarray) -> List[Optional[float]]:
+    return [None if not np.isfinite(v) else round(float(v), 6) for v in values]
+
+
+def run_backtest(rule: SignalRule,
+                 thresholds: Iterable[float],
+                 lags: Iterable[int] = (1,),
+                 start_date=None,
+                 end_date=None,
+                 as_of=None,
+                 workers: int = 1,
+                 use_cache: bool = True) -> BacktestResult:
+    """
+    回测信号规则在参数网格（阈值 × 执行滞后）上的表现
+
+    Args:
+        rule: 信号规则
+        thresholds: 阈值候选
+        lags: 执行滞后期数候选（>=1，避免使用当期尚未可得的信号）
+        start_date: 回测开始日期
+        end_date: 回测结束日期
+        as_of: 使用该时点可见的数据版本
+        workers: 进程数
+        use_cache: 是否读取/写入结果缓存
+
+    Returns:
+        BacktestResult: 各参数组合的收益、波动、夏普、最大回撤、胜率、持仓占比与换手次数
+    """
+    started = time.time()
+    rule.validate()
+    thresholds = [float(t) for t in thresholds]
+    lags = [int(l) for l in lags]
+    if not thresholds:
+        raise ValueError("至少需要一个阈值")
+    if not lags or min(lags) < 1:
+        raise ValueError("执行滞后期数必须为正整数")
+
+    codes = sorted(set(rule.codes) | {rule.benchmark})
+    profiles = indicator_profiles(codes)
+    missing = [code for code in codes if code not in profiles]
+    if missing:
+        raise ValueError(f"指标不存在: {', '.join(missing)}")
+
+    version = data_version(profile['id'] for profile in profiles.values())
+    key = _cache_key(rule, thresholds, lags, version, [as_of, start_date, end_date])
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    matrix = load_backtest_matrix(profiles, rule.frequency, as_of)
+    missing = [code for code in codes if code not in matrix.codes]
+    if missing:
+        raise ValueError(f"指标无数据: {', '.join(missing)}")
+
+    dates = matrix.dates
+    keep = np.ones(len(dates), dtype=bool)
+    if start_date:
+        keep &= dates >= np.datetime64(start_date, 'D')
+    if end_date:
+        keep &= dates <= np.datetime64(end_date, 'D')
+    values = forward_fill(matrix.values[keep], SIGNAL_FILL_LIMIT[rule.frequency])
+    dates = dates[keep]
+    if len(dates) < 2:
+        raise ValueError("回测区间内数据不足")
+
+    columns = {code: values[:, j] for j, code in enumerate(matrix.codes)}
+    signal = evaluate_expression(rule.expression, {code: columns[code] for code in rule.codes})
+
+    prices = columns[rule.benchmark]
+    returns = np.full(len(prices), np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+
+    grid_thresholds = np.repeat(np.array(thresholds), len(lags))
+    grid_lags = np.tile(np.array(lags, dtype=np.int64), len(thresholds))
+    periods_per_year = PERIODS_PER_YEAR[rule.frequency]
+    metrics = evaluate_grid_parallel(
+        signal, returns, grid_thresholds, grid_lags, rule.direction, rule.mode, periods_per_year, workers
+    )
+    benchmark = evaluate_grid(
+        np.ones(len(prices)), returns, np.array([0.0]), np.array([1]), 'above', 'long_flat', periods_per_year
+    )
+
+    result = BacktestResult(
+        rule=asdict(rule),
+        thresholds=grid_thresholds.tolist(),
+        lags=grid_lags.tolist(),
+        start_date=str(dates[0]),
+        end_date=str(dates[-1]),
+        periods=len(dates),
+        metrics={name: _clean(metrics[name]) for name in METRICS},
+        benchmark={name: _clean(benchmark[name])[0] for name in METRICS},
+        version=version,
+        execution_time=time.time() - started,
+    )
+    logger.info(
+        f"回测完成: {rule.name or rule.expression}, 参数组合 {len(result.thresholds)} 个, "
+        f"期数 {result.periods}, 耗时 {result.execution_time:.2f}秒"
+    )
+    if use_cache:
+        cache.set(key, result, timeout=CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+指标目录批量导入器
+在内存中将导入数据与现有指标目录比对，一次性创建缺失分类，
+并在单个事务内分块执行 bulk_create / bulk_update，未变化的指标不产生写操作
+"""
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import IndicatorCategory, Indicator
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ImportStats:
+    """指标目录导入统计"""
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    errors: int = 0
+    categories_created: int = 0
+    error_messages: List[str] = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.created + self.updated + self.unchanged + self.errors
+
+
+def default_category_defaults(category_name: str) -> Dict:
+    """新建分类的默认字段"""
+    return {
+        'code': category_name.upper(),
+        'level': 1,
+        'description': f"Category for {category_name}",
+    }
+
+
+class CatalogueImporter:
+    """
+    指标目录批量导入器
+
+    每行数据为 Indicator 字段字典，必须包含 code，分类通过 category_name 指定。
+    """
+
+    def __init__(self,
+                 chunk_size: int = 500,
+                 update_existing: bool = True,
+                 category_defaults: Callable[[str], Dict] = default_category_defaults):
+        self.chunk_size = max(1, chunk_size)
+        self.update_existing = update_existing
+        self.category_defaults = category_defaults
+        self._field_map = self._build_field_map()
+
+    def _build_field_map(self) -> Dict:
+        """可写入的具体字段（不含主键和多对多字段）"""
+        return {
+            f.name: f for f in Indicator._meta.concrete_fields
+            if not f.primary_key
+        }
+
+    def import_rows(self, rows: Iterable[Dict]) -> ImportStats:
+        """
+        导入指标数据
+
+        Args:
+            rows: 指标字段字典，包含 code 与 category_name
+
+        Returns:
+            ImportStats: 导入统计
+        """
+        stats = ImportStats()
+        incoming = self._collect_rows(rows, stats)
+        if not incoming:
+            return stats
+
+        with transaction.atomic():
+            categories = self._ensure_categories(
+                {row['category_name'] for row in incoming.values()}, stats
+            )
+            existing = self._load_existing(list(incoming.keys()))
+
+            to_create: List[Indicator] = []
+            to_update: List[Indicator] = []
+            changed_fields = set()
+
+            for code, row in incoming.items():
+                values = self._prepare_values(row, categories[row['category_name']])
+                indicator = existing.get(code)
+
+                if indicator is None:
+                    to_create.append(Indicator(code=code, **values))
+                    continue
+
+                if not self.update_existing:
+                    stats.unchanged += 1
+                    continue
+
+                changes = self._diff(indicator, values)
+                if not changes:
+                    stats.unchanged += 1
+                    continue
+
+                for name, value in changes.items():
+                    setattr(indicator, name, value)
+                changed_fields.update(changes)
+                to_update.append(indicator)
+
+            if to_create:
+                Indicator.objects.bulk_create(to_create, batch_size=self.chunk_size)
+                stats.created = len(to_create)
+
+            if to_update:
+                # bulk_update 不会触发 auto_now，需要手动设置更新时间
+                now = timezone.now()
+                for indicator in to_update:
+                    indicator.updated_at = now
+                changed_fields.add('updated_at')
+                Indicator.objects.bulk_update(
+                    to_update, sorted(changed_fields), batch_size=self.chunk_size
+                )
+                stats.updated = len(to_update)
+
+        logger.info(
+            f"指标目录导入完成: 新建 {stats.created}, 更新 {stats.updated}, "
+            f"未变化 {stats.unchanged}, 错误 {stats.errors}, 新建分类 {stats.categories_created}"
+        )
+        return stats
+
+    def _collect_rows(self, rows: Iterable[Dict], stats: ImportStats) -> Dict[str, Dict]:
+        """校验并按指标代码去重（同一代码以最后一行为准）"""
+        incoming: Dict[str, Dict] = {}
+        for row in rows:
+            code = row.get('code')
+            if not code:
+                self._record_error(stats, f"缺少指标代码: {row.get('name', '')}")
+                continue
+            if not row.get('category_name'):
+                self._record_error(stats, f"指标 {code} 缺少分类")
+                continue
+            incoming[code] = row
+        return incoming
+
+    def _ensure_categories(self, names: Iterable[str], stats: ImportStats) -> Dict[str, IndicatorCategory]:
+        """按名称或代码匹配已有分类，缺失的分类一次性批量创建"""
+        names = set(names)
+        by_name = {c.name: c for c in IndicatorCategory.objects.filter(name__in=names)}
+
+        missing = names - by_name.keys()
+        if missing:
+            defaults = {name: self.category_defaults(name) for name in missing}
+            by_code = {
+                c.code: c for c in IndicatorCategory.objects.filter(
+                    code__in=[d['code'] for d in defaults.values()]
+                )
+            }
+
+            new_categories = []
+            for name in sorted(missing):
+                values = defaults[name]
+                if values['code'] in by_code:
+                    by_name[name] = by_code[values['code']]
+                else:
+                    category = IndicatorCategory(name=name, **values)
+                    new_categories.append(category)
+                    by_code[values['code']] = category
+                    by_name[name] = category
+
+            if new_categories:
+                IndicatorCategory.objects.bulk_create(new_categories, batch_size=self.chunk_size)
+                stats.categories_created = len(new_categories)
+
+            # 部分数据库不会为 bulk_create 回填主键，重新查询一次
+            if any(c.pk is None for c in new_categories):
+                refreshed = {
+                    c.code: c for c in IndicatorCategory.objects.filter(
+                        code__in=[c.code for c in new_categories]
+                    )
+                }
+                for name in missing:
+                    by_name[name] = refreshed.get(by_name[name].code, by_name[name])
+
+        return by_name
+
+    def _load_existing(self, codes: List[str]) -> Dict[str, Indicator]:
+        """分块加载已有指标"""
+        existing: Dict[str, Indicator] = {}
+        for i in range(0, len(codes), self.chunk_size):
+            chunk = codes[i:i + self.chunk_size]
+            for indicator in Indicator.objects.filter(code__in=chunk):
+                existing[indicator.code] = indicator
+        return existing
+
+    def _prepare_values(self, row: Dict, category: IndicatorCategory) -> Dict:
+        """将导入行转换为模型字段值"""
+        values = {'category_id': category.pk}
+        for name, value in row.items():
+            if name in ('code', 'category_name', 'category'):
+                continue
+            model_field = self._field_map.get(name)
+            if model_field is None:
+                continue
+            if value is not None:
+                value = model_field.to_python(value)
+            values[model_field.attname] = value
+        return values
+
+    def _diff(self, indicator: Indicator, values: Dict) -> Dict:
+        """返回与数据库不一致的字段"""
+        return {
+            name: value for name, value in values.items()
+            if getattr(indicator, name) != value
+        }
+
+    def _record_error(self, stats: ImportStats, message: str):
+        stats.errors += 1
+        stats.error_messages.append(message)
+        logger.error(message)
+
+
+def import_catalogue(rows: Iterable[Dict],
+                     chunk_size: int = 500,
+                     update_existing: bool = True,
+                     category_defaults: Optional[Callable[[str], Dict]] = None) -> ImportStats:
+    """批量导入指标目录的便捷函数"""
+    importer = CatalogueImporter(
+        chunk_size=chunk_size,
+        update_existing=update_existing,
+        category_defaults=category_defaults or default_category_defaults,
+    )
+    return importer.import_rows(rows)
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+上游接口熔断
+按上游函数（AkShare函数名、Wind请求类型）维护熔断器：
+1. 关闭(closed)：正常调用，连续失败达到阈值后打开
+2. 打开(open)：冷却期内直接跳过依赖该函数的指标，不再请求和重试
+3. 半开(half_open)：冷却结束后放行一次试探调用，成功则关闭，失败则重新打开
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# 连续失败次数阈值
+FAILURE_THRESHOLD = 3
+
+# 打开后的冷却时间（秒）
+COOLDOWN_SECONDS = 300
+
+
+def akshare_circuit_key(func_name: str) -> str:
+    return f"akshare:{func_name}"
+
+
+def wind_circuit_key(function: str, field: Optional[str] = None) -> str:
+    return f"wind:{function}:{field}" if field else f"wind:{function}"
+
+
+class CircuitBreaker:
+    """单个上游函数的熔断器"""
+
+    def __init__(self, name: str,
+                 failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = COOLDOWN_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def allow(self) -> bool:
+        """是否放行本次调用（冷却结束后只放行一次试探调用）"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state = HALF_OPEN
+            self.trial_in_flight = False
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        self.stats['rejected'] += 1
+        return False
+
+    def record_success(self):
+        self.stats['successes'] += 1
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.stats['failures'] += 1
+        self.consecutive_failures += 1
+        if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.stats['opened'] += 1
+            self.state = OPEN
+            self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+    def retry_after(self) -> float:
+        """距离半开还需等待的秒数"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self.opened_at))
+
+    def to_dict(self) -> Dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_after': round(self.retry_after(), 1),
+            **self.stats,
+        }
+
+
+class CircuitBreakerRegistry:
+    """进程内共享的熔断器集合（线程安全）"""
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(key, self.failure_threshold, self.cooldown)
+            self._breakers[key] = breaker
+        return breaker
+
+    def allow(self, key: str) -> bool:
+        with self._lock:
+            return self._get(key).allow()
+
+    def is_open(self, key: str) -> bool:
+        """是否处于打开状态（仅查询，不占用半开试探名额）"""
+        return self.retry_after(key) > 0
+
+    def retry_after(self, key: str) -> float:
+        """距离半开还需等待的秒数，未打开时为0"""
+        with self._lock:
+            breaker = self._breakers.get(key)
+            return 0.0 if breaker is None else breaker.retry_after()
+
+    def record(self, key: str, success: bool):
+        with self._lock:
+            breaker = self._get(key)
+            if success:
+                breaker.record_success()
+            else:
+                breaker.record_failure()
+
+    def release(self, key: str):
+        """放弃本次调用的结果（不计成败），归还半开试探名额"""
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is not None:
+                breaker.trial_in_flight = False
+
+    def reset(self, key: str = None):
+        """重置指定熔断器（不指定则全部重置）"""
+        with self._lock:
+            if key is None:
+                self._breakers.clear()
+            else:
+                self._breakers.pop(key, None)
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: breaker.to_dict() for key, breaker in sorted(self._breakers.items())}
+
+
+_registry = CircuitBreakerRegistry()
+
+
+def get_circuit_breakers() -> CircuitBreakerRegistry:
+    """获取进程内共享的熔断器集合"""
+    return _registry
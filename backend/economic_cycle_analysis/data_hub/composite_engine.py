@@ -0,0 +1,403 @@
+# -*- coding: utf-8 -*-
+"""
+复合指标与扩散指数计算引擎
+所有复合指标的成分在同一个对齐矩阵上统一变换、滞后与标准化，
+再用一次矩阵乘法得到全部复合指标（缺失成分按剩余权重重新归一化）；
+扩散指数为成分中上升者的（加权）占比
+
+标准化使用扩展窗口（每期只用截至当期的均值与标准差），历史值不使用未来数据，
+新增观测也不会改变已有的历史值，增量计算只写入新增的期
+
+计算结果写入复合指标关联指标的 IndicatorData，只写入有变化的数据点
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import CompositeIndicator, CompositeIndicatorComponent, Indicator, IndicatorData
+from .regime_engine import expanding_zscore
+from .series_matrix import PERIODS_PER_YEAR, AlignedMatrix, load_aligned_matrix
+from .series_store import sync_derived_series
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SYSTEM = 'composite_engine'
+
+# 引擎支持的计算方法
+SUPPORTED_METHODS = (
+    CompositeIndicator.CalculationMethod.WEIGHTED_AVERAGE,
+    CompositeIndicator.CalculationMethod.SIMPLE_AVERAGE,
+    CompositeIndicator.CalculationMethod.DIFFUSION,
+)
+
+# 扩展窗口标准化至少使用一年的历史，且不少于该期数
+MIN_ZSCORE_HISTORY = 3
+
+@dataclass
+class ComponentSpec:
+    """成分定义：同一 (指标, 变换, 滞后) 组合在矩阵中只计算一次"""
+    code: str
+    weight: float
+    transformation: Optional[str] = None
+    lag_periods: int = 0
+
+    @property
+    def key(self) -> Tuple[str, Optional[str], int]:
+        return (self.code, self.transformation, self.lag_periods)
+
+
+@dataclass
+class CompositeSpec:
+    """复合指标定义（脱离ORM，便于批量计算）"""
+    code: str
+    method: str
+    components: List[ComponentSpec]
+    min_coverage: float = 0.5
+    composite_id: Optional[int] = None
+    indicator_id: Optional[int] = None
+    frequency: str = 'M'
+
+
+@dataclass
+class CompositeSeries:
+    """复合指标计算结果"""
+    dates: np.ndarray       # datetime64[D]
+    values: np.ndarray      # 覆盖率不足的期为NaN
+    coverage: np.ndarray    # 有效成分权重占比
+
+
+@dataclass
+class CompositeRunResult:
+    """复合指标计算运行结果"""
+    composites_evaluated: int = 0
+    composites_skipped: int = 0
+    points_created: int = 0
+    points_updated: int = 0
+    points_deleted: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def transform_column(values: np.ndarray, transformation: Optional[str], frequency: str) -> np.ndarray:
+    """成分数据变换（log/diff/pct_change/yoy；zscore 与不变换相同，标准化统一在之后进行）"""
+    if not transformation or transformation in ('level', 'zscore'):
+        return values
+    if transformation == 'log':
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(values > 0, np.log(values), np.nan)
+
+    step = PERIODS_PER_YEAR[frequency] if transformation == 'yoy' else 1
+    result = np.full(values.shape, np.nan)
+    if transformation == 'diff':
+        result[step:] = values[step:] - values[:-step]
+    elif transformation in ('pct_change', 'yoy'):
+        base = values[:-step]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            result[step:] = np.where(base != 0, (values[step:] / base - 1) * 100, np.nan)
+    else:
+        raise ValueError(f"不支持的数据变换: {transformation}")
+    return result
+
+
+def shift_rows(values: np.ndarray, lag: int) -> np.ndarray:
+    """按期滞后：第 t 期使用第 t - lag 期的值"""
+    if lag == 0:
+        return values
+    result = np.full(values.shape, np.nan)
+    if abs(lag) < len(values):
+        if lag > 0:
+            result[lag:] = values[:-lag]
+        else:
+            result[:lag] = values[-lag:]
+    return result
+
+
+def build_component_matrix(matrix: AlignedMatrix, keys: List[Tuple[str, Optional[str], int]]):
+    """
+    构造成分矩阵
+
+    Returns:
+        (扩展窗口标准化矩阵 Z, 变换+滞后后的原始矩阵 R)，shape = (期数, 成分组合数)；
+        历史不足的期 Z 为NaN（视为该成分缺失）
+    """
+    raw = np.full((matrix.shape[0], len(keys)), np.nan)
+    for k, (code, transformation, lag) in enumerate(keys):
+        if code in matrix.codes:
+            column = transform_column(matrix.column(code), transformation, matrix.frequency)
+            raw[:, k] = shift_rows(column, lag)
+
+    min_history = max(PERIODS_PER_YEAR[matrix.frequency], MIN_ZSCORE_HISTORY)
+    return expanding_zscore(raw, min_history), raw
+
+
+def evaluate_composites(matrix: AlignedMatrix, specs: List[CompositeSpec]) -> Dict[str, CompositeSeries]:
+    """
+    在同一对齐矩阵上批量计算复合指标
+
+    加权/简单平均: Σ w·z / Σ|w|（仅对当期有效成分求和）
+    扩散指数: 100 × Σ|w|·上升 / Σ|w|，上升=1、持平=0.5、下降=0，负权重成分方向取反
+    """
+    keys = list(dict.fromkeys(component.key for spec in specs for component in spec.components))
+    key_index = {key: k for k, key in enumerate(keys)}
+    z, raw = build_component_matrix(matrix, keys)
+
+    weights = np.zeros((len(keys), len(specs)))
+    for c, spec in enumerate(specs):
+        for component in spec.components:
+            weight = component.weight
+            if spec.method == CompositeIndicator.CalculationMethod.SIMPLE_AVERAGE:
+                weight = np.sign(weight) or 1.0
+            weights[key_index[component.key], c] += weight
+    abs_weights = np.abs(weights)
+    total_weight = abs_weights.sum(axis=0)
+
+    is_diffusion = np.array([spec.method == CompositeIndicator.CalculationMethod.DIFFUSION for spec in specs])
+
+    # 加权平均
+    z_mask = np.isfinite(z)
+    covered = z_mask.astype(np.float64) @ abs_weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        average = (np.where(z_mask, z, 0.0) @ weights) / covered
+
+    # 扩散指数
+    change = np.full(raw.shape, np.nan)
+    change[1:] = raw[1:] - raw[:-1]
+    d_mask = np.isfinite(change)
+    rising = np.where(change > 0, 1.0, np.where(change < 0, 0.0, 0.5))
+    direction = np.sign(weights)
+    d_covered = d_mask.astype(np.float64) @ abs_weights
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # 负权重成分：上升计为下降
+        up = np.where(d_mask, rising, 0.0) @ (abs_weights * (direction > 0)) \
+            + np.where(d_mask, 1.0 - rising, 0.0) @ (abs_weights * (direction < 0))
+        diffusion = 100 * up / d_covered
+
+    values = np.where(is_diffusion, diffusion, average)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        coverage = np.where(is_diffusion, d_covered, covered) / np.where(total_weight > 0, total_weight, np.nan)
+    min_coverage = np.array([max(spec.min_coverage, 1e-12) for spec in specs])
+    values = np.where(coverage >= min_coverage, values, np.nan)
+
+    dates = matrix.dates
+    return {
+        spec.code: CompositeSeries(dates=dates, values=values[:, c], coverage=coverage[:, c])
+        for c, spec in enumerate(specs)
+    }
+
+
+def load_composite_specs(composite_codes: Iterable[str] = None) -> List[CompositeSpec]:
+    """从数据库加载复合指标定义（两次查询）"""
+    queryset = CompositeIndicator.objects.select_related('indicator')
+    if composite_codes is not None:
+        queryset = queryset.filter(indicator__code__in=list(composite_codes))
+
+    specs = {
+        composite.pk: CompositeSpec(
+            code=composite.indicator.code,
+            method=composite.calculation_method,
+            components=[],
+            min_coverage=composite.min_coverage,
+            composite_id=composite.pk,
+            indicator_id=composite.indicator_id,
+            frequency=composite.indicator.frequency,
+        )
+        for composite in queryset
+    }
+    rows = CompositeIndicatorComponent.objects.filter(
+        composite_indicator_id__in=list(specs.keys())
+    ).values_list('composite_indicator_id', 'component_indicator__code', 'weight', 'transformation', 'lag_periods')
+    for composite_id, code, weight, transformation, lag in rows:
+        specs[composite_id].components.append(ComponentSpec(code, weight, transformation, lag))
+    return list(specs.values())
+
+
+def dependency_levels(specs: List[CompositeSpec]) -> List[List[CompositeSpec]]:
+    """按依赖关系分层：以其他复合指标为成分的复合指标在其之后计算"""
+    remaining = {spec.code: spec for spec in specs}
+    levels: List[List[CompositeSpec]] = []
+    while remaining:
+        ready = [
+            spec for spec in remaining.values()
+            if not any(c.code in remaining and c.code != spec.code for c in spec.components)
+        ]
+        if not ready:
+            raise ValueError(f"复合指标存在循环依赖: {', '.join(sorted(remaining))}")
+        levels.append(ready)
+        for spec in ready:
+            remaining.pop(spec.code)
+    return levels
+
+
+class CompositeEngine:
+    """复合指标增量计算与持久化"""
+
+    def __init__(self, batch_size: int = 1000):
+        self.batch_size = batch_size
+
+    def run(self, composite_codes: Iterable[str] = None, full: bool = False) -> CompositeRunResult:
+        """
+        计算复合指标并写入 IndicatorData
+
+        Args:
+            composite_codes: 复合指标（关联指标）代码，None表示所有自动更新的复合指标
+            full: 是否忽略增量判断重新计算
+        """
+        started = time.time()
+        result = CompositeRunResult()
+
+        specs = load_composite_specs(composite_codes)
+        if composite_codes is None:
+            auto_ids = set(CompositeIndicator.objects.filter(is_auto_update=True).values_list('pk', flat=True))
+            specs = [spec for spec in specs if spec.composite_id in auto_ids]
+
+        try:
+            levels = dependency_levels(specs)
+        except ValueError as e:
+            logger.error(str(e))
+            result.errors.append({'composites': [spec.code for spec in specs], 'error': str(e)})
+            levels = []
+
+        updated_codes = set()
+        for level in levels:
+            # 上一层有更新的复合指标会让依赖它的复合指标重新计算
+            stale = self._select_stale(level, full, updated_codes, result)
+            for frequency in sorted({spec.frequency for spec in stale}):
+                group = [spec for spec in stale if spec.frequency == frequency]
+                try:
+                    changed = self._evaluate_group(group, frequency, result)
+                    updated_codes.update(changed)
+                except Exception as e:
+                    logger.error(f"复合指标计算失败: {e}")
+                    result.errors.append({'composites': [spec.code for spec in group], 'error': str(e)})
+
+        result.execution_time = time.time() - started
+        logger.info(
+            f"复合指标计算完成: 计算 {result.composites_evaluated} 个, 跳过 {result.composites_skipped} 个, "
+            f"新增 {result.points_created}, 更新 {result.points_updated}, 删除 {result.points_deleted}, "
+            f"耗时 {result.execution_time:.3f}秒"
+        )
+        return result
+
+    def _select_stale(self, specs: List[CompositeSpec], full: bool, updated_codes: set,
+                      result: CompositeRunResult) -> List[CompositeSpec]:
+        """选择成分在上次计算后有更新的复合指标"""
+        supported = []
+        for spec in specs:
+            if spec.method not in SUPPORTED_METHODS:
+                result.errors.append({'composites': [spec.code], 'error': f"暂不支持的计算方法: {spec.method}"})
+            elif not spec.components:
+                result.composites_skipped += 1
+            else:
+                supported.append(spec)
+        if full or not supported:
+            return supported
+
+        component_codes = {c.code for spec in supported for c in spec.components}
+        last_collected = dict(
+            IndicatorData.objects.filter(indicator__code__in=component_codes)
+            .values('indicator__code').order_by()
+            .annotate(last=Max('collection_time')).values_list('indicator__code', 'last')
+        )
+        last_calculation = dict(
+            CompositeIndicator.objects.filter(pk__in=[s.composite_id for s in supported])
+            .values_list('pk', 'last_calculation')
+        )
+
+        stale = []
+        for spec in supported:
+            calculated = last_calculation.get(spec.composite_id)
+            newest = max((last_collected[c.code] for c in spec.components if c.code in last_collected), default=None)
+            if (calculated is None
+                    or any(c.code in updated_codes for c in spec.components)
+                    or (newest is not None and newest > calculated)):
+                stale.append(spec)
+            else:
+                result.composites_skipped += 1
+        return stale
+
+    def _evaluate_group(self, specs: List[CompositeSpec], frequency: str, result: CompositeRunResult) -> List[str]:
+        """同频率的复合指标共用一个对齐矩阵计算，返回数据有变化的复合指标代码"""
+        calculated_at = timezone.now()
+        component_codes = {c.code for spec in specs for c in spec.components}
+        matrix = load_aligned_matrix(component_codes, frequency, harmonize=True)
+        series = evaluate_composites(matrix, specs) if matrix.shape[1] else {}
+
+        changed = []
+        with transaction.atomic():
+            for spec in specs:
+                counts = self._write_series(spec, series.get(spec.code))
+                result.points_created += counts[0]
+                result.points_updated += counts[1]
+                result.points_deleted += counts[2]
+                result.composites_evaluated += 1
+                if any(counts):
+                    changed.append(spec.code)
+            CompositeIndicator.objects.filter(
+                pk__in=[spec.composite_id for spec in specs]
+            ).update(last_calculation=calculated_at)
+        return changed
+
+    def _write_series(self, spec: CompositeSpec, series: Optional[CompositeSeries]) -> Tuple[int, int, int]:
+        """与已有数据比较，只写入变化的数据点"""
+        if series is None:
+            series = CompositeSeries(np.empty(0, dtype='datetime64[D]'), np.empty(0), np.empty(0))
+        return sync_derived_series(
+            spec.indicator_id, series.dates, series.values, SOURCE_SYSTEM,
+            confidence=series.coverage, batch_size=self.batch_size,
+        )
+
+
+def save_composite_definition(indicator_code: str,
+                              components: List[Dict],
+                              method: str = CompositeIndicator.CalculationMethod.WEIGHTED_AVERAGE,
+                              min_coverage: float = 0.5,
+                              is_auto_update: bool = True) -> CompositeIndicator:
+    """
+    创建或替换复合指标定义
+
+    Args:
+        indicator_code: 复合指标关联的指标代码（需已存在）
+        components: [{'code': 指标代码, 'weight': 1.0, 'transformation': None, 'lag_periods': 0}, ...]
+    """
+    indicator = Indicator.objects.get(code=indicator_code)
+    component_ids = dict(
+        Indicator.objects.filter(code__in=[c['code'] for c in components]).values_list('code', 'id')
+    )
+    missing = [c['code'] for c in components if c['code'] not in component_ids]
+    if missing:
+        raise ValueError(f"成分指标不存在: {', '.join(missing)}")
+
+    with transaction.atomic():
+        composite, _ = CompositeIndicator.objects.update_or_create(
+            indicator=indicator,
+            defaults={
+                'calculation_method': method,
+                'min_coverage': min_coverage,
+                'is_auto_update': is_auto_update,
+                'last_calculation': None,
+            },
+        )
+        composite.components.all().delete()
+        CompositeIndicatorComponent.objects.bulk_create([
+            CompositeIndicatorComponent(
+                composite_indicator=composite,
+                component_indicator_id=component_ids[c['code']],
+                weight=c.get('weight', 1.0),
+                transformation=c.get('transformation'),
+                lag_periods=c.get('lag_periods', 0),
+            )
+            for c in components
+        ])
+    return composite
+
+
+def calculate_composites(composite_codes: Iterable[str] = None, full: bool = False) -> CompositeRunResult:
+    """计算复合指标的便捷函数"""
+    return CompositeEngine().run(composite_codes=composite_codes, full=full)
@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""
+经济周期分解引擎
+对对齐后的指标矩阵按周期频带做带通滤波（HP / Baxter-King / Christiano-Fitzgerald），
+并根据周期成分的水平与斜率划分扩张/峰值/收缩/谷底阶段
+
+所有滤波器都是线性的：BK/CF 按序列长度构建一次权重矩阵后以矩阵乘法同时处理全部指标，
+HP 以五对角带状 Cholesky 分解对全部指标同时求解（O(n)，不构建 n × n 矩阵）
+只支持月度及以上频率，单段序列超过 MAX_FILTER_PERIODS 期时只分解最近的部分
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+from .models import Indicator
+from .series_matrix import (
+    AlignedMatrix, PERIODS_PER_YEAR, fill_interior_gaps, load_aligned_matrix, valid_spans,
+)
+from .series_store import data_version
+
+logger = logging.getLogger(__name__)
+
+# 周期频带定义（单位：年）
+CYCLE_BANDS = {
+    'business': {'label': '商业周期', 'min_years': 1.5, 'max_years': 8},
+    'kitchin': {'label': '基钦周期', 'min_years': 2, 'max_years': 5},
+    'juglar': {'label': '朱格拉周期', 'min_years': 7, 'max_years': 11},
+    'kuznets': {'label': '库兹涅茨周期', 'min_years': 15, 'max_years': 25},
+    'kondratieff': {'label': '康德拉季耶夫周期', 'min_years': 45, 'max_years': 60},
+    'custom': {'label': '综合周期', 'min_years': 2, 'max_years': 25},
+}
+
+FILTER_METHODS = ('cf', 'bk', 'hp')
+
+# 周期阶段（按水平/斜率象限划分）
+PHASES = ('expansion', 'peak', 'contraction', 'trough')
+PHASE_LABELS = {'expansion': '扩张期', 'peak': '峰值期', 'contraction': '收缩期', 'trough': '谷底期'}
+
+# Baxter-King 滤波的截断长度（年）
+BK_TRUNCATION_YEARS = 3
+
+# 分析结果缓存时间（秒）
+CACHE_TIMEOUT = 60 * 60
+
+# 做周期分解所需的最少期数
+MIN_OBSERVATIONS = 12
+
+# 支持的分析频率（日度/周度序列请先按月聚合）
+SUPPORTED_FREQUENCIES = ('M', 'Q', 'Y')
+
+# 单段序列参与滤波的最大期数（80年月度数据），限制 n × n 权重矩阵的大小
+MAX_FILTER_PERIODS = 960
+
+# 缓存的权重矩阵个数（同一请求内各有效区间长度通常只有少数几种）
+WEIGHTS_CACHE_SIZE = 8
+
+
+def hp_lambda(cutoff_periods: float) -> float:
+    """以截止周期（期数）确定HP滤波平滑参数"""
+    return 1.0 / (4.0 * (1.0 - np.cos(2.0 * np.pi / cutoff_periods)) ** 2)
+
+
+def hp_trend(values: np.ndarray, lam: float) -> np.ndarray:
+    """
+    HP趋势：求解 (I + λD'D) t = x，对矩阵的每一列同时计算
+
+    系数矩阵为对称正定的五对角矩阵，按带宽2做Cholesky分解后前代、回代，
+    计算量与内存均为 O(n × 列数)
+    """
+    x = np.asarray(values, dtype=np.float64)
+    n = len(x)
+    # 主对角线与第1、2条副对角线（D为二阶差分矩阵）
+    diag = np.full(n, 1.0 + 6.0 * lam)
+    diag[[0, -1]] = 1.0 + lam
+    diag[[1, -2]] = 1.0 + 5.0 * lam
+    off1 = np.full(n - 1, -4.0 * lam)
+    off1[[0, -1]] = -2.0 * lam
+    off2 = np.full(n - 2, lam)
+
+    # 带状Cholesky分解 L（下三角，带宽2）
+    l0, l1, l2 = np.zeros(n), np.zeros(n), np.zeros(n)  # L[i,i], L[i,i-1], L[i,i-2]
+    for i in range(n):
+        if i >= 2:
+            l2[i] = off2[i - 2] / l0[i - 2]
+        if i >= 1:
+            l1[i] = (off1[i - 1] - l2[i] * l1[i - 1]) / l0[i - 1]
+        l0[i] = np.sqrt(diag[i] - l1[i] ** 2 - l2[i] ** 2)
+
+    # 前代 L y = x
+    y = np.empty_like(x)
+    for i in range(n):
+        row = x[i].copy()
+        if i >= 1:
+            row -= l1[i] * y[i - 1]
+        if i >= 2:
+            row -= l2[i] * y[i - 2]
+        y[i] = row / l0[i]
+
+    # 回代 L' t = y
+    trend = np.empty_like(x)
+    for i in range(n - 1, -1, -1):
+        row = y[i].copy()
+        if i + 1 < n:
+            row -= l1[i + 1] * trend[i + 1]
+        if i + 2 < n:
+            row -= l2[i + 2] * trend[i + 2]
+        trend[i] = row / l0[i]
+    return trend
+
+
+def _ideal_band_coefficients(n: int, low_periods: float, high_periods: float) -> np.ndarray:
+    """理想带通滤波器系数 B_0..B_{n-1}"""
+    a = 2.0 * np.pi / high_periods
+    b = 2.0 * np.pi / low_periods
+    j = np.arange(1, n)
+    coefficients = np.empty(n)
+    coefficients[0] = (b - a) / np.pi
+    coefficients[1:] = (np.sin(b * j) - np.sin(a * j)) / (np.pi * j)
+    return coefficients
+
+
+@lru_cache(maxsize=WEIGHTS_CACHE_SIZE)
+def _bandpass_weights(method: str, n: int, low_periods: float, high_periods: float,
+                      bk_truncation: int) -> np.ndarray:
+    """
+    构建带通滤波权重矩阵 W（n × n），周期成分 = W @ x
+    无法计算的行（BK两端、CF首尾）为NaN
+    """
+    if n > MAX_FILTER_PERIODS:
+        raise ValueError(f"序列长度 {n} 超过滤波上限 {MAX_FILTER_PERIODS}")
+
+    if method == 'bk':
+        k = min(bk_truncation, (n - 1) // 2)
+        coefficients = _ideal_band_coefficients(k + 1, low_periods, high_periods)
+        symmetric = np.concatenate([coefficients[:0:-1], coefficients])
+        symmetric -= symmetric.mean()  # 权重和为0，消除趋势
+        weights = np.full((n, n), np.nan)
+        if n > 2 * k:
+            weights[k:n - k] = 0.0
+            for offset, w in zip(range(-k, k + 1), symmetric):
+                rows = np.arange(k, n - k)
+                weights[rows, rows + offset] = w
+
+    elif method == 'cf':
+        # Christiano-Fitzgerald 非对称滤波（随机游走假设），先去除线性漂移
+        coefficients = _ideal_band_coefficients(n, low_periods, high_periods)
+        b0 = coefficients[0]
+        cumulative = np.concatenate([[0.0], np.cumsum(coefficients[1:])])
+        index = np.arange(n)
+        weights = coefficients[np.abs(index[:, None] - index[None, :])]
+        forward = cumulative[np.clip(n - 2 - index, 0, None)]
+        backward = cumulative[np.clip(index - 1, 0, None)]
+        weights[:, -1] = -0.5 * b0 - forward
+        weights[:, 0] = -0.5 * b0 - backward
+        weights[[0, -1]] = np.nan
+
+        drift = np.eye(n) - np.outer(index, np.eye(n)[-1] - np.eye(n)[0]) / (n - 1)
+        weights = weights @ drift
+
+    else:
+        raise ValueError(f"不支持的滤波方法: {method}")
+
+    weights.setflags(write=False)
+    return weights
+
+
+def bandpass_matrix(values: np.ndarray,
+                    low_periods: float,
+                    high_periods: float,
+                    method: str = 'cf',
+                    bk_truncation: int = 36) -> np.ndarray:
+    """
+    对矩阵的每一列做带通滤波
+
+    Args:
+        values: (期数 × 指标) 矩阵，NaN表示缺失
+        low_periods: 频带最短周期（期数）
+        high_periods: 频带最长周期（期数）
+        method: cf / bk / hp
+        bk_truncation: Baxter-King 截断长度（期数）
+
+    Returns:
+        np.ndarray: 与输入同形状的周期成分矩阵
+    """
+    filled = fill_interior_gaps(values)
+    cycles = np.full(values.shape, np.nan)
+
+    # 有效区间相同的列共用一个权重矩阵，一次矩阵乘法完成
+    for (first, last), columns in _filter_spans(filled):
+        n = last - first + 1
+        block = filled[first:last + 1, columns]
+        if method == 'hp':
+            cycles[first:last + 1, columns] = (hp_trend(block, hp_lambda(low_periods)) -
+                                               hp_trend(block, hp_lambda(high_periods)))
+            continue
+        weights = _bandpass_weights(method, n, float(low_periods), float(high_periods), int(bk_truncation))
+        with np.errstate(invalid='ignore'):
+            cycles[first:last + 1, columns] = weights @ block
+    return cycles
+
+
+def _filter_spans(filled: np.ndarray):
+    """参与滤波的有效区间：过短的跳过，超过 MAX_FILTER_PERIODS 的只保留最近部分"""
+    spans: Dict[Tuple[int, int], List[int]] = {}
+    for (first, last), columns in valid_spans(filled).items():
+        if last - first + 1 < MIN_OBSERVATIONS:
+            continue
+        first = max(first, last - MAX_FILTER_PERIODS + 1)
+        spans.setdefault((first, last), []).extend(columns)
+    return spans.items()
+
+
+def classify_phases(cycles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    根据周期成分的水平与斜率划分阶段
+
+    - 高于趋势且上升：扩张期
+    - 高于趋势但下降：峰值期
+    - 低于趋势且下降：收缩期
+    - 低于趋势但上升：谷底期
+
+    Returns:
+        (阶段编号矩阵[-1表示无法判断], 置信度矩阵)
+    """
+    single = cycles.ndim == 1
+    if single:
+        cycles = cycles[:, None]
+
+    slope = np.full(cycles.shape, np.nan)
+    slope[1:] = np.diff(cycles, axis=0)
+
+    above = cycles > 0
+    rising = slope > 0
+    phases = np.where(above, np.where(rising, 0, 1), np.where(rising, 3, 2)).astype(np.int8)
+    valid = ~(np.isnan(cycles) | np.isnan(slope))
+    phases[~valid] = -1
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        level_scale = np.nanstd(cycles, axis=0)
+        slope_scale = np.nanstd(slope, axis=0)
+        confidence = 0.5 * np.tanh(np.abs(cycles) / level_scale) + 0.5 * np.tanh(np.abs(slope) / slope_scale)
+    confidence = np.where(valid, np.nan_to_num(confidence), np.nan)
+
+    if single:
+        return phases[:, 0], confidence[:, 0]
+    return phases, confidence
+
+
+def _phase_runs(phases: np.ndarray) -> Tuple[int, Dict[int, float]]:
+    """返回最后一段阶段的持续期数，以及各阶段历史平均持续期数"""
+    valid = phases[phases >= 0]
+    if len(valid) == 0:
+        return 0, {}
+    changes = np.flatnonzero(np.diff(valid) != 0) + 1
+    starts = np.concatenate([[0], changes])
+    lengths = np.diff(np.append(starts, len(valid)))
+    labels = valid[starts]
+
+    # 首尾两段不完整，不计入平均持续期
+    complete = slice(1, -1) if len(lengths) > 2 else slice(0, 0)
+    averages = {}
+    for label in np.unique(labels[complete]):
+        averages[int(label)] = float(lengths[complete][labels[complete] == label].mean())
+    return int(lengths[-1]), averages
+
+
+@dataclass
+class CycleDecomposition:
+    """周期分解结果"""
+    cycle: str
+    method: str
+    frequency: str
+    low_periods: float
+    high_periods: float
+    codes: List[str]
+    dates: np.ndarray
+    cycles: np.ndarray
+    phases: np.ndarray
+    confidence: np.ndarray
+    strength: np.ndarray
+    composite: np.ndarray
+    composite_phases: np.ndarray
+    composite_confidence: np.ndarray
+    version: str = ''
+    names: Dict[str, str] = field(default_factory=dict)
+
+    def _history(self, values, phases, confidence) -> List[Dict]:
+        history = []
+        for d, value, phase, conf in zip(self.dates, values, phases, confidence):
+            if phase < 0:
+                continue
+            history.append({
+                'date': str(d)[:7] if self.frequency in ('M', 'Q', 'Y') else str(d),
+                'value': round(float(value), 6),
+                'phase': PHASES[phase],
+                'confidence': round(float(conf), 4),
+            })
+        return history
+
+    def _summary(self, phases, confidence) -> Dict:
+        valid = np.flatnonzero(phases >= 0)
+        if len(valid) == 0:
+            return {'currentPhase': None, 'phaseConfidence': None, 'phaseDuration': 0, 'expectedDuration': None}
+        last = valid[-1]
+        duration, averages = _phase_runs(phases)
+        current = int(phases[last])
+        return {
+            'currentPhase': PHASES[current],
+            'currentPhaseLabel': PHASE_LABELS[PHASES[current]],
+            'phaseConfidence': round(float(confidence[last]), 4),
+            'phaseDuration': duration,
+            'expectedDuration': round(averages[current], 1) if current in averages else None,
+            'asOf': str(self.dates[last]),
+        }
+
+    def to_dict(self, detail: bool = False) -> Dict:
+        """API返回格式"""
+        periods_per_year = PERIODS_PER_YEAR[self.frequency]
+        composite = self._summary(self.composite_phases, self.composite_confidence)
+        composite['cycleStrength'] = round(float(np.nanmean(self.strength)), 4) if len(self.codes) else None
+        composite['historicalData'] = self._history(
+            self.composite, self.composite_phases, self.composite_confidence
+        )
+
+        indicators = []
+        key_indicators = []
+        latest_z = self._latest_standardized()
+        available = np.count_nonzero(~np.isnan(latest_z))
+        for j, code in enumerate(self.codes):
+            item = {'code': code, 'name': self.names.get(code, '')}
+            item.update(self._summary(self.phases[:, j], self.confidence[:, j]))
+            item['cycleStrength'] = None if np.isnan(self.strength[j]) else round(float(self.strength[j]), 4)
+            span = np.count_nonzero(~np.isnan(self.cycles[:, j]))
+            item['reliable'] = bool(span >= self.high_periods)
+            if detail:
+                item['historicalData'] = self._history(self.cycles[:, j], self.phases[:, j], self.confidence[:, j])
+            indicators.append(item)
+
+            if not np.isnan(latest_z[j]):
+                key_indicators.append({
+                    'code': code,
+                    'name': self.names.get(code, ''),
+                    'weight': round(1.0 / available, 4),
+                    'contribution': round(float(latest_z[j]) / available, 4),
+                })
+
+        key_indicators.sort(key=lambda x: abs(x['contribution']), reverse=True)
+
+        return {
+            'cycle': self.cycle,
+            'cycleLabel': CYCLE_BANDS[self.cycle]['label'],
+            'method': self.method,
+            'frequency': self.frequency,
+            'bandYears': [self.low_periods / periods_per_year, self.high_periods / periods_per_year],
+            'dataVersion': self.version,
+            'composite': composite,
+            'indicators': indicators,
+            'keyIndicators': key_indicators,
+        }
+
+    def _latest_standardized(self) -> np.ndarray:
+        """各指标在综合周期最新日期上的标准化周期成分"""
+        valid_rows = np.flatnonzero(self.composite_phases >= 0)
+        if len(valid_rows) == 0:
+            return np.full(len(self.codes), np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = self.cycles[valid_rows[-1]] / np.nanstd(self.cycles, axis=0)
+        return z
+
+
+def decompose(matrix: AlignedMatrix, cycle: str = 'business', method: str = 'cf') -> CycleDecomposition:
+    """
+    批量周期分解
+
+    Args:
+        matrix: 对齐矩阵
+        cycle: 周期类型（见 CYCLE_BANDS）
+        method: 滤波方法 cf / bk / hp
+
+    Returns:
+        CycleDecomposition: 分解结果
+    """
+    if cycle not in CYCLE_BANDS:
+        raise ValueError(f"不支持的周期类型: {cycle}")
+    if method not in FILTER_METHODS:
+        raise ValueError(f"不支持的滤波方法: {method}")
+
+    periods_per_year = PERIODS_PER_YEAR[matrix.frequency]
+    band = CYCLE_BANDS[cycle]
+    low = max(2.0, band['min_years'] * periods_per_year)
+    high = band['max_years'] * periods_per_year
+    bk_truncation = BK_TRUNCATION_YEARS * periods_per_year
+
+    values = matrix.values
+    cycles = bandpass_matrix(values, low, high, method, bk_truncation)
+
+    # 周期强度：频带成分方差占（去除长期趋势后）波动方差的比例
+    filled = fill_interior_gaps(values)
+    detrended = np.full(values.shape, np.nan)
+    for (first, last), columns in _filter_spans(filled):
+        block = filled[first:last + 1, columns]
+        detrended[first:last + 1, columns] = block - hp_trend(block, hp_lambda(high))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        strength = np.clip(np.nanvar(cycles, axis=0) / np.nanvar(detrended, axis=0), 0.0, 1.0)
+
+    phases, confidence = classify_phases(cycles)
+
+    # 综合周期：各指标周期成分标准化后取截面均值
+    with np.errstate(invalid='ignore', divide='ignore'):
+        standardized = cycles / np.nanstd(cycles, axis=0)
+    standardized[:, ~np.isfinite(np.nanstd(standardized, axis=0))] = np.nan
+    counts = np.count_nonzero(~np.isnan(standardized), axis=1)
+    composite = np.where(counts > 0, np.nansum(standardized, axis=1) / np.maximum(counts, 1), np.nan)
+    composite_phases, composite_confidence = classify_phases(composite)
+
+    return CycleDecomposition(
+        cycle=cycle,
+        method=method,
+        frequency=matrix.frequency,
+        low_periods=low,
+        high_periods=high,
+        codes=list(matrix.codes),
+        dates=matrix.dates,
+        cycles=cycles,
+        phases=phases,
+        confidence=confidence,
+        strength=strength,
+        composite=composite,
+        composite_phases=composite_phases,
+        composite_confidence=composite_confidence,
+        version=matrix.version,
+    )
+
+
+def analyze_cycles(indicator_codes: Iterable[str],
+                   cycle: str = 'business',
+                   method: str = 'cf',
+                   frequency: str = 'M',
+                   start_date: str = None,
+                   end_date: str = None,
+                   detail: bool = False) -> Dict:
+    """
+    周期分析（带缓存），缓存键由指标集合、频带、方法与数据版本组成
+
+    Returns:
+        Dict: API返回格式的分析结果
+    """
+    if cycle not in CYCLE_BANDS:
+        raise ValueError(f"不支持的周期类型: {cycle}")
+    if method not in FILTER_METHODS:
+        raise ValueError(f"不支持的滤波方法: {method}")
+    if frequency not in SUPPORTED_FREQUENCIES:
+        raise ValueError(f"不支持的分析频率: {frequency}（支持 {'/'.join(SUPPORTED_FREQUENCIES)}）")
+
+    names = dict(
+        Indicator.objects.filter(code__in=list(indicator_codes)).values_list('code', 'name')
+    )
+    codes = sorted(names)
+    ids = Indicator.objects.filter(code__in=codes).values_list('id', flat=True)
+    version = data_version(ids)
+
+    key_source = json.dumps([codes, cycle, method, frequency, start_date, end_date, detail, version])
+    cache_key = f"cycle_engine:{hashlib.md5(key_source.encode('utf-8')).hexdigest()}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    matrix = load_aligned_matrix(codes, frequency, start_date, end_date)
+    decomposition = decompose(matrix, cycle, method)
+    decomposition.names = names
+    result = decomposition.to_dict(detail=detail)
+
+    cache.set(cache_key, result, timeout=CACHE_TIMEOUT)
+    return result
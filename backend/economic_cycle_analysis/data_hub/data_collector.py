@@ -6,13 +6,12 @@
 
 import logging
 import pandas as pd
-import akshare as ak
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 
-from django.db import transaction
-from .models import Indicator, IndicatorData
+from .models import Indicator
 from .indicators_config import get_all_indicators
+from .series_store import save_series
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -137,6 +136,8 @@ class DataCollector:
             pd.DataFrame: 获取的数据
         """
         try:
+            import akshare as ak  # 延迟导入，仅在实际采集时加载
+            
             # 获取 AkShare 函数
             akshare_func = getattr(ak, func_name)
             
@@ -239,7 +240,7 @@ class DataCollector:
     
     def _save_to_database(self, indicator: Indicator, data_df: pd.DataFrame) -> int:
         """
-        将数据保存到数据库
+        将数据保存到数据库（只写入新增或修订的数据点，并记录数据版本）
         
         Args:
             indicator: 指标对象
@@ -251,17 +252,12 @@ class DataCollector:
         saved_count = 0
         
         try:
-            with transaction.atomic():
-                for _, row in data_df.iterrows():
-                    # 使用 update_or_create 来避免重复数据
-                    indicator_data, created = IndicatorData.objects.update_or_create(
-                        indicator=indicator,
-                        date=row['date'].date(),
-                        defaults={'value': float(row['value'])}
-                    )
-                    
-                    if created:
-                        saved_count += 1
+            saved_count, _ = save_series(
+                indicator.id,
+                pd.to_datetime(data_df['date']).values.astype('datetime64[D]'),
+                data_df['value'].astype(float).values,
+                source_system='AkShare',
+            )
                 
         except Exception as e:
             logger.error(f"保存数据到数据库失败: {str(e)}")
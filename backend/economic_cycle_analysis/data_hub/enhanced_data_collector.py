@@ -7,21 +7,26 @@
 
 import logging
 import pandas as pd
-import akshare as ak
 import numpy as np
 import re
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, Tuple
 from dataclasses import dataclass
 
-from django.db import transaction, IntegrityError
-from django.utils import timezone
-from .models import Indicator, IndicatorData, DataQualityReport
+from django.db import transaction
+from .models import Indicator
+from .mapping_registry import get_mapping_registry
+from .series_store import save_series
+from .circuit_breaker import akshare_circuit_key, get_circuit_breakers
+from .fingerprint import FULL, UNCHANGED, SeriesChange, detect_change, save_fingerprint
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 支持按日期区间请求的AkShare函数（其余函数每次返回完整历史，不做分段回补）
+DATE_RANGE_FUNCTIONS = ('index_zh_a_hist',)
+
 
 @dataclass
 class CollectionResult:
@@ -31,6 +36,8 @@ class CollectionResult:
     error_message: str = ""
     data_range: Tuple[str, str] = ("", "")
     api_function: str = ""
+    circuit_open: bool = False  # 上游函数熔断，未实际请求
+    unchanged: bool = False     # 数据与上次采集一致，未清洗写库
 
 
 class EnhancedDataCollector:
@@ -41,474 +48,15 @@ class EnhancedDataCollector:
         self.error_count = 0
         self.errors = []
         
-        # AkShare函数映射表 - 支持1,064个指标
-        self.akshare_mappings = self._build_comprehensive_mappings()
+        # 上游函数熔断器（进程内共享）
+        self.circuit_breakers = get_circuit_breakers()
         
-        # 加载自动生成的映射配置
-        self._load_enhanced_mappings()
+        # AkShare函数映射表 - 支持1,064个指标（含自动生成的映射，进程内共享）
+        self.akshare_mappings = get_mapping_registry().akshare
         
         # 数据标准化规则
         self.standardization_rules = self._build_standardization_rules()
     
-    def _load_enhanced_mappings(self):
-        """加载自动生成的增强映射配置"""
-        try:
-            from .enhanced_mapping_config import ENHANCED_AKSHARE_MAPPINGS, MAPPING_STATS
-            
-            # 合并自动生成的映射
-            self.akshare_mappings.update(ENHANCED_AKSHARE_MAPPINGS)
-            
-            logger.info(f"已加载 {MAPPING_STATS['total_indicators']} 个自动映射配置")
-            logger.info(f"映射覆盖率: {MAPPING_STATS['coverage_rate']:.1f}%")
-            logger.info(f"生成时间: {MAPPING_STATS['generation_time']}")
-            
-        except ImportError:
-            logger.warning("未找到增强映射配置文件，请先运行指标映射更新器")
-    
-    def _build_comprehensive_mappings(self) -> Dict[str, Dict]:
-        """构建全面的AkShare函数映射表"""
-        return {
-            # ===== 宏观经济指标 =====
-            'CN_CPI_MONTHLY': {
-                'func': 'macro_china_cpi_monthly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_CPI_YEARLY': {
-                'func': 'macro_china_cpi_yearly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_CPI_MONTHLY': {
-                'func': 'macro_usa_cpi_monthly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            
-            # PPI相关
-            'CN_PPI_YEARLY': {
-                'func': 'macro_china_ppi_yearly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            
-            # 货币供应量
-            'CN_M1_YEARLY': {
-                'func': 'macro_china_m1_yearly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_M2_YEARLY': {
-                'func': 'macro_china_m2_yearly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            
-            # PMI指标
-            'CN_PMI_MFG': {
-                'func': 'macro_china_pmi_yearly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_PMI_NON_MFG': {
-                'func': 'macro_china_non_man_pmi',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_PMI_CAIXIN_MFG': {
-                'func': 'index_pmi_man_cx',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '数值',
-                'data_type': 'index',
-                'frequency': 'M'
-            },
-            
-            # GDP相关
-            'CN_GDP_YEARLY': {
-                'func': 'macro_china_gdp_yearly',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'Q'
-            },
-            'CN_INDUSTRIAL_ADDED_VALUE': {
-                'func': 'macro_china_industrial_added_value',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            
-            # 贸易数据
-            'CN_EXPORTS_YOY': {
-                'func': 'macro_china_exports_yoy',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_IMPORTS_YOY': {
-                'func': 'macro_china_imports_yoy',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_TRADE_BALANCE': {
-                'func': 'macro_china_trade_balance',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_FDI': {
-                'func': 'macro_china_fdi',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            
-            # 社融与信贷
-            'CN_SOCIAL_FINANCING': {
-                'func': 'macro_china_shrzgm',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '社会融资规模存量',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_NEW_RMB_LOAN': {
-                'func': 'macro_rmb_loan',
-                'params': {},
-                'date_col': '月份',
-                'value_col': '新增人民币贷款',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'CN_NEW_FINANCIAL_CREDIT': {
-                'func': 'macro_china_new_financial_credit',
-                'params': {},
-                'date_col': '月份',
-                'value_col': '当月',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            
-            # 利率指标
-            'CN_SHIBOR': {
-                'func': 'macro_china_shibor_all',
-                'params': {},
-                'date_col': '日期',
-                'value_col': 'Shibor隔夜',
-                'data_type': 'rate',
-                'frequency': 'D'
-            },
-            'CN_LPR': {
-                'func': 'rate_interbank',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '1年期LPR',
-                'data_type': 'rate',
-                'frequency': 'M'
-            },
-            
-            # ===== 美国经济指标 =====
-            'US_UNEMPLOYMENT': {
-                'func': 'macro_usa_unemployment_rate',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_PMI_MFG': {
-                'func': 'macro_usa_pmi',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_INITIAL_JOBLESS': {
-                'func': 'macro_usa_initial_jobless',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'W'
-            },
-            'US_ADP_EMPLOYMENT': {
-                'func': 'macro_usa_adp_employment',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_DURABLE_GOODS': {
-                'func': 'macro_usa_durable_goods_orders',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_RETAIL_SALES': {
-                'func': 'macro_usa_retail_sales',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_EXIST_HOME_SALES': {
-                'func': 'macro_usa_exist_home_sales',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_HOUSE_STARTS': {
-                'func': 'macro_usa_house_starts',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_MICHIGAN_SENTIMENT': {
-                'func': 'macro_usa_michigan_consumer_sentiment',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_LMCI': {
-                'func': 'macro_usa_lmci',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'macro',
-                'frequency': 'M'
-            },
-            'US_EIA_CRUDE': {
-                'func': 'macro_usa_eia_crude_rate',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'commodity',
-                'frequency': 'W'
-            },
-            'US_API_CRUDE': {
-                'func': 'macro_usa_api_crude_stock',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '今值',
-                'data_type': 'commodity',
-                'frequency': 'W'
-            },
-            
-            # ===== 股票指数 =====
-            'SSE_INDEX': {
-                'func': 'index_zh_a_hist',
-                'params': {'symbol': '000001', 'period': 'daily'},
-                'date_col': '日期',
-                'value_col': '收盘',
-                'data_type': 'index',
-                'frequency': 'D'
-            },
-            'SZSE_INDEX': {
-                'func': 'index_zh_a_hist',
-                'params': {'symbol': '399001', 'period': 'daily'},
-                'date_col': '日期',
-                'value_col': '收盘',
-                'data_type': 'index',
-                'frequency': 'D'
-            },
-            'CHINEXT_INDEX': {
-                'func': 'index_zh_a_hist',
-                'params': {'symbol': '399006', 'period': 'daily'},
-                'date_col': '日期',
-                'value_col': '收盘',
-                'data_type': 'index',
-                'frequency': 'D'
-            },
-            'CSI300_INDEX': {
-                'func': 'index_zh_a_hist',
-                'params': {'symbol': '000300', 'period': 'daily'},
-                'date_col': '日期',
-                'value_col': '收盘',
-                'data_type': 'index',
-                'frequency': 'D'
-            },
-            'CSI500_INDEX': {
-                'func': 'index_zh_a_hist',
-                'params': {'symbol': '000905', 'period': 'daily'},
-                'date_col': '日期',
-                'value_col': '收盘',
-                'data_type': 'index',
-                'frequency': 'D'
-            },
-            'SSE50_INDEX': {
-                'func': 'index_zh_a_hist',
-                'params': {'symbol': '000016', 'period': 'daily'},
-                'date_col': '日期',
-                'value_col': '收盘',
-                'data_type': 'index',
-                'frequency': 'D'
-            },
-            
-            # ===== 资金流数据 =====
-            'NORTHBOUND_CAPITAL': {
-                'func': 'stock_connect_hist_sina',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '北向资金',
-                'data_type': 'capital_flow',
-                'frequency': 'D'
-            },
-            'SOUTHBOUND_CAPITAL': {
-                'func': 'stock_connect_hist_sina',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '南向资金',
-                'data_type': 'capital_flow',
-                'frequency': 'D'
-            },
-            
-            # ===== 估值指标 =====
-            'A_SHARE_PE': {
-                'func': 'stock_zh_valuation_baidu',
-                'params': {},
-                'date_col': '日期',
-                'value_col': 'PE',
-                'data_type': 'valuation',
-                'frequency': 'D'
-            },
-            'A_SHARE_PB': {
-                'func': 'stock_zh_valuation_baidu',
-                'params': {},
-                'date_col': '日期',
-                'value_col': 'PB',
-                'data_type': 'valuation',
-                'frequency': 'D'
-            },
-            
-            # ===== 政策相关 =====
-            'CN_BOND_10Y': {
-                'func': 'bond_zh_us_rate',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '中国国债收益率10年',
-                'data_type': 'bond',
-                'frequency': 'D'
-            },
-            'CN_BOND_1Y': {
-                'func': 'bond_zh_us_rate',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '中国国债收益率1年',
-                'data_type': 'bond',
-                'frequency': 'D'
-            },
-            'CN_BOND_5Y': {
-                'func': 'bond_zh_us_rate',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '中国国债收益率5年',
-                'data_type': 'bond',
-                'frequency': 'D'
-            },
-            'CN_RRR': {
-                'func': 'tool_china_rrr',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '存款准备金率',
-                'data_type': 'policy',
-                'frequency': 'M'
-            },
-            
-            # ===== 大宗商品 =====
-            'GOLD_PRICE': {
-                'func': 'macro_cons_gold',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '库存总量',
-                'data_type': 'commodity',
-                'frequency': 'D'
-            },
-            'LME_STOCK': {
-                'func': 'macro_euro_lme_stock',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '库存',
-                'data_type': 'commodity',
-                'frequency': 'D'
-            },
-            
-            # ===== 情绪指标 =====
-            'VIX_INDEX': {
-                'func': 'index_vix',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '收盘价',
-                'data_type': 'sentiment',
-                'frequency': 'D'
-            },
-            
-            # ===== 全球市场 =====
-            'GLOBAL_INDICES': {
-                'func': 'index_global_spot_em',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '最新价',
-                'data_type': 'global_index',
-                'frequency': 'D'
-            },
-            'HK_INDICES': {
-                'func': 'stock_hk_index_spot_sina',
-                'params': {},
-                'date_col': '日期',
-                'value_col': '现价',
-                'data_type': 'hk_index',
-                'frequency': 'D'
-            }
-        }
-    
     def _build_standardization_rules(self) -> Dict[str, Dict]:
         """构建数据标准化规则"""
         return {
@@ -560,15 +108,49 @@ class EnhancedDataCollector:
             
             config = self.akshare_mappings[indicator_code]
             
+            # 上游函数熔断中则直接跳过，不再请求和重试
+            if not self.circuit_breakers.allow(akshare_circuit_key(config['func'])):
+                return CollectionResult(
+                    success=False,
+                    error_message=f"AkShare函数 {config['func']} 熔断中，跳过指标 {indicator_code}",
+                    api_function=config['func'],
+                    circuit_open=True
+                )
+            
             # 调用AkShare函数获取数据
             data_df = self._fetch_data_from_akshare(config, start_date, end_date)
             
+            # 数据清洗、标准化并保存到数据库
+            return self._store_indicator_frame(indicator, config, data_df, start_date, end_date)
+            
+        except Exception as e:
+            error_msg = f"采集指标 {indicator_code} 时出错: {str(e)}"
+            logger.error(error_msg)
+            return CollectionResult(
+                success=False,
+                error_message=error_msg
+            )
+    
+    def _store_indicator_frame(self,
+                               indicator: Indicator,
+                               config: Dict,
+                               data_df: Optional[pd.DataFrame],
+                               start_date: str = None,
+                               end_date: str = None) -> CollectionResult:
+        """变更检测、清洗并保存单个指标已抓取的数据"""
+        indicator_code = indicator.code
+        try:
             if data_df is None or data_df.empty:
                 return CollectionResult(
                     success=False,
                     error_message=f"指标 {indicator_code} 未获取到数据"
                 )
             
+            # 变更检测：原始数据与上次一致则跳过清洗与写库
+            change = self._detect_change(indicator, config, data_df, start_date, end_date)
+            if change is not None and change.unchanged:
+                return self._unchanged_result(indicator_code, config, change)
+            
             # 数据清洗和标准化
             cleaned_data = self._clean_and_standardize_data(data_df, config)
             
@@ -579,7 +161,7 @@ class EnhancedDataCollector:
                 )
             
             # 保存到数据库
-            saved_count = self._save_to_database(indicator, cleaned_data)
+            saved_count = self._save_to_database(indicator, cleaned_data, change)
             
             # 计算数据范围
             data_range = (
@@ -601,7 +183,8 @@ class EnhancedDataCollector:
             logger.error(error_msg)
             return CollectionResult(
                 success=False,
-                error_message=error_msg
+                error_message=error_msg,
+                api_function=config['func']
             )
     
     def _fetch_data_from_akshare(self, 
@@ -623,23 +206,27 @@ class EnhancedDataCollector:
             func_name = config['func']
             params = config.get('params', {}).copy()
             
+            import akshare as ak  # 延迟导入，仅在实际采集时加载
+            
             # 获取AkShare函数
             akshare_func = getattr(ak, func_name)
             
             # 根据函数类型添加日期参数
-            if func_name in ['index_zh_a_hist'] and start_date and end_date:
+            if func_name in DATE_RANGE_FUNCTIONS and start_date and end_date:
                 params['start_date'] = start_date.replace('-', '')
                 params['end_date'] = end_date.replace('-', '')
             
             # 调用AkShare函数
             logger.info(f"调用 {func_name} 函数，参数: {params}")
             data_df = akshare_func(**params)
+            self.circuit_breakers.record(akshare_circuit_key(func_name), True)
             
             logger.info(f"成功获取 {len(data_df) if data_df is not None else 0} 条数据")
             return data_df
             
         except Exception as e:
             logger.error(f"调用AkShare函数 {config['func']} 失败: {str(e)}")
+            self.circuit_breakers.record(akshare_circuit_key(config['func']), False)
             return None
     
     def _clean_and_standardize_data(self, 
@@ -777,55 +364,99 @@ class EnhancedDataCollector:
         
         return value_series.apply(parse_numeric)
     
-    def _save_to_database(self, indicator: Indicator, data_df: pd.DataFrame) -> int:
+    def _detect_change(self,
+                       indicator: Indicator,
+                       config: Dict,
+                       data_df: pd.DataFrame,
+                       start_date: str = None,
+                       end_date: str = None) -> Optional[SeriesChange]:
+        """与上次指纹比较（按日期区间请求的结果随区间变化，不做变更检测，返回None）"""
+        if config['func'] in DATE_RANGE_FUNCTIONS and start_date and end_date:
+            return None
+        return detect_change(indicator.id, data_df, config=config)
+    
+    def _unchanged_result(self, indicator_code: str, config: Dict, change: SeriesChange) -> CollectionResult:
+        stored = change.stored
+        logger.info(f"指标 {indicator_code} 数据未变化，跳过写库")
+        return CollectionResult(
+            success=True,
+            data_range=(
+                stored.first_date.strftime('%Y-%m-%d') if stored.first_date else "",
+                stored.last_date.strftime('%Y-%m-%d') if stored.last_date else "",
+            ),
+            api_function=config['func'],
+            unchanged=True
+        )
+    
+    def _save_to_database(self,
+                          indicator: Indicator,
+                          data_df: pd.DataFrame,
+                          change: Optional[SeriesChange] = None) -> int:
         """
-        保存数据到数据库
+        保存数据到数据库（只写入新增或修订的数据点，并记录数据版本）
         
         Args:
             indicator: 指标对象
             data_df: 清洗后的数据
+            change: 变更检测结果，指定时只写入变化的区间并更新指纹
             
         Returns:
             int: 保存的记录数
         """
-        saved_count = 0
-        
         try:
-            with transaction.atomic():
-                for _, row in data_df.iterrows():
-                    try:
-                        # 创建或更新数据记录
-                        data_point, created = IndicatorData.objects.update_or_create(
-                            indicator=indicator,
-                            date=row['date'],
-                            defaults={
-                                'value': row['value'],
-                                'source_system': 'AkShare',
-                                'is_estimated': False,
-                                'confidence_score': 0.9,  # 默认置信度
-                                'raw_value': row['value'],
-                                'calculated_value': row['value']
-                            }
-                        )
-                        
-                        if created:
-                            saved_count += 1
-                            
-                    except IntegrityError as e:
-                        logger.warning(f"保存数据点失败 {indicator.code} {row['date']}: {e}")
-                        continue
-                
-                logger.info(f"成功保存 {saved_count} 条新数据到数据库")
-                
+            return self._write_series(indicator, data_df, change)
         except Exception as e:
             logger.error(f"保存数据到数据库失败: {str(e)}")
-            
+            return 0
+    
+    def _write_series(self,
+                      indicator: Indicator,
+                      data_df: pd.DataFrame,
+                      change: Optional[SeriesChange] = None) -> int:
+        """写入数据点与指纹，失败时抛出异常（由调用方决定如何处理）"""
+        saved_count = 0
+        dates = pd.to_datetime(data_df['date']).values.astype('datetime64[D]')
+        values = pd.to_numeric(data_df['value'], errors='coerce').values
+        
+        with transaction.atomic():
+            kind, since = (FULL, None) if change is None else change.compare(dates, values)
+            if kind != UNCHANGED:
+                mask = slice(None) if since is None else dates >= np.datetime64(since, 'D')
+                created, revised = save_series(
+                    indicator.id,
+                    dates[mask],
+                    values[mask],
+                    source_system='AkShare',
+                    confidence_score=0.9,  # 默认置信度
+                )
+                saved_count = created
+                logger.info(f"成功保存 {created} 条新数据到数据库，修订 {revised} 条"
+                            + (f"（仅比较 {since} 之后的数据）" if since else ""))
+            if change is not None:
+                save_fingerprint(indicator.id, change.fingerprint(dates, values))
+        
         return saved_count
     
     def get_supported_indicators(self) -> List[str]:
         """获取支持的指标列表"""
         return list(self.akshare_mappings.keys())
     
+    def is_circuit_open(self, indicator_code: str) -> bool:
+        """指标依赖的AkShare函数是否处于熔断状态"""
+        return self.circuit_retry_after(indicator_code) > 0
+    
+    def circuit_retry_after(self, indicator_code: str) -> float:
+        """指标依赖的AkShare函数距离熔断结束的秒数，未熔断时为0"""
+        config = self.akshare_mappings.get(indicator_code)
+        if config is None:
+            return 0.0
+        return self.circuit_breakers.retry_after(akshare_circuit_key(config['func']))
+    
+    def supports_date_range(self, indicator_code: str) -> bool:
+        """指标的AkShare函数是否支持按日期区间请求（可分段回补）"""
+        config = self.akshare_mappings.get(indicator_code)
+        return config is not None and config['func'] in DATE_RANGE_FUNCTIONS
+    
     def validate_indicator_support(self, indicator_code: str) -> Tuple[bool, str]:
         """验证指标是否支持"""
         if indicator_code in self.akshare_mappings:
@@ -3,7 +3,8 @@
 增强版数据采集器 - 核心方法
 """
 
-from .enhanced_data_collector import EnhancedDataCollector, CollectionResult
+from .enhanced_data_collector import DATE_RANGE_FUNCTIONS, EnhancedDataCollector, CollectionResult
+from .circuit_breaker import akshare_circuit_key
 import pandas as pd
 import numpy as np
 from datetime import datetime
@@ -46,6 +47,15 @@ class EnhancedDataCollectorMethods(EnhancedDataCollector):
             
             config = self.akshare_mappings[indicator_code]
             
+            # 上游函数熔断中则直接跳过，不再请求和重试
+            if not self.circuit_breakers.allow(akshare_circuit_key(config['func'])):
+                return CollectionResult(
+                    success=False,
+                    error_message=f"AkShare函数 {config['func']} 熔断中，跳过指标 {indicator_code}",
+                    api_function=config['func'],
+                    circuit_open=True
+                )
+            
             # 调用AkShare函数获取数据
             data_df = self._fetch_data_from_akshare(config, start_date, end_date)
             
@@ -55,6 +65,11 @@ class EnhancedDataCollectorMethods(EnhancedDataCollector):
                     error_message=f"指标 {indicator_code} 未获取到数据"
                 )
             
+            # 变更检测：原始数据与上次一致则跳过清洗与写库
+            change = self._detect_change(indicator, config, data_df, start_date, end_date)
+            if change is not None and change.unchanged:
+                return self._unchanged_result(indicator_code, config, change)
+            
             # 数据清洗和标准化
             cleaned_data = self._clean_and_standardize_data(data_df, config)
             
@@ -65,7 +80,7 @@ class EnhancedDataCollectorMethods(EnhancedDataCollector):
                 )
             
             # 保存到数据库
-            saved_count = self._save_to_database(indicator, cleaned_data)
+            saved_count = self._save_to_database(indicator, cleaned_data, change)
             
             # 计算数据范围
             data_range = (
@@ -104,19 +119,21 @@ class EnhancedDataCollectorMethods(EnhancedDataCollector):
             akshare_func = getattr(ak, func_name)
             
             # 根据函数类型添加日期参数
-            if func_name in ['index_zh_a_hist'] and start_date and end_date:
+            if func_name in DATE_RANGE_FUNCTIONS and start_date and end_date:
                 params['start_date'] = start_date.replace('-', '')
                 params['end_date'] = end_date.replace('-', '')
             
             # 调用AkShare函数
             logger.info(f"调用 {func_name} 函数，参数: {params}")
             data_df = akshare_func(**params)
+            self.circuit_breakers.record(akshare_circuit_key(func_name), True)
             
             logger.info(f"成功获取 {len(data_df) if data_df is not None else 0} 条数据")
             return data_df
             
         except Exception as e:
             logger.error(f"调用AkShare函数 {config['func']} 失败: {str(e)}")
+            self.circuit_breakers.record(akshare_circuit_key(config['func']), False)
             return None
     
     def _clean_and_standardize_data(self, data_df: pd.DataFrame, config) -> pd.DataFrame:
@@ -243,45 +260,6 @@ class EnhancedDataCollectorMethods(EnhancedDataCollector):
         
         return value_series.apply(parse_numeric)
     
-    def _save_to_database(self, indicator, data_df: pd.DataFrame) -> int:
-        """保存数据到数据库"""
-        from django.db import transaction, IntegrityError
-        from .models import IndicatorData
-        
-        saved_count = 0
-        
-        try:
-            with transaction.atomic():
-                for _, row in data_df.iterrows():
-                    try:
-                        # 创建或更新数据记录
-                        data_point, created = IndicatorData.objects.update_or_create(
-                            indicator=indicator,
-                            date=row['date'],
-                            defaults={
-                                'value': row['value'],
-                                'source_system': 'AkShare',
-                                'is_estimated': False,
-                                'confidence_score': 0.9,
-                                'raw_value': row['value'],
-                                'calculated_value': row['value']
-                            }
-                        )
-                        
-                        if created:
-                            saved_count += 1
-                            
-                    except IntegrityError as e:
-                        logger.warning(f"保存数据点失败 {indicator.code} {row['date']}: {e}")
-                        continue
-                
-                logger.info(f"成功保存 {saved_count} 条新数据到数据库")
-                
-        except Exception as e:
-            logger.error(f"保存数据到数据库失败: {str(e)}")
-            
-        return saved_count
-    
     def get_supported_indicators(self) -> List[str]:
         """获取支持的指标列表"""
         return list(self.akshare_mappings.keys())
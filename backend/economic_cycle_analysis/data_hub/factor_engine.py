@@ -0,0 +1,373 @@
+# -*- coding: utf-8 -*-
+"""
+8维度因子提取
+对每个维度（海外面、资金面、宏观经济面 ...）的指标在对齐、标准化后的矩阵上
+提取前 k 个主成分作为该维度的"状态"因子，缺失值用 EM 迭代补全
+（以当前低秩重构填补缺失、重新分解，直至收敛），大维度使用随机化SVD
+
+因子得分保存为派生指标序列（FACTOR_<维度>_PC<k>），模型状态（成分指标、
+标准化参数、载荷）保存在第一主成分指标的 metadata 中；
+新数据到达时以上一次的载荷为初始子空间热启动，通常一两次迭代即可收敛
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Indicator, IndicatorCategory
+from .series_matrix import SUPPORTED_FREQUENCIES, load_aligned_matrix
+from .series_store import data_version, sync_derived_series
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SYSTEM = 'factor_engine'
+STATE_KEY = 'factor_model'
+
+# 8维度定义（与 8_dimension_comprehensive_report.py 一致）: 键 -> (名称, 分类名称)
+EIGHT_DIMENSIONS = {
+    'overseas': ('海外面', ['海外面']),
+    'capital': ('资金面', ['资金面']),
+    'macro': ('宏观经济面', ['宏观经济面']),
+    'corporate': ('企业基本面', ['企业基本面']),
+    'policy': ('政策面', ['政策面']),
+    'market': ('市场面', ['市场面']),
+    'sentiment': ('情绪面', ['情绪面']),
+    'industry': ('行业面', ['TMT行业', '制造业', '消费行业', '周期行业', '医疗健康', '金融地产']),
+}
+
+FACTOR_CATEGORY = {'name': '因子得分', 'code': 'FACTOR_SCORES'}
+
+# 列数或行数超过该值时使用随机化SVD
+RANDOMIZED_MIN_SIZE = 200
+
+
+@dataclass
+class FactorConfig:
+    """因子提取参数"""
+    n_factors: int = 3
+    frequency: str = 'M'
+    min_observations: int = 24     # 成分指标最少有效期数
+    min_row_coverage: float = 0.3  # 某期有效成分占比低于该值时不输出得分
+    tol: float = 1e-4              # EM 收敛阈值（缺失位置重构值的相对变化）
+    max_iter: int = 100            # 冷启动最大迭代次数
+    warm_max_iter: int = 10        # 热启动最大迭代次数
+    oversample: int = 10           # 随机化SVD过采样列数
+    power_iter: int = 2            # 随机化SVD幂迭代次数
+
+
+@dataclass
+class FactorModel:
+    """因子分解结果"""
+    codes: List[str]
+    center: np.ndarray          # (N,)
+    scale: np.ndarray           # (N,)
+    loadings: np.ndarray        # (N, k)，列正交归一
+    scores: np.ndarray          # (T, k)
+    singular_values: np.ndarray
+    explained_ratio: np.ndarray
+    coverage: np.ndarray        # (T,) 各期有效成分占比
+    iterations: int = 0
+    warm_started: bool = False
+
+
+@dataclass
+class FactorRunResult:
+    """因子提取运行结果"""
+    dimensions_updated: List[str] = field(default_factory=list)
+    dimensions_skipped: List[str] = field(default_factory=list)
+    warm_started: int = 0
+    points_created: int = 0
+    points_updated: int = 0
+    points_deleted: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def randomized_svd(matrix: np.ndarray,
+                   rank: int,
+                   oversample: int = 10,
+                   power_iter: int = 2,
+                   init: Optional[np.ndarray] = None,
+                   seed: int = 0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    随机化截断SVD（Halko 等）
+
+    Args:
+        init: 初始右奇异子空间 (N, r)，热启动时传入上一次的载荷，其余列随机补足
+    """
+    n_columns = matrix.shape[1]
+    width = min(rank + oversample, min(matrix.shape))
+    rng = np.random.default_rng(seed)
+    omega = rng.standard_normal((n_columns, width))
+    if init is not None:
+        columns = min(init.shape[1], width)
+        omega[:, :columns] = init[:, :columns]
+
+    basis, _ = np.linalg.qr(matrix @ omega)
+    for _ in range(power_iter):
+        basis, _ = np.linalg.qr(matrix.T @ basis)
+        basis, _ = np.linalg.qr(matrix @ basis)
+
+    u_small, s, vt = np.linalg.svd(basis.T @ matrix, full_matrices=False)
+    return (basis @ u_small)[:, :rank], s[:rank], vt[:rank]
+
+
+def truncated_svd(matrix: np.ndarray, rank: int, config: FactorConfig, init: Optional[np.ndarray] = None):
+    """截断SVD：大矩阵用随机化算法，小矩阵直接分解"""
+    if min(matrix.shape) > RANDOMIZED_MIN_SIZE:
+        return randomized_svd(matrix, rank, config.oversample, config.power_iter, init)
+    u, s, vt = np.linalg.svd(matrix, full_matrices=False)
+    return u[:, :rank], s[:rank], vt[:rank]
+
+
+def extract_factors(values: np.ndarray,
+                    codes: List[str],
+                    config: FactorConfig,
+                    previous: Optional[FactorModel] = None) -> FactorModel:
+    """
+    EM-PCA 因子提取
+
+    Args:
+        values: 对齐矩阵 (T, N)，缺失为NaN
+        codes: 列对应的指标代码
+        previous: 上一次的模型；成分一致时沿用其标准化参数并以其载荷热启动
+
+    Returns:
+        FactorModel
+    """
+    mask = np.isfinite(values)
+    warm = previous is not None and previous.codes == codes
+
+    if warm:
+        center, scale = previous.center, previous.scale
+    else:
+        center = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+        scale = np.where(scale > 0, scale, 1.0)
+    standardized = np.where(mask, (values - center) / scale, 0.0)
+
+    rank = min(config.n_factors, *standardized.shape)
+    filled = standardized.copy()
+    init = None
+    if warm:
+        # 用上一次的载荷对每期的有效观测做最小二乘投影，得到缺失位置的初始估计
+        init = previous.loadings[:, :rank]
+        filled[~mask] = _masked_projection(standardized, mask, init)[~mask]
+
+    max_iter = config.warm_max_iter if warm else config.max_iter
+    missing = ~mask
+    iterations = 0
+    for iterations in range(1, max_iter + 1):
+        u, s, vt = truncated_svd(filled, rank, config, init)
+        reconstruction = (u * s) @ vt
+        if not missing.any():
+            break
+        previous_fill = filled[missing]
+        filled[missing] = reconstruction[missing]
+        change = np.linalg.norm(filled[missing] - previous_fill) / max(np.linalg.norm(filled[missing]), 1e-12)
+        init = vt.T
+        if change < config.tol:
+            break
+
+    loadings = vt.T
+    # 符号约定：与上一次载荷同向；冷启动时使载荷之和为正
+    reference = previous.loadings[:, :rank] if warm else np.ones((len(codes), rank))
+    signs = np.sign(np.sum(loadings * reference, axis=0))
+    signs[signs == 0] = 1.0
+    loadings = loadings * signs
+
+    total = np.sum(filled ** 2)
+    return FactorModel(
+        codes=codes,
+        center=center,
+        scale=scale,
+        loadings=loadings,
+        scores=filled @ loadings,
+        singular_values=s,
+        explained_ratio=s ** 2 / total if total > 0 else np.zeros_like(s),
+        coverage=mask.mean(axis=1),
+        iterations=iterations,
+        warm_started=warm,
+    )
+
+
+def _masked_projection(standardized: np.ndarray, mask: np.ndarray, loadings: np.ndarray) -> np.ndarray:
+    """按各期有效观测求因子得分的最小二乘解，返回低秩重构"""
+    weights = mask.astype(np.float64)
+    # gram[t] = Σ_j m_tj v_j v_jᵀ，rhs[t] = Σ_j m_tj x_tj v_j
+    gram = np.einsum('tj,jk,jl->tkl', weights, loadings, loadings)
+    rhs = (standardized * weights) @ loadings
+    gram += 1e-6 * np.eye(loadings.shape[1])
+    scores = np.linalg.solve(gram, rhs[..., None])[..., 0]
+    return scores @ loadings.T
+
+
+def dimension_indicator_codes(dimension: str) -> List[str]:
+    """维度所含的启用指标（包括子分类下的指标）"""
+    _, category_names = EIGHT_DIMENSIONS[dimension]
+    return list(
+        Indicator.objects.filter(is_active=True)
+        .filter(Q(category__name__in=category_names) | Q(category__parent__name__in=category_names))
+        .order_by('code')
+        .values_list('code', flat=True)
+    )
+
+
+def factor_indicator_code(dimension: str, index: int) -> str:
+    return f"FACTOR_{dimension.upper()}_PC{index}"
+
+
+class FactorEngine:
+    """8维度因子提取与持久化"""
+
+    def __init__(self, config: FactorConfig = None):
+        self.config = config or FactorConfig()
+        if self.config.frequency not in SUPPORTED_FREQUENCIES:
+            raise ValueError(f"不支持的频率: {self.config.frequency}")
+
+    def run(self, dimensions: Iterable[str] = None, full: bool = False) -> FactorRunResult:
+        """
+        提取各维度因子并保存得分序列
+
+        Args:
+            dimensions: 维度键列表，None表示全部8个维度
+            full: 是否忽略已保存的模型冷启动重算
+        """
+        started = time.time()
+        result = FactorRunResult()
+
+        for dimension in (dimensions or EIGHT_DIMENSIONS.keys()):
+            if dimension not in EIGHT_DIMENSIONS:
+                result.errors.append({'dimension': dimension, 'error': f"未知维度: {dimension}"})
+                continue
+            try:
+                self._run_dimension(dimension, full, result)
+            except Exception as e:
+                logger.error(f"维度 {dimension} 因子提取失败: {e}")
+                result.errors.append({'dimension': dimension, 'error': str(e)})
+
+        result.execution_time = time.time() - started
+        logger.info(
+            f"因子提取完成: 更新 {len(result.dimensions_updated)} 个维度 (热启动 {result.warm_started}), "
+            f"跳过 {len(result.dimensions_skipped)} 个, 新增 {result.points_created}, "
+            f"更新 {result.points_updated}, 删除 {result.points_deleted}, 耗时 {result.execution_time:.2f}秒"
+        )
+        return result
+
+    def _run_dimension(self, dimension: str, full: bool, result: FactorRunResult):
+        codes = dimension_indicator_codes(dimension)
+        ids = list(Indicator.objects.filter(code__in=codes).values_list('id', flat=True))
+        version = data_version(ids)
+
+        factor_indicators = self._factor_indicators(dimension)
+        state = factor_indicators[0].metadata.get(STATE_KEY) or {}
+        if not full and state.get('version') == version and state.get('frequency') == self.config.frequency:
+            result.dimensions_skipped.append(dimension)
+            return
+
+        matrix = load_aligned_matrix(codes, self.config.frequency, how='mean')
+        keep = np.isfinite(matrix.values).sum(axis=0) >= self.config.min_observations
+        matrix = matrix.subset([code for code, ok in zip(matrix.codes, keep) if ok])
+        if len(matrix.codes) < 2:
+            logger.warning(f"维度 {dimension} 有效指标不足，跳过因子提取")
+            result.dimensions_skipped.append(dimension)
+            return
+
+        previous = None if full else self._load_model(state)
+        model = extract_factors(matrix.values, matrix.codes, self.config, previous)
+
+        dates = matrix.dates
+        scores = np.where(model.coverage[:, None] >= self.config.min_row_coverage, model.scores, np.nan)
+        with transaction.atomic():
+            for i, indicator in enumerate(factor_indicators):
+                column = scores[:, i] if i < scores.shape[1] else np.full(len(dates), np.nan)
+                created, updated, deleted = sync_derived_series(
+                    indicator.pk, dates, column, SOURCE_SYSTEM, confidence=model.coverage
+                )
+                result.points_created += created
+                result.points_updated += updated
+                result.points_deleted += deleted
+            self._save_model(factor_indicators[0], model, version)
+
+        result.dimensions_updated.append(dimension)
+        result.warm_started += int(model.warm_started)
+        logger.info(
+            f"维度 {dimension}: {len(model.codes)} 个指标 × {len(dates)} 期, 迭代 {model.iterations} 次, "
+            f"解释方差 {np.round(model.explained_ratio, 3).tolist()}"
+        )
+
+    def _factor_indicators(self, dimension: str) -> List[Indicator]:
+        """获取（必要时创建）维度因子得分指标"""
+        label, _ = EIGHT_DIMENSIONS[dimension]
+        category, _ = IndicatorCategory.objects.get_or_create(
+            name=FACTOR_CATEGORY['name'],
+            defaults={'code': FACTOR_CATEGORY['code'], 'description': '8维度因子提取得分'},
+        )
+        indicators = []
+        for i in range(1, self.config.n_factors + 1):
+            indicator, _ = Indicator.objects.get_or_create(
+                code=factor_indicator_code(dimension, i),
+                defaults={
+                    'name': f"{label}第{i}主成分",
+                    'category': category,
+                    'frequency': self.config.frequency,
+                    'lead_lag_status': Indicator.LeadLag.SYNCHRONOUS,
+                    'source': 'calculated',
+                    'data_availability': Indicator.DataAvailability.CALCULATED,
+                    'calculation_method': '因子模型（EM-PCA）',
+                    'description': f"{label}指标标准化后的第{i}主成分得分",
+                },
+            )
+            indicators.append(indicator)
+        return indicators
+
+    def _load_model(self, state: Dict) -> Optional[FactorModel]:
+        if not state or state.get('frequency') != self.config.frequency:
+            return None
+        try:
+            loadings = np.array(state['loadings'], dtype=np.float64)
+            if loadings.shape[1] < self.config.n_factors:
+                return None
+            return FactorModel(
+                codes=state['codes'],
+                center=np.array(state['center'], dtype=np.float64),
+                scale=np.array(state['scale'], dtype=np.float64),
+                loadings=loadings,
+                scores=np.empty((0, loadings.shape[1])),
+                singular_values=np.array(state.get('singular_values', [])),
+                explained_ratio=np.array(state.get('explained_ratio', [])),
+                coverage=np.empty(0),
+            )
+        except (KeyError, ValueError, IndexError):
+            return None
+
+    def _save_model(self, indicator: Indicator, model: FactorModel, version: str):
+        """只写入本模块的元数据键，不覆盖其他模块在计算期间写入的键"""
+        state = {
+            'version': version,
+            'frequency': self.config.frequency,
+            'codes': model.codes,
+            'center': model.center.tolist(),
+            'scale': model.scale.tolist(),
+            'loadings': model.loadings.tolist(),
+            'singular_values': model.singular_values.tolist(),
+            'explained_ratio': model.explained_ratio.tolist(),
+            'iterations': model.iterations,
+            'fitted_at': timezone.now().isoformat(),
+        }
+        Indicator.update_metadata_key(STATE_KEY, {indicator.pk: state})
+
+
+def update_factors(dimensions: Iterable[str] = None,
+                   n_factors: int = 3,
+                   frequency: str = 'M',
+                   full: bool = False) -> FactorRunResult:
+    """更新8维度因子的便捷函数"""
+    config = FactorConfig(n_factors=n_factors, frequency=frequency)
+    return FactorEngine(config).run(dimensions=dimensions, full=full)
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+离线文件数据导入
+按行分块流式读取供应商导出的 CSV / Excel 文件（宽表：一列日期 + 每个指标一列），
+逐块写入数据库，内存占用与文件大小无关：
+1. CSV 使用 pd.read_csv(chunksize=...) 分块解析
+2. XLSX 使用 openpyxl 只读模式逐行读取，累积到块大小后再构造 DataFrame
+3. 列名通过映射注册表解析为指标代码（指标代码、Wind代码、Wind指标描述、指标名称）
+4. 写入统一走 save_series，只写入新增或修订的数据点并记录数据版本，重复导入不会产生重复数据；
+   所有块共用一个可知时间，同一日期在多个块中出现时以最后一个值为准
+
+日期无法解析的行（如Wind导出的 频率/单位/指标ID 说明行、末尾的数据来源行）直接跳过
+"""
+
+import logging
+import time
+import warnings
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pandas as pd
+from django.utils import timezone
+
+from .mapping_registry import get_mapping_registry
+from .models import Indicator
+from .series_store import save_series
+
+logger = logging.getLogger(__name__)
+
+# 每块读取的行数
+INGEST_CHUNK_ROWS = 5000
+
+CSV_SUFFIXES = ('.csv', '.txt')
+EXCEL_SUFFIXES = ('.xlsx', '.xlsm')
+
+# 默认来源系统标识
+DEFAULT_SOURCE_SYSTEM = 'file_import'
+
+
+@dataclass
+class IngestResult:
+    """文件导入结果"""
+    file_path: str
+    rows_read: int = 0
+    rows_skipped: int = 0
+    chunks: int = 0
+    created: int = 0
+    revised: int = 0
+    columns: Dict[str, str] = field(default_factory=dict)       # 列名 -> 指标代码
+    unmapped_columns: List[str] = field(default_factory=list)
+    execution_time: float = 0.0
+
+
+def iter_csv_chunks(path: str,
+                    chunk_rows: int = INGEST_CHUNK_ROWS,
+                    header_row: int = 0,
+                    encoding: str = 'utf-8') -> Iterator[pd.DataFrame]:
+    """分块读取CSV（所有列按字符串读取，数值在写入前统一转换）"""
+    yield from pd.read_csv(path, chunksize=chunk_rows, header=header_row, encoding=encoding, dtype=str)
+
+
+def iter_excel_chunks(path: str,
+                      chunk_rows: int = INGEST_CHUNK_ROWS,
+                      header_row: int = 0,
+                      sheet: Optional[str] = None) -> Iterator[pd.DataFrame]:
+    """以openpyxl只读模式逐行读取工作表，每 chunk_rows 行构造一个DataFrame"""
+    from openpyxl import load_workbook  # 延迟导入，仅导入Excel文件时需要
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        worksheet = workbook[sheet] if sheet else workbook.worksheets[0]
+        rows = worksheet.iter_rows(values_only=True)
+        for _ in range(header_row):
+            next(rows, None)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(value).strip() if value is not None else f'_col{i}' for i, value in enumerate(header)]
+
+        buffer = []
+        for row in rows:
+            buffer.append(row[:len(columns)])
+            if len(buffer) >= chunk_rows:
+                yield pd.DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield pd.DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def iter_file_chunks(path: str,
+                     chunk_rows: int = INGEST_CHUNK_ROWS,
+                     header_row: int = 0,
+                     sheet: Optional[str] = None,
+                     encoding: str = 'utf-8') -> Iterator[pd.DataFrame]:
+    """按文件扩展名选择分块读取方式"""
+    suffix = Path(path).suffix.lower()
+    if suffix in CSV_SUFFIXES:
+        return iter_csv_chunks(path, chunk_rows, header_row, encoding)
+    if suffix in EXCEL_SUFFIXES:
+        return iter_excel_chunks(path, chunk_rows, header_row, sheet)
+    raise ValueError(f"不支持的文件格式: {suffix}（支持 {', '.join(CSV_SUFFIXES + EXCEL_SUFFIXES)}）")
+
+
+def _to_float(column: pd.Series):
+    """转换为浮点数组：去除千分位逗号，无法解析的值为NaN"""
+    if not pd.api.types.is_numeric_dtype(column):
+        column = column.astype(str).str.replace(',', '', regex=False)
+    return pd.to_numeric(column, errors='coerce').to_numpy(dtype=float)
+
+
+def resolve_columns(columns: List[str], column_map: Dict[str, str] = None) -> Dict[str, Indicator]:
+    """
+    将文件列名解析为指标
+
+    解析顺序：显式映射 > 指标代码 > Wind代码 > Wind指标描述 > 指标名称，
+    对应多个指标或无法解析的列不导入
+
+    Args:
+        columns: 列名（不含日期列）
+        column_map: 显式映射 列名 -> 指标代码
+
+    Returns:
+        Dict[str, Indicator]: 列名 -> 指标
+    """
+    column_map = column_map or {}
+    registry = get_mapping_registry()
+    wind_by_description: Dict[str, List[str]] = {}
+    for code, config in registry.wind.items():
+        wind_by_description.setdefault(config.get('description', ''), []).append(code)
+
+    candidates: Dict[str, str] = {}
+    for column in columns:
+        name = str(column).strip()
+        if name in column_map:
+            candidates[column] = column_map[name]
+        elif name in registry.unified:
+            candidates[column] = name
+        elif len(registry.codes_for_wind_code(name)) == 1:
+            candidates[column] = registry.codes_for_wind_code(name)[0]
+        elif len(wind_by_description.get(name, [])) == 1:
+            candidates[column] = wind_by_description[name][0]
+        else:
+            candidates[column] = name
+
+    by_code = Indicator.objects.in_bulk(set(candidates.values()), field_name='code')
+    resolved = {column: by_code[code] for column, code in candidates.items() if code in by_code}
+
+    # 其余列按指标名称匹配（名称唯一时）
+    remaining = [column for column in columns if column not in resolved]
+    if remaining:
+        by_name: Dict[str, List[Indicator]] = {}
+        for indicator in Indicator.objects.filter(name__in=[str(column).strip() for column in remaining]):
+            by_name.setdefault(indicator.name, []).append(indicator)
+        for column in remaining:
+            matches = by_name.get(str(column).strip(), [])
+            if len(matches) == 1:
+                resolved[column] = matches[0]
+    return resolved
+
+
+def ingest_file(path: str,
+                date_column: Optional[str] = None,
+                column_map: Dict[str, str] = None,
+                sheet: Optional[str] = None,
+                header_row: int = 0,
+                chunk_rows: int = INGEST_CHUNK_ROWS,
+                encoding: str = 'utf-8',
+                source_system: str = DEFAULT_SOURCE_SYSTEM,
+                dry_run: bool = False,
+                on_chunk: Callable[[IngestResult], None] = None) -> IngestResult:
+    """
+    流式导入宽表格式的CSV/Excel文件
+
+    Args:
+        path: 文件路径
+        date_column: 日期列名，默认第一列
+        column_map: 显式列映射 列名 -> 指标代码
+        sheet: Excel工作表名，默认第一个工作表
+        header_row: 表头所在行（从0开始）
+        chunk_rows: 每块行数
+        encoding: CSV编码
+        source_system: 写入数据的来源系统标识
+        dry_run: 仅解析列映射和统计行数，不写库
+        on_chunk: 每块写入后的回调（用于输出进度）
+
+    Returns:
+        IngestResult: 导入结果
+    """
+    start_time = time.time()
+    result = IngestResult(file_path=str(path))
+    known_from = timezone.now()
+    mapping: Optional[Dict[str, Indicator]] = None
+
+    for chunk in iter_file_chunks(path, chunk_rows, header_row, sheet, encoding):
+        if mapping is None:
+            date_column = date_column or chunk.columns[0]
+            if date_column not in chunk.columns:
+                raise ValueError(f"日期列不存在: {date_column}")
+            value_columns = [column for column in chunk.columns if column != date_column]
+            mapping = resolve_columns(value_columns, column_map)
+            result.columns = {column: indicator.code for column, indicator in mapping.items()}
+            result.unmapped_columns = [column for column in value_columns if column not in mapping]
+            logger.info(f"文件 {path}: 映射 {len(mapping)} 列，未映射 {len(result.unmapped_columns)} 列")
+            if not mapping:
+                break
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)  # 混有说明行时无法推断统一日期格式
+            dates = pd.to_datetime(chunk[date_column], errors='coerce')
+        valid = dates.notna().to_numpy()
+        result.chunks += 1
+        result.rows_read += len(chunk)
+        result.rows_skipped += int((~valid).sum())
+        if not valid.any():
+            continue
+
+        day_values = dates[valid].to_numpy().astype('datetime64[D]')
+        if not dry_run:
+            for column, indicator in mapping.items():
+                values = _to_float(chunk[column][valid])
+                created, revised = save_series(
+                    indicator.id, day_values, values,
+                    source_system=source_system, known_from=known_from,
+                )
+                result.created += created
+                result.revised += revised
+
+        if on_chunk:
+            on_chunk(result)
+
+    result.execution_time = time.time() - start_time
+    logger.info(
+        f"文件导入完成 {path}: {result.rows_read} 行, 新增 {result.created}, 修订 {result.revised}, "
+        f"耗时 {result.execution_time:.2f}秒"
+    )
+    return result
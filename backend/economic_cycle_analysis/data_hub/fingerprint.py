@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+采集变更检测（CDC）
+多数AkShare宏观接口每次返回完整历史，通常只有最后几期新增或修订。
+每个指标保存一份序列指纹（SeriesFingerprint），采集时先比较再决定写入范围：
+1. 原始数据摘要与映射配置摘要都相同：跳过清洗、写库、质量报告与异常检测；
+   没有写入则 data_version 不变，依赖数据版本的缓存（周期引擎、滚动相关等）继续有效；
+   映射或清洗配置（日期列、数值列、单位等）变化时即使原始数据相同也重新清洗
+2. 原始数据变化：清洗后按上次的尾部起始日期切分，头部摘要相同则只写入尾部区间
+3. 头部也变化（历史修订、口径调整）：整段交给 save_series 逐点比较
+
+只对返回完整历史的请求做变更检测，按日期区间请求的结果随区间变化，仍整段比较
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .models import SeriesFingerprint
+
+logger = logging.getLogger(__name__)
+
+# 尾部的数据点数（最近的若干期最常被修订）
+TAIL_ROWS = 12
+
+# 数值摘要保留的小数位，与 save_series 的变化容差一致
+VALUE_DECIMALS = 9
+
+UNCHANGED = 'unchanged'  # 清洗后的序列未变化
+TAIL = 'tail'            # 只有尾部变化
+FULL = 'full'            # 头部也变化或没有历史指纹
+
+
+def frame_hash(data_df: pd.DataFrame) -> str:
+    """原始返回数据的摘要（列名与逐行内容）"""
+    digest = hashlib.sha1('\x1f'.join(map(str, data_df.columns)).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(data_df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def config_hash(config: Optional[Dict]) -> str:
+    """映射配置的摘要（接口参数与清洗所用的列名、单位等）"""
+    if not config:
+        return ''
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def _sorted_arrays(dates, values) -> Tuple[np.ndarray, np.ndarray]:
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(values) & ~np.isnat(dates)
+    dates, values = dates[valid], np.round(values[valid], VALUE_DECIMALS)
+    order = np.argsort(dates, kind='stable')
+    return dates[order], values[order]
+
+
+def _digest(dates: np.ndarray, values: np.ndarray) -> str:
+    digest = hashlib.sha1(dates.astype(np.int64).tobytes())
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _as_date(value: np.datetime64) -> date:
+    return value.astype('datetime64[D]').astype(object)
+
+
+@dataclass
+class SeriesChange:
+    """一次抓取相对上次指纹的变化"""
+    raw_hash: str
+    stored: Optional[SeriesFingerprint] = None
+    config_hash: str = ''
+
+    @property
+    def unchanged(self) -> bool:
+        """原始数据与映射配置都与上次完全一致"""
+        return (
+            self.stored is not None
+            and self.stored.raw_hash == self.raw_hash
+            and self.stored.config_hash == self.config_hash
+        )
+
+    def compare(self, dates, values) -> Tuple[str, Optional[date]]:
+        """
+        比较清洗后的序列
+
+        Returns:
+            (UNCHANGED/TAIL/FULL, 需要写入的起始日期)，FULL 时起始日期为None
+        """
+        stored = self.stored
+        if stored is None or stored.tail_start is None:
+            return FULL, None
+        dates, values = _sorted_arrays(dates, values)
+        split = int(np.searchsorted(dates, np.datetime64(stored.tail_start, 'D')))
+        if _digest(dates[:split], values[:split]) != stored.head_hash:
+            return FULL, None
+        if len(dates) == stored.rows and _digest(dates[split:], values[split:]) == stored.tail_hash:
+            return UNCHANGED, None
+        return TAIL, stored.tail_start
+
+    def fingerprint(self, dates, values) -> Dict:
+        """本次数据的指纹字段"""
+        dates, values = _sorted_arrays(dates, values)
+        split = max(0, len(dates) - TAIL_ROWS)
+        return {
+            'raw_hash': self.raw_hash,
+            'config_hash': self.config_hash,
+            'head_hash': _digest(dates[:split], values[:split]),
+            'tail_hash': _digest(dates[split:], values[split:]),
+            'tail_start': _as_date(dates[split]) if len(dates) else None,
+            'rows': len(dates),
+            'first_date': _as_date(dates[0]) if len(dates) else None,
+            'last_date': _as_date(dates[-1]) if len(dates) else None,
+        }
+
+
+def load_fingerprints(indicator_ids: Iterable[int]) -> Dict[int, SeriesFingerprint]:
+    """批量加载指标指纹"""
+    return {
+        fingerprint.indicator_id: fingerprint
+        for fingerprint in SeriesFingerprint.objects.filter(indicator_id__in=sorted(set(indicator_ids)))
+    }
+
+
+def detect_change(indicator_id: int, data_df: pd.DataFrame,
+                  stored: Optional[SeriesFingerprint] = None,
+                  config: Optional[Dict] = None) -> SeriesChange:
+    """计算原始数据与映射配置的摘要并与上次指纹比较（stored 未传入时从数据库读取）"""
+    if stored is None:
+        stored = SeriesFingerprint.objects.filter(indicator_id=indicator_id).first()
+    return SeriesChange(raw_hash=frame_hash(data_df), stored=stored, config_hash=config_hash(config))
+
+
+def save_fingerprint(indicator_id: int, fields: Dict) -> SeriesFingerprint:
+    fingerprint, _ = SeriesFingerprint.objects.update_or_create(indicator_id=indicator_id, defaults=fields)
+    return fingerprint
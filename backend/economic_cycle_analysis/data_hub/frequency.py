@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+频率协调
+日/周/月/季/年频指标混合计算时的统一处理：
+1. 同频或高频序列按目标频率分期聚合（last/mean/sum）
+2. 低频序列按发布时滞做 as-of 连接，即每期取截至期末已发布的最新值
+3. 向前填充限制最多沿用的期数，避免过期数据无限延续
+
+全部基于有序日期数组上的 NumPy searchsorted 实现
+"""
+
+from datetime import date
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# 频率别名（导入数据中存在英文/中文写法）
+FREQUENCY_ALIASES = {
+    'D': 'D', 'DAILY': 'D', '日': 'D', '日度': 'D',
+    'W': 'W', 'WEEKLY': 'W', '周': 'W', '周度': 'W',
+    'M': 'M', 'MONTHLY': 'M', '月': 'M', '月度': 'M',
+    'Q': 'Q', 'QUARTERLY': 'Q', '季': 'Q', '季度': 'Q',
+    'Y': 'Y', 'YEARLY': 'Y', 'ANNUAL': 'Y', '年': 'Y', '年度': 'Y',
+}
+
+AGGREGATIONS = ('last', 'mean', 'sum')
+
+# 频率由高到低的排序
+FREQUENCY_RANK = {'D': 0, 'W': 1, 'M': 2, 'Q': 3, 'Y': 4}
+
+# 各频率一期的最长天数，用于 as-of 连接的过期判断
+PERIOD_DAYS = {'D': 1, 'W': 7, 'M': 31, 'Q': 92, 'Y': 366}
+
+# 回补时可用的日期分段粒度
+CHUNK_FREQUENCIES = ('M', 'Q', 'Y')
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def normalize_frequency(frequency: Optional[str], dates: Optional[np.ndarray] = None) -> str:
+    """标准化频率代码，无法识别时根据日期间隔推断"""
+    if frequency:
+        normalized = FREQUENCY_ALIASES.get(str(frequency).strip().upper())
+        if normalized:
+            return normalized
+
+    if dates is not None and len(dates) > 2:
+        median_step = float(np.median(np.diff(dates).astype(np.int64)))
+        if median_step <= 3:
+            return 'D'
+        if median_step <= 10:
+            return 'W'
+        if median_step <= 45:
+            return 'M'
+        if median_step <= 135:
+            return 'Q'
+        return 'Y'
+
+    return 'M'
+
+
+def period_index(dates: np.ndarray, frequency: str) -> np.ndarray:
+    """将日期映射为按频率连续编号的期数（相邻期相差1）"""
+    if frequency == 'D':
+        # 按工作日编号，周末不视为缺失
+        return np.busday_count(_EPOCH, dates, weekmask='1111100')
+    if frequency == 'W':
+        # 1970-01-01 为周四，+3 后按周一分周
+        return (dates.astype('datetime64[D]').astype(np.int64) + 3) // 7
+    if frequency == 'Q':
+        return dates.astype('datetime64[M]').astype(np.int64) // 3
+    if frequency == 'Y':
+        return dates.astype('datetime64[Y]').astype(np.int64)
+    return dates.astype('datetime64[M]').astype(np.int64)
+
+
+def period_start(periods: np.ndarray, frequency: str) -> np.ndarray:
+    """期数编号转换为该期起始日期（period_index 的逆运算）"""
+    periods = np.asarray(periods, dtype=np.int64)
+    if frequency == 'D':
+        return np.busday_offset(_EPOCH, periods, roll='forward', weekmask='1111100')
+    if frequency == 'W':
+        return (periods * 7 - 3).astype('datetime64[D]')
+    if frequency == 'Q':
+        return (periods * 3).astype('datetime64[M]').astype('datetime64[D]')
+    if frequency == 'Y':
+        return periods.astype('datetime64[Y]').astype('datetime64[D]')
+    return periods.astype('datetime64[M]').astype('datetime64[D]')
+
+
+def period_end(periods: np.ndarray, frequency: str) -> np.ndarray:
+    """期数编号转换为该期最后一天"""
+    periods = np.asarray(periods, dtype=np.int64)
+    if frequency == 'D':
+        return period_start(periods, frequency)
+    return period_start(periods + 1, frequency) - np.timedelta64(1, 'D')
+
+
+def date_windows(start, end, chunk: str = 'Y') -> List[Tuple[date, date]]:
+    """
+    将 [start, end] 按自然月/季/年切分为连续的日期窗口（首尾窗口截断到区间内）
+
+    Args:
+        start: 开始日期（date 或 YYYY-MM-DD）
+        end: 结束日期（date 或 YYYY-MM-DD）
+        chunk: 分段粒度 M/Q/Y
+    """
+    if chunk not in CHUNK_FREQUENCIES:
+        raise ValueError(f"不支持的分段粒度: {chunk}")
+    bounds = np.array([start, end], dtype='datetime64[D]')
+    if bounds[1] < bounds[0]:
+        return []
+
+    first, last = period_index(bounds, chunk)
+    periods = np.arange(first, last + 1)
+    starts = np.maximum(period_start(periods, chunk), bounds[0])
+    ends = np.minimum(period_end(periods, chunk), bounds[1])
+    return [(s.item(), e.item()) for s, e in zip(starts, ends)]
+
+
+def is_lower_frequency(source: str, target: str) -> bool:
+    """source 是否比 target 频率更低（如月频相对日频）"""
+    return FREQUENCY_RANK[source] > FREQUENCY_RANK[target]
+
+
+def resample(dates: np.ndarray, values: np.ndarray, frequency: str, how: str = 'last') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按目标频率分期聚合（日期需升序，缺失值不参与聚合）
+
+    Args:
+        dates: datetime64[D] 日期
+        values: 数值
+        frequency: 目标频率 D/W/M/Q/Y
+        how: 期内聚合方式 last/mean/sum
+
+    Returns:
+        (期数编号, 聚合值)
+    """
+    if how not in AGGREGATIONS:
+        raise ValueError(f"不支持的聚合方式: {how}")
+
+    valid = np.isfinite(values)
+    if not valid.all():
+        dates, values = dates[valid], values[valid]
+    if len(dates) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    periods = period_index(dates, frequency)
+    keys = periods[np.r_[True, periods[1:] != periods[:-1]]]
+    starts = np.searchsorted(periods, keys, side='left')
+
+    if how == 'last':
+        return keys, values[np.searchsorted(periods, keys, side='right') - 1]
+
+    sums = np.add.reduceat(values, starts)
+    if how == 'sum':
+        return keys, sums
+    counts = np.diff(np.append(starts, len(periods)))
+    return keys, sums / counts
+
+
+def asof_join(target_dates: np.ndarray,
+              dates: np.ndarray,
+              values: np.ndarray,
+              publication_lag: int = 0,
+              tolerance: Optional[int] = None) -> np.ndarray:
+    """
+    as-of 连接：每个目标日期取截至当日已发布的最新值
+
+    Args:
+        target_dates: 目标日期（datetime64[D]，升序）
+        dates: 源序列日期（数据所属日期，升序）
+        values: 源序列数值
+        publication_lag: 发布时滞（天），数据在 date + publication_lag 当天可得
+        tolerance: 最长沿用天数（自发布日起），None表示不限
+
+    Returns:
+        与 target_dates 等长的数组，无可用值为NaN
+    """
+    result = np.full(len(target_dates), np.nan)
+    valid = np.isfinite(values)
+    if not valid.all():
+        dates, values = dates[valid], values[valid]
+    if len(dates) == 0:
+        return result
+
+    available = dates.astype('datetime64[D]') + np.timedelta64(int(publication_lag), 'D')
+    target_dates = np.asarray(target_dates, dtype='datetime64[D]')
+    position = np.searchsorted(available, target_dates, side='right') - 1
+
+    found = position >= 0
+    if tolerance is not None:
+        age = (target_dates - available[np.maximum(position, 0)]).astype(np.int64)
+        found &= age <= tolerance
+    result[found] = values[position[found]]
+    return result
+
+
+def forward_fill(values: np.ndarray, limit: Optional[int] = None) -> np.ndarray:
+    """按列向前填充缺失值，最多填充 limit 期（None表示不限）"""
+    one_dimensional = values.ndim == 1
+    if one_dimensional:
+        values = values[:, None]
+
+    valid = np.isfinite(values)
+    rows = np.arange(values.shape[0])[:, None]
+    last_valid = np.maximum.accumulate(np.where(valid, rows, -1), axis=0)
+    filled = np.take_along_axis(values, np.maximum(last_valid, 0), axis=0)
+    fillable = last_valid >= 0
+    if limit is not None:
+        fillable &= rows - last_valid <= limit
+    filled = np.where(fillable, filled, np.nan)
+
+    return filled[:, 0] if one_dimensional else filled
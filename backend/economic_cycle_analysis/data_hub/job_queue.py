@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+持久化采集任务队列
+批量回补拆分为 CollectionRun（作业）与 CollectionTask（指标 × 时间窗口）：
+1. 任务状态持久化在数据库中，进程退出后可用 --resume 继续，已成功的任务不会重做
+2. 多个工作进程（可在不同机器上）并发领取任务：支持时使用 SELECT ... FOR UPDATE SKIP LOCKED，
+   并以条件更新保证同一任务只被一个进程领取
+3. 执行中的任务超过租约时间未完成视为工作进程已退出，可被重新领取
+4. 失败的任务按指数退避推迟后重新排队，达到最大尝试次数后记为失败
+
+任务执行是幂等的：写库只写入新增或修订的数据点，重复执行同一任务不会产生重复数据
+"""
+
+import logging
+import os
+import socket
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .frequency import date_windows
+from .models import CollectionRun, CollectionTask, Indicator
+
+logger = logging.getLogger(__name__)
+
+# 执行中任务的租约时间（秒），超时视为工作进程已退出
+LEASE_SECONDS = 30 * 60
+
+# 单个任务的最大尝试次数
+MAX_ATTEMPTS = 4
+
+# 失败重试的退避基数（秒），第n次失败后推迟 RETRY_BACKOFF * 2^(n-1)
+RETRY_BACKOFF = 2
+
+# 单次批量创建任务的数量
+CREATE_BATCH_SIZE = 1000
+
+
+def default_worker_name() -> str:
+    """工作进程标识: 主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _as_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def create_run(indicators: Iterable[Indicator],
+               window_start,
+               window_end,
+               name: str = '',
+               params: Dict = None,
+               chunk: str = None,
+               chunkable: Callable[[Indicator], bool] = None) -> CollectionRun:
+    """
+    创建采集作业及其任务（按传入顺序确定执行顺序）
+
+    Args:
+        indicators: 要采集的指标
+        window_start: 作业开始日期
+        window_end: 作业结束日期
+        name: 作业名称
+        params: 作业参数（记录用）
+        chunk: 分段粒度 M/Q/Y，指定时每个指标按自然月/季/年拆分为多个任务，
+               各分段独立提交，作为回补的检查点
+        chunkable: 判断指标是否支持分段请求，默认全部支持
+    """
+    window_start, window_end = _as_date(window_start), _as_date(window_end)
+    full_window = [(window_start, window_end)]
+    chunks = date_windows(window_start, window_end, chunk) if chunk else full_window
+
+    def windows_for(indicator):
+        if chunkable is None or chunkable(indicator):
+            return chunks
+        return full_window
+
+    with transaction.atomic():
+        run = CollectionRun.objects.create(
+            name=name, window_start=window_start, window_end=window_end, params=params or {}
+        )
+        tasks = [
+            CollectionTask(
+                run=run, indicator=indicator, window_start=start, window_end=end,
+                priority=priority,
+            )
+            for priority, (indicator, (start, end)) in enumerate(
+                (indicator, window) for indicator in indicators for window in windows_for(indicator)
+            )
+        ]
+        CollectionTask.objects.bulk_create(tasks, batch_size=CREATE_BATCH_SIZE)
+
+    logger.info(f"创建采集作业 #{run.pk}: {len(tasks)} 个任务")
+    return run
+
+
+def get_resumable_run(run_id: int = None) -> Optional[CollectionRun]:
+    """获取要继续的作业：指定ID，或最近一个未完成的作业"""
+    if run_id is not None:
+        return CollectionRun.objects.filter(pk=run_id).first()
+    return CollectionRun.objects.filter(status=CollectionRun.Status.RUNNING).order_by('-created_at').first()
+
+
+def _claimable(run: CollectionRun, now: datetime):
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    return CollectionTask.objects.filter(run=run).filter(
+        Q(state=CollectionTask.State.PENDING, available_at__isnull=True)
+        | Q(state=CollectionTask.State.PENDING, available_at__lte=now)
+        | Q(state=CollectionTask.State.RUNNING, claimed_at__lt=stale)
+    )
+
+
+def claim_tasks(run: CollectionRun, worker: str, limit: int = 1) -> List[CollectionTask]:
+    """
+    领取可执行的任务（待执行且已到可执行时间，或租约已过期的执行中任务）
+
+    Returns:
+        List[CollectionTask]: 本进程领取到的任务，没有可执行任务时为空
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        queryset = _claimable(run, now).order_by('priority', 'id')
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        ids = list(queryset.values_list('id', flat=True)[:limit])
+        if not ids:
+            return []
+        # 条件更新：不支持 SKIP LOCKED 的数据库（如SQLite）依赖此条件避免重复领取
+        _claimable(run, now).filter(id__in=ids).update(
+            state=CollectionTask.State.RUNNING,
+            worker=worker,
+            claimed_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(
+        CollectionTask.objects.filter(id__in=ids, worker=worker, claimed_at=now)
+        .select_related('indicator').order_by('priority', 'id')
+    )
+
+
+def _owned(task: CollectionTask):
+    # 只更新仍由本进程持有的任务（租约过期后可能已被其他进程领取）
+    return CollectionTask.objects.filter(pk=task.pk, worker=task.worker, claimed_at=task.claimed_at)
+
+
+def complete_task(task: CollectionTask, records_count: int = 0) -> bool:
+    """标记任务成功"""
+    return bool(_owned(task).update(
+        state=CollectionTask.State.SUCCEEDED,
+        records_count=records_count,
+        last_error='',
+        finished_at=timezone.now(),
+    ))
+
+
+def fail_task(task: CollectionTask, error: str, max_attempts: int = MAX_ATTEMPTS) -> bool:
+    """
+    记录任务失败：未达最大尝试次数时按指数退避推迟后重新排队，否则标记为失败
+
+    Returns:
+        bool: 是否会重试
+    """
+    now = timezone.now()
+    if task.attempts < max_attempts:
+        delay = RETRY_BACKOFF * 2 ** (task.attempts - 1)
+        _owned(task).update(
+            state=CollectionTask.State.PENDING,
+            last_error=error[:2000],
+            available_at=now + timedelta(seconds=delay),
+        )
+        return True
+
+    _owned(task).update(
+        state=CollectionTask.State.FAILED,
+        last_error=error[:2000],
+        finished_at=now,
+    )
+    return False
+
+
+def defer_task(task: CollectionTask, seconds: float, reason: str = '') -> bool:
+    """推迟任务（如上游熔断），不计入尝试次数"""
+    return bool(_owned(task).update(
+        state=CollectionTask.State.PENDING,
+        attempts=F('attempts') - 1,
+        last_error=reason[:2000],
+        available_at=timezone.now() + timedelta(seconds=seconds),
+    ))
+
+
+def next_available_in(run: CollectionRun) -> Optional[float]:
+    """
+    距离下一个任务可领取还需等待的秒数
+
+    Returns:
+        没有未完成任务时为None，已有可领取任务时为0
+    """
+    now = timezone.now()
+    pending = CollectionTask.objects.filter(
+        run=run, state__in=[CollectionTask.State.PENDING, CollectionTask.State.RUNNING]
+    )
+    if not pending.exists():
+        return None
+    if _claimable(run, now).exists():
+        return 0.0
+
+    nearest = pending.aggregate(
+        available=Min('available_at', filter=Q(state=CollectionTask.State.PENDING)),
+        claimed=Min('claimed_at', filter=Q(state=CollectionTask.State.RUNNING)),
+    )
+    candidates = []
+    if nearest['available'] is not None:
+        candidates.append(nearest['available'])
+    if nearest['claimed'] is not None:
+        candidates.append(nearest['claimed'] + timedelta(seconds=LEASE_SECONDS))
+    return max(0.0, (min(candidates) - now).total_seconds())
+
+
+def run_progress(run: CollectionRun) -> Dict[str, int]:
+    """作业各状态任务数"""
+    counts = {state: 0 for state in CollectionTask.State.values}
+    for row in CollectionTask.objects.filter(run=run).values('state').annotate(n=Count('id')):
+        counts[row['state']] = row['n']
+    counts['total'] = sum(counts.values())
+    return counts
+
+
+def finalize_run(run: CollectionRun) -> CollectionRun:
+    """全部任务结束后更新作业状态"""
+    progress = run_progress(run)
+    if progress[CollectionTask.State.PENDING] or progress[CollectionTask.State.RUNNING]:
+        return run
+
+    status = CollectionRun.Status.FAILED if progress[CollectionTask.State.FAILED] else CollectionRun.Status.COMPLETED
+    updated = CollectionRun.objects.filter(pk=run.pk, status=CollectionRun.Status.RUNNING).update(
+        status=status, finished_at=timezone.now()
+    )
+    if updated:
+        logger.info(f"采集作业 #{run.pk} 结束: {progress}")
+    run.refresh_from_db()
+    return run
@@ -0,0 +1,313 @@
+# -*- coding: utf-8 -*-
+"""
+领先滞后分析
+在对齐矩阵上用FFT批量计算目标指标与全部候选指标在 -max_lag..+max_lag 期的互相关，
+缺失值通过掩码处理（每个滞后期按实际重叠样本计算Pearson相关），
+结果（最佳滞后期与相关系数）保存到 LeadLagResult 表，用于校验 Indicator.lead_lag_status
+
+滞后期约定：正值表示候选指标领先目标指标，即 corr(target[t], candidate[t - lag])
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.db import transaction
+from django.db.models.functions import Abs
+
+from .models import Indicator, LeadLagResult
+from .series_matrix import PERIODS_PER_YEAR, load_aligned_matrix
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FREQUENCIES = ('W', 'M', 'Q')
+TRANSFORMS = ('level', 'diff', 'yoy')
+
+DEFAULT_MAX_LAG = 24
+
+# 最佳滞后期在该范围（年）内视为同步
+SYNC_BAND_YEARS = 2 / 12
+
+# 最少重叠样本（年）
+MIN_OVERLAP_YEARS = 3
+
+
+@dataclass
+class LeadLagProfile:
+    """目标指标对全部候选指标的互相关结果"""
+    target: str
+    frequency: str
+    transform: str
+    lags: np.ndarray            # shape = (L,)
+    codes: List[str]            # 候选指标代码
+    correlations: np.ndarray    # shape = (L, N)，重叠样本不足为NaN
+    overlaps: np.ndarray        # shape = (L, N)
+
+    def best(self) -> Dict[str, Dict]:
+        """各候选指标的最佳滞后期（按绝对相关系数）"""
+        results = {}
+        valid = np.isfinite(self.correlations)
+        has_valid = valid.any(axis=0)
+        best_rows = np.nanargmax(np.where(valid, np.abs(self.correlations), -1.0), axis=0)
+        zero_row = int(np.flatnonzero(self.lags == 0)[0])
+        sync_band = max(1, int(round(SYNC_BAND_YEARS * PERIODS_PER_YEAR[self.frequency])))
+
+        for j, code in enumerate(self.codes):
+            if not has_valid[j]:
+                continue
+            row = best_rows[j]
+            lag = int(self.lags[row])
+            if lag >= sync_band:
+                status = Indicator.LeadLag.LEADING
+            elif lag <= -sync_band:
+                status = Indicator.LeadLag.LAGGING
+            else:
+                status = Indicator.LeadLag.SYNCHRONOUS
+            sync = self.correlations[zero_row, j]
+            results[code] = {
+                'best_lag': lag,
+                'correlation': float(self.correlations[row, j]),
+                'sync_correlation': float(sync) if np.isfinite(sync) else None,
+                'overlap': int(self.overlaps[row, j]),
+                'estimated_status': status,
+                'profile': [None if not np.isfinite(r) else round(float(r), 4) for r in self.correlations[:, j]],
+            }
+        return results
+
+
+@dataclass
+class LeadLagRunResult:
+    """领先滞后分析运行结果"""
+    targets: List[str] = field(default_factory=list)
+    candidates_evaluated: int = 0
+    results_saved: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def transform_matrix(values: np.ndarray, transform: str, frequency: str) -> np.ndarray:
+    """序列变换（缺失值在差分后保持NaN）"""
+    if transform == 'level':
+        return values
+    step = 1 if transform == 'diff' else PERIODS_PER_YEAR[frequency]
+    result = np.full(values.shape, np.nan)
+    result[step:] = values[step:] - values[:-step]
+    return result
+
+
+def masked_cross_correlation(target: np.ndarray,
+                             candidates: np.ndarray,
+                             max_lag: int,
+                             min_overlap: int):
+    """
+    掩码FFT互相关
+
+    对每个滞后期分别统计重叠样本的 n、Σx、Σy、Σx²、Σy²、Σxy，
+    每一项都是两个（掩码后）序列的互相关，可以用一次FFT批量求出
+
+    Args:
+        target: 目标序列，shape = (T,)
+        candidates: 候选矩阵，shape = (T, N)
+        max_lag: 最大滞后期
+        min_overlap: 最少重叠样本数
+
+    Returns:
+        (lags, correlations (L, N), overlaps (L, N))
+    """
+    n_periods = len(target)
+    lags = np.arange(-max_lag, max_lag + 1)
+
+    # 标准化以减少大数相消带来的数值误差
+    def standardize(a):
+        mean = np.nanmean(a, axis=0)
+        std = np.nanstd(a, axis=0)
+        std = np.where(std > 0, std, 1.0)
+        return (a - mean) / std
+
+    x = standardize(target[:, None])
+    y = standardize(candidates)
+    mx = np.isfinite(x).astype(np.float64)
+    my = np.isfinite(y).astype(np.float64)
+    x = np.where(mx > 0, x, 0.0)
+    y = np.where(my > 0, y, 0.0)
+
+    nfft = 1 << int(np.ceil(np.log2(n_periods + max_lag + 1)))
+
+    def spectrum(a):
+        return np.fft.rfft(a, n=nfft, axis=0)
+
+    def correlate(fa, fb):
+        # c[lag] = Σ_t a[t] b[t - lag]
+        full = np.fft.irfft(fa * np.conj(fb), n=nfft, axis=0)
+        return full[lags % nfft]
+
+    fmx, fx, fxx = spectrum(mx), spectrum(x), spectrum(x * x)
+    fmy, fy, fyy = spectrum(my), spectrum(y), spectrum(y * y)
+
+    n = np.rint(correlate(fmx, fmy))
+    sx = correlate(fx, fmy)
+    sy = correlate(fmx, fy)
+    sxx = correlate(fxx, fmy)
+    syy = correlate(fmx, fyy)
+    sxy = correlate(fx, fy)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        correlations = cov / np.sqrt(var)
+
+    correlations[(n < min_overlap) | ~(var > 1e-9 * np.maximum(n, 1) ** 4)] = np.nan
+    return lags, np.clip(correlations, -1.0, 1.0), n.astype(np.int64)
+
+
+def compute_lead_lag(target_code: str,
+                     candidate_codes: Iterable[str] = None,
+                     frequency: str = 'M',
+                     transform: str = 'level',
+                     max_lag: int = DEFAULT_MAX_LAG,
+                     start_date=None,
+                     end_date=None) -> LeadLagProfile:
+    """
+    计算目标指标与候选指标的互相关
+
+    Args:
+        target_code: 目标指标代码（如 CN_PMI_MFG、CN_GDP_YEARLY）
+        candidate_codes: 候选指标代码，None表示所有启用指标
+        frequency: 统一分析频率，不同频率的指标按期取均值对齐
+        transform: 序列变换 level/diff/yoy
+        max_lag: 最大滞后期（期数）
+    """
+    if frequency not in SUPPORTED_FREQUENCIES:
+        raise ValueError(f"领先滞后分析不支持频率: {frequency}")
+    if transform not in TRANSFORMS:
+        raise ValueError(f"不支持的序列变换: {transform}")
+    if max_lag < 1:
+        raise ValueError("max_lag 必须为正整数")
+
+    if candidate_codes is None:
+        candidate_codes = Indicator.objects.filter(is_active=True).values_list('code', flat=True)
+    codes = [target_code] + [code for code in candidate_codes if code != target_code]
+
+    matrix = load_aligned_matrix(codes, frequency, start_date, end_date, how='mean')
+    if target_code not in matrix.codes:
+        raise ValueError(f"目标指标无数据: {target_code}")
+
+    values = transform_matrix(matrix.values, transform, frequency)
+    target_column = matrix.codes.index(target_code)
+    candidate_columns = [j for j in range(len(matrix.codes)) if j != target_column]
+
+    min_overlap = max(8, int(MIN_OVERLAP_YEARS * PERIODS_PER_YEAR[frequency]))
+    lags, correlations, overlaps = masked_cross_correlation(
+        values[:, target_column], values[:, candidate_columns], max_lag, min_overlap
+    )
+    return LeadLagProfile(
+        target=target_code,
+        frequency=frequency,
+        transform=transform,
+        lags=lags,
+        codes=[matrix.codes[j] for j in candidate_columns],
+        correlations=correlations,
+        overlaps=overlaps,
+    )
+
+
+def save_lead_lag(profile: LeadLagProfile, batch_size: int = 1000) -> int:
+    """保存各候选指标的最佳滞后期（按 目标+候选+频率+变换 覆盖写入）"""
+    best = profile.best()
+    ids = dict(
+        Indicator.objects.filter(code__in=[profile.target, *best.keys()]).values_list('code', 'id')
+    )
+    target_id = ids[profile.target]
+    rows = [
+        LeadLagResult(
+            target_id=target_id,
+            indicator_id=ids[code],
+            frequency=profile.frequency,
+            transform=profile.transform,
+            **values,
+        )
+        for code, values in best.items()
+    ]
+
+    with transaction.atomic():
+        # 数据不足、本次未产生结果的旧记录一并清除
+        LeadLagResult.objects.filter(
+            target_id=target_id, frequency=profile.frequency, transform=profile.transform
+        ).exclude(indicator_id__in=[row.indicator_id for row in rows]).delete()
+
+        LeadLagResult.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['target', 'indicator', 'frequency', 'transform'],
+            update_fields=[
+                'best_lag', 'correlation', 'sync_correlation', 'overlap',
+                'estimated_status', 'profile', 'computed_at',
+            ],
+        )
+    return len(rows)
+
+
+def run_lead_lag_analysis(target_codes: Iterable[str],
+                          candidate_codes: Iterable[str] = None,
+                          frequency: str = 'M',
+                          transform: str = 'level',
+                          max_lag: int = DEFAULT_MAX_LAG) -> LeadLagRunResult:
+    """对多个目标指标执行领先滞后分析并保存结果"""
+    started = time.time()
+    result = LeadLagRunResult()
+    candidate_codes = list(candidate_codes) if candidate_codes is not None else None
+
+    for target_code in target_codes:
+        try:
+            profile = compute_lead_lag(target_code, candidate_codes, frequency, transform, max_lag)
+            result.results_saved += save_lead_lag(profile)
+            result.candidates_evaluated += len(profile.codes)
+            result.targets.append(target_code)
+        except Exception as e:
+            logger.error(f"领先滞后分析失败 {target_code}: {e}")
+            result.errors.append({'target': target_code, 'error': str(e)})
+
+    result.execution_time = time.time() - started
+    logger.info(
+        f"领先滞后分析完成: 目标 {len(result.targets)} 个, 候选 {result.candidates_evaluated} 个, "
+        f"保存 {result.results_saved} 条, 耗时 {result.execution_time:.2f}秒"
+    )
+    return result
+
+
+def lead_lag_ranking(target_code: str,
+                     frequency: str = 'M',
+                     transform: str = 'level',
+                     status: Optional[str] = None,
+                     limit: int = 50) -> List[Dict]:
+    """
+    读取已保存的领先滞后结果，按绝对相关系数排序
+
+    Args:
+        status: 仅返回测算属性为 LEAD/SYNC/LAG 的候选指标
+    """
+    queryset = LeadLagResult.objects.filter(
+        target__code=target_code, frequency=frequency, transform=transform
+    ).select_related('indicator')
+    if status:
+        queryset = queryset.filter(estimated_status=status)
+
+    rows = queryset.order_by(Abs('correlation').desc())[:limit]
+    return [
+        {
+            'indicator_code': row.indicator.code,
+            'indicator_name': row.indicator.name,
+            'best_lag': row.best_lag,
+            'correlation': row.correlation,
+            'sync_correlation': row.sync_correlation,
+            'overlap': row.overlap,
+            'estimated_status': row.estimated_status,
+            'declared_status': row.indicator.lead_lag_status,
+            'status_consistent': row.estimated_status == row.indicator.lead_lag_status,
+            'computed_at': row.computed_at,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 领先滞后分析
+运行命令: python manage.py analyze_lead_lag --targets CN_PMI_MFG,CN_GDP_YEARLY
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.lead_lag import DEFAULT_MAX_LAG, SUPPORTED_FREQUENCIES, TRANSFORMS, run_lead_lag_analysis
+
+
+class Command(BaseCommand):
+    help = '计算目标指标与全部候选指标的互相关，保存最佳滞后期并校验领先滞后属性'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--targets',
+            type=str,
+            default='CN_PMI_MFG,CN_GDP_YEARLY',
+            help='目标指标代码，用逗号分隔 (默认: CN_PMI_MFG,CN_GDP_YEARLY)'
+        )
+        parser.add_argument(
+            '--indicators',
+            type=str,
+            help='候选指标代码列表，用逗号分隔，不指定则使用所有启用指标'
+        )
+        parser.add_argument(
+            '--frequency',
+            type=str,
+            default='M',
+            choices=SUPPORTED_FREQUENCIES,
+            help='统一分析频率 (默认: M)'
+        )
+        parser.add_argument(
+            '--transform',
+            type=str,
+            default='level',
+            choices=TRANSFORMS,
+            help='序列变换 (默认: level)'
+        )
+        parser.add_argument(
+            '--max-lag',
+            type=int,
+            default=DEFAULT_MAX_LAG,
+            help=f'最大滞后期数 (默认: {DEFAULT_MAX_LAG})'
+        )
+
+    def handle(self, *args, **options):
+        targets = [code.strip() for code in options['targets'].split(',') if code.strip()]
+        candidates = None
+        if options['indicators']:
+            candidates = [code.strip() for code in options['indicators'].split(',') if code.strip()]
+
+        self.stdout.write(f'开始领先滞后分析: {", ".join(targets)}')
+        result = run_lead_lag_analysis(
+            targets,
+            candidate_codes=candidates,
+            frequency=options['frequency'],
+            transform=options['transform'],
+            max_lag=options['max_lag'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'领先滞后分析完成! 目标: {len(result.targets)}, 候选: {result.candidates_evaluated}, '
+            f'保存: {result.results_saved}, 耗时: {result.execution_time:.2f}秒'
+        ))
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"  - {error['target']}: {error['error']}"))
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 异步并发采集指标数据
+运行命令: python manage.py async_collect --phases 1 --max-in-flight 128
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.async_collection import (
+    MAX_IN_FLIGHT, SOURCE_RATE_LIMITS, TASK_TIMEOUT, AsyncCollectionRuntime,
+)
+from data_hub.models import Indicator
+
+
+class Command(BaseCommand):
+    help = '在单个进程内异步并发采集指标数据（阻塞的SDK调用由线程池执行）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indicators',
+            nargs='+',
+            type=str,
+            help='指定要采集的指标代码，不指定则采集全部启用的指标'
+        )
+        parser.add_argument(
+            '--phases',
+            nargs='+',
+            type=int,
+            choices=[1, 2, 3],
+            help='指定要采集的实施阶段，如 --phases 1 2'
+        )
+        parser.add_argument('--start-date', type=str, help='开始日期，格式：YYYY-MM-DD')
+        parser.add_argument('--end-date', type=str, help='结束日期，格式：YYYY-MM-DD')
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=MAX_IN_FLIGHT,
+            help=f'同时进行的抓取任务上限 (默认: {MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--akshare-rate',
+            type=float,
+            default=SOURCE_RATE_LIMITS['akshare'],
+            help=f"AkShare每秒请求数上限 (默认: {SOURCE_RATE_LIMITS['akshare']})"
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=TASK_TIMEOUT,
+            help=f'单个抓取任务的截止时间，秒 (默认: {TASK_TIMEOUT})'
+        )
+        parser.add_argument(
+            '--wind',
+            action='store_true',
+            help='无AkShare映射的指标使用Wind采集'
+        )
+        parser.add_argument(
+            '--verbose-events',
+            action='store_true',
+            help='输出每个指标的进度事件'
+        )
+
+    def handle(self, *args, **options):
+        if options['indicators']:
+            codes = options['indicators']
+        else:
+            queryset = Indicator.objects.filter(is_active=True)
+            if options['phases']:
+                queryset = queryset.filter(implementation_phase__in=options['phases'])
+            codes = list(queryset.order_by('implementation_phase', '-importance_level').values_list('code', flat=True))
+
+        wind_collector = None
+        if options['wind']:
+            from data_hub.wind_data_collector import WindDataCollector
+            wind_collector = WindDataCollector()
+
+        verbose = options['verbose_events']
+
+        def on_event(event):
+            if event.kind in ('failed', 'timeout'):
+                self.stdout.write(self.style.WARNING(f'  ✗ {event.indicator_code}: {event.message}'))
+            elif verbose:
+                self.stdout.write(f'  [{event.kind}] {event.indicator_code} {event.source} {event.message}'.rstrip())
+
+        runtime = AsyncCollectionRuntime(
+            wind_collector=wind_collector,
+            max_in_flight=options['max_in_flight'],
+            rate_limits={'akshare': options['akshare_rate'] or None},
+            task_timeout=options['timeout'],
+            on_event=on_event,
+        )
+
+        self.stdout.write(f'开始异步采集 {len(codes)} 个指标...')
+        try:
+            result = runtime.run(codes, options['start_date'], options['end_date'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.WARNING('用户中断采集过程，已抓取的数据已写入'))
+            return
+
+        self.stdout.write(self.style.SUCCESS(
+            f'异步采集完成! 成功: {result.successful_indicators} (未变化: {result.unchanged_indicators}), '
+            f'失败: {result.failed_indicators}, '
+            f'跳过: {result.skipped_indicators}, 超时: {result.timed_out_indicators}, '
+            f'上游请求: {result.fetch_requests}, 数据点: {result.total_data_points}, '
+            f'耗时: {result.execution_time:.2f}秒'
+        ))
@@ -6,27 +6,24 @@ Django管理命令: 批量采集近10年指标数据
 
 import time
 import logging
-import traceback
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Set
 
 from django.core.management.base import BaseCommand
-from django.db import transaction, connection
+from django.db import connection
 from django.utils import timezone
 
-from data_hub.models import Indicator, IndicatorData, DataQualityReport
+from data_hub.models import Indicator, IndicatorData
 from data_hub.enhanced_data_collector_methods import EnhancedDataCollectorMethods
-from data_hub.indicators_config import get_all_indicators
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('data_collection.log'),
-        logging.StreamHandler()
-    ]
+from data_hub.quality_engine import generate_quality_reports
+from data_hub.anomaly_detection import run_anomaly_detection
+from data_hub.circuit_breaker import get_circuit_breakers
+from data_hub.frequency import CHUNK_FREQUENCIES
+from data_hub.job_queue import (
+    claim_tasks, complete_task, create_run, default_worker_name, defer_task, fail_task,
+    finalize_run, get_resumable_run, next_available_in, run_progress,
 )
+
 logger = logging.getLogger(__name__)
 
 
@@ -35,59 +32,95 @@ class BatchDataCollector:
     
     def __init__(self):
         self.collector = EnhancedDataCollectorMethods()
-        self.success_count = 0
-        self.error_count = 0
+        # 按指标统计（分段回补时一个指标对应多个任务）
+        self.succeeded_codes: Set[str] = set()
+        self.failed_codes: Set[str] = set()
+        self.unchanged_codes: Set[str] = set()  # 数据未变化、跳过写库的指标
+        self.collected_codes: Set[str] = set()  # 有数据写入的指标
         self.skip_count = 0
         self.total_records = 0
         self.errors: List[Dict] = []
         self.start_time = None
-        self.progress_interval = 10  # 每10个指标显示一次进度
+        self.progress_interval = 10  # 每10个任务显示一次进度
+        self.run = None
+        self.worker = None
+    
+    @property
+    def success_count(self) -> int:
+        """采集成功的指标数（任一分段最终失败的指标计为失败）"""
+        return len(self.succeeded_codes - self.failed_codes)
+    
+    @property
+    def error_count(self) -> int:
+        return len(self.failed_codes)
+    
+    @property
+    def unchanged_count(self) -> int:
+        return len(self.unchanged_codes - self.collected_codes - self.failed_codes)
         
     def collect_all_10_years_data(self, 
                                   phases: List[int] = None, 
                                   force_update: bool = False,
                                   max_retries: int = 3,
-                                  delay_between_calls: float = 1.0):
+                                  delay_between_calls: float = 1.0,
+                                  resume: Optional[str] = None,
+                                  worker: str = None,
+                                  chunk: str = None):
         """
         采集所有指标近10年数据
         
+        作业与任务状态持久化在数据库中，多个进程可同时执行同一作业，中断后可继续
+        
         Args:
             phases: 要采集的阶段，如[1, 2, 3]，None表示所有阶段
             force_update: 是否强制更新已有数据
             max_retries: 最大重试次数
             delay_between_calls: API调用间隔（秒）
+            resume: 继续已有作业：作业ID，或 'latest' 表示最近一个未完成的作业
+            worker: 工作进程标识，默认 主机名:进程号
+            chunk: 分段粒度 M/Q/Y，支持日期区间请求的指标按分段拆分任务，逐段提交
         """
         self.start_time = datetime.now()
+        self.worker = worker or default_worker_name()
+        
+        if resume is not None:
+            run = get_resumable_run(None if resume == 'latest' else int(resume))
+            if run is None:
+                logger.info("没有可继续的采集作业")
+                return
+            logger.info(f"继续采集作业 #{run.pk}: {run_progress(run)}")
+        else:
+            # 计算时间范围（近10年）
+            end_date = datetime.now().strftime('%Y-%m-%d')
+            start_date = (datetime.now() - timedelta(days=365*10)).strftime('%Y-%m-%d')
+            
+            # 获取要采集的指标
+            indicators = self._get_indicators_to_collect(phases, force_update)
+            if not indicators:
+                logger.info("没有需要采集的指标")
+                return
+            
+            run = create_run(
+                indicators, start_date, end_date,
+                name='近10年数据回补',
+                params={'phases': phases, 'force_update': force_update, 'chunk': chunk},
+                chunk=chunk,
+                chunkable=lambda indicator: self.collector.supports_date_range(indicator.code),
+            )
+            logger.info(f"共需采集 {len(indicators)} 个指标，作业 #{run.pk}")
         
-        # 计算时间范围（近10年）
-        end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=365*10)).strftime('%Y-%m-%d')
+        self.run = run
+        start_date, end_date = run.window_start.isoformat(), run.window_end.isoformat()
+        logger.info(f"开始批量采集 ({start_date} 到 {end_date})，工作进程: {self.worker}")
+        logger.info(f"最大重试: {max_retries}, 调用间隔: {delay_between_calls}秒")
         
-        logger.info(f"开始批量采集近10年数据 ({start_date} 到 {end_date})")
-        logger.info(f"强制更新: {force_update}, 最大重试: {max_retries}, 调用间隔: {delay_between_calls}秒")
+        self._work_run(run, max_retries + 1, delay_between_calls)
         
-        # 获取要采集的指标
-        indicators = self._get_indicators_to_collect(phases, force_update)
-        total_indicators = len(indicators)
+        # 异常检测与数据质量报告
+        self._detect_anomalies()
+        self._generate_quality_reports()
         
-        if total_indicators == 0:
-            logger.info("没有需要采集的指标")
-            return
-            
-        logger.info(f"共需采集 {total_indicators} 个指标")
-        
-        # 按阶段分组处理
-        phase_groups = self._group_indicators_by_phase(indicators)
-        
-        for phase, phase_indicators in phase_groups.items():
-            logger.info(f"\n=== 开始处理第 {phase} 阶段指标 ({len(phase_indicators)} 个) ===")
-            self._collect_phase_data(
-                phase_indicators, 
-                start_date, 
-                end_date, 
-                max_retries, 
-                delay_between_calls
-            )
+        finalize_run(run)
         
         # 生成采集报告
         self._generate_collection_report(start_date, end_date)
@@ -110,170 +143,137 @@ class BatchDataCollector:
             
         return list(queryset.order_by('implementation_phase', '-importance_level'))
     
-    def _group_indicators_by_phase(self, indicators: List[Indicator]) -> Dict[int, List[Indicator]]:
-        """按实施阶段分组指标"""
-        phase_groups = {}
-        for indicator in indicators:
-            phase = indicator.implementation_phase
-            if phase not in phase_groups:
-                phase_groups[phase] = []
-            phase_groups[phase].append(indicator)
-        return phase_groups
-    
-    def _collect_phase_data(self, 
-                           indicators: List[Indicator],
-                           start_date: str,
-                           end_date: str,
-                           max_retries: int,
-                           delay_between_calls: float):
-        """采集单个阶段的数据"""
-        phase_start_time = datetime.now()
-        
-        for i, indicator in enumerate(indicators, 1):
-            try:
-                logger.info(f"[{i}/{len(indicators)}] 处理指标: {indicator.name} ({indicator.code})")
-                
-                # 采集数据（带重试机制）
-                success = self._collect_with_retry(
-                    indicator, start_date, end_date, max_retries
-                )
-                
-                if success:
-                    self.success_count += 1
-                    logger.info(f"✓ 成功采集 {indicator.code}")
-                else:
-                    self.error_count += 1
-                    logger.error(f"✗ 采集失败 {indicator.code}")
+    def _work_run(self, run, max_attempts: int, delay_between_calls: float):
+        """领取并执行作业中的任务，直到没有未完成的任务"""
+        processed = 0
+        work_start_time = datetime.now()
+        
+        while True:
+            tasks = claim_tasks(run, self.worker)
+            if not tasks:
+                wait = next_available_in(run)
+                if wait is None:
+                    break
+                # 剩余任务被推迟（重试退避、上游熔断）或由其他进程执行中
+                logger.info(f"暂无可领取的任务，{min(max(wait, 1), 60):.0f} 秒后重试")
+                time.sleep(min(max(wait, 1), 60))
+                continue
+            
+            for task in tasks:
+                requested = self._execute_task(task, max_attempts)
+                processed += 1
                 
                 # 显示进度
-                if i % self.progress_interval == 0:
-                    self._show_progress(i, len(indicators), phase_start_time)
+                if processed % self.progress_interval == 0:
+                    self._show_progress(processed, work_start_time)
                 
                 # API调用间隔
-                if delay_between_calls > 0:
+                if requested and delay_between_calls > 0:
                     time.sleep(delay_between_calls)
-                    
-            except Exception as e:
-                self.error_count += 1
-                error_info = {
-                    'indicator_code': indicator.code,
-                    'indicator_name': indicator.name,
-                    'error': str(e),
-                    'traceback': traceback.format_exc(),
-                    'timestamp': datetime.now().isoformat()
-                }
-                self.errors.append(error_info)
-                logger.error(f"处理指标 {indicator.code} 时发生异常: {e}")
-    
-    def _collect_with_retry(self, 
-                           indicator: Indicator, 
-                           start_date: str, 
-                           end_date: str, 
-                           max_retries: int) -> bool:
-        """带重试机制的数据采集"""
-        for attempt in range(max_retries + 1):
-            try:
-                if attempt > 0:
-                    wait_time = 2 ** attempt  # 指数退避
-                    logger.info(f"重试 {attempt}/{max_retries} - 等待 {wait_time} 秒...")
-                    time.sleep(wait_time)
-                
-                result = self.collector.collect_indicator_data(
-                    indicator.code, start_date, end_date
-                )
-                success = result.success
-                
-                if success:
-                    # 更新指标的最后更新时间
-                    indicator.last_update_date = timezone.now().date()
-                    indicator.save(update_fields=['last_update_date'])
-                    
-                    # 生成数据质量报告
-                    self._generate_quality_report(indicator)
-                    return True
-                    
-            except Exception as e:
-                logger.warning(f"第 {attempt + 1} 次尝试失败: {e}")
-                if attempt == max_retries:
-                    error_info = {
-                        'indicator_code': indicator.code,
-                        'indicator_name': indicator.name,
-                        'error': str(e),
-                        'attempts': attempt + 1,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                    self.errors.append(error_info)
-        
-        return False
     
-    def _generate_quality_report(self, indicator: Indicator):
-        """为指标生成数据质量报告"""
+    def _execute_task(self, task, max_attempts: int) -> bool:
+        """
+        执行单个任务（幂等：写库只写入新增或修订的数据点）
+        
+        Returns:
+            bool: 是否实际发起了上游请求
+        """
+        indicator = task.indicator
+        logger.info(f"[任务 #{task.pk} 第 {task.attempts} 次] 处理指标: {indicator.name} ({indicator.code})")
+        
+        # 上游函数熔断：不发起请求，推迟到冷却结束后
+        retry_after = self.collector.circuit_retry_after(indicator.code)
+        if retry_after > 0:
+            defer_task(task, retry_after, '上游函数熔断中')
+            logger.warning(f"⏸ 上游熔断，推迟 {retry_after:.0f} 秒采集 {indicator.code}")
+            return False
+        
         try:
-            # 获取指标最近的数据
-            recent_data = IndicatorData.objects.filter(
-                indicator=indicator
-            ).order_by('-date')[:100]
-            
-            if not recent_data.exists():
-                return
-            
-            # 计算质量指标
-            total_count = recent_data.count()
-            non_null_count = recent_data.exclude(value__isnull=True).count()
-            completeness_score = non_null_count / total_count if total_count > 0 else 0
-            
-            # 计算及时性（基于最新数据的时间差）
-            latest_data = recent_data.first()
-            days_since_update = (datetime.now().date() - latest_data.date).days if latest_data else 365
-            timeliness_score = max(0, 1 - days_since_update / 30)  # 30天内为满分
-            
-            # 计算准确性和一致性（简化版本）
-            accuracy_score = 0.8  # 假设准确性为80%
-            consistency_score = 0.85  # 假设一致性为85%
-            
-            # 确定总体质量等级
-            overall_score = (completeness_score + timeliness_score + accuracy_score + consistency_score) / 4
-            if overall_score >= 0.9:
-                quality_level = DataQualityReport.QualityLevel.EXCELLENT
-            elif overall_score >= 0.75:
-                quality_level = DataQualityReport.QualityLevel.GOOD
-            elif overall_score >= 0.6:
-                quality_level = DataQualityReport.QualityLevel.FAIR
-            else:
-                quality_level = DataQualityReport.QualityLevel.POOR
-            
-            # 创建或更新质量报告
-            report, created = DataQualityReport.objects.update_or_create(
-                indicator=indicator,
-                report_date=datetime.now().date(),
-                defaults={
-                    'completeness_score': completeness_score,
-                    'timeliness_score': timeliness_score,
-                    'accuracy_score': accuracy_score,
-                    'consistency_score': consistency_score,
-                    'overall_quality': quality_level,
-                    'issues_found': [],
-                    'recommendations': '数据质量良好' if overall_score >= 0.75 else '需要关注数据质量'
-                }
+            result = self.collector.collect_indicator_data(
+                indicator.code, task.window_start.isoformat(), task.window_end.isoformat()
             )
+        except Exception as e:
+            result = None
+            error = str(e)
+            logger.warning(f"采集 {indicator.code} 时发生异常: {e}")
+        else:
+            error = result.error_message
+        
+        if result is not None and result.circuit_open:
+            retry_after = self.collector.circuit_retry_after(indicator.code)
+            defer_task(task, retry_after, result.error_message)
+            logger.warning(f"⏸ 上游熔断，推迟 {retry_after:.0f} 秒采集 {indicator.code}")
+            return False
+        
+        if result is not None and result.success:
+            complete_task(task, result.records_count)
+            self.succeeded_codes.add(indicator.code)
+            self.total_records += result.records_count
             
-            # 更新指标的数据质量评分
-            indicator.data_quality_score = overall_score
-            indicator.save(update_fields=['data_quality_score'])
+            if result.unchanged:
+                # 数据与上次采集一致：无需更新时间、质量报告与异常检测
+                self.unchanged_codes.add(indicator.code)
+                logger.info(f"= 数据未变化 {indicator.code}")
+                return True
             
+            # 更新指标的最后更新时间
+            indicator.last_update_date = timezone.now().date()
+            indicator.save(update_fields=['last_update_date'])
+            
+            # 质量报告在全部采集完成后批量生成
+            self.collected_codes.add(indicator.code)
+            logger.info(f"✓ 成功采集 {indicator.code}")
+            return True
+        
+        if fail_task(task, error or '采集失败', max_attempts):
+            logger.warning(f"第 {task.attempts} 次尝试失败，稍后重试 {indicator.code}: {error}")
+            return True
+        
+        self.failed_codes.add(indicator.code)
+        self.errors.append({
+            'indicator_code': indicator.code,
+            'indicator_name': indicator.name,
+            'error': error,
+            'attempts': task.attempts,
+            'timestamp': datetime.now().isoformat()
+        })
+        logger.error(f"✗ 采集失败 {indicator.code}")
+        return True
+    
+    def _detect_anomalies(self):
+        """对本次采集成功的指标做增量异常检测"""
+        if not self.collected_codes:
+            return
+        
+        try:
+            run_anomaly_detection(indicator_codes=sorted(self.collected_codes))
         except Exception as e:
-            logger.warning(f"生成质量报告失败 {indicator.code}: {e}")
+            logger.warning(f"异常检测失败: {e}")
     
-    def _show_progress(self, current: int, total: int, start_time: datetime):
-        """显示采集进度"""
+    def _generate_quality_reports(self):
+        """为本次采集成功的指标批量生成数据质量报告"""
+        if not self.collected_codes:
+            return
+        
+        try:
+            generate_quality_reports(indicator_codes=sorted(self.collected_codes))
+        except Exception as e:
+            logger.warning(f"生成质量报告失败: {e}")
+    
+    def _show_progress(self, current: int, start_time: datetime):
+        """显示采集进度（作业整体进度，含其他工作进程完成的任务）"""
+        progress = run_progress(self.run)
+        total = progress['total']
+        done = progress['succeeded'] + progress['failed']
+        
         elapsed = datetime.now() - start_time
         rate = current / elapsed.total_seconds() if elapsed.total_seconds() > 0 else 0
-        eta = (total - current) / rate if rate > 0 else 0
+        eta = (total - done) / rate if rate > 0 else 0
         
-        progress_percent = (current / total) * 100
+        progress_percent = (done / total) * 100 if total else 100
         
-        logger.info(f"进度: {current}/{total} ({progress_percent:.1f}%) | "
-                   f"速度: {rate:.2f} 指标/秒 | "
+        logger.info(f"进度: {done}/{total} ({progress_percent:.1f}%) | "
+                   f"本进程速度: {rate:.2f} 任务/秒 | "
                    f"预计剩余: {eta/60:.1f} 分钟 | "
                    f"成功: {self.success_count}, 失败: {self.error_count}")
     
@@ -292,19 +292,24 @@ class BatchDataCollector:
             collection_time__gte=self.start_time
         ).count()
         
+        progress = run_progress(self.run)
+        
         report = f"""
 ================================
 数据采集完成报告
 ================================
+采集作业: #{self.run.pk} ({self.run.get_status_display()}), 工作进程: {self.worker}
+作业任务: 共 {progress['total']}, 成功 {progress['succeeded']}, 失败 {progress['failed']}, 未完成 {progress['pending'] + progress['running']}
 采集时间范围: {start_date} 到 {end_date}
 采集开始时间: {self.start_time.strftime('%Y-%m-%d %H:%M:%S')}
 采集结束时间: {end_time.strftime('%Y-%m-%d %H:%M:%S')}
 总耗时: {total_time}
 
-指标采集统计:
+本进程采集统计:
 - 总指标数: {total_indicators}
 - 成功采集: {self.success_count}
 - 采集失败: {self.error_count}
+- 数据未变化（跳过写库）: {self.unchanged_count}
 - 成功率: {success_rate:.1f}%
 
 数据点统计:
@@ -326,6 +331,14 @@ class BatchDataCollector:
             if len(self.errors) > 10:
                 report += f"... 还有 {len(self.errors) - 10} 个错误\n"
         
+        breakers = {
+            key: state for key, state in get_circuit_breakers().snapshot().items() if state['opened']
+        }
+        if breakers:
+            report += "\n熔断的上游函数:\n"
+            for key, state in breakers.items():
+                report += f"- {key}: {state['state']}, 失败 {state['failures']} 次, 跳过 {state['rejected']} 次\n"
+        
         report += "\n================================"
         
         logger.info(report)
@@ -378,8 +391,37 @@ class Command(BaseCommand):
             action='store_true',
             help='测试模式，只处理前5个指标'
         )
+        parser.add_argument(
+            '--resume',
+            nargs='?',
+            const='latest',
+            help='继续已有的采集作业（指定作业ID，不指定则为最近一个未完成的作业）；'
+                 '多台机器同时执行同一作业时各自使用 --resume <作业ID>'
+        )
+        parser.add_argument(
+            '--chunk',
+            type=str,
+            choices=CHUNK_FREQUENCIES,
+            help='按自然月(M)/季(Q)/年(Y)分段回补支持日期区间的指标，每段独立提交'
+        )
+        parser.add_argument(
+            '--worker-name',
+            type=str,
+            help='工作进程标识（默认 主机名:进程号）'
+        )
 
     def handle(self, *args, **options):
+        # 配置日志（导入采集模块时已配置过根日志，force 替换为文件与控制台输出）
+        logging.basicConfig(
+            level=logging.INFO,
+            format='%(asctime)s - %(levelname)s - %(message)s',
+            handlers=[
+                logging.FileHandler('data_collection.log'),
+                logging.StreamHandler()
+            ],
+            force=True
+        )
+        
         self.stdout.write(self.style.SUCCESS('开始批量数据采集...'))
         
         # 检查数据库连接
@@ -405,7 +447,10 @@ class Command(BaseCommand):
                 phases=options['phases'],
                 force_update=options['force'],
                 max_retries=options['max_retries'],
-                delay_between_calls=options['delay']
+                delay_between_calls=options['delay'],
+                resume=options['resume'],
+                worker=options['worker_name'],
+                chunk=options['chunk']
             )
             
             self.stdout.write(
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 基于录制夹具的采集性能基准（无需网络）
+录制: python manage.py benchmark_collection --fixtures fixtures/collection --record --phases 1 --wind
+回放: python manage.py benchmark_collection --fixtures fixtures/collection --runtime sequential async --latency 0.2
+
+回放会写入当前配置的数据库，请在测试或临时数据库上运行；
+每次运行前删除所选指标的数据点、版本记录与序列指纹，各次运行都完整清洗并写库，结果可相互比较
+（--keep-data 保留这些数据，用于测量数据未变化时的跳过路径）
+"""
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_hub.async_collection import MAX_IN_FLIGHT, SOURCE_RATE_LIMITS, AsyncCollectionRuntime
+from data_hub.circuit_breaker import get_circuit_breakers
+from data_hub.models import Indicator, IndicatorData, IndicatorDataVintage, SeriesFingerprint
+from data_hub.replay import ReplayProfile, replay_upstreams
+
+RUNTIMES = ('sequential', 'async')
+
+
+class Command(BaseCommand):
+    help = '录制上游响应为压缩夹具，或以可配置的延迟/错误率/限流回放夹具，测量端到端采集吞吐'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fixtures', type=str, required=True, help='夹具目录')
+        parser.add_argument('--record', action='store_true', help='录制模式：调用真实上游并保存夹具')
+        parser.add_argument('--indicators', nargs='+', type=str, help='指定指标代码')
+        parser.add_argument('--phases', nargs='+', type=int, choices=[1, 2, 3], help='指定实施阶段')
+        parser.add_argument('--start-date', type=str, help='开始日期，格式：YYYY-MM-DD')
+        parser.add_argument('--end-date', type=str, help='结束日期，格式：YYYY-MM-DD')
+        parser.add_argument('--wind', action='store_true', help='包含Wind指标（无AkShare映射时使用Wind）')
+        parser.add_argument(
+            '--runtime',
+            nargs='+',
+            choices=RUNTIMES,
+            default=list(RUNTIMES),
+            help='要测量的采集方式 (默认: 全部)'
+        )
+        parser.add_argument('--repeat', type=int, default=1, help='每种采集方式的运行次数 (默认: 1)')
+        parser.add_argument('--latency', type=float, default=0.0, help='回放时每次上游调用的延迟，秒')
+        parser.add_argument('--jitter', type=float, default=0.0, help='回放延迟的随机波动，秒')
+        parser.add_argument('--error-rate', type=float, default=0.0, help='回放时上游调用的随机失败概率')
+        parser.add_argument('--throttle', type=float, help='回放时上游每秒请求数上限，超出的调用被拒绝')
+        parser.add_argument('--seed', type=int, default=0, help='随机种子 (默认: 0)')
+        parser.add_argument(
+            '--max-in-flight',
+            type=int,
+            default=MAX_IN_FLIGHT,
+            help=f'异步采集同时进行的抓取任务上限 (默认: {MAX_IN_FLIGHT})'
+        )
+        parser.add_argument(
+            '--akshare-rate',
+            type=float,
+            default=SOURCE_RATE_LIMITS['akshare'],
+            help=f"异步采集AkShare每秒请求数上限，0表示不限速 (默认: {SOURCE_RATE_LIMITS['akshare']})"
+        )
+        parser.add_argument(
+            '--keep-data',
+            action='store_true',
+            help='运行之间保留已写入的数据与序列指纹（默认每次运行前删除，各次运行都走完整的写库路径）'
+        )
+        parser.add_argument('--output', type=str, help='将基准结果写入JSON文件')
+
+    def handle(self, *args, **options):
+        from data_hub.enhanced_data_collector import EnhancedDataCollector
+
+        profile = ReplayProfile(
+            latency=options['latency'],
+            jitter=options['jitter'],
+            error_rate=options['error_rate'],
+            throttle_rate=options['throttle'],
+            seed=options['seed'],
+        )
+
+        with replay_upstreams(options['fixtures'], profile, record=options['record']) as replay:
+            akshare_collector = EnhancedDataCollector()
+            wind_collector = replay.wind_collector() if options['wind'] and replay.wind_api else None
+            akshare_codes, wind_codes = self._select_indicators(replay, akshare_collector, wind_collector, options)
+            if not akshare_codes and not wind_codes:
+                raise CommandError('没有可采集的指标（回放模式下只包含已录制夹具的指标）')
+
+            self.stdout.write(
+                f"{'录制' if options['record'] else '回放'}: AkShare指标 {len(akshare_codes)} 个, "
+                f"Wind指标 {len(wind_codes)} 个"
+            )
+            if options['record']:
+                self._run_sequential(akshare_collector, wind_collector, akshare_codes, wind_codes, options)
+                self.stdout.write(self.style.SUCCESS(f"夹具已保存到 {options['fixtures']}"))
+                return
+
+            reports = []
+            for runtime in options['runtime']:
+                for run in range(1, options['repeat'] + 1):
+                    get_circuit_breakers().reset()
+                    if not options['keep_data']:
+                        self._reset_indicators(akshare_codes + wind_codes)
+                    before = replay.stats()
+                    if runtime == 'sequential':
+                        report = self._run_sequential(
+                            akshare_collector, wind_collector, akshare_codes, wind_codes, options
+                        )
+                    else:
+                        report = self._run_async(akshare_collector, wind_collector, akshare_codes + wind_codes, options)
+                    report.update(runtime=runtime, run=run, upstream=self._stats_delta(before, replay.stats()))
+                    reports.append(report)
+                    self._print_report(report)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as f:
+                json.dump(
+                    {'profile': profile.__dict__, 'keep_data': options['keep_data'], 'runs': reports},
+                    f, ensure_ascii=False, indent=2
+                )
+            self.stdout.write(f"基准结果已写入 {options['output']}")
+
+    def _select_indicators(self, replay, akshare_collector, wind_collector, options):
+        """选择指标：AkShare映射优先，其余有Wind映射的指标走Wind；回放时只保留已录制夹具的指标"""
+        if options['indicators']:
+            codes = options['indicators']
+        else:
+            queryset = Indicator.objects.filter(is_active=True)
+            if options['phases']:
+                queryset = queryset.filter(implementation_phase__in=options['phases'])
+            codes = list(queryset.order_by('implementation_phase', '-importance_level').values_list('code', flat=True))
+
+        akshare_codes, wind_codes = [], []
+        for code in codes:
+            config = akshare_collector.akshare_mappings.get(code)
+            if config is not None:
+                if options['record'] or replay.store.has_akshare(config['func'], config.get('params', {})):
+                    akshare_codes.append(code)
+                continue
+            if wind_collector is None or code not in wind_collector.wind_mappings:
+                continue
+            wind_config = wind_collector.wind_mappings[code]
+            request_type = wind_collector._request_type(wind_config)
+            if request_type is None:
+                continue
+            if options['record'] or replay.store.has_wind(*request_type, wind_config['wind_code']):
+                wind_codes.append(code)
+        return akshare_codes, wind_codes
+
+    def _reset_indicators(self, codes):
+        """删除所选指标已写入的数据点、版本记录与序列指纹"""
+        for model in (IndicatorData, IndicatorDataVintage, SeriesFingerprint):
+            model.objects.filter(indicator__code__in=codes).delete()
+
+    def _run_sequential(self, akshare_collector, wind_collector, akshare_codes, wind_codes, options):
+        """逐个指标同步采集（Wind指标按请求类型批量采集）"""
+        start_time = time.time()
+        successful = failed = data_points = 0
+
+        for code in akshare_codes:
+            result = akshare_collector.collect_indicator_data(code, options['start_date'], options['end_date'])
+            successful += result.success
+            failed += not result.success
+            data_points += result.records_count
+
+        if wind_codes:
+            results = wind_collector.collect_indicators_data(wind_codes, options['start_date'], options['end_date'])
+            for result in results.values():
+                successful += result.success
+                failed += not result.success
+                data_points += result.records_count
+
+        return self._report(len(akshare_codes) + len(wind_codes), successful, failed, data_points, start_time)
+
+    def _run_async(self, akshare_collector, wind_collector, codes, options):
+        """异步运行时采集"""
+        runtime = AsyncCollectionRuntime(
+            akshare_collector=akshare_collector,
+            wind_collector=wind_collector,
+            max_in_flight=options['max_in_flight'],
+            rate_limits={'akshare': options['akshare_rate'] or None},
+        )
+        start_time = time.time()
+        result = runtime.run(codes, options['start_date'], options['end_date'])
+        return self._report(
+            len(codes), result.successful_indicators,
+            result.failed_indicators + result.timed_out_indicators, result.total_data_points, start_time
+        )
+
+    def _report(self, total, successful, failed, data_points, start_time):
+        elapsed = time.time() - start_time
+        return {
+            'indicators': total,
+            'successful': int(successful),
+            'failed': int(failed),
+            'data_points': data_points,
+            'seconds': round(elapsed, 3),
+            'indicators_per_second': round(total / elapsed, 2) if elapsed > 0 else 0.0,
+        }
+
+    def _stats_delta(self, before, after):
+        return {
+            source: {key: value - before.get(source, {}).get(key, 0) for key, value in stats.items()}
+            for source, stats in after.items()
+        }
+
+    def _print_report(self, report):
+        upstream = ', '.join(
+            f"{source}: 调用 {int(stats['calls'])}, 失败 {int(stats['errors'])}, 限流 {int(stats['throttled'])}"
+            for source, stats in report['upstream'].items()
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"[{report['runtime']} #{report['run']}] 指标: {report['indicators']}, 成功: {report['successful']}, "
+            f"失败: {report['failed']}, 数据点: {report['data_points']}, 耗时: {report['seconds']:.2f}秒, "
+            f"吞吐: {report['indicators_per_second']:.2f} 指标/秒"
+        ))
+        if upstream:
+            self.stdout.write(f'  上游 - {upstream}')
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 计算复合指标与扩散指数
+运行命令: python manage.py calculate_composites
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.composite_engine import calculate_composites
+
+
+class Command(BaseCommand):
+    help = '按复合指标定义计算景气度指数、扩散指数等复合指标'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--composites',
+            type=str,
+            help='复合指标代码列表，用逗号分隔，不指定则计算所有自动更新的复合指标'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略增量判断，重新计算全部复合指标'
+        )
+
+    def handle(self, *args, **options):
+        composite_codes = None
+        if options['composites']:
+            composite_codes = [code.strip() for code in options['composites'].split(',') if code.strip()]
+
+        self.stdout.write('开始计算复合指标...')
+        result = calculate_composites(composite_codes=composite_codes, full=options['full'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'复合指标计算完成! 计算: {result.composites_evaluated}, 跳过: {result.composites_skipped}, '
+            f'新增: {result.points_created}, 更新: {result.points_updated}, 删除: {result.points_deleted}, '
+            f'耗时: {result.execution_time:.3f}秒'
+        ))
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"  - {', '.join(error['composites'])}: {error['error']}"))
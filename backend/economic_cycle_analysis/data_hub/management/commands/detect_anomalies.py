@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 指标数据异常检测
+运行命令: python manage.py detect_anomalies
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.anomaly_detection import run_anomaly_detection
+
+
+class Command(BaseCommand):
+    help = '对指标时间序列做异常检测并更新 is_anomaly 标记'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indicators',
+            type=str,
+            help='指标代码列表，用逗号分隔，不指定则检测所有启用指标'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略增量状态，对全部历史数据重新检测'
+        )
+
+    def handle(self, *args, **options):
+        indicator_codes = None
+        if options['indicators']:
+            indicator_codes = [code.strip() for code in options['indicators'].split(',') if code.strip()]
+
+        self.stdout.write('开始异常检测...')
+        result = run_anomaly_detection(indicator_codes=indicator_codes, full=options['full'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'异常检测完成! 评估指标: {result.indicators_evaluated}, '
+            f'数据点: {result.points_evaluated}, 异常: {result.anomalies_found}, '
+            f'标记变更: {result.flags_changed}, 耗时: {result.execution_time:.2f}秒'
+        ))
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"  - {error['error']}"))
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 指标拐点识别（Bry-Boschan）
+运行命令: python manage.py detect_turning_points
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.turning_points import SUPPORTED_FREQUENCIES, update_turning_points
+
+
+class Command(BaseCommand):
+    help = '识别指标时间序列的峰值与谷底并更新拐点表'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--indicators',
+            type=str,
+            help='指标代码列表，用逗号分隔，不指定则识别所有启用指标'
+        )
+        parser.add_argument(
+            '--frequency',
+            type=str,
+            default='M',
+            choices=SUPPORTED_FREQUENCIES,
+            help='对齐频率 (默认: M)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略增量状态，重新识别全部指标'
+        )
+
+    def handle(self, *args, **options):
+        indicator_codes = None
+        if options['indicators']:
+            indicator_codes = [code.strip() for code in options['indicators'].split(',') if code.strip()]
+
+        self.stdout.write('开始拐点识别...')
+        result = update_turning_points(
+            indicator_codes=indicator_codes,
+            frequency=options['frequency'],
+            full=options['full'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'拐点识别完成! 评估指标: {result.indicators_evaluated}, 跳过: {result.indicators_skipped}, '
+            f'拐点: {result.points_detected}, 新增: {result.created}, 更新: {result.updated}, '
+            f'删除: {result.deleted}, 耗时: {result.execution_time:.2f}秒'
+        ))
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"  - {error['error']}"))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 8维度因子提取
+运行命令: python manage.py extract_factors
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.factor_engine import EIGHT_DIMENSIONS, update_factors
+
+
+class Command(BaseCommand):
+    help = '对8个维度的指标提取主成分因子并保存因子得分序列'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dimensions',
+            type=str,
+            help=f'维度列表，用逗号分隔，可选: {",".join(EIGHT_DIMENSIONS)}，不指定则处理全部维度'
+        )
+        parser.add_argument(
+            '--factors',
+            type=int,
+            default=3,
+            help='每个维度提取的因子数量 (默认: 3)'
+        )
+        parser.add_argument(
+            '--frequency',
+            type=str,
+            default='M',
+            help='对齐频率 (默认: M)'
+        )
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='忽略已保存的模型，冷启动重新分解'
+        )
+
+    def handle(self, *args, **options):
+        dimensions = None
+        if options['dimensions']:
+            dimensions = [d.strip() for d in options['dimensions'].split(',') if d.strip()]
+
+        self.stdout.write('开始因子提取...')
+        result = update_factors(
+            dimensions=dimensions,
+            n_factors=options['factors'],
+            frequency=options['frequency'],
+            full=options['full'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'因子提取完成! 更新维度: {len(result.dimensions_updated)} (热启动 {result.warm_started}), '
+            f'跳过: {len(result.dimensions_skipped)}, 新增: {result.points_created}, '
+            f'更新: {result.points_updated}, 删除: {result.points_deleted}, 耗时: {result.execution_time:.2f}秒'
+        ))
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"  - {error['dimension']}: {error['error']}"))
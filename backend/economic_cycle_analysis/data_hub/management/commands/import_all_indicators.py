@@ -8,8 +8,7 @@ import json
 import os
 import re
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
-from data_hub.models import IndicatorCategory, Indicator
+from data_hub.catalogue_importer import import_catalogue
 from django.conf import settings
 from django.utils import timezone
 import logging
@@ -29,8 +28,8 @@ class Command(BaseCommand):
         parser.add_argument(
             '--batch-size',
             type=int,
-            default=50,
-            help='Batch size for processing'
+            default=500,
+            help='Chunk size for bulk_create / bulk_update'
         )
         parser.add_argument(
             '--dry-run',
@@ -114,45 +113,34 @@ class Command(BaseCommand):
             self.stdout.write(f'  - {dim}')
 
     def _import_indicators(self, indicators_data, batch_size):
-        """Import indicators in batches with progress tracking"""
+        """Diff against the existing catalogue and import in bulk"""
         total_indicators = len(indicators_data)
-        processed = 0
-        created = 0
-        updated = 0
-        errors = 0
-        
         self.stdout.write(f'\nStarting import of {total_indicators} indicators...')
-        
-        indicator_items = list(indicators_data.items())
-        
-        for i in range(0, len(indicator_items), batch_size):
-            batch = indicator_items[i:i + batch_size]
-            
-            try:
-                with transaction.atomic():
-                    batch_created, batch_updated, batch_errors = self._process_batch(batch)
-                    created += batch_created
-                    updated += batch_updated
-                    errors += batch_errors
-                    processed += len(batch)
-                
-                progress = (processed / total_indicators) * 100
-                self.stdout.write(
-                    f'Progress: {processed}/{total_indicators} ({progress:.1f}%) - '
-                    f'Created: {created}, Updated: {updated}, Errors: {errors}'
-                )
-                
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Batch error at indicators {i}-{i+len(batch)}: {str(e)}')
-                )
-                errors += len(batch)
-                processed += len(batch)
-        
+
+        rows = []
+        invalid = 0
+        for indicator_id, indicator_data in indicators_data.items():
+            row = self._build_indicator_row(indicator_id, indicator_data)
+            if row is None:
+                invalid += 1
+            else:
+                rows.append(row)
+
+        try:
+            stats = import_catalogue(rows, chunk_size=batch_size)
+        except Exception as e:
+            self.stdout.write(self.style.ERROR(f'Bulk import failed, transaction rolled back: {str(e)}'))
+            logger.error(f"Bulk import error: {str(e)}", exc_info=True)
+            return
+
+        errors = stats.errors + invalid
+
         self.stdout.write('\n=== IMPORT COMPLETE ===')
-        self.stdout.write(f'Total processed: {processed}')
-        self.stdout.write(f'Created: {created}')
-        self.stdout.write(f'Updated: {updated}')
+        self.stdout.write(f'Total processed: {stats.total + invalid}')
+        self.stdout.write(f'Categories created: {stats.categories_created}')
+        self.stdout.write(f'Created: {stats.created}')
+        self.stdout.write(f'Updated: {stats.updated}')
+        self.stdout.write(f'Unchanged: {stats.unchanged}')
         self.stdout.write(f'Errors: {errors}')
         
         if errors > 0:
@@ -164,31 +152,11 @@ class Command(BaseCommand):
                 self.style.SUCCESS('All indicators imported successfully!')
             )
 
-    def _process_batch(self, batch):
-        """Process a batch of indicators"""
-        created = 0
-        updated = 0
-        errors = 0
-        
-        for indicator_id, indicator_data in batch:
-            result = self._process_single_indicator(indicator_id, indicator_data)
-            if result == 'created':
-                created += 1
-            elif result == 'updated':
-                updated += 1
-            elif result == 'error':
-                errors += 1
-        
-        return created, updated, errors
-
-    def _process_single_indicator(self, indicator_id, indicator_data):
-        """Process a single indicator"""
+    def _build_indicator_row(self, indicator_id, indicator_data):
+        """Build the row for a single indicator, or None if it is invalid"""
         try:
-            category_name = indicator_data.get('category', '未分类')
-            category = self._get_category(category_name)
-
             indicator_defaults = self._map_data_to_model(indicator_data, indicator_id)
-            indicator_defaults['category'] = category
+            indicator_defaults['category'] = indicator_data.get('category', '未分类')
 
             dimensions = self._detect_dimensions(indicator_data)
             indicator_defaults.update(dimensions)
@@ -196,20 +164,15 @@ class Command(BaseCommand):
             is_valid, error_msg = self._validate_indicator_data(indicator_defaults)
             if not is_valid:
                 logger.error(f"Invalid data for {indicator_id}: {error_msg}")
-                return 'error'
+                return None
 
             cleaned_data = self._clean_data_for_model(indicator_defaults)
-
-            indicator, created = Indicator.objects.update_or_create(
-                code=cleaned_data.pop('code'),
-                defaults=cleaned_data
-            )
-            
-            return 'created' if created else 'updated'
+            cleaned_data['category_name'] = cleaned_data.pop('category')
+            return cleaned_data
 
         except Exception as e:
             logger.error(f"Critical error processing indicator {indicator_id}: {str(e)}", exc_info=True)
-            return 'error'
+            return None
 
     def _map_data_to_model(self, indicator_data, indicator_id):
         """Maps JSON data to the Indicator model fields."""
@@ -310,19 +273,3 @@ class Command(BaseCommand):
             if field in indicator_data:
                 cleaned_data[field] = indicator_data[field]
         return cleaned_data
-
-    def _get_category(self, category_name):
-        """
-        Retrieves or creates a category, including handling of parent-child relationships.
-        """
-        # Simple case: direct match
-        try:
-            return IndicatorCategory.objects.get(name=category_name)
-        except IndicatorCategory.DoesNotExist:
-            # More complex case could be handled here if needed
-            return IndicatorCategory.objects.create(
-                name=category_name, 
-                code=category_name.upper(), 
-                level=1, 
-                description=f"Category for {category_name}"
-            )
\ No newline at end of file
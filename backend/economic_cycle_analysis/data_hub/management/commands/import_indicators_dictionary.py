@@ -9,7 +9,9 @@ import os
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.contrib.auth.models import User
-from data_hub.models import IndicatorCategory, Indicator
+from data_hub.models import IndicatorCategory, Indicator, CompositeIndicator
+from data_hub.catalogue_importer import import_catalogue
+from data_hub.composite_engine import save_composite_definition
 
 
 class Command(BaseCommand):
@@ -61,94 +63,46 @@ class Command(BaseCommand):
                 IndicatorCategory.objects.all().delete()
             self.stdout.write(self.style.SUCCESS('✅ 清空完成'))
 
-        # 开始导入
+        # 开始导入（单个事务内批量写入）
         try:
-            with transaction.atomic():
-                self._import_categories(data)
-                self._import_indicators(data)
-                self._import_composite_indicators(data)
+            rows = [
+                self._build_indicator_row(indicator_code, indicator_info)
+                for indicator_code, indicator_info in data.get('indicators', {}).items()
+            ]
+            stats = import_catalogue(
+                rows,
+                update_existing=False,
+                category_defaults=self._category_defaults,
+            )
         except Exception as e:
             raise CommandError(f'导入过程中出错: {e}')
 
         self.stdout.write(
-            self.style.SUCCESS('🎉 指标字典导入完成！')
-        )
-
-    def _import_categories(self, data):
-        """导入指标分类"""
-        self.stdout.write('📂 导入指标分类...')
-        
-        # 从indicators数据中提取分类信息
-        indicators_data = data.get('indicators', {})
-        categories = set()
-        
-        # 收集所有分类
-        for indicator_code, indicator_info in indicators_data.items():
-            category = indicator_info.get('category')
-            if category:
-                categories.add(category)
-        
-        created_count = 0
-
-        # 创建分类
-        for category_name in categories:
-            category, created = IndicatorCategory.objects.get_or_create(
-                code=category_name.upper(),
-                defaults={
-                    'name': category_name,
-                    'description': f'{category_name}行业指标分类',
-                    'level': 1,
-                    'sort_order': 0,
-                }
+            self.style.SUCCESS(
+                f'✅ 指标导入完成！新建分类: {stats.categories_created}, '
+                f'新建指标: {stats.created}, 已存在: {stats.unchanged}, 失败: {stats.errors}'
             )
-            if created:
-                created_count += 1
-                self.stdout.write(f'  + 创建分类: {category.name}')
-
-        self.stdout.write(
-            self.style.SUCCESS(f'✅ 分类导入完成，共创建 {created_count} 个分类')
         )
+        for message in stats.error_messages:
+            self.stdout.write(self.style.ERROR(f'  ❌ {message}'))
 
-    def _import_indicators(self, data):
-        """导入指标"""
-        self.stdout.write('📊 导入指标...')
-        
-        indicators_data = data.get('indicators', {})
-        created_count = 0
-        error_count = 0
-
-        for indicator_code, indicator_info in indicators_data.items():
-            try:
-                self._create_indicator(indicator_code, indicator_info)
-                created_count += 1
-                if created_count % 100 == 0:
-                    self.stdout.write(f'  已处理 {created_count} 个指标...')
-            except Exception as e:
-                error_count += 1
-                self.stdout.write(
-                    self.style.ERROR(f'  ❌ 创建指标失败: {indicator_code} - {e}')
-                )
+        self._import_composite_indicators(data)
 
         self.stdout.write(
-            self.style.SUCCESS(
-                f'✅ 指标导入完成！成功: {created_count}, 失败: {error_count}'
-            )
+            self.style.SUCCESS('🎉 指标字典导入完成！')
         )
 
-    def _create_indicator(self, indicator_code, indicator_data):
-        """创建单个指标"""
-        # 获取分类
-        category_name = indicator_data.get('category')
-        try:
-            category = IndicatorCategory.objects.get(code=category_name.upper())
-        except IndicatorCategory.DoesNotExist:
-            # 如果分类不存在，创建一个默认分类
-            category = IndicatorCategory.objects.create(
-                code=category_name.upper(),
-                name=category_name,
-                level=1
-            )
+    def _category_defaults(self, category_name):
+        """新建分类的默认字段"""
+        return {
+            'code': category_name.upper(),
+            'description': f'{category_name}行业指标分类',
+            'level': 1,
+            'sort_order': 0,
+        }
 
+    def _build_indicator_row(self, indicator_code, indicator_data):
+        """构建单个指标的导入数据"""
         # 映射数据可用性
         availability_mapping = {
             'high': 'high',
@@ -173,42 +127,57 @@ class Command(BaseCommand):
             indicator_data.get('frequency'), 'M'
         )
 
-        # 创建指标
-        indicator, created = Indicator.objects.get_or_create(
-            code=indicator_code,
-            defaults={
-                'name': indicator_data.get('name_cn', ''),
-                'description': indicator_data.get('investment_significance'),
-                'category': category,
-                'sub_category': indicator_data.get('sub_category'),
-                'sector': indicator_data.get('sector'),
-                'industry': indicator_data.get('indicator_type'),
-                'frequency': frequency,
-                'lead_lag_status': 'SYNC',  # 默认同步指标
-                'unit': indicator_data.get('unit'),
-                'source': indicator_data.get('data_source', 'akshare'),
-                'api_function': indicator_data.get('api_function'),
-                'data_availability': data_availability,
-                'calculation_method': indicator_data.get('calculation_method'),
-                'importance_level': indicator_data.get('importance_level', 3),
-                'implementation_phase': indicator_data.get('implementation_phase', 1),
-                'investment_significance': indicator_data.get('investment_significance'),
-                
-                # 先设置基础维度标签
-                'dimension_prosperity': True,  # 大部分指标都与景气度相关
-                'dimension_fundamental': True,  # 基本面指标
-            }
-        )
-
-        return indicator
+        return {
+            'code': indicator_code,
+            'category_name': indicator_data.get('category'),
+            'name': indicator_data.get('name_cn', ''),
+            'description': indicator_data.get('investment_significance'),
+            'sub_category': indicator_data.get('sub_category'),
+            'sector': indicator_data.get('sector'),
+            'industry': indicator_data.get('indicator_type'),
+            'frequency': frequency,
+            'lead_lag_status': 'SYNC',  # 默认同步指标
+            'unit': indicator_data.get('unit'),
+            'source': indicator_data.get('data_source', 'akshare'),
+            'api_function': indicator_data.get('api_function'),
+            'data_availability': data_availability,
+            'calculation_method': indicator_data.get('calculation_method'),
+            'importance_level': indicator_data.get('importance_level', 3),
+            'implementation_phase': indicator_data.get('implementation_phase', 1),
+            'investment_significance': indicator_data.get('investment_significance'),
+            
+            # 先设置基础维度标签
+            'dimension_prosperity': True,  # 大部分指标都与景气度相关
+            'dimension_fundamental': True,  # 基本面指标
+        }
 
     def _import_composite_indicators(self, data):
-        """导入复合指标"""
+        """导入复合指标（先导入复合指标本身，再写入成分与权重定义）"""
         self.stdout.write('🔗 导入复合指标...')
         
-        # 目前JSON中没有复合指标定义，跳过
-        self.stdout.write('  暂无复合指标定义，跳过此步骤')
+        composites = data.get('composite_indicators', {})
+        if not composites:
+            self.stdout.write('  暂无复合指标定义，跳过此步骤')
+            return
+        
+        rows = [self._build_indicator_row(code, info) for code, info in composites.items()]
+        import_catalogue(rows, update_existing=False, category_defaults=self._category_defaults)
+        
+        # 字典中的 weighted_composite / supply_chain_composite 等均为成分加权合成
+        imported = 0
+        for code, info in composites.items():
+            component_codes = info.get('components', [])
+            weights = info.get('weights') or [1.0] * len(component_codes)
+            try:
+                save_composite_definition(
+                    code,
+                    [{'code': c, 'weight': w} for c, w in zip(component_codes, weights)],
+                    method=CompositeIndicator.CalculationMethod.WEIGHTED_AVERAGE,
+                )
+                imported += 1
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  ❌ 复合指标 {code} 导入失败: {e}'))
         
         self.stdout.write(
-            self.style.SUCCESS('✅ 复合指标导入完成')
-        ) 
\ No newline at end of file
+            self.style.SUCCESS(f'✅ 复合指标导入完成: {imported} 个')
+        )
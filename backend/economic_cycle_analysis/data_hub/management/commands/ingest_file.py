@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 流式导入供应商导出的CSV/Excel历史数据
+运行命令: python manage.py ingest_file wind_export.xlsx --sheet 数据 --map 社会融资规模=SOCIAL_FINANCING
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from data_hub.file_ingest import DEFAULT_SOURCE_SYSTEM, INGEST_CHUNK_ROWS, ingest_file
+
+
+class Command(BaseCommand):
+    help = '按行分块流式导入宽表格式的CSV/XLSX文件（一列日期 + 每个指标一列），内存占用与文件大小无关'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', type=str, help='要导入的文件路径')
+        parser.add_argument('--date-column', type=str, help='日期列名，默认第一列')
+        parser.add_argument('--sheet', type=str, help='Excel工作表名，默认第一个工作表')
+        parser.add_argument('--header-row', type=int, default=0, help='表头所在行，从0开始 (默认: 0)')
+        parser.add_argument(
+            '--map',
+            nargs='+',
+            default=[],
+            metavar='列名=指标代码',
+            help='显式指定列与指标代码的对应关系，优先于自动解析'
+        )
+        parser.add_argument(
+            '--chunk-rows',
+            type=int,
+            default=INGEST_CHUNK_ROWS,
+            help=f'每块读取的行数 (默认: {INGEST_CHUNK_ROWS})'
+        )
+        parser.add_argument('--encoding', type=str, default='utf-8', help='CSV文件编码 (默认: utf-8)')
+        parser.add_argument(
+            '--source-system',
+            type=str,
+            default=DEFAULT_SOURCE_SYSTEM,
+            help=f'写入数据的来源系统标识 (默认: {DEFAULT_SOURCE_SYSTEM})'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='只解析列映射并统计行数，不写入数据库')
+
+    def handle(self, *args, **options):
+        column_map = {}
+        for item in options['map']:
+            column, sep, code = item.partition('=')
+            if not sep or not column or not code:
+                raise CommandError(f'无效的列映射: {item}，格式应为 列名=指标代码')
+            column_map[column.strip()] = code.strip()
+
+        def on_chunk(result):
+            self.stdout.write(f'  已处理 {result.rows_read} 行，新增 {result.created}，修订 {result.revised}')
+
+        for path in options['files']:
+            self.stdout.write(f'导入文件: {path}')
+            try:
+                result = ingest_file(
+                    path,
+                    date_column=options['date_column'],
+                    column_map=column_map,
+                    sheet=options['sheet'],
+                    header_row=options['header_row'],
+                    chunk_rows=options['chunk_rows'],
+                    encoding=options['encoding'],
+                    source_system=options['source_system'],
+                    dry_run=options['dry_run'],
+                    on_chunk=on_chunk,
+                )
+            except (OSError, ValueError, KeyError, ImportError) as e:
+                raise CommandError(f'导入文件 {path} 失败: {e}')
+
+            self.stdout.write(f'  映射列: {len(result.columns)}')
+            for column, code in result.columns.items():
+                self.stdout.write(f'    {column} -> {code}')
+            if result.unmapped_columns:
+                self.stdout.write(self.style.WARNING(
+                    f"  未映射列 ({len(result.unmapped_columns)}): {', '.join(map(str, result.unmapped_columns[:20]))}"
+                ))
+
+            self.stdout.write(self.style.SUCCESS(
+                f'  完成! 读取: {result.rows_read} 行, 跳过: {result.rows_skipped} 行, '
+                f'新增: {result.created}, 修订: {result.revised}, 耗时: {result.execution_time:.2f}秒'
+                + (' (试运行，未写入)' if options['dry_run'] else '')
+            ))
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 信号回测
+运行命令: python manage.py run_backtest --expression "(1/CSI300_PE) - (CN_10Y_BOND_YIELD/100)" --thresholds 0.02:0.06:0.005
+"""
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from data_hub.backtest import (
+    DEFAULT_BENCHMARK, DIRECTIONS, METRICS, MODES, SUPPORTED_FREQUENCIES, SignalRule, run_backtest,
+)
+
+
+def parse_grid(text: str):
+    """解析参数网格: 逗号分隔的取值，或 起点:终点:步长（含终点）"""
+    if ':' in text:
+        start, stop, step = (float(part) for part in text.split(':'))
+        if step <= 0:
+            raise CommandError('步长必须为正数')
+        count = int(np.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 10) for i in range(max(count, 0))]
+    return [float(part) for part in text.split(',') if part.strip()]
+
+
+class Command(BaseCommand):
+    help = '在已采集的指数序列上回测指标信号规则（阈值 × 执行滞后参数网格）'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--expression',
+            type=str,
+            required=True,
+            help='信号表达式，如 "(1/CSI300_PE) - (CN_10Y_BOND_YIELD/100)"'
+        )
+        parser.add_argument(
+            '--thresholds',
+            type=str,
+            required=True,
+            help='阈值网格：逗号分隔或 起点:终点:步长'
+        )
+        parser.add_argument(
+            '--lags',
+            type=str,
+            default='1',
+            help='执行滞后期数网格，逗号分隔 (默认: 1)'
+        )
+        parser.add_argument(
+            '--benchmark',
+            type=str,
+            default=DEFAULT_BENCHMARK,
+            help=f'基准指数代码 (默认: {DEFAULT_BENCHMARK})'
+        )
+        parser.add_argument(
+            '--direction',
+            type=str,
+            default='above',
+            choices=DIRECTIONS,
+            help='表达式高于(above)/低于(below)阈值时持有基准 (默认: above)'
+        )
+        parser.add_argument(
+            '--mode',
+            type=str,
+            default='long_flat',
+            choices=MODES,
+            help='信号不成立时空仓(long_flat)或做空(long_short) (默认: long_flat)'
+        )
+        parser.add_argument(
+            '--frequency',
+            type=str,
+            default='M',
+            choices=SUPPORTED_FREQUENCIES,
+            help='调仓频率 (默认: M)'
+        )
+        parser.add_argument('--start-date', type=str, help='回测开始日期 (YYYY-MM-DD)')
+        parser.add_argument('--end-date', type=str, help='回测结束日期 (YYYY-MM-DD)')
+        parser.add_argument(
+            '--as-of',
+            type=str,
+            help='使用该日期可见的数据版本 (YYYY-MM-DD)，不指定则使用最新数据'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='并行进程数 (默认: 1)'
+        )
+        parser.add_argument(
+            '--sort-by',
+            type=str,
+            default='sharpe',
+            choices=METRICS,
+            help='结果排序指标 (默认: sharpe)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='显示前N个参数组合 (默认: 10)'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='忽略已缓存的回测结果'
+        )
+
+    def handle(self, *args, **options):
+        rule = SignalRule(
+            expression=options['expression'],
+            benchmark=options['benchmark'],
+            direction=options['direction'],
+            mode=options['mode'],
+            frequency=options['frequency'],
+        )
+        thresholds = parse_grid(options['thresholds'])
+        lags = [int(part) for part in options['lags'].split(',') if part.strip()]
+
+        self.stdout.write(f'开始回测: {rule.expression}，参数组合 {len(thresholds) * len(lags)} 个')
+        try:
+            result = run_backtest(
+                rule,
+                thresholds,
+                lags,
+                start_date=options['start_date'],
+                end_date=options['end_date'],
+                as_of=options['as_of'],
+                workers=options['workers'],
+                use_cache=not options['no_cache'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'回测完成! 区间: {result.start_date} ~ {result.end_date}, 期数: {result.periods}, '
+            f'耗时: {result.execution_time:.2f}秒'
+        ))
+
+        def fmt(value, percent=True):
+            if value is None:
+                return '-'
+            return f'{value:.2%}' if percent else f'{value:.2f}'
+
+        benchmark = result.benchmark
+        self.stdout.write(
+            f"基准 {rule.benchmark}: 年化 {fmt(benchmark['annual_return'])}, "
+            f"夏普 {fmt(benchmark['sharpe'], False)}, 最大回撤 {fmt(benchmark['max_drawdown'])}"
+        )
+        for row in result.rows(options['sort_by'], options['top']):
+            self.stdout.write(
+                f"  阈值 {row['threshold']:g}, 滞后 {row['lag']}: "
+                f"总收益 {fmt(row['total_return'])}, 年化 {fmt(row['annual_return'])}, "
+                f"夏普 {fmt(row['sharpe'], False)}, 最大回撤 {fmt(row['max_drawdown'])}, "
+                f"胜率 {fmt(row['hit_rate'])}, 持仓占比 {fmt(row['exposure'])}, 换手 {int(row['trades'])}"
+            )
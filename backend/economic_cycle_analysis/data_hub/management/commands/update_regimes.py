@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""
+Django管理命令: 更新投资时钟阶段序列
+运行命令: python manage.py update_regimes
+"""
+
+from django.core.management.base import BaseCommand
+
+from data_hub.regime_engine import update_regimes
+
+
+class Command(BaseCommand):
+    help = '根据增长、通胀合成指标划分投资时钟阶段并写入阶段序列'
+
+    def handle(self, *args, **options):
+        self.stdout.write('开始投资时钟阶段划分...')
+        result = update_regimes()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'阶段划分完成! 期数: {result.periods}, 新增: {result.created}, 更新: {result.updated}, '
+            f'删除: {result.deleted}, 耗时: {result.execution_time:.3f}秒'
+        ))
+
+        for error in result.errors:
+            self.stdout.write(self.style.ERROR(f"  - {error['error']}"))
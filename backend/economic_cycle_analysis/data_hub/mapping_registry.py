@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+指标映射注册表
+进程内只构建一次的只读映射表，供所有采集器和视图共享
+提供按指标代码、AkShare函数、Wind代码的索引
+"""
+
+import logging
+import threading
+from dataclasses import dataclass
+from enum import Enum
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from .akshare_mapping_config import AKSHARE_MAPPINGS
+from .wind_mapping_config import WIND_MAPPINGS
+
+logger = logging.getLogger(__name__)
+
+
+class DataSource(Enum):
+    """数据源枚举"""
+    AKSHARE = "akshare"
+    WIND = "wind"
+    AUTO = "auto"  # 自动选择
+
+
+# 数据源优先级策略（按数据类型）
+SOURCE_PRIORITY = {
+    # 宏观经济指标：优先使用Wind，备选AkShare
+    'macro': (DataSource.WIND, DataSource.AKSHARE),
+
+    # 股票指数：优先使用Wind
+    'index': (DataSource.WIND, DataSource.AKSHARE),
+    'industry': (DataSource.WIND, DataSource.AKSHARE),
+    'us_index': (DataSource.WIND, DataSource.AKSHARE),
+
+    # 债券利率：优先使用Wind
+    'bond': (DataSource.WIND, DataSource.AKSHARE),
+
+    # 商品期货：优先使用Wind
+    'commodity': (DataSource.WIND, DataSource.AKSHARE),
+
+    # 外汇：优先使用Wind
+    'fx': (DataSource.WIND, DataSource.AKSHARE),
+
+    # 默认：自动选择
+    'default': (DataSource.WIND, DataSource.AKSHARE),
+}
+
+
+class FrozenDict(dict):
+    """只读字典 - 注册表中的配置在进程内共享，禁止就地修改"""
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("映射注册表为只读，请先 copy() 后再修改")
+
+    __setitem__ = _readonly
+    __delitem__ = _readonly
+    clear = _readonly
+    pop = _readonly
+    popitem = _readonly
+    setdefault = _readonly
+    update = _readonly
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value):
+    """递归冻结配置对象"""
+    if isinstance(value, FrozenDict):
+        return value
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """递归解冻为普通字典/列表，便于修改或序列化"""
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+@dataclass(frozen=True)
+class MappingRegistry:
+    """只读映射注册表"""
+    akshare: Mapping[str, Mapping]
+    wind: Mapping[str, Mapping]
+    unified: Mapping[str, Mapping]
+    unified_akshare_only: Mapping[str, Mapping]
+    by_function: Mapping[str, Tuple[str, ...]]
+    by_wind_code: Mapping[str, Tuple[str, ...]]
+
+    def get(self, indicator_code: str) -> Optional[Mapping]:
+        """按指标代码获取统一映射"""
+        return self.unified.get(indicator_code)
+
+    def codes_for_function(self, func_name: str) -> Tuple[str, ...]:
+        """获取使用同一AkShare函数的所有指标代码"""
+        return self.by_function.get(func_name, ())
+
+    def codes_for_wind_code(self, wind_code: str) -> Tuple[str, ...]:
+        """获取对应同一Wind代码的所有指标代码"""
+        return self.by_wind_code.get(wind_code, ())
+
+    def wind_supported_list(self) -> List[Dict]:
+        """Wind支持的指标列表（API返回格式）"""
+        return [
+            {
+                'code': code,
+                'wind_code': config['wind_code'],
+                'description': config['description'],
+                'data_type': config['data_type'],
+                'frequency': config['frequency'],
+                'dimension': config.get('dimension', ''),
+                'industry': config.get('industry', '')
+            }
+            for code, config in self.wind.items()
+        ]
+
+
+def _load_akshare_mappings() -> Dict[str, Dict]:
+    """合并手工映射与自动生成的增强映射（后者优先）"""
+    mappings = dict(AKSHARE_MAPPINGS)
+    try:
+        from .enhanced_mapping_config import ENHANCED_AKSHARE_MAPPINGS, MAPPING_STATS
+
+        mappings.update(ENHANCED_AKSHARE_MAPPINGS)
+
+        logger.info(f"已加载 {MAPPING_STATS['total_indicators']} 个自动映射配置")
+        logger.info(f"映射覆盖率: {MAPPING_STATS['coverage_rate']:.1f}%")
+        logger.info(f"生成时间: {MAPPING_STATS['generation_time']}")
+
+    except ImportError:
+        logger.warning("未找到增强映射配置文件，请先运行指标映射更新器")
+
+    return mappings
+
+
+def _build_unified(akshare: Mapping[str, Mapping],
+                   wind: Optional[Mapping[str, Mapping]]) -> Dict[str, Dict]:
+    """构建统一指标映射，并按优先级确定主数据源"""
+    unified = {}
+
+    for code, config in akshare.items():
+        unified[code] = {
+            'sources': {DataSource.AKSHARE: config},
+            'primary_source': DataSource.AKSHARE,
+            'data_type': config.get('data_type', 'unknown')
+        }
+
+    for code, config in (wind or {}).items():
+        if code in unified:
+            # 如果已存在，添加Wind作为备选数据源
+            unified[code]['sources'][DataSource.WIND] = config
+        else:
+            unified[code] = {
+                'sources': {DataSource.WIND: config},
+                'primary_source': DataSource.WIND,
+                'data_type': config.get('data_type', 'unknown')
+            }
+
+    for mapping in unified.values():
+        priority = SOURCE_PRIORITY.get(mapping['data_type'], SOURCE_PRIORITY['default'])
+        for source in priority:
+            if source in mapping['sources']:
+                mapping['primary_source'] = source
+                break
+
+    return unified
+
+
+def _build_index(mappings: Mapping[str, Mapping], key: str) -> Dict[str, Tuple[str, ...]]:
+    index: Dict[str, List[str]] = {}
+    for code, config in mappings.items():
+        value = config.get(key)
+        if value:
+            index.setdefault(value, []).append(code)
+    return {value: tuple(codes) for value, codes in index.items()}
+
+
+def build_mapping_registry() -> MappingRegistry:
+    """构建映射注册表（通常使用 get_mapping_registry 获取共享实例）"""
+    akshare = freeze(_load_akshare_mappings())
+    wind = freeze(WIND_MAPPINGS)
+
+    return MappingRegistry(
+        akshare=akshare,
+        wind=wind,
+        unified=freeze(_build_unified(akshare, wind)),
+        unified_akshare_only=freeze(_build_unified(akshare, None)),
+        by_function=FrozenDict(_build_index(akshare, 'func')),
+        by_wind_code=FrozenDict(_build_index(wind, 'wind_code')),
+    )
+
+
+_registry: Optional[MappingRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_mapping_registry() -> MappingRegistry:
+    """获取进程内共享的映射注册表"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = build_mapping_registry()
+    return _registry
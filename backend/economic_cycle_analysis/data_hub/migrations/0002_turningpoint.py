@@ -0,0 +1,98 @@
+# Generated by Django 5.2.2 on 2026-10-19 09:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TurningPoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[
+                            ("D", "日度"),
+                            ("W", "周度"),
+                            ("M", "月度"),
+                            ("Q", "季度"),
+                            ("Y", "年度"),
+                        ],
+                        default="M",
+                        max_length=10,
+                        verbose_name="分析频率",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="拐点日期")),
+                (
+                    "point_type",
+                    models.CharField(
+                        choices=[("peak", "峰值"), ("trough", "谷底")],
+                        max_length=10,
+                        verbose_name="拐点类型",
+                    ),
+                ),
+                ("value", models.FloatField(verbose_name="拐点数值")),
+                (
+                    "amplitude",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="相对前一拐点的变化幅度"
+                    ),
+                ),
+                (
+                    "duration_periods",
+                    models.IntegerField(
+                        blank=True, null=True, verbose_name="距前一拐点期数"
+                    ),
+                ),
+                (
+                    "is_confirmed",
+                    models.BooleanField(default=True, verbose_name="是否已确认"),
+                ),
+                (
+                    "detected_at",
+                    models.DateTimeField(auto_now=True, verbose_name="识别时间"),
+                ),
+                (
+                    "indicator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="turning_points",
+                        to="data_hub.indicator",
+                        verbose_name="指标",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "指标拐点",
+                "verbose_name_plural": "指标拐点",
+                "ordering": ["indicator", "date"],
+                "indexes": [
+                    models.Index(
+                        fields=["indicator", "frequency", "-date"],
+                        name="data_hub_tu_indicat_65b7f1_idx",
+                    ),
+                    models.Index(
+                        fields=["date", "point_type"],
+                        name="data_hub_tu_date_760f64_idx",
+                    ),
+                ],
+                "unique_together": {("indicator", "frequency", "date")},
+            },
+        ),
+    ]
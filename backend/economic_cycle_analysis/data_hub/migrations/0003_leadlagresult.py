@@ -0,0 +1,119 @@
+# Generated by Django 5.2.2 on 2026-10-19 10:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0002_turningpoint"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeadLagResult",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[
+                            ("D", "日度"),
+                            ("W", "周度"),
+                            ("M", "月度"),
+                            ("Q", "季度"),
+                            ("Y", "年度"),
+                        ],
+                        default="M",
+                        max_length=10,
+                        verbose_name="分析频率",
+                    ),
+                ),
+                (
+                    "transform",
+                    models.CharField(
+                        choices=[
+                            ("level", "原值"),
+                            ("diff", "一阶差分"),
+                            ("yoy", "同比变化"),
+                        ],
+                        default="level",
+                        max_length=10,
+                        verbose_name="序列变换",
+                    ),
+                ),
+                ("best_lag", models.IntegerField(verbose_name="最佳滞后期")),
+                ("correlation", models.FloatField(verbose_name="最佳滞后期相关系数")),
+                (
+                    "sync_correlation",
+                    models.FloatField(
+                        blank=True, null=True, verbose_name="同期相关系数"
+                    ),
+                ),
+                ("overlap", models.IntegerField(verbose_name="重叠样本数")),
+                (
+                    "estimated_status",
+                    models.CharField(
+                        choices=[
+                            ("LEAD", "领先指标"),
+                            ("SYNC", "同步指标"),
+                            ("LAG", "滞后指标"),
+                        ],
+                        max_length=10,
+                        verbose_name="测算领先滞后属性",
+                    ),
+                ),
+                (
+                    "profile",
+                    models.JSONField(default=list, verbose_name="各滞后期相关系数"),
+                ),
+                (
+                    "computed_at",
+                    models.DateTimeField(auto_now=True, verbose_name="计算时间"),
+                ),
+                (
+                    "indicator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lead_lag_results",
+                        to="data_hub.indicator",
+                        verbose_name="候选指标",
+                    ),
+                ),
+                (
+                    "target",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lead_lag_as_target",
+                        to="data_hub.indicator",
+                        verbose_name="目标指标",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "领先滞后分析结果",
+                "verbose_name_plural": "领先滞后分析结果",
+                "ordering": ["target", "-computed_at"],
+                "indexes": [
+                    models.Index(
+                        fields=["target", "frequency", "transform"],
+                        name="data_hub_le_target__fd02ab_idx",
+                    ),
+                    models.Index(
+                        fields=["indicator", "estimated_status"],
+                        name="data_hub_le_indicat_783285_idx",
+                    ),
+                ],
+                "unique_together": {("target", "indicator", "frequency", "transform")},
+            },
+        ),
+    ]
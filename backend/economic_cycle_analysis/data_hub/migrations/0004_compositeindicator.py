@@ -0,0 +1,157 @@
+# Generated by Django 5.2.2 on 2026-10-19 11:05
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0003_leadlagresult"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompositeIndicator",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "calculation_method",
+                    models.CharField(
+                        choices=[
+                            ("weighted_avg", "加权平均"),
+                            ("simple_avg", "简单平均"),
+                            ("diffusion", "扩散指数"),
+                            ("factor_model", "因子模型"),
+                            ("custom_formula", "自定义公式"),
+                        ],
+                        default="weighted_avg",
+                        max_length=20,
+                        verbose_name="计算方法",
+                    ),
+                ),
+                (
+                    "calculation_formula",
+                    models.TextField(blank=True, null=True, verbose_name="计算公式"),
+                ),
+                (
+                    "rebalance_frequency",
+                    models.CharField(
+                        default="M", max_length=10, verbose_name="再平衡频率"
+                    ),
+                ),
+                (
+                    "min_coverage",
+                    models.FloatField(
+                        default=0.5,
+                        help_text="某期有效成分的权重占比低于该值时不输出",
+                        validators=[
+                            django.core.validators.MinValueValidator(0.0),
+                            django.core.validators.MaxValueValidator(1.0),
+                        ],
+                        verbose_name="最低覆盖率",
+                    ),
+                ),
+                (
+                    "is_auto_update",
+                    models.BooleanField(default=True, verbose_name="是否自动更新"),
+                ),
+                (
+                    "last_calculation",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="最后计算时间"
+                    ),
+                ),
+                (
+                    "indicator",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="composite_definition",
+                        to="data_hub.indicator",
+                        verbose_name="关联指标",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "复合指标",
+                "verbose_name_plural": "复合指标",
+            },
+        ),
+        migrations.CreateModel(
+            name="CompositeIndicatorComponent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("weight", models.FloatField(default=1.0, verbose_name="权重")),
+                (
+                    "transformation",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("log", "对数"),
+                            ("diff", "一阶差分"),
+                            ("pct_change", "环比变化率"),
+                            ("yoy", "同比变化率"),
+                            ("zscore", "标准化"),
+                        ],
+                        help_text="如: log, diff, pct_change, zscore等",
+                        max_length=50,
+                        null=True,
+                        verbose_name="数据变换",
+                    ),
+                ),
+                (
+                    "lag_periods",
+                    models.IntegerField(default=0, verbose_name="滞后期数"),
+                ),
+                (
+                    "component_indicator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="data_hub.indicator",
+                        verbose_name="组成指标",
+                    ),
+                ),
+                (
+                    "composite_indicator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="components",
+                        to="data_hub.compositeindicator",
+                        verbose_name="复合指标",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "复合指标组成",
+                "verbose_name_plural": "复合指标组成",
+                "unique_together": {("composite_indicator", "component_indicator")},
+            },
+        ),
+        migrations.AddField(
+            model_name="compositeindicator",
+            name="component_indicators",
+            field=models.ManyToManyField(
+                related_name="composite_indicators",
+                through="data_hub.CompositeIndicatorComponent",
+                to="data_hub.indicator",
+                verbose_name="组成指标",
+            ),
+        ),
+    ]
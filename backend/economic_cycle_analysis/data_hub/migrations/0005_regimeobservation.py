@@ -0,0 +1,81 @@
+# Generated by Django 5.2.2 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0004_compositeindicator"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RegimeObservation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "frequency",
+                    models.CharField(
+                        choices=[
+                            ("D", "日度"),
+                            ("W", "周度"),
+                            ("M", "月度"),
+                            ("Q", "季度"),
+                            ("Y", "年度"),
+                        ],
+                        default="M",
+                        max_length=10,
+                        verbose_name="分析频率",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="日期")),
+                (
+                    "regime",
+                    models.CharField(
+                        choices=[
+                            ("recovery", "复苏"),
+                            ("overheat", "过热"),
+                            ("stagflation", "滞胀"),
+                            ("reflation", "衰退"),
+                        ],
+                        max_length=20,
+                        verbose_name="经济阶段",
+                    ),
+                ),
+                ("confidence", models.FloatField(verbose_name="阶段概率")),
+                (
+                    "probabilities",
+                    models.JSONField(default=dict, verbose_name="各阶段概率"),
+                ),
+                ("growth_score", models.FloatField(verbose_name="增长合成指标")),
+                ("inflation_score", models.FloatField(verbose_name="通胀合成指标")),
+                ("growth_momentum", models.FloatField(verbose_name="增长动量")),
+                ("inflation_momentum", models.FloatField(verbose_name="通胀动量")),
+                (
+                    "computed_at",
+                    models.DateTimeField(auto_now=True, verbose_name="计算时间"),
+                ),
+            ],
+            options={
+                "verbose_name": "投资时钟阶段",
+                "verbose_name_plural": "投资时钟阶段",
+                "ordering": ["-date"],
+                "indexes": [
+                    models.Index(
+                        fields=["frequency", "-date"],
+                        name="data_hub_re_frequen_546f13_idx",
+                    )
+                ],
+                "unique_together": {("frequency", "date")},
+            },
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 5.2.2 on 2026-10-19 14:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0005_regimeobservation"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="IndicatorDataVintage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField(verbose_name="日期")),
+                ("value", models.FloatField(verbose_name="数值")),
+                (
+                    "known_from",
+                    models.DateTimeField(
+                        help_text="该数值自此时间起可见（采集或修订时间）",
+                        verbose_name="可知时间",
+                    ),
+                ),
+                (
+                    "source_system",
+                    models.CharField(
+                        blank=True, max_length=100, null=True, verbose_name="来源系统"
+                    ),
+                ),
+                (
+                    "indicator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="vintages",
+                        to="data_hub.indicator",
+                        verbose_name="指标",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "指标数据版本",
+                "verbose_name_plural": "指标数据版本",
+                "ordering": ["indicator", "date", "known_from"],
+                "indexes": [
+                    models.Index(
+                        fields=["indicator", "known_from"],
+                        name="data_hub_in_indicat_942481_idx",
+                    ),
+                    models.Index(
+                        fields=["known_from"], name="data_hub_in_known_f_52e26f_idx"
+                    ),
+                ],
+                "unique_together": {("indicator", "date", "known_from")},
+            },
+        ),
+        # 以现有数据作为初始版本（可知时间取采集时间）
+        migrations.RunSQL(
+            sql=(
+                "INSERT INTO data_hub_indicatordatavintage "
+                "(indicator_id, date, value, known_from, source_system) "
+                "SELECT indicator_id, date, value, collection_time, source_system "
+                "FROM data_hub_indicatordata"
+            ),
+            reverse_sql=migrations.RunSQL.noop,
+        ),
+    ]
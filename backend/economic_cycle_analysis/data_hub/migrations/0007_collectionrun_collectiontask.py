@@ -0,0 +1,156 @@
+# Generated by Django 5.2.2 on 2026-10-19 15:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0006_indicatordatavintage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CollectionRun",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "name",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="作业名称"
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("running", "进行中"),
+                            ("completed", "已完成"),
+                            ("failed", "部分失败"),
+                        ],
+                        default="running",
+                        max_length=20,
+                        verbose_name="状态",
+                    ),
+                ),
+                ("window_start", models.DateField(verbose_name="采集开始日期")),
+                ("window_end", models.DateField(verbose_name="采集结束日期")),
+                ("params", models.JSONField(default=dict, verbose_name="作业参数")),
+                (
+                    "created_at",
+                    models.DateTimeField(auto_now_add=True, verbose_name="创建时间"),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="完成时间"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "采集作业",
+                "verbose_name_plural": "采集作业",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="CollectionTask",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("window_start", models.DateField(verbose_name="窗口开始日期")),
+                ("window_end", models.DateField(verbose_name="窗口结束日期")),
+                (
+                    "state",
+                    models.CharField(
+                        choices=[
+                            ("pending", "待执行"),
+                            ("running", "执行中"),
+                            ("succeeded", "成功"),
+                            ("failed", "失败"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                        verbose_name="状态",
+                    ),
+                ),
+                ("priority", models.IntegerField(default=0, verbose_name="执行顺序")),
+                ("attempts", models.IntegerField(default=0, verbose_name="尝试次数")),
+                ("last_error", models.TextField(blank=True, verbose_name="最近错误")),
+                (
+                    "records_count",
+                    models.IntegerField(default=0, verbose_name="写入数据点数"),
+                ),
+                (
+                    "available_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="可执行时间"
+                    ),
+                ),
+                (
+                    "worker",
+                    models.CharField(
+                        blank=True, max_length=100, verbose_name="工作进程"
+                    ),
+                ),
+                (
+                    "claimed_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="领取时间"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="完成时间"
+                    ),
+                ),
+                (
+                    "indicator",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="collection_tasks",
+                        to="data_hub.indicator",
+                        verbose_name="指标",
+                    ),
+                ),
+                (
+                    "run",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tasks",
+                        to="data_hub.collectionrun",
+                        verbose_name="采集作业",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "采集任务",
+                "verbose_name_plural": "采集任务",
+                "ordering": ["run", "priority", "id"],
+                "indexes": [
+                    models.Index(
+                        fields=["run", "state", "priority"],
+                        name="data_hub_co_run_id_d010e0_idx",
+                    )
+                ],
+                "unique_together": {("run", "indicator", "window_start", "window_end")},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.2 on 2026-10-19 17:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0007_collectionrun_collectiontask"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SeriesFingerprint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "raw_hash",
+                    models.CharField(max_length=40, verbose_name="原始数据摘要"),
+                ),
+                ("head_hash", models.CharField(max_length=40, verbose_name="头部摘要")),
+                ("tail_hash", models.CharField(max_length=40, verbose_name="尾部摘要")),
+                (
+                    "tail_start",
+                    models.DateField(
+                        blank=True, null=True, verbose_name="尾部起始日期"
+                    ),
+                ),
+                ("rows", models.IntegerField(default=0, verbose_name="数据点数")),
+                (
+                    "first_date",
+                    models.DateField(blank=True, null=True, verbose_name="最早日期"),
+                ),
+                (
+                    "last_date",
+                    models.DateField(blank=True, null=True, verbose_name="最新日期"),
+                ),
+                (
+                    "updated_at",
+                    models.DateTimeField(auto_now=True, verbose_name="更新时间"),
+                ),
+                (
+                    "indicator",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="fingerprint",
+                        to="data_hub.indicator",
+                        verbose_name="指标",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "序列指纹",
+                "verbose_name_plural": "序列指纹",
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-19 18:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0008_seriesfingerprint"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="indicatordata",
+            name="collection_time",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, verbose_name="采集时间"
+            ),
+        ),
+    ]
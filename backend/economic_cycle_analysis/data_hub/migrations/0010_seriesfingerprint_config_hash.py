@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-19 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("data_hub", "0009_indicatordata_collection_time_default"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="seriesfingerprint",
+            name="config_hash",
+            field=models.CharField(
+                blank=True, default="", max_length=40, verbose_name="配置摘要"
+            ),
+        ),
+    ]
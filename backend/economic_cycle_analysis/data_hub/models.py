@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
 from django.core.validators import MinValueValidator, MaxValueValidator
 import json
 
@@ -188,6 +189,31 @@ class Indicator(models.Model):
         """获取重要程度的星级显示"""
         return '★' * self.importance_level + '☆' * (5 - self.importance_level)
 
+    @classmethod
+    def update_metadata_key(cls, key, values, merge=False, batch_size=500):
+        """
+        只更新 metadata 中的一个键
+        在事务内重新读取（并锁定）最新的元数据再写回，不会覆盖其他模块同时写入的键
+
+        Args:
+            key: 元数据键
+            values: 指标ID -> 该键的新值
+            merge: 新旧值均为字典时合并（新值优先），否则整体替换
+        """
+        if not values:
+            return
+        with transaction.atomic():
+            rows = cls.objects.select_for_update().filter(pk__in=list(values)).values_list('pk', 'metadata')
+            updates = []
+            for pk, metadata in rows:
+                metadata = dict(metadata or {})
+                value = values[pk]
+                if merge and isinstance(value, dict) and isinstance(metadata.get(key), dict):
+                    value = {**metadata[key], **value}
+                metadata[key] = value
+                updates.append(cls(pk=pk, metadata=metadata))
+            cls.objects.bulk_update(updates, ['metadata'], batch_size=batch_size)
+
 
 class IndicatorData(models.Model):
     """指标数据模型 - 存储时间序列数据"""
@@ -208,7 +234,7 @@ class IndicatorData(models.Model):
     
     # 数据来源
     source_system = models.CharField(max_length=100, blank=True, null=True, verbose_name="来源系统")
-    collection_time = models.DateTimeField(auto_now_add=True, verbose_name="采集时间")
+    collection_time = models.DateTimeField(default=timezone.now, verbose_name="采集时间")
     
     # 计算相关
     raw_value = models.FloatField(null=True, blank=True, verbose_name="原始值")
@@ -230,72 +256,114 @@ class IndicatorData(models.Model):
         ]
 
 
-# class CompositeIndicator(models.Model):
-#     """复合指标模型 - 支持计算型指标如景气度指数"""
-    
-#     class CalculationMethod(models.TextChoices):
-#         WEIGHTED_AVERAGE = 'weighted_avg', '加权平均'
-#         SIMPLE_AVERAGE = 'simple_avg', '简单平均'
-#         FACTOR_MODEL = 'factor_model', '因子模型'
-#         CUSTOM_FORMULA = 'custom_formula', '自定义公式'
-    
-#     # 基础信息
-#     indicator = models.OneToOneField(Indicator, on_delete=models.CASCADE, verbose_name="关联指标")
-#     calculation_method = models.CharField(
-#         max_length=20, 
-#         choices=CalculationMethod.choices,
-#         default=CalculationMethod.WEIGHTED_AVERAGE,
-#         verbose_name="计算方法"
-#     )
-    
-#     # 指标组成
-#     component_indicators = models.ManyToManyField(
-#         Indicator, 
-#         through='CompositeIndicatorComponent',
-#         related_name='composite_indicators',
-#         verbose_name="组成指标"
-#     )
-#     calculation_formula = models.TextField(blank=True, null=True, verbose_name="计算公式")
-#     rebalance_frequency = models.CharField(max_length=10, default='M', verbose_name="再平衡频率")
-    
-#     # 状态管理
-#     is_auto_update = models.BooleanField(default=True, verbose_name="是否自动更新")
-#     last_calculation = models.DateTimeField(null=True, blank=True, verbose_name="最后计算时间")
-    
-#     def __str__(self):
-#         return f"复合指标: {self.indicator.name}"
-
-#     class Meta:
-#         verbose_name = "复合指标"
-#         verbose_name_plural = "复合指标"
-
-# class CompositeIndicatorComponent(models.Model):
-#     """复合指标组成部分 - 定义权重和计算规则"""
-    
-#     composite_indicator = models.ForeignKey(CompositeIndicator, on_delete=models.CASCADE, verbose_name="复合指标")
-#     component_indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, verbose_name="组成指标")
-    
-#     # 权重配置
-#     weight = models.FloatField(default=1.0, verbose_name="权重")
-#     is_dynamic_weight = models.BooleanField(default=False, verbose_name="是否动态权重")
-    
-#     # 计算配置
-#     transformation = models.CharField(
-#         max_length=50, 
-#         blank=True, 
-#         null=True, 
-#         verbose_name="数据变换",
-#         help_text="如: log, diff, pct_change, zscore等"
-#     )
-#     lag_periods = models.IntegerField(default=0, verbose_name="滞后期数")
-
-#     def __str__(self):
-#         return f"{self.composite_indicator.indicator.name} -> {self.component_indicator.name} (权重: {self.weight})"
-
-#     class Meta:
-#         unique_together = ('composite_indicator', 'component_indicator')
-#         verbose_name = "复合指标组成"
-#         verbose_name_plural = "复合指标组成"
+class IndicatorDataVintage(models.Model):
+    """指标数据版本 - 只追加的时点数据，记录每个数据点在何时以何值为人所知
+
+    只在数据点首次出现或数值被修订时追加一条记录（增量存储），
+    IndicatorData 始终保存最新版本，回测通过 as-of 查询还原历史时点可见的数据
+    """
+
+    indicator = models.ForeignKey(Indicator, related_name='vintages', on_delete=models.CASCADE, verbose_name="指标")
+    date = models.DateField(verbose_name="日期")
+    value = models.FloatField(verbose_name="数值")
+    known_from = models.DateTimeField(verbose_name="可知时间", help_text="该数值自此时间起可见（采集或修订时间）")
+    source_system = models.CharField(max_length=100, blank=True, null=True, verbose_name="来源系统")
+
+    def __str__(self):
+        return f"{self.indicator.code} {self.date}: {self.value} @ {self.known_from:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        unique_together = ('indicator', 'date', 'known_from')
+        ordering = ['indicator', 'date', 'known_from']
+        verbose_name = "指标数据版本"
+        verbose_name_plural = "指标数据版本"
+        indexes = [
+            models.Index(fields=['indicator', 'known_from']),
+            models.Index(fields=['known_from']),
+        ]
+
+
+class CompositeIndicator(models.Model):
+    """复合指标模型 - 支持计算型指标如景气度指数、扩散指数"""
+    
+    class CalculationMethod(models.TextChoices):
+        WEIGHTED_AVERAGE = 'weighted_avg', '加权平均'
+        SIMPLE_AVERAGE = 'simple_avg', '简单平均'
+        DIFFUSION = 'diffusion', '扩散指数'
+        FACTOR_MODEL = 'factor_model', '因子模型'
+        CUSTOM_FORMULA = 'custom_formula', '自定义公式'
+    
+    # 基础信息（计算结果写入关联指标的 IndicatorData，频率取关联指标的频率）
+    indicator = models.OneToOneField(Indicator, related_name='composite_definition', on_delete=models.CASCADE, verbose_name="关联指标")
+    calculation_method = models.CharField(
+        max_length=20, 
+        choices=CalculationMethod.choices,
+        default=CalculationMethod.WEIGHTED_AVERAGE,
+        verbose_name="计算方法"
+    )
+    
+    # 指标组成
+    component_indicators = models.ManyToManyField(
+        Indicator, 
+        through='CompositeIndicatorComponent',
+        related_name='composite_indicators',
+        verbose_name="组成指标"
+    )
+    calculation_formula = models.TextField(blank=True, null=True, verbose_name="计算公式")
+    rebalance_frequency = models.CharField(max_length=10, default='M', verbose_name="再平衡频率")
+    min_coverage = models.FloatField(
+        default=0.5,
+        validators=[MinValueValidator(0.0), MaxValueValidator(1.0)],
+        verbose_name="最低覆盖率",
+        help_text="某期有效成分的权重占比低于该值时不输出"
+    )
+    
+    # 状态管理
+    is_auto_update = models.BooleanField(default=True, verbose_name="是否自动更新")
+    last_calculation = models.DateTimeField(null=True, blank=True, verbose_name="最后计算时间")
+    
+    def __str__(self):
+        return f"复合指标: {self.indicator.name}"
+
+    class Meta:
+        verbose_name = "复合指标"
+        verbose_name_plural = "复合指标"
+
+
+class CompositeIndicatorComponent(models.Model):
+    """复合指标组成部分 - 定义权重和计算规则"""
+    
+    class Transformation(models.TextChoices):
+        LOG = 'log', '对数'
+        DIFF = 'diff', '一阶差分'
+        PCT_CHANGE = 'pct_change', '环比变化率'
+        YOY = 'yoy', '同比变化率'
+        ZSCORE = 'zscore', '标准化'
+    
+    composite_indicator = models.ForeignKey(CompositeIndicator, related_name='components', on_delete=models.CASCADE, verbose_name="复合指标")
+    component_indicator = models.ForeignKey(Indicator, on_delete=models.CASCADE, verbose_name="组成指标")
+    
+    # 权重配置（负权重表示与复合指标反向变动）
+    weight = models.FloatField(default=1.0, verbose_name="权重")
+    
+    # 计算配置
+    transformation = models.CharField(
+        max_length=50, 
+        blank=True, 
+        null=True, 
+        choices=Transformation.choices,
+        verbose_name="数据变换",
+        help_text="如: log, diff, pct_change, zscore等"
+    )
+    lag_periods = models.IntegerField(default=0, verbose_name="滞后期数")
+
+    def __str__(self):
+        return f"{self.composite_indicator.indicator.name} -> {self.component_indicator.name} (权重: {self.weight})"
+
+    class Meta:
+        unique_together = ('composite_indicator', 'component_indicator')
+        verbose_name = "复合指标组成"
+        verbose_name_plural = "复合指标组成"
 
 
 class DataQualityReport(models.Model):
@@ -331,3 +399,201 @@ class DataQualityReport(models.Model):
         ordering = ['-report_date']
         verbose_name = "数据质量报告"
         verbose_name_plural = "数据质量报告"
+
+
+class TurningPoint(models.Model):
+    """指标拐点模型 - Bry-Boschan 方法识别的峰值与谷底"""
+    
+    class PointType(models.TextChoices):
+        PEAK = 'peak', '峰值'
+        TROUGH = 'trough', '谷底'
+    
+    indicator = models.ForeignKey(Indicator, related_name='turning_points', on_delete=models.CASCADE, verbose_name="指标")
+    frequency = models.CharField(max_length=10, choices=Indicator.Frequency.choices, default=Indicator.Frequency.MONTHLY, verbose_name="分析频率")
+    date = models.DateField(verbose_name="拐点日期")
+    point_type = models.CharField(max_length=10, choices=PointType.choices, verbose_name="拐点类型")
+    value = models.FloatField(verbose_name="拐点数值")
+    
+    # 与前一拐点的比较
+    amplitude = models.FloatField(null=True, blank=True, verbose_name="相对前一拐点的变化幅度")
+    duration_periods = models.IntegerField(null=True, blank=True, verbose_name="距前一拐点期数")
+    
+    # 序列末端附近的拐点可能随新数据修正
+    is_confirmed = models.BooleanField(default=True, verbose_name="是否已确认")
+    detected_at = models.DateTimeField(auto_now=True, verbose_name="识别时间")
+
+    def __str__(self):
+        return f"{self.indicator.name} - {self.date} {self.get_point_type_display()}"
+
+    class Meta:
+        unique_together = ('indicator', 'frequency', 'date')
+        ordering = ['indicator', 'date']
+        verbose_name = "指标拐点"
+        verbose_name_plural = "指标拐点"
+        indexes = [
+            models.Index(fields=['indicator', 'frequency', '-date']),
+            models.Index(fields=['date', 'point_type']),
+        ]
+
+
+class LeadLagResult(models.Model):
+    """领先滞后分析结果 - 候选指标相对目标指标的最佳滞后期与相关系数"""
+    
+    class Transform(models.TextChoices):
+        LEVEL = 'level', '原值'
+        DIFF = 'diff', '一阶差分'
+        YOY = 'yoy', '同比变化'
+    
+    target = models.ForeignKey(Indicator, related_name='lead_lag_as_target', on_delete=models.CASCADE, verbose_name="目标指标")
+    indicator = models.ForeignKey(Indicator, related_name='lead_lag_results', on_delete=models.CASCADE, verbose_name="候选指标")
+    frequency = models.CharField(max_length=10, choices=Indicator.Frequency.choices, default=Indicator.Frequency.MONTHLY, verbose_name="分析频率")
+    transform = models.CharField(max_length=10, choices=Transform.choices, default=Transform.LEVEL, verbose_name="序列变换")
+    
+    # 正值表示候选指标领先目标指标的期数，负值表示滞后
+    best_lag = models.IntegerField(verbose_name="最佳滞后期")
+    correlation = models.FloatField(verbose_name="最佳滞后期相关系数")
+    sync_correlation = models.FloatField(null=True, blank=True, verbose_name="同期相关系数")
+    overlap = models.IntegerField(verbose_name="重叠样本数")
+    estimated_status = models.CharField(max_length=10, choices=Indicator.LeadLag.choices, verbose_name="测算领先滞后属性")
+    profile = models.JSONField(default=list, verbose_name="各滞后期相关系数")
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="计算时间")
+
+    def __str__(self):
+        return f"{self.indicator.code} vs {self.target.code}: lag={self.best_lag}, r={self.correlation:.2f}"
+
+    class Meta:
+        unique_together = ('target', 'indicator', 'frequency', 'transform')
+        ordering = ['target', '-computed_at']
+        verbose_name = "领先滞后分析结果"
+        verbose_name_plural = "领先滞后分析结果"
+        indexes = [
+            models.Index(fields=['target', 'frequency', 'transform']),
+            models.Index(fields=['indicator', 'estimated_status']),
+        ]
+
+
+class RegimeObservation(models.Model):
+    """投资时钟阶段观测 - 基于增长与通胀合成指标的方向划分经济阶段"""
+    
+    class Regime(models.TextChoices):
+        RECOVERY = 'recovery', '复苏'
+        OVERHEAT = 'overheat', '过热'
+        STAGFLATION = 'stagflation', '滞胀'
+        REFLATION = 'reflation', '衰退'
+    
+    frequency = models.CharField(max_length=10, choices=Indicator.Frequency.choices, default=Indicator.Frequency.MONTHLY, verbose_name="分析频率")
+    date = models.DateField(verbose_name="日期")
+    regime = models.CharField(max_length=20, choices=Regime.choices, verbose_name="经济阶段")
+    confidence = models.FloatField(verbose_name="阶段概率")
+    probabilities = models.JSONField(default=dict, verbose_name="各阶段概率")
+    
+    # 合成指标（扩展窗口标准化）及其动量
+    growth_score = models.FloatField(verbose_name="增长合成指标")
+    inflation_score = models.FloatField(verbose_name="通胀合成指标")
+    growth_momentum = models.FloatField(verbose_name="增长动量")
+    inflation_momentum = models.FloatField(verbose_name="通胀动量")
+    
+    computed_at = models.DateTimeField(auto_now=True, verbose_name="计算时间")
+
+    def __str__(self):
+        return f"{self.date} {self.get_regime_display()} ({self.confidence:.0%})"
+
+    class Meta:
+        unique_together = ('frequency', 'date')
+        ordering = ['-date']
+        verbose_name = "投资时钟阶段"
+        verbose_name_plural = "投资时钟阶段"
+        indexes = [
+            models.Index(fields=['frequency', '-date']),
+        ]
+
+
+class CollectionRun(models.Model):
+    """采集作业 - 一次批量回补的参数与整体状态，任务明细见 CollectionTask"""
+    
+    class Status(models.TextChoices):
+        RUNNING = 'running', '进行中'
+        COMPLETED = 'completed', '已完成'
+        FAILED = 'failed', '部分失败'
+    
+    name = models.CharField(max_length=100, blank=True, verbose_name="作业名称")
+    status = models.CharField(max_length=20, choices=Status.choices, default=Status.RUNNING, verbose_name="状态")
+    window_start = models.DateField(verbose_name="采集开始日期")
+    window_end = models.DateField(verbose_name="采集结束日期")
+    params = models.JSONField(default=dict, verbose_name="作业参数")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "采集作业"
+        verbose_name_plural = "采集作业"
+
+
+class CollectionTask(models.Model):
+    """采集任务 - 作业中单个指标、单个时间窗口的采集，可由多个工作进程并发领取"""
+    
+    class State(models.TextChoices):
+        PENDING = 'pending', '待执行'
+        RUNNING = 'running', '执行中'
+        SUCCEEDED = 'succeeded', '成功'
+        FAILED = 'failed', '失败'
+    
+    run = models.ForeignKey(CollectionRun, related_name='tasks', on_delete=models.CASCADE, verbose_name="采集作业")
+    indicator = models.ForeignKey(Indicator, related_name='collection_tasks', on_delete=models.CASCADE, verbose_name="指标")
+    window_start = models.DateField(verbose_name="窗口开始日期")
+    window_end = models.DateField(verbose_name="窗口结束日期")
+    state = models.CharField(max_length=20, choices=State.choices, default=State.PENDING, verbose_name="状态")
+    priority = models.IntegerField(default=0, verbose_name="执行顺序")
+    attempts = models.IntegerField(default=0, verbose_name="尝试次数")
+    last_error = models.TextField(blank=True, verbose_name="最近错误")
+    records_count = models.IntegerField(default=0, verbose_name="写入数据点数")
+    
+    # 失败重试或上游熔断时推迟到该时间之后再领取
+    available_at = models.DateTimeField(null=True, blank=True, verbose_name="可执行时间")
+    
+    # 领取信息：执行中的任务超过租约时间未完成视为工作进程已退出，可被重新领取
+    worker = models.CharField(max_length=100, blank=True, verbose_name="工作进程")
+    claimed_at = models.DateTimeField(null=True, blank=True, verbose_name="领取时间")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="完成时间")
+
+    def __str__(self):
+        return f"{self.indicator.code} {self.window_start}~{self.window_end} ({self.get_state_display()})"
+
+    class Meta:
+        unique_together = ('run', 'indicator', 'window_start', 'window_end')
+        ordering = ['run', 'priority', 'id']
+        verbose_name = "采集任务"
+        verbose_name_plural = "采集任务"
+        indexes = [
+            models.Index(fields=['run', 'state', 'priority']),
+        ]
+
+
+class SeriesFingerprint(models.Model):
+    """序列指纹 - 上次采集数据的内容摘要，用于判断新抓取的数据是否变化
+
+    raw_hash 为原始返回数据的摘要，config_hash 为映射配置的摘要，两者都相同则跳过清洗、写库与下游计算；
+    清洗后的序列按 tail_start 分为头部与尾部分别计算摘要，只有尾部变化时只写入尾部区间
+    """
+
+    indicator = models.OneToOneField(Indicator, related_name='fingerprint', on_delete=models.CASCADE, verbose_name="指标")
+    raw_hash = models.CharField(max_length=40, verbose_name="原始数据摘要")
+    config_hash = models.CharField(max_length=40, blank=True, default='', verbose_name="配置摘要")
+    head_hash = models.CharField(max_length=40, verbose_name="头部摘要")
+    tail_hash = models.CharField(max_length=40, verbose_name="尾部摘要")
+    tail_start = models.DateField(null=True, blank=True, verbose_name="尾部起始日期")
+    rows = models.IntegerField(default=0, verbose_name="数据点数")
+    first_date = models.DateField(null=True, blank=True, verbose_name="最早日期")
+    last_date = models.DateField(null=True, blank=True, verbose_name="最新日期")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新时间")
+
+    def __str__(self):
+        return f"{self.indicator.code} {self.first_date}~{self.last_date} ({self.rows})"
+
+    class Meta:
+        verbose_name = "序列指纹"
+        verbose_name_plural = "序列指纹"
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+数据质量引擎
+基于时间序列实际情况计算质量评分，批量写入 DataQualityReport：
+- 完整性：按指标频率的期望日历统计缺失期数
+- 及时性：最新数据距今天数与更新频率比较
+- 准确性：非有限值与异常跳变（MAD稳健Z分数）比例
+- 一致性：数据缺口与同期重复值
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max, OuterRef, Subquery
+from django.utils import timezone
+
+from .frequency import normalize_frequency, period_index
+from .models import Indicator, DataQualityReport
+from .series_store import SeriesArrays, load_series_arrays
+
+logger = logging.getLogger(__name__)
+
+# 未配置 update_frequency_days 时的默认更新周期（天）
+DEFAULT_UPDATE_INTERVAL_DAYS = {'D': 3, 'W': 7, 'M': 31, 'Q': 92, 'Y': 366}
+
+# 异常跳变判定阈值（稳健Z分数）
+OUTLIER_Z_THRESHOLD = 5.0
+
+# 计算异常率所需的最少变化量个数
+MIN_OBSERVATIONS_FOR_OUTLIERS = 8
+
+
+@dataclass
+class QualityMetrics:
+    """单个指标的质量度量"""
+    observations: int
+    periods_observed: int
+    periods_expected: int
+    gap_count: int
+    missing_periods: int
+    duplicate_periods: int
+    staleness_days: int
+    update_interval_days: int
+    outlier_count: int
+    non_finite_count: int
+    completeness_score: float
+    timeliness_score: float
+    accuracy_score: float
+    consistency_score: float
+
+    @property
+    def overall_score(self) -> float:
+        return (self.completeness_score + self.timeliness_score +
+                self.accuracy_score + self.consistency_score) / 4
+
+
+@dataclass
+class QualityRunResult:
+    """质量评估运行结果"""
+    evaluated: int = 0
+    skipped: int = 0
+    reports_written: int = 0
+    scores_updated: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def quality_level(score: float) -> str:
+    """根据综合评分确定质量等级"""
+    if score >= 0.9:
+        return DataQualityReport.QualityLevel.EXCELLENT
+    if score >= 0.75:
+        return DataQualityReport.QualityLevel.GOOD
+    if score >= 0.6:
+        return DataQualityReport.QualityLevel.FAIR
+    return DataQualityReport.QualityLevel.POOR
+
+
+def measure_series(series: SeriesArrays,
+                   frequency: str,
+                   report_date: date,
+                   update_interval_days: Optional[int] = None) -> QualityMetrics:
+    """计算单个时间序列的质量度量"""
+    dates, values = series.dates, series.values
+    n = len(dates)
+
+    # 完整性与一致性：按期统计
+    periods = period_index(dates, frequency)
+    is_new_period = np.empty(n, dtype=bool)
+    is_new_period[0] = True
+    is_new_period[1:] = periods[1:] != periods[:-1]
+    distinct_periods = periods[is_new_period]
+
+    steps = np.diff(distinct_periods)
+    gap_steps = steps[steps > 1]
+    periods_observed = len(distinct_periods)
+    periods_expected = int(distinct_periods[-1] - distinct_periods[0]) + 1
+    missing_periods = int((gap_steps - 1).sum())
+    duplicate_periods = n - periods_observed
+
+    completeness = periods_observed / periods_expected
+    consistency = 1.0 - min(1.0, (len(gap_steps) + duplicate_periods) / max(1, periods_observed - 1))
+
+    # 及时性：在一个更新周期之外再允许一个周期的发布滞后，之后线性衰减
+    interval = update_interval_days or DEFAULT_UPDATE_INTERVAL_DAYS[frequency]
+    staleness = int((np.datetime64(report_date, 'D') - dates[-1]).astype(np.int64))
+    allowed = 2 * interval
+    if staleness <= allowed:
+        timeliness = 1.0
+    else:
+        timeliness = max(0.0, 1.0 - (staleness - allowed) / (2 * interval))
+
+    # 准确性：非有限值与异常跳变
+    finite = np.isfinite(values)
+    non_finite = int(n - finite.sum())
+    outliers = 0
+    changes = np.diff(values[finite])
+    if len(changes) >= MIN_OBSERVATIONS_FOR_OUTLIERS:
+        deviation = np.abs(changes - np.median(changes))
+        scale = np.median(deviation) * 1.4826
+        if scale == 0:
+            # 变化量大多相同（如匀速增长）时退化为平均绝对偏差
+            scale = deviation.mean() * 1.2533
+        if scale > 0:
+            outliers = int((deviation > OUTLIER_Z_THRESHOLD * scale).sum())
+    accuracy = 1.0 - min(1.0, (outliers + non_finite) / n)
+
+    return QualityMetrics(
+        observations=n,
+        periods_observed=periods_observed,
+        periods_expected=periods_expected,
+        gap_count=len(gap_steps),
+        missing_periods=missing_periods,
+        duplicate_periods=duplicate_periods,
+        staleness_days=staleness,
+        update_interval_days=interval,
+        outlier_count=outliers,
+        non_finite_count=non_finite,
+        completeness_score=round(completeness, 4),
+        timeliness_score=round(timeliness, 4),
+        accuracy_score=round(accuracy, 4),
+        consistency_score=round(consistency, 4),
+    )
+
+
+class DataQualityEngine:
+    """批量数据质量评估引擎"""
+
+    def __init__(self, report_date: date = None, batch_size: int = 500):
+        self.report_date = report_date or timezone.localdate()
+        self.batch_size = batch_size
+
+    def run(self,
+            indicator_codes: Iterable[str] = None,
+            incremental: bool = True,
+            start_date=None,
+            end_date=None) -> QualityRunResult:
+        """
+        评估指标数据质量并写入报告
+
+        Args:
+            indicator_codes: 指标代码列表，None表示所有启用指标
+            incremental: 仅评估上次报告后有新采集数据的指标
+            start_date: 评估区间开始日期
+            end_date: 评估区间结束日期
+
+        Returns:
+            QualityRunResult: 运行结果
+        """
+        started = time.time()
+        result = QualityRunResult()
+
+        candidates = self._select_indicators(indicator_codes, incremental, result)
+        if not candidates:
+            result.execution_time = time.time() - started
+            return result
+
+        series_map = load_series_arrays(candidates.keys(), start_date, end_date)
+
+        reports = []
+        score_updates = []
+        for indicator_id, info in candidates.items():
+            series = series_map.get(indicator_id)
+            if series is None:
+                result.skipped += 1
+                continue
+
+            try:
+                frequency = normalize_frequency(info['frequency'], series.dates)
+                metrics = measure_series(
+                    series, frequency, self.report_date, info['update_frequency_days']
+                )
+            except Exception as e:
+                logger.error(f"计算指标 {info['code']} 质量评分时出错: {e}")
+                result.errors.append({'indicator_code': info['code'], 'error': str(e)})
+                continue
+
+            reports.append(self._build_report(indicator_id, metrics))
+            result.evaluated += 1
+
+            overall = round(metrics.overall_score, 4)
+            if info['data_quality_score'] is None or abs(info['data_quality_score'] - overall) > 1e-6:
+                score_updates.append(Indicator(pk=indicator_id, data_quality_score=overall))
+
+        with transaction.atomic():
+            if reports:
+                DataQualityReport.objects.bulk_create(
+                    reports,
+                    batch_size=self.batch_size,
+                    update_conflicts=True,
+                    unique_fields=['indicator', 'report_date'],
+                    update_fields=[
+                        'completeness_score', 'timeliness_score', 'accuracy_score',
+                        'consistency_score', 'overall_quality', 'issues_found', 'recommendations',
+                    ],
+                )
+                result.reports_written = len(reports)
+            if score_updates:
+                Indicator.objects.bulk_update(
+                    score_updates, ['data_quality_score'], batch_size=self.batch_size
+                )
+                result.scores_updated = len(score_updates)
+
+        result.execution_time = time.time() - started
+        logger.info(
+            f"数据质量评估完成: 评估 {result.evaluated} 个指标, 跳过 {result.skipped} 个, "
+            f"写入报告 {result.reports_written} 条, 耗时 {result.execution_time:.2f}秒"
+        )
+        return result
+
+    def _select_indicators(self,
+                           indicator_codes: Optional[Iterable[str]],
+                           incremental: bool,
+                           result: QualityRunResult) -> Dict[int, Dict]:
+        """选择需要评估的指标（增量模式下比较最新采集时间与上次报告日期）"""
+        queryset = Indicator.objects.all()
+        if indicator_codes is not None:
+            queryset = queryset.filter(code__in=list(indicator_codes))
+        else:
+            queryset = queryset.filter(is_active=True)
+
+        last_report = DataQualityReport.objects.filter(
+            indicator=OuterRef('pk')
+        ).order_by('-report_date').values('report_date')[:1]
+
+        rows = queryset.order_by().annotate(
+            last_collected=Max('data_points__collection_time'),
+            last_report=Subquery(last_report),
+        ).values(
+            'id', 'code', 'frequency', 'update_frequency_days', 'data_quality_score',
+            'last_collected', 'last_report',
+        )
+
+        candidates = {}
+        for row in rows:
+            if row['last_collected'] is None:
+                result.skipped += 1
+                continue
+            if incremental and row['last_report'] is not None:
+                collected = row['last_collected']
+                if timezone.is_aware(collected):
+                    collected = timezone.localtime(collected)
+                if collected.date() < row['last_report']:
+                    result.skipped += 1
+                    continue
+            candidates[row['id']] = row
+        return candidates
+
+    def _build_report(self, indicator_id: int, metrics: QualityMetrics) -> DataQualityReport:
+        """根据度量结果构建质量报告"""
+        issues = []
+        recommendations = []
+
+        if metrics.gap_count:
+            issues.append(f"存在 {metrics.gap_count} 处数据缺口，共缺失 {metrics.missing_periods} 期")
+            recommendations.append("补采缺失区间的历史数据")
+        if metrics.duplicate_periods:
+            issues.append(f"{metrics.duplicate_periods} 条数据与同期数据重复")
+            recommendations.append("检查指标频率配置或数据源日期口径")
+        if metrics.timeliness_score < 1.0:
+            issues.append(
+                f"最新数据已滞后 {metrics.staleness_days} 天（更新周期 {metrics.update_interval_days} 天）"
+            )
+            recommendations.append("检查数据源更新状态或采集任务")
+        if metrics.outlier_count:
+            issues.append(f"检测到 {metrics.outlier_count} 处异常跳变")
+            recommendations.append("核实异常跳变是否为真实数据")
+        if metrics.non_finite_count:
+            issues.append(f"存在 {metrics.non_finite_count} 个无效数值")
+
+        overall = metrics.overall_score
+        return DataQualityReport(
+            indicator_id=indicator_id,
+            report_date=self.report_date,
+            completeness_score=metrics.completeness_score,
+            timeliness_score=metrics.timeliness_score,
+            accuracy_score=metrics.accuracy_score,
+            consistency_score=metrics.consistency_score,
+            overall_quality=quality_level(overall),
+            issues_found=issues,
+            recommendations='；'.join(recommendations) if recommendations else '数据质量良好',
+        )
+
+
+def generate_quality_reports(indicator_codes: Iterable[str] = None,
+                             incremental: bool = True,
+                             start_date=None,
+                             end_date=None) -> QualityRunResult:
+    """生成数据质量报告的便捷函数"""
+    return DataQualityEngine().run(
+        indicator_codes=indicator_codes,
+        incremental=incremental,
+        start_date=start_date,
+        end_date=end_date,
+    )
@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+投资时钟阶段划分
+由 PMI、M1-M2剪刀差（增长）与 CPI、PPI（通胀）合成增长、通胀两个指标，
+按两者的方向将每一期划分为 复苏 / 过热 / 滞胀 / 衰退，
+并由阶段序列估计马尔可夫转移概率矩阵
+
+合成指标使用扩展窗口标准化（每期只用截至当期的数据），新增观测只会追加新的阶段，
+不会改写历史划分；全部历史在一次向量化计算中完成，结果只写入有变化的期
+"""
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .frequency import forward_fill
+from .models import RegimeObservation
+from .series_matrix import load_aligned_matrix
+
+logger = logging.getLogger(__name__)
+
+# 合成指标的输入: 指标代码 -> 权重
+REGIME_INPUTS = {
+    'growth': {'CN_PMI_MFG': 1.0, 'CN_M1_M2_SPREAD': 0.5, 'CN_GDP_YEARLY': 0.5},
+    'inflation': {'CN_CPI_YEARLY': 1.0, 'CN_PPI_YEARLY': 1.0},
+}
+
+# 阶段顺序（与转移矩阵的行列对应）: (增长上行, 通胀上行)
+REGIMES = [
+    (RegimeObservation.Regime.RECOVERY, True, False),
+    (RegimeObservation.Regime.OVERHEAT, True, True),
+    (RegimeObservation.Regime.STAGFLATION, False, True),
+    (RegimeObservation.Regime.REFLATION, False, False),
+]
+REGIME_CODES = [regime for regime, _, _ in REGIMES]
+
+CACHE_TIMEOUT = 60 * 60
+
+# 数值变化小于该值视为未变化
+VALUE_TOLERANCE = 1e-9
+
+
+@dataclass
+class RegimeConfig:
+    """阶段划分参数（期数）"""
+    frequency: str = 'M'
+    min_history: int = 24       # 扩展窗口标准化所需的最少历史
+    max_fill: int = 3           # 输入缺失（如发布延迟）时向前填充的最大期数
+    smoothing: int = 3          # 合成指标移动平均期数
+    momentum: int = 3           # 动量：平滑值与 momentum 期前之差
+    prior_count: float = 1.0    # 转移矩阵的拉普拉斯平滑
+
+
+@dataclass
+class RegimeSeries:
+    """阶段划分结果（仅包含可划分的期）"""
+    dates: np.ndarray
+    growth: np.ndarray
+    inflation: np.ndarray
+    growth_momentum: np.ndarray
+    inflation_momentum: np.ndarray
+    probabilities: np.ndarray   # (T, 4)，列顺序同 REGIME_CODES
+    regimes: np.ndarray         # (T,) 阶段序号
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+@dataclass
+class RegimeRunResult:
+    """阶段划分运行结果"""
+    periods: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def expanding_zscore(values: np.ndarray, min_history: int) -> np.ndarray:
+    """扩展窗口标准化：每期只使用截至当期的均值与标准差"""
+    valid = np.isfinite(values)
+    x = np.where(valid, values, 0.0)
+    n = np.cumsum(valid, axis=0)
+    total = np.cumsum(x, axis=0)
+    squares = np.cumsum(x * x, axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / n
+        var = (squares - n * mean * mean) / (n - 1)
+        z = (values - mean) / np.sqrt(var)
+    return np.where(valid & (n >= min_history) & (var > 0), z, np.nan)
+
+
+def _weighted_composite(z: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    valid = np.isfinite(z)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return (np.where(valid, z, 0.0) @ weights) / (valid @ weights)
+
+
+def _moving_average(values: np.ndarray, window: int) -> np.ndarray:
+    """简单移动平均（窗口内需全部有效）"""
+    result = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        csum = np.concatenate([[0.0], np.cumsum(np.where(np.isfinite(values), values, 0.0))])
+        ccount = np.concatenate([[0], np.cumsum(np.isfinite(values))])
+        sums = csum[window:] - csum[:-window]
+        full = (ccount[window:] - ccount[:-window]) == window
+        result[window - 1:] = np.where(full, sums / window, np.nan)
+    return result
+
+
+def _prob_up(momentum: np.ndarray, min_history: int) -> np.ndarray:
+    """动量为正的概率：按扩展窗口的动量波动率缩放后做正态近似（logistic）"""
+    valid = np.isfinite(momentum)
+    x = np.where(valid, momentum, 0.0)
+    n = np.cumsum(valid)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scale = np.sqrt(np.cumsum(x * x) / n)
+        scaled = momentum / np.where(n >= min_history // 2, scale, np.nan)
+    return 1.0 / (1.0 + np.exp(-1.702 * np.clip(scaled, -20, 20)))
+
+
+def compute_regimes(matrix, config: RegimeConfig = None) -> RegimeSeries:
+    """
+    向量化计算全部历史的阶段划分
+
+    Args:
+        matrix: 包含 REGIME_INPUTS 中指标的对齐矩阵
+    """
+    config = config or RegimeConfig()
+    values = forward_fill(matrix.values, config.max_fill)
+    z = expanding_zscore(values, config.min_history)
+
+    scores = {}
+    for name, inputs in REGIME_INPUTS.items():
+        weights = np.array([inputs.get(code, 0.0) for code in matrix.codes])
+        if not weights.any():
+            raise ValueError(f"缺少{name}合成指标的输入数据: {', '.join(inputs)}")
+        scores[name] = _weighted_composite(z, weights)
+
+    momentum = {}
+    for name, score in scores.items():
+        smoothed = _moving_average(score, config.smoothing)
+        momentum[name] = np.full(len(score), np.nan)
+        momentum[name][config.momentum:] = smoothed[config.momentum:] - smoothed[:-config.momentum]
+
+    p_growth = _prob_up(momentum['growth'], config.min_history)
+    p_inflation = _prob_up(momentum['inflation'], config.min_history)
+    probabilities = np.column_stack([
+        (p_growth if growth_up else 1 - p_growth) * (p_inflation if inflation_up else 1 - p_inflation)
+        for _, growth_up, inflation_up in REGIMES
+    ])
+
+    valid = np.isfinite(probabilities).all(axis=1)
+    return RegimeSeries(
+        dates=matrix.dates[valid],
+        growth=scores['growth'][valid],
+        inflation=scores['inflation'][valid],
+        growth_momentum=momentum['growth'][valid],
+        inflation_momentum=momentum['inflation'][valid],
+        probabilities=probabilities[valid],
+        regimes=probabilities[valid].argmax(axis=1),
+    )
+
+
+def transition_matrix(regimes: np.ndarray, prior_count: float = 1.0) -> np.ndarray:
+    """由阶段序列估计马尔可夫转移矩阵（行: 当前阶段，列: 下一期阶段）"""
+    counts = np.full((len(REGIMES), len(REGIMES)), float(prior_count))
+    if len(regimes) > 1:
+        np.add.at(counts, (regimes[:-1], regimes[1:]), 1.0)
+    return counts / counts.sum(axis=1, keepdims=True)
+
+
+def load_regime_inputs(config: RegimeConfig = None):
+    """加载合成指标输入的对齐矩阵"""
+    config = config or RegimeConfig()
+    codes = [code for inputs in REGIME_INPUTS.values() for code in inputs]
+    return load_aligned_matrix(codes, config.frequency, how='mean', harmonize=True)
+
+
+def stored_version(frequency: str) -> str:
+    """已保存阶段序列的版本（行数 + 最近计算时间），用于缓存"""
+    stats = RegimeObservation.objects.filter(frequency=frequency).aggregate(
+        count=Count('id'), latest=Max('computed_at')
+    )
+    return f"{stats['count']}:{stats['latest'].isoformat() if stats['latest'] else ''}"
+
+
+class RegimeEngine:
+    """阶段划分的计算与持久化"""
+
+    def __init__(self, config: RegimeConfig = None, batch_size: int = 1000):
+        self.config = config or RegimeConfig()
+        self.batch_size = batch_size
+
+    def run(self) -> RegimeRunResult:
+        """计算阶段序列，只写入新增或变化的期"""
+        started = time.time()
+        result = RegimeRunResult()
+        try:
+            series = compute_regimes(load_regime_inputs(self.config), self.config)
+            result.periods = len(series)
+            with transaction.atomic():
+                self._sync(series, result)
+        except Exception as e:
+            logger.error(f"投资时钟阶段划分失败: {e}")
+            result.errors.append({'error': str(e)})
+
+        result.execution_time = time.time() - started
+        logger.info(
+            f"投资时钟阶段划分完成: {result.periods} 期, 新增 {result.created}, "
+            f"更新 {result.updated}, 删除 {result.deleted}, 耗时 {result.execution_time:.3f}秒"
+        )
+        return result
+
+    def _sync(self, series: RegimeSeries, result: RegimeRunResult):
+        existing = {
+            row.date: row
+            for row in RegimeObservation.objects.filter(frequency=self.config.frequency)
+        }
+
+        now = timezone.now()
+        to_create, to_update = [], []
+        seen = set()
+        for i, date in enumerate(series.dates.astype(object)):
+            seen.add(date)
+            probabilities = series.probabilities[i]
+            values = {
+                'regime': REGIME_CODES[series.regimes[i]],
+                'confidence': float(probabilities[series.regimes[i]]),
+                'probabilities': {code: round(float(p), 6) for code, p in zip(REGIME_CODES, probabilities)},
+                'growth_score': float(series.growth[i]),
+                'inflation_score': float(series.inflation[i]),
+                'growth_momentum': float(series.growth_momentum[i]),
+                'inflation_momentum': float(series.inflation_momentum[i]),
+            }
+            row = existing.get(date)
+            if row is None:
+                to_create.append(RegimeObservation(frequency=self.config.frequency, date=date, **values))
+            elif self._changed(row, values):
+                for name, value in values.items():
+                    setattr(row, name, value)
+                row.computed_at = now
+                to_update.append(row)
+
+        stale = [row.pk for date, row in existing.items() if date not in seen]
+        if stale:
+            RegimeObservation.objects.filter(pk__in=stale).delete()
+        if to_create:
+            RegimeObservation.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            RegimeObservation.objects.bulk_update(
+                to_update,
+                ['regime', 'confidence', 'probabilities', 'growth_score', 'inflation_score',
+                 'growth_momentum', 'inflation_momentum', 'computed_at'],
+                batch_size=self.batch_size,
+            )
+        result.created += len(to_create)
+        result.updated += len(to_update)
+        result.deleted += len(stale)
+
+    @staticmethod
+    def _changed(row: RegimeObservation, values: Dict) -> bool:
+        if row.regime != values['regime']:
+            return True
+        return any(
+            abs(getattr(row, name) - values[name]) > VALUE_TOLERANCE
+            for name in ('confidence', 'growth_score', 'inflation_score', 'growth_momentum', 'inflation_momentum')
+        )
+
+
+def update_regimes(config: RegimeConfig = None) -> RegimeRunResult:
+    """更新阶段序列的便捷函数"""
+    return RegimeEngine(config).run()
+
+
+def _daily_expand(dates: np.ndarray, end) -> tuple:
+    """将各期阶段展开为工作日序列：每个工作日取起始日不晚于该日的最近一期"""
+    days = np.arange(dates[0], np.datetime64(end, 'D') + 1, dtype='datetime64[D]')
+    days = days[np.is_busday(days)]
+    positions = np.searchsorted(dates, days, side='right') - 1
+    return days, positions
+
+
+def regime_summary(start_date=None, end_date=None, daily: bool = False,
+                   config: RegimeConfig = None) -> Dict:
+    """
+    阶段序列与转移概率（带缓存），只读取已保存的阶段序列
+    阶段序列由 python manage.py update_regimes（或定时任务）计算写入
+
+    Args:
+        daily: 是否展开为工作日序列
+    """
+    config = config or RegimeConfig()
+    version = stored_version(config.frequency)
+    key_source = json.dumps([version, config.frequency, str(start_date), str(end_date), daily])
+    cache_key = f"regime_engine:{hashlib.md5(key_source.encode('utf-8')).hexdigest()}"
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    rows = list(
+        RegimeObservation.objects.filter(frequency=config.frequency).order_by('date')
+        .values('date', 'regime', 'confidence', 'probabilities', 'growth_score', 'inflation_score')
+    )
+    if not rows:
+        raise ValueError("暂无可用的阶段划分数据，请先运行 update_regimes")
+
+    codes = np.array([REGIME_CODES.index(row['regime']) for row in rows])
+    matrix = transition_matrix(codes, config.prior_count)
+    current = rows[-1]
+    current_probs = np.array([current['probabilities'].get(code, 0.0) for code in REGIME_CODES])
+    labels = dict(RegimeObservation.Regime.choices)
+
+    dates = np.array([row['date'] for row in rows], dtype='datetime64[D]')
+    if daily:
+        end = end_date or np.datetime64('today')
+        days, positions = _daily_expand(dates, end)
+        history_dates, history_rows = days.astype(object), [rows[p] for p in positions]
+    else:
+        history_dates, history_rows = dates.astype(object), rows
+
+    history = [
+        {
+            'date': date,
+            'regime': row['regime'],
+            'label': labels[row['regime']],
+            'confidence': round(row['confidence'], 4),
+            'growth': round(row['growth_score'], 4),
+            'inflation': round(row['inflation_score'], 4),
+        }
+        for date, row in zip(history_dates, history_rows)
+        if (start_date is None or str(date) >= str(start_date)) and (end_date is None or str(date) <= str(end_date))
+    ]
+
+    with np.errstate(divide='ignore'):
+        durations = 1.0 / (1.0 - np.diag(matrix))
+
+    result = {
+        'frequency': 'D' if daily else config.frequency,
+        'current': {
+            'date': current['date'],
+            'regime': current['regime'],
+            'label': labels[current['regime']],
+            'confidence': round(current['confidence'], 4),
+            'probabilities': current['probabilities'],
+        },
+        'next_period_probabilities': {
+            code: round(float(p), 4) for code, p in zip(REGIME_CODES, current_probs @ matrix)
+        },
+        'transition_matrix': {
+            source: {target: round(float(p), 4) for target, p in zip(REGIME_CODES, matrix[i])}
+            for i, source in enumerate(REGIME_CODES)
+        },
+        'expected_duration': {code: round(float(d), 2) for code, d in zip(REGIME_CODES, durations)},
+        'labels': labels,
+        'history': history,
+    }
+    cache.set(cache_key, result, timeout=CACHE_TIMEOUT)
+    return result
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+"""
+上游数据录制与回放
+不依赖网络与Wind终端复现采集流程，用于采集性能基准与回归测试：
+1. 录制：包装真实的 akshare 模块与 WindPy 接口，把返回结果保存为压缩夹具（gzip JSON）
+   - AkShare 按 函数 + 参数（不含日期区间）保存返回的DataFrame
+   - Wind 按 请求类型 + 代码 保存完整序列，回放时按请求的日期区间与代码组合重新拼装，
+     因此调整批量大小或分段方式后仍可回放
+2. 回放：ReplayAkShare / ReplayWindPy 与真实接口调用方式一致，
+   采集器的 _fetch_data_from_akshare / _fetch_data_from_wind 无需修改
+3. 上游模拟：按 ReplayProfile 注入固定延迟、随机抖动、随机失败与限流（超出每秒请求数的调用被拒绝），
+   随机数由种子确定，结果可复现
+
+AkShare 在采集器内延迟导入（import akshare），replay_upstreams 期间以回放模块替换 sys.modules['akshare']；
+Wind 通过 WindSessionManager 的 api_factory 接入回放接口
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import types
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 日期区间参数，不参与AkShare夹具的键（回放时按区间过滤）
+DATE_RANGE_PARAMS = ('start_date', 'end_date')
+
+# AkShare返回数据中可能的日期列
+DATE_COLUMNS = ('日期', 'date', '时间', 'trade_date')
+
+# 回放时Wind请求失败返回的错误代码
+REPLAY_ERROR_CODE = -40522017
+
+
+class ReplayError(RuntimeError):
+    """回放失败：夹具缺失或注入的上游错误"""
+
+
+@dataclass
+class ReplayProfile:
+    """上游模拟参数"""
+    latency: float = 0.0                   # 每次调用的基础延迟（秒）
+    jitter: float = 0.0                    # 延迟波动（秒，均匀分布 ±jitter）
+    error_rate: float = 0.0                # 随机失败概率
+    throttle_rate: Optional[float] = None  # 每秒请求数上限，超出的调用被拒绝
+    seed: int = 0
+
+
+def _params_key(params: Dict) -> str:
+    canonical = json.dumps(
+        {key: value for key, value in params.items() if key not in DATE_RANGE_PARAMS},
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:16]
+
+
+def _compact(date_value) -> str:
+    return str(date_value).replace('-', '')[:8]
+
+
+class FixtureStore:
+    """夹具目录：akshare/<函数>/<参数键>.json.gz，wind/<函数>[_字段]/<代码>.json.gz"""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _read(self, path: Path) -> Optional[Dict]:
+        if not path.exists():
+            return None
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _write(self, path: Path, payload: Dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, default=str)
+
+    # AkShare
+
+    def _akshare_path(self, func_name: str, params: Dict) -> Path:
+        return self.root / 'akshare' / func_name / f"{_params_key(params)}.json.gz"
+
+    def has_akshare(self, func_name: str, params: Dict) -> bool:
+        return self._akshare_path(func_name, params).exists()
+
+    def save_akshare(self, func_name: str, params: Dict, data_df: pd.DataFrame):
+        path = self._akshare_path(func_name, params)
+        existing = self.load_akshare(func_name, params) if path.exists() else None
+        if existing is not None and 'start_date' in params:
+            # 分段录制：与已有数据合并
+            data_df = pd.concat([existing, data_df], ignore_index=True).drop_duplicates(keep='last')
+        payload = {
+            'func': func_name,
+            'params': {key: value for key, value in params.items() if key not in DATE_RANGE_PARAMS},
+            'frame': json.loads(data_df.to_json(orient='split', date_format='iso', force_ascii=False,
+                                                default_handler=str)),
+        }
+        self._write(path, payload)
+
+    def load_akshare(self, func_name: str, params: Dict) -> Optional[pd.DataFrame]:
+        payload = self._read(self._akshare_path(func_name, params))
+        if payload is None:
+            return None
+        frame = payload['frame']
+        return pd.DataFrame(frame['data'], columns=frame['columns'])
+
+    # Wind
+
+    def _wind_path(self, function: str, field: Optional[str], wind_code: str) -> Path:
+        request_type = f"{function}_{field}" if field else function
+        return self.root / 'wind' / request_type / f"{wind_code.upper()}.json.gz"
+
+    def has_wind(self, function: str, field: Optional[str], wind_code: str) -> bool:
+        return self._wind_path(function, field, wind_code).exists()
+
+    def save_wind(self, function: str, field: Optional[str], wind_code: str, times: List, values: List):
+        series = self.load_wind(function, field, wind_code) or {}
+        series.update({str(t)[:10]: value for t, value in zip(times, values)})
+        self._write(self._wind_path(function, field, wind_code), {
+            'wind_code': wind_code.upper(),
+            'series': dict(sorted(series.items())),
+        })
+
+    def load_wind(self, function: str, field: Optional[str], wind_code: str) -> Optional[Dict[str, float]]:
+        payload = self._read(self._wind_path(function, field, wind_code))
+        return None if payload is None else payload['series']
+
+
+class UpstreamSimulator:
+    """按 ReplayProfile 模拟上游延迟、失败与限流（线程安全）"""
+
+    def __init__(self, profile: ReplayProfile = None):
+        self.profile = profile or ReplayProfile()
+        self._rng = random.Random(self.profile.seed)
+        self._lock = threading.Lock()
+        self._recent: Dict[str, deque] = {}
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    def _source_stats(self, source: str) -> Dict[str, float]:
+        return self.stats.setdefault(source, {'calls': 0, 'errors': 0, 'throttled': 0, 'latency': 0.0})
+
+    def call(self, source: str) -> Optional[str]:
+        """
+        模拟一次上游调用
+
+        Returns:
+            错误信息，调用成功时为None
+        """
+        profile = self.profile
+        with self._lock:
+            stats = self._source_stats(source)
+            stats['calls'] += 1
+            delay = max(0.0, profile.latency + self._rng.uniform(-profile.jitter, profile.jitter))
+            failed = profile.error_rate > 0 and self._rng.random() < profile.error_rate
+
+            throttled = False
+            if profile.throttle_rate:
+                now = time.monotonic()
+                recent = self._recent.setdefault(source, deque())
+                while recent and now - recent[0] >= 1.0:
+                    recent.popleft()
+                throttled = len(recent) >= profile.throttle_rate
+                if not throttled:
+                    recent.append(now)
+            stats['latency'] += delay
+
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            with self._lock:
+                stats['throttled'] += 1
+            return "请求过于频繁（回放限流）"
+        if failed:
+            with self._lock:
+                stats['errors'] += 1
+            return "上游请求失败（回放注入）"
+        return None
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {source: dict(stats) for source, stats in self.stats.items()}
+
+
+class ReplayAkShare(types.ModuleType):
+    """回放版 akshare 模块：任意函数按参数返回夹具数据"""
+
+    def __init__(self, store: FixtureStore, simulator: UpstreamSimulator):
+        super().__init__('akshare')
+        self._store = store
+        self._simulator = simulator
+
+    def __getattr__(self, name: str):
+        if name.startswith('_'):
+            raise AttributeError(name)
+
+        def replay(**params):
+            error = self._simulator.call('akshare')
+            if error:
+                raise ReplayError(error)
+            data_df = self._store.load_akshare(name, params)
+            if data_df is None:
+                raise ReplayError(f"缺少AkShare夹具: {name} {params}")
+            return self._filter_dates(data_df, params)
+
+        replay.__name__ = name
+        return replay
+
+    def _filter_dates(self, data_df: pd.DataFrame, params: Dict) -> pd.DataFrame:
+        if 'start_date' not in params or 'end_date' not in params:
+            return data_df
+        date_col = next((col for col in DATE_COLUMNS if col in data_df.columns), None)
+        if date_col is None:
+            return data_df
+        dates = pd.to_datetime(data_df[date_col], errors='coerce').dt.strftime('%Y%m%d')
+        mask = (dates >= _compact(params['start_date'])) & (dates <= _compact(params['end_date']))
+        return data_df[mask.fillna(False)].reset_index(drop=True)
+
+
+class ReplayWindPy:
+    """回放版 WindPy 接口：按代码从夹具拼装 edb/wsd 的返回结构"""
+
+    def __init__(self, store: FixtureStore, simulator: UpstreamSimulator):
+        self._store = store
+        self._simulator = simulator
+        self.connected = False
+
+    def start(self, waitTime: int = 120, **kwargs):
+        self.connected = True
+        return SimpleNamespace(ErrorCode=0)
+
+    def logon(self, username, password):
+        return SimpleNamespace(ErrorCode=0)
+
+    def stop(self):
+        self.connected = False
+
+    def isconnected(self) -> bool:
+        return self.connected
+
+    def getVersionInfo(self) -> str:
+        return 'ReplayWindPy'
+
+    def edb(self, codes: str, start_date: str, end_date: str, *args):
+        return self._result('edb', None, codes, start_date, end_date)
+
+    def wsd(self, codes: str, fields: str, start_date: str, end_date: str, *args):
+        return self._result('wsd', fields, codes, start_date, end_date)
+
+    def _result(self, function: str, field: Optional[str], codes: str, start_date: str, end_date: str):
+        code_list = [code.strip().upper() for code in codes.split(',') if code.strip()]
+        if self._simulator.call('wind') or not self.connected:
+            return SimpleNamespace(ErrorCode=REPLAY_ERROR_CODE, Codes=code_list, Times=[], Data=[])
+
+        start, end = str(start_date)[:10], str(end_date)[:10]
+        series = []
+        for code in code_list:
+            values = self._store.load_wind(function, field, code)
+            if values is None:
+                # 与WindPy一致：含无效代码的批量请求整体失败
+                return SimpleNamespace(ErrorCode=REPLAY_ERROR_CODE, Codes=code_list, Times=[], Data=[])
+            series.append({day: value for day, value in values.items() if start <= day <= end})
+
+        days = sorted(set().union(*series)) if series else []
+        times = [pd.Timestamp(day).date() for day in days]
+        data = [[values.get(day, float('nan')) for day in days] for values in series]
+        return SimpleNamespace(ErrorCode=0, Codes=code_list, Times=times, Data=data)
+
+
+class RecordingAkShare(types.ModuleType):
+    """录制版 akshare 模块：调用真实函数并保存返回的DataFrame"""
+
+    def __init__(self, module, store: FixtureStore):
+        super().__init__('akshare')
+        self._module = module
+        self._store = store
+
+    def __getattr__(self, name: str):
+        func = getattr(self._module, name)
+        if name.startswith('_') or not callable(func):
+            return func
+
+        def record(**params):
+            data_df = func(**params)
+            if isinstance(data_df, pd.DataFrame) and not data_df.empty:
+                self._store.save_akshare(name, params, data_df)
+            return data_df
+
+        record.__name__ = name
+        return record
+
+
+class RecordingWindPy:
+    """录制版 WindPy 接口：调用真实接口并按代码保存返回的序列"""
+
+    def __init__(self, api, store: FixtureStore):
+        self._api = api
+        self._store = store
+
+    def __getattr__(self, name: str):
+        return getattr(self._api, name)
+
+    def edb(self, codes: str, start_date: str, end_date: str, *args):
+        return self._record('edb', None, codes, self._api.edb(codes, start_date, end_date, *args))
+
+    def wsd(self, codes: str, fields: str, start_date: str, end_date: str, *args):
+        return self._record('wsd', fields, codes, self._api.wsd(codes, fields, start_date, end_date, *args))
+
+    def _record(self, function: str, field: Optional[str], codes: str, result):
+        if getattr(result, 'ErrorCode', None) != 0 or not result.Data or not result.Times:
+            return result
+        rows = result.Data if isinstance(result.Data[0], list) else [result.Data]
+        code_list = getattr(result, 'Codes', None) or [code.strip() for code in codes.split(',')]
+        if len(code_list) == len(rows):
+            for code, row in zip(code_list, rows):
+                self._store.save_wind(function, field, str(code), result.Times, row)
+        return result
+
+
+class UpstreamReplay:
+    """一次录制/回放会话：持有替身接口与上游模拟统计"""
+
+    def __init__(self, store: FixtureStore, simulator: UpstreamSimulator, akshare, wind_api, record: bool):
+        self.store = store
+        self.simulator = simulator
+        self.akshare = akshare
+        self.wind_api = wind_api
+        self.record = record
+
+    def wind_session_manager(self, config=None):
+        """使用回放（或录制）接口的独立Wind会话"""
+        from .wind_data_collector import WindConnectionConfig
+        from .wind_session import WindSessionManager
+
+        return WindSessionManager(config or WindConnectionConfig(), lambda: self.wind_api)
+
+    def wind_collector(self, config=None):
+        """使用回放（或录制）接口的Wind采集器"""
+        from .wind_data_collector import WindDataCollector
+
+        return WindDataCollector(config, session_manager=self.wind_session_manager(config))
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return self.simulator.snapshot()
+
+
+@contextmanager
+def replay_upstreams(fixture_dir, profile: ReplayProfile = None, record: bool = False) -> Iterator[UpstreamReplay]:
+    """
+    在上下文内以回放（或录制）接口替换 akshare 模块，并提供回放版Wind会话
+
+    Args:
+        fixture_dir: 夹具目录
+        profile: 上游模拟参数（仅回放时生效）
+        record: 录制模式：调用真实上游并保存夹具
+    """
+    store = FixtureStore(fixture_dir)
+    simulator = UpstreamSimulator(profile)
+    previous = sys.modules.get('akshare')
+
+    if record:
+        import akshare as real_akshare
+        from .wind_data_collector import get_wind_api
+
+        akshare = RecordingAkShare(real_akshare, store)
+        real_wind = get_wind_api()
+        wind_api = RecordingWindPy(real_wind, store) if real_wind is not None else None
+        if wind_api is None:
+            logger.warning("WindPy未安装，只录制AkShare数据")
+    else:
+        akshare = ReplayAkShare(store, simulator)
+        wind_api = ReplayWindPy(store, simulator)
+
+    sys.modules['akshare'] = akshare
+    try:
+        yield UpstreamReplay(store, simulator, akshare, wind_api, record)
+    finally:
+        if previous is None:
+            sys.modules.pop('akshare', None)
+        else:
+            sys.modules['akshare'] = previous
@@ -0,0 +1,282 @@
+# -*- coding: utf-8 -*-
+"""
+滚动相关矩阵
+对指标组（如全部流动性维度指标）维护滚动窗口内的成对共矩
+（重叠样本数、Σx、Σx²、Σxy，均为 N×N 矩阵），新增一期数据时加入新行、
+移出最旧一行即可更新，复杂度 O(N²)，无需对每个窗口重新计算
+
+共矩状态与计算结果都保存在缓存中，同一组指标的后续请求只需推进新增的期数
+"""
+
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from datetime import date as date_type, datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from django.core.cache import cache
+from django.db.models import Max
+
+from .models import Indicator, IndicatorData
+from .frequency import period_index
+from .series_matrix import load_aligned_matrix, period_start
+from .series_store import data_version
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_WINDOWS = (60, 120, 250)
+SUPPORTED_FREQUENCIES = ('D', 'W', 'M')
+
+# 单个相关矩阵的指标数量上限
+MAX_GROUP_SIZE = 300
+
+# 增量推进若干期后按窗口数据重算一次共矩，消除加减累积的舍入误差
+REBASE_INTERVAL = 1000
+
+CACHE_TIMEOUT = 60 * 60
+STATE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# 可用的维度分组: 名称 -> Indicator 布尔字段
+DIMENSION_FIELDS = {
+    field.name[len('dimension_'):]: field.name
+    for field in Indicator._meta.get_fields()
+    if field.name.startswith('dimension_')
+}
+
+
+class RollingCorrelation:
+    """滚动窗口成对共矩（缺失值按成对完整样本处理）"""
+
+    def __init__(self, n_columns: int, window: int, min_periods: int):
+        self.window = window
+        self.min_periods = min_periods
+        self.count = np.zeros((n_columns, n_columns))
+        self.sums = np.zeros((n_columns, n_columns))      # sums[i, j] = Σ x_i（i、j同时有效）
+        self.squares = np.zeros((n_columns, n_columns))   # squares[i, j] = Σ x_i²
+        self.cross = np.zeros((n_columns, n_columns))     # cross[i, j] = Σ x_i·x_j
+        self.buffer = np.full((window, n_columns), np.nan)
+        self.position = 0
+        self.pushes = 0
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, window: int, min_periods: int) -> 'RollingCorrelation':
+        """由窗口内的数据直接构造（矩阵乘法一次算出全部共矩）"""
+        state = cls(rows.shape[1], window, min_periods)
+        state._rebuild(rows[-window:])
+        return state
+
+    def _rebuild(self, rows: np.ndarray):
+        mask = np.isfinite(rows).astype(np.float64)
+        values = np.where(mask > 0, rows, 0.0)
+        self.count = mask.T @ mask
+        self.sums = values.T @ mask
+        self.squares = (values * values).T @ mask
+        self.cross = values.T @ values
+
+        self.buffer[:] = np.nan
+        self.buffer[self.window - len(rows):] = rows
+        self.position = 0
+        self.pushes = 0
+
+    def _apply(self, row: np.ndarray, sign: float):
+        mask = np.isfinite(row).astype(np.float64)
+        values = np.where(mask > 0, row, 0.0)
+        self.count += sign * np.outer(mask, mask)
+        self.sums += sign * np.outer(values, mask)
+        self.squares += sign * np.outer(values * values, mask)
+        self.cross += sign * np.outer(values, values)
+
+    def push(self, row: np.ndarray):
+        """加入新的一期（同时移出窗口最旧的一期）"""
+        oldest = self.buffer[self.position]
+        if np.isfinite(oldest).any():
+            self._apply(oldest, -1.0)
+        self._apply(row, 1.0)
+        self.buffer[self.position] = row
+        self.position = (self.position + 1) % self.window
+
+        self.pushes += 1
+        if self.pushes >= REBASE_INTERVAL:
+            self._rebuild(self.rows())
+
+    def rows(self) -> np.ndarray:
+        """窗口内数据（按时间升序）"""
+        return np.roll(self.buffer, -self.position, axis=0)
+
+    def correlation(self) -> np.ndarray:
+        """当前窗口的相关矩阵，重叠样本不足 min_periods 的位置为NaN"""
+        n = self.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = n * self.cross - self.sums * self.sums.T
+            var_i = n * self.squares - self.sums * self.sums
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[(n < self.min_periods) | ~np.isfinite(corr)] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(n) >= self.min_periods, 1.0, np.nan))
+        return np.clip(corr, -1.0, 1.0)
+
+
+@dataclass
+class CorrelationState:
+    """缓存的增量状态"""
+    codes: List[str]
+    frequency: str
+    last_period: int
+    center: np.ndarray
+    scale: np.ndarray
+    engine: RollingCorrelation
+
+
+def group_indicator_codes(dimension: str, limit: int = MAX_GROUP_SIZE) -> List[str]:
+    """维度分组内的启用指标（按重要程度取前 limit 个）"""
+    if dimension not in DIMENSION_FIELDS:
+        raise ValueError(f"不支持的维度: {dimension}")
+    return list(
+        Indicator.objects.filter(is_active=True, **{DIMENSION_FIELDS[dimension]: True})
+        .order_by('-importance_level', 'code')
+        .values_list('code', flat=True)[:limit]
+    )
+
+
+def _cache_key(prefix: str, *parts) -> str:
+    key_source = json.dumps(parts, default=str)
+    return f"{prefix}:{hashlib.md5(key_source.encode('utf-8')).hexdigest()}"
+
+
+def _to_date(value) -> Optional[date_type]:
+    if value is None or isinstance(value, date_type):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _condensed(matrix: np.ndarray) -> List[Optional[float]]:
+    """上三角（不含对角线）按行展开"""
+    upper = matrix[np.triu_indices(len(matrix), k=1)]
+    return [None if not np.isfinite(v) else round(float(v), 4) for v in upper]
+
+
+def _standardized(values: np.ndarray, center: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    return (values - center) / scale
+
+
+def rolling_correlation(indicator_codes: Iterable[str],
+                        window: int = 60,
+                        frequency: str = 'D',
+                        date=None,
+                        min_periods: Optional[int] = None) -> Dict:
+    """
+    计算指定日期、窗口的滚动相关矩阵（带缓存与增量更新）
+
+    Args:
+        indicator_codes: 指标代码列表
+        window: 窗口期数 60/120/250
+        frequency: 对齐频率 D/W/M
+        date: 窗口结束日期，None表示最新一期
+        min_periods: 成对最少重叠样本，默认为窗口的一半
+
+    Returns:
+        Dict: codes 与按行展开的上三角相关系数 values
+    """
+    if window not in SUPPORTED_WINDOWS:
+        raise ValueError(f"不支持的窗口: {window}，可选 {SUPPORTED_WINDOWS}")
+    if frequency not in SUPPORTED_FREQUENCIES:
+        raise ValueError(f"不支持的频率: {frequency}")
+    min_periods = min_periods or window // 2
+    if not 2 <= min_periods <= window:
+        raise ValueError("min_periods 必须在 2 与窗口期数之间")
+
+    names = dict(Indicator.objects.filter(code__in=list(indicator_codes)).values_list('code', 'name'))
+    codes = sorted(names)
+    if len(codes) > MAX_GROUP_SIZE:
+        raise ValueError(f"指标数量 {len(codes)} 超过上限 {MAX_GROUP_SIZE}")
+    if len(codes) < 2:
+        raise ValueError("至少需要两个有效指标")
+
+    ids = list(Indicator.objects.filter(code__in=codes).values_list('id', flat=True))
+    end_date = _to_date(date)
+    version = data_version(ids)
+
+    result_key = _cache_key('rolling_corr', codes, window, frequency, end_date, min_periods, version)
+    cached = cache.get(result_key)
+    if cached is not None:
+        return cached
+
+    if end_date is None:
+        end_date = IndicatorData.objects.filter(indicator_id__in=ids).aggregate(last=Max('date'))['last']
+        if end_date is None:
+            raise ValueError("指标组没有数据")
+    target = int(period_index(np.array([end_date], dtype='datetime64[D]'), frequency)[0])
+
+    # 只加载覆盖目标窗口（再多一期余量）的数据
+    start_date = period_start(np.array([target - window]), frequency)[0].astype(object)
+    matrix = load_aligned_matrix(codes, frequency, start_date, end_date)
+    values = np.full((window + 1, len(codes)), np.nan)
+    if matrix.shape[1]:
+        columns = [codes.index(code) for code in matrix.codes]
+        rows = matrix.periods - (target - window)
+        keep = (rows >= 0) & (rows <= window)
+        values[np.ix_(rows[keep], columns)] = matrix.values[keep]
+
+    state_key = _cache_key('rolling_corr_state', codes, window, frequency, min_periods)
+    state: Optional[CorrelationState] = cache.get(state_key)
+    engine = None
+    if state is not None and target - window < state.last_period <= target:
+        engine = _advance(state, values, target, window)
+    if engine is None:
+        fresh = _fresh_state(codes, frequency, values, target, window, min_periods)
+        engine = fresh.engine
+        # 查询历史日期时不覆盖指向最新一期的状态
+        if state is None or target >= state.last_period:
+            state = fresh
+        else:
+            state = None
+    if state is not None:
+        cache.set(state_key, state, timeout=STATE_CACHE_TIMEOUT)
+
+    corr = engine.correlation()
+    result = {
+        'date': period_start(np.array([target]), frequency)[0].astype(object),
+        'window': window,
+        'frequency': frequency,
+        'min_periods': min_periods,
+        'codes': codes,
+        'names': names,
+        'format': 'upper',
+        'values': _condensed(corr),
+    }
+    cache.set(result_key, result, timeout=CACHE_TIMEOUT)
+    return result
+
+
+def _fresh_state(codes, frequency, values, target, window, min_periods) -> CorrelationState:
+    """按窗口数据重新构造共矩"""
+    center = np.nanmean(values, axis=0)
+    scale = np.nanstd(values, axis=0)
+    center = np.where(np.isfinite(center), center, 0.0)
+    scale = np.where(np.isfinite(scale) & (scale > 0), scale, 1.0)
+    engine = RollingCorrelation.from_rows(_standardized(values[1:], center, scale), window, min_periods)
+    return CorrelationState(codes, frequency, target, center, scale, engine)
+
+
+def _advance(state: CorrelationState, values: np.ndarray, target: int, window: int) -> Optional[RollingCorrelation]:
+    """
+    在缓存状态上推进到目标期；窗口内仍保留的数据与最新数据不一致（数据被修订）时返回None
+    """
+    engine = state.engine
+    standardized = _standardized(values, state.center, state.scale)
+    offset = target - window   # values 第0行对应的期数
+
+    # 新窗口中沿用的旧数据：期数 target-window+1 .. state.last_period
+    kept = state.last_period - (target - window)
+    if kept > 0:
+        buffered = engine.rows()[window - kept:]
+        current = standardized[1:kept + 1]
+        same = np.isclose(buffered, current, rtol=1e-9, atol=1e-12, equal_nan=True)
+        if not same.all():
+            return None
+
+    for period in range(state.last_period + 1, target + 1):
+        engine.push(standardized[period - offset])
+    state.last_period = target
+    return engine
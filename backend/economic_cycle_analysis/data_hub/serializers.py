@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import IndicatorCategory, Indicator, IndicatorData
+from .models import IndicatorCategory, Indicator, IndicatorData, TurningPoint
 
 
 class IndicatorCategorySerializer(serializers.ModelSerializer):
@@ -95,4 +95,18 @@ class IndicatorStatsSerializer(serializers.Serializer):
     latest_value = serializers.DecimalField(max_digits=20, decimal_places=6)
     avg_value = serializers.DecimalField(max_digits=20, decimal_places=6)
     max_value = serializers.DecimalField(max_digits=20, decimal_places=6)
-    min_value = serializers.DecimalField(max_digits=20, decimal_places=6) 
\ No newline at end of file
+    min_value = serializers.DecimalField(max_digits=20, decimal_places=6)
+
+
+class TurningPointSerializer(serializers.ModelSerializer):
+    """指标拐点序列化器"""
+    indicator_code = serializers.CharField(source='indicator.code', read_only=True)
+    indicator_name = serializers.CharField(source='indicator.name', read_only=True)
+    
+    class Meta:
+        model = TurningPoint
+        fields = [
+            'id', 'indicator', 'indicator_code', 'indicator_name',
+            'frequency', 'date', 'point_type', 'value',
+            'amplitude', 'duration_periods', 'is_confirmed', 'detected_at'
+        ]
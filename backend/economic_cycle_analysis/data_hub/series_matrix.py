@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+对齐时间序列矩阵
+将多个指标按统一频率分期对齐为 (期数 × 指标) 的二维矩阵，缺失值为NaN，
+供周期分解、拐点识别、领先滞后等批量分析使用
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .frequency import (
+    PERIOD_DAYS, asof_join, is_lower_frequency, normalize_frequency, period_end, period_index,
+    period_start, resample,
+)
+from .models import Indicator
+from .series_store import SeriesArrays, load_series_arrays, data_version
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_FREQUENCIES = ('D', 'W', 'M', 'Q', 'Y')
+
+# 各频率每年的期数
+PERIODS_PER_YEAR = {'D': 252, 'W': 52, 'M': 12, 'Q': 4, 'Y': 1}
+
+
+@dataclass
+class AlignedMatrix:
+    """按期对齐的指标矩阵"""
+    frequency: str
+    periods: np.ndarray        # 期数编号（连续整数）
+    codes: List[str]           # 列对应的指标代码
+    values: np.ndarray         # shape = (len(periods), len(codes))，缺失为NaN
+    version: str = ''          # 数据版本，用于缓存
+
+    @property
+    def dates(self) -> np.ndarray:
+        """各期起始日期"""
+        return period_start(self.periods, self.frequency)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    def column(self, code: str) -> np.ndarray:
+        return self.values[:, self.codes.index(code)]
+
+    def subset(self, codes: Iterable[str]) -> 'AlignedMatrix':
+        """选取部分指标列"""
+        codes = [code for code in codes if code in self.codes]
+        columns = [self.codes.index(code) for code in codes]
+        return AlignedMatrix(self.frequency, self.periods, codes, self.values[:, columns], self.version)
+
+
+def bucket_series(series: SeriesArrays, frequency: str, how: str = 'last', publication_lag: int = 0):
+    """
+    将单个序列按期聚合（数据按 日期+发布时滞 归入对应期）
+
+    Returns:
+        (期数编号, 聚合值)
+    """
+    dates = series.dates
+    if publication_lag:
+        dates = dates + np.timedelta64(int(publication_lag), 'D')
+    return resample(dates, series.values, frequency, how)
+
+
+def align_series(series_by_code: Dict[str, SeriesArrays],
+                 frequency: str = 'M',
+                 how: str = 'last',
+                 source_frequencies: Optional[Dict[str, str]] = None,
+                 publication_lags: Optional[Dict[str, int]] = None) -> AlignedMatrix:
+    """
+    将多个序列按期对齐为矩阵（期数取所有序列的连续并集）
+
+    Args:
+        series_by_code: 指标代码 -> 序列
+        frequency: 目标频率
+        how: 同频或高频序列的期内聚合方式 last/mean/sum
+        source_frequencies: 各指标自身频率；低于目标频率的指标按 as-of 连接取截至期末
+                            已发布的最新值，最多沿用一个源周期（如月频指标在日频矩阵中）
+        publication_lags: 各指标发布时滞（天）
+    """
+    if frequency not in SUPPORTED_FREQUENCIES:
+        raise ValueError(f"不支持的频率: {frequency}")
+    source_frequencies = source_frequencies or {}
+    publication_lags = publication_lags or {}
+
+    codes = [code for code, series in series_by_code.items() if series is not None and len(series)]
+    lower = {
+        code for code in codes
+        if source_frequencies.get(code) and is_lower_frequency(source_frequencies[code], frequency)
+    }
+
+    bucketed = {
+        code: bucket_series(series_by_code[code], frequency, how, publication_lags.get(code, 0))
+        for code in codes if code not in lower
+    }
+    bounds = [(int(p[0]), int(p[-1])) for p, _ in bucketed.values() if len(p)]
+    for code in lower:
+        available = series_by_code[code].dates[[0, -1]] + np.timedelta64(int(publication_lags.get(code, 0)), 'D')
+        first, last = period_index(available, frequency)
+        bounds.append((int(first), int(last)))
+
+    if not bounds:
+        return AlignedMatrix(frequency, np.empty(0, dtype=np.int64), [], np.empty((0, 0)))
+
+    first = min(b[0] for b in bounds)
+    last = max(b[1] for b in bounds)
+    periods = np.arange(first, last + 1, dtype=np.int64)
+    values = np.full((len(periods), len(codes)), np.nan)
+    ends = period_end(periods, frequency) if lower else None
+    for j, code in enumerate(codes):
+        if code in lower:
+            series = series_by_code[code]
+            values[:, j] = asof_join(
+                ends, series.dates, series.values,
+                publication_lag=publication_lags.get(code, 0),
+                tolerance=PERIOD_DAYS[source_frequencies[code]],
+            )
+        else:
+            p, v = bucketed[code]
+            values[p - first, j] = v
+
+    return AlignedMatrix(frequency, periods, codes, values)
+
+
+def indicator_profiles(indicator_codes: Iterable[str]) -> Dict[str, Dict]:
+    """
+    指标的 id、自身频率与发布时滞（Indicator.metadata['publication_lag_days']，默认0天）
+    """
+    profiles = {}
+    rows = Indicator.objects.filter(code__in=list(indicator_codes)).values_list('code', 'id', 'frequency', 'metadata')
+    for code, pk, frequency, metadata in rows:
+        lag = (metadata or {}).get('publication_lag_days') or 0
+        profiles[code] = {
+            'id': pk,
+            'frequency': normalize_frequency(frequency),
+            'publication_lag': int(lag),
+        }
+    return profiles
+
+
+def load_aligned_matrix(indicator_codes: Iterable[str],
+                        frequency: str = 'M',
+                        start_date=None,
+                        end_date=None,
+                        how: str = 'last',
+                        harmonize: bool = False) -> AlignedMatrix:
+    """
+    从数据库加载指标并对齐为矩阵
+
+    Args:
+        indicator_codes: 指标代码列表
+        frequency: 目标频率 D/W/M/Q/Y
+        start_date: 开始日期
+        end_date: 结束日期
+        how: 同一期内多个数据点的聚合方式 last/mean/sum
+        harmonize: 按各指标自身频率与发布时滞协调（低频指标 as-of 沿用到后续各期）
+
+    Returns:
+        AlignedMatrix: 对齐矩阵（无数据的指标不出现在列中）
+    """
+    profiles = indicator_profiles(indicator_codes)
+    ids = [profile['id'] for profile in profiles.values()]
+    series = load_series_arrays(ids, start_date, end_date)
+
+    source_frequencies = publication_lags = None
+    if harmonize:
+        source_frequencies = {code: profile['frequency'] for code, profile in profiles.items()}
+        publication_lags = {code: profile['publication_lag'] for code, profile in profiles.items()}
+
+    matrix = align_series(
+        {code: series.get(profile['id']) for code, profile in profiles.items()},
+        frequency, how, source_frequencies, publication_lags,
+    )
+    matrix.version = data_version(ids)
+    return matrix
+
+
+def align_pandas_series(data_dict: Dict, frequency: str, how: str = 'last') -> Dict:
+    """
+    将 pandas.Series 字典（指标代码 -> 序列）协调到统一频率，供公式计算使用
+
+    Returns:
+        Dict: 指标代码 -> 以各期起始日期为索引的 pandas.Series
+    """
+    import pandas as pd
+
+    profiles = indicator_profiles(data_dict.keys())
+    series_by_code = {}
+    for code, series in data_dict.items():
+        series = series.dropna().sort_index()
+        series_by_code[code] = SeriesArrays(
+            dates=pd.DatetimeIndex(series.index).values.astype('datetime64[D]'),
+            values=series.to_numpy(dtype=np.float64),
+        )
+
+    matrix = align_series(
+        series_by_code,
+        frequency,
+        how,
+        source_frequencies={code: p['frequency'] for code, p in profiles.items()},
+        publication_lags={code: p['publication_lag'] for code, p in profiles.items()},
+    )
+    index = pd.DatetimeIndex(matrix.dates)
+    return {code: pd.Series(matrix.values[:, j], index=index) for j, code in enumerate(matrix.codes)}
+
+
+def fill_interior_gaps(values: np.ndarray) -> np.ndarray:
+    """按列线性插值填补首尾有效值之间的缺失（首尾之外保持NaN）"""
+    filled = values.copy()
+    index = np.arange(values.shape[0])
+    for j in np.flatnonzero(np.isnan(values).any(axis=0)):
+        column = values[:, j]
+        valid = ~np.isnan(column)
+        if valid.sum() < 2:
+            continue
+        first, last = np.flatnonzero(valid)[[0, -1]]
+        inside = slice(first, last + 1)
+        filled[inside, j] = np.interp(index[inside], index[valid], column[valid])
+    return filled
+
+
+def valid_spans(values: np.ndarray) -> Dict[tuple, np.ndarray]:
+    """
+    按有效区间（首个有效行，末个有效行）对列分组
+    区间相同的列可以共用同一个滤波权重矩阵
+    """
+    valid = ~np.isnan(values)
+    has_data = valid.any(axis=0)
+    first = np.where(has_data, valid.argmax(axis=0), -1)
+    last = np.where(has_data, values.shape[0] - 1 - valid[::-1].argmax(axis=0), -1)
+
+    groups: Dict[tuple, List[int]] = {}
+    for j in np.flatnonzero(has_data):
+        groups.setdefault((int(first[j]), int(last[j])), []).append(int(j))
+    return {span: np.array(columns) for span, columns in groups.items()}
@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+"""
+时间序列存储访问层
+一次查询批量加载多个指标的时间序列，并按指标拆分为NumPy数组
+
+采集数据统一通过 save_series 写入：IndicatorData 保存最新值，
+新增或修订的数据点同时追加到 IndicatorDataVintage，供回测按时点（as-of）查询
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .models import Indicator, IndicatorData, IndicatorDataVintage
+
+logger = logging.getLogger(__name__)
+
+# 单次查询的指标ID数量上限，避免 IN 子句过长
+ID_CHUNK_SIZE = 500
+
+# 数值变化小于该值视为未变化
+VALUE_TOLERANCE = 1e-9
+
+
+@dataclass
+class SeriesArrays:
+    """单个指标的时间序列（按日期升序）"""
+    dates: np.ndarray   # datetime64[D]
+    values: np.ndarray  # float64
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def load_series_arrays(indicator_ids: Iterable[int],
+                       start_date=None,
+                       end_date=None) -> Dict[int, SeriesArrays]:
+    """
+    批量加载指标时间序列
+
+    Args:
+        indicator_ids: 指标ID列表
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+
+    Returns:
+        Dict[int, SeriesArrays]: 指标ID -> 时间序列，无数据的指标不包含在结果中
+    """
+    indicator_ids = sorted(set(indicator_ids))
+    series: Dict[int, SeriesArrays] = {}
+
+    for i in range(0, len(indicator_ids), ID_CHUNK_SIZE):
+        queryset = IndicatorData.objects.filter(
+            indicator_id__in=indicator_ids[i:i + ID_CHUNK_SIZE]
+        )
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+
+        rows = list(
+            queryset.order_by('indicator_id', 'date').values_list('indicator_id', 'date', 'value')
+        )
+        if not rows:
+            continue
+
+        ids, dates, values = zip(*rows)
+        ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+        dates = np.array(dates, dtype='datetime64[D]')
+        values = np.array(values, dtype=np.float64)
+
+        # 按指标ID切分（数据已按指标排序）
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        for id_part, date_part, value_part in zip(np.split(ids, bounds),
+                                                  np.split(dates, bounds),
+                                                  np.split(values, bounds)):
+            series[int(id_part[0])] = SeriesArrays(dates=date_part, values=value_part)
+
+    return series
+
+
+def load_series(indicator_id: int, start_date=None, end_date=None) -> Optional[SeriesArrays]:
+    """加载单个指标的时间序列"""
+    return load_series_arrays([indicator_id], start_date, end_date).get(indicator_id)
+
+
+def _as_of_bound(as_of) -> datetime:
+    """as-of 时点：日期表示当天结束时（当天采集的数据可见）"""
+    if isinstance(as_of, str):
+        as_of = datetime.strptime(as_of, '%Y-%m-%d').date()
+    if not isinstance(as_of, datetime):
+        as_of = datetime.combine(as_of + timedelta(days=1), time.min) - timedelta(microseconds=1)
+    if timezone.is_naive(as_of):
+        as_of = timezone.make_aware(as_of)
+    return as_of
+
+
+def load_vintage_arrays(indicator_ids: Iterable[int],
+                        as_of,
+                        start_date=None,
+                        end_date=None) -> Dict[int, SeriesArrays]:
+    """
+    批量加载指标在 as_of 时点可见的时间序列（每个日期取截至该时点的最新版本）
+
+    Args:
+        indicator_ids: 指标ID列表
+        as_of: 时点（date 或 datetime）
+        start_date: 开始日期（含）
+        end_date: 结束日期（含）
+
+    Returns:
+        Dict[int, SeriesArrays]: 指标ID -> 时间序列，无数据的指标不包含在结果中
+    """
+    indicator_ids = sorted(set(indicator_ids))
+    bound = _as_of_bound(as_of)
+    series: Dict[int, SeriesArrays] = {}
+
+    for i in range(0, len(indicator_ids), ID_CHUNK_SIZE):
+        queryset = IndicatorDataVintage.objects.filter(
+            indicator_id__in=indicator_ids[i:i + ID_CHUNK_SIZE], known_from__lte=bound
+        )
+        if start_date:
+            queryset = queryset.filter(date__gte=start_date)
+        if end_date:
+            queryset = queryset.filter(date__lte=end_date)
+
+        rows = list(
+            queryset.order_by('indicator_id', 'date', 'known_from').values_list('indicator_id', 'date', 'value')
+        )
+        if not rows:
+            continue
+
+        ids, dates, values = zip(*rows)
+        ids = np.fromiter(ids, dtype=np.int64, count=len(rows))
+        dates = np.array(dates, dtype='datetime64[D]')
+        values = np.array(values, dtype=np.float64)
+
+        # 同一指标同一日期只保留最后一个（最新）版本
+        is_last = np.ones(len(rows), dtype=bool)
+        is_last[:-1] = (ids[1:] != ids[:-1]) | (dates[1:] != dates[:-1])
+        ids, dates, values = ids[is_last], dates[is_last], values[is_last]
+
+        bounds = np.flatnonzero(np.diff(ids)) + 1
+        for id_part, date_part, value_part in zip(np.split(ids, bounds),
+                                                  np.split(dates, bounds),
+                                                  np.split(values, bounds)):
+            series[int(id_part[0])] = SeriesArrays(dates=date_part, values=value_part)
+
+    return series
+
+
+def get_series(code: str, as_of=None, start_date=None, end_date=None) -> Optional[SeriesArrays]:
+    """
+    按指标代码读取时间序列
+
+    Args:
+        code: 指标代码
+        as_of: 时点，None表示最新版本（直接读取 IndicatorData）
+
+    Returns:
+        SeriesArrays 或 None（无数据）
+    """
+    indicator_id = Indicator.objects.filter(code=code).values_list('id', flat=True).first()
+    if indicator_id is None:
+        raise ValueError(f"指标不存在: {code}")
+    if as_of is None:
+        return load_series(indicator_id, start_date, end_date)
+    return load_vintage_arrays([indicator_id], as_of, start_date, end_date).get(indicator_id)
+
+
+def save_series(indicator_id: int,
+                dates: np.ndarray,
+                values: np.ndarray,
+                source_system: Optional[str] = None,
+                confidence_score: Optional[float] = None,
+                known_from: Optional[datetime] = None,
+                batch_size: int = 1000) -> Tuple[int, int]:
+    """
+    保存采集数据：与已有最新值比较，批量新增/更新变化的数据点，
+    并为这些数据点追加版本记录（未变化的数据点不写入）
+
+    同一 known_from 多次调用（如分块导入）时，已由本次写入的日期再次出现则覆盖该版本，
+    与同一批数据中重复的日期一样以最后一个为准，不计入新增或修订数
+
+    Args:
+        indicator_id: 指标ID
+        dates: datetime64[D] 日期
+        values: 数值，NaN 跳过
+        source_system: 来源系统标识
+        confidence_score: 置信度（0-1），可选
+        known_from: 本次数据的可知时间，默认当前时间
+
+    Returns:
+        (新增数, 修订数)
+    """
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    values = np.asarray(values, dtype=np.float64)
+    valid = np.isfinite(values) & ~np.isnat(dates)
+    if not valid.any():
+        return 0, 0
+
+    # 同一日期出现多次时以最后一个为准
+    incoming = dict(zip(dates[valid].astype(object), values[valid].tolist()))
+    known_from = known_from or timezone.now()
+
+    existing = {
+        row.date: row
+        for row in IndicatorData.objects.filter(
+            indicator_id=indicator_id, date__gte=min(incoming), date__lte=max(incoming)
+        ).only('id', 'date', 'value', 'collection_time')
+    }
+
+    to_create, to_update, vintages = [], [], []
+    rewritten: Dict = {}  # 日期 -> 覆盖本次已写入版本的数值
+    for date, value in incoming.items():
+        row = existing.get(date)
+        if row is None:
+            to_create.append(IndicatorData(
+                indicator_id=indicator_id, date=date, value=value, raw_value=value,
+                calculated_value=value, confidence_score=confidence_score, source_system=source_system,
+                collection_time=known_from,
+            ))
+        elif abs(row.value - value) > VALUE_TOLERANCE:
+            rewrite = row.collection_time == known_from  # 本次已写入过该日期
+            row.value = row.raw_value = row.calculated_value = value
+            row.confidence_score = confidence_score
+            row.source_system = source_system
+            row.collection_time = known_from
+            to_update.append(row)
+            if rewrite:
+                rewritten[date] = value
+                continue
+        else:
+            continue
+        vintages.append(IndicatorDataVintage(
+            indicator_id=indicator_id, date=date, value=value,
+            known_from=known_from, source_system=source_system,
+        ))
+
+    with transaction.atomic():
+        if to_create:
+            IndicatorData.objects.bulk_create(to_create, batch_size=batch_size)
+        if to_update:
+            IndicatorData.objects.bulk_update(
+                to_update,
+                ['value', 'raw_value', 'calculated_value', 'confidence_score', 'source_system', 'collection_time'],
+                batch_size=batch_size,
+            )
+        if vintages:
+            IndicatorDataVintage.objects.bulk_create(vintages, batch_size=batch_size)
+        if rewritten:
+            versions = list(IndicatorDataVintage.objects.filter(
+                indicator_id=indicator_id, known_from=known_from, date__in=list(rewritten)
+            ))
+            for version in versions:
+                version.value = rewritten[version.date]
+                version.source_system = source_system
+            IndicatorDataVintage.objects.bulk_update(versions, ['value', 'source_system'], batch_size=batch_size)
+    return len(to_create), len(to_update) - len(rewritten)
+
+
+def data_version(indicator_ids: Iterable[int]) -> str:
+    """
+    指标集合的数据版本标识
+    由数据点数量、最大ID与最新采集时间组成，数据有增删或重新采集时会变化
+    """
+    stats = IndicatorData.objects.filter(indicator_id__in=sorted(set(indicator_ids))).aggregate(
+        count=Count('id'), max_id=Max('id'), last_collected=Max('collection_time')
+    )
+    last_collected = stats['last_collected'].isoformat() if stats['last_collected'] else ''
+    return f"{stats['count']}:{stats['max_id'] or 0}:{last_collected}"
+
+
+def sync_derived_series(indicator_id: int,
+                        dates: np.ndarray,
+                        values: np.ndarray,
+                        source_system: str,
+                        confidence: Optional[np.ndarray] = None,
+                        batch_size: int = 1000) -> Tuple[int, int, int]:
+    """
+    将计算得到的派生序列（复合指标、因子得分等）同步到 IndicatorData
+    与已有数据比较，只新增/更新有变化的数据点，删除不再存在的日期
+
+    Args:
+        indicator_id: 派生指标ID
+        dates: datetime64[D] 日期
+        values: 数值，NaN表示该期无值
+        source_system: 来源系统标识
+        confidence: 各期置信度（0-1），可选
+
+    Returns:
+        (新增数, 更新数, 删除数)
+    """
+    valid = np.isfinite(values)
+    if confidence is None:
+        confidence = np.full(len(values), np.nan)
+    target = {
+        date: (float(value), None if not np.isfinite(score) else min(float(score), 1.0))
+        for date, value, score in zip(dates[valid].astype(object), values[valid], confidence[valid])
+    }
+
+    existing = {
+        row.date: row
+        for row in IndicatorData.objects.filter(indicator_id=indicator_id).only('id', 'date', 'value')
+    }
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for date, (value, score) in target.items():
+        row = existing.get(date)
+        if row is None:
+            to_create.append(IndicatorData(
+                indicator_id=indicator_id, date=date, value=value, calculated_value=value,
+                confidence_score=score, source_system=source_system,
+            ))
+        elif abs(row.value - value) > VALUE_TOLERANCE:
+            row.value = value
+            row.calculated_value = value
+            row.confidence_score = score
+            row.collection_time = now
+            to_update.append(row)
+    stale = [row.pk for date, row in existing.items() if date not in target]
+
+    if stale:
+        IndicatorData.objects.filter(pk__in=stale).delete()
+    if to_create:
+        IndicatorData.objects.bulk_create(to_create, batch_size=batch_size)
+    if to_update:
+        IndicatorData.objects.bulk_update(
+            to_update, ['value', 'calculated_value', 'confidence_score', 'collection_time'],
+            batch_size=batch_size,
+        )
+    return len(to_create), len(to_update), len(stale)
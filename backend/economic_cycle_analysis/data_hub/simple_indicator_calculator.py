@@ -7,8 +7,10 @@ import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 from django.db import transaction
+from .frequency import normalize_frequency
 from .models import Indicator, IndicatorData, IndicatorCategory
 from .indicators_config_simple_calc import get_simple_calc_indicators, get_executable_calc_indicators
+from .series_matrix import align_pandas_series
 import logging
 
 logger = logging.getLogger(__name__)
@@ -129,19 +131,10 @@ class SimpleIndicatorCalculator:
             logger.warning(f"No dependency data available for {indicator_code}")
             return pd.Series(dtype=float)
         
-        # 对齐时间序列
+        # 按目标指标频率协调各依赖序列：高频序列期内聚合，低频序列按发布时滞沿用
         if len(data_dict) > 1:
-            common_dates = None
-            for series in data_dict.values():
-                if common_dates is None:
-                    common_dates = set(series.index)
-                else:
-                    common_dates = common_dates.intersection(set(series.index))
-            
-            if common_dates:
-                common_dates = sorted(list(common_dates))
-                for code, series in data_dict.items():
-                    data_dict[code] = series.reindex(common_dates)
+            frequency = normalize_frequency(calc_config.get("frequency"))
+            data_dict = align_pandas_series(data_dict, frequency, calc_config.get("aggregation", "last"))
         
         # 计算表达式
         result = self.evaluate_expression_safe(expression, data_dict)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+数据源健康度统计
+按数据源记录每次采集的耗时与成败：
+1. 耗时直方图（对数分桶，内存固定），用于估计延迟分位数（如对冲请求的触发时间）
+2. 成功率的指数加权平均，结合延迟得到健康评分，用于动态调整数据源优先级
+"""
+
+import math
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# 直方图分桶：10ms ~ 约20分钟，每个数量级10个桶
+_MIN_LATENCY = 0.01
+_BUCKETS_PER_DECADE = 10
+_N_BUCKETS = 52
+
+# 样本不足时的默认延迟分位数（秒）
+DEFAULT_LATENCY = 5.0
+MIN_SAMPLES = 5
+
+# 成功率指数加权系数
+SUCCESS_DECAY = 0.2
+
+# 延迟达到该值（秒）时健康评分减半
+LATENCY_HALF_SCORE = 10.0
+
+
+class LatencyHistogram:
+    """对数分桶的耗时直方图"""
+
+    def __init__(self):
+        self.counts = [0] * _N_BUCKETS
+        self.total = 0
+
+    @staticmethod
+    def _bucket(seconds: float) -> int:
+        if seconds <= _MIN_LATENCY:
+            return 0
+        index = int(math.log10(seconds / _MIN_LATENCY) * _BUCKETS_PER_DECADE) + 1
+        return min(index, _N_BUCKETS - 1)
+
+    @staticmethod
+    def _upper_bound(bucket: int) -> float:
+        return _MIN_LATENCY * 10 ** (bucket / _BUCKETS_PER_DECADE)
+
+    def record(self, seconds: float):
+        self.counts[self._bucket(seconds)] += 1
+        self.total += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        """分位数（取所在桶的上界），无样本时返回None"""
+        if self.total == 0:
+            return None
+        target = q * self.total
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return self._upper_bound(bucket)
+        return self._upper_bound(_N_BUCKETS - 1)
+
+
+class SourceHealth:
+    """单个数据源的耗时与成功率"""
+
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.success_rate = 1.0
+        self.successes = 0
+        self.failures = 0
+
+    def record(self, seconds: float, success: bool):
+        self.latency.record(seconds)
+        self.success_rate += SUCCESS_DECAY * ((1.0 if success else 0.0) - self.success_rate)
+        if success:
+            self.successes += 1
+        else:
+            self.failures += 1
+
+    @property
+    def score(self) -> float:
+        """健康评分（0-1）：成功率 × 延迟折扣，样本不足时按默认延迟估计"""
+        median = self.latency.percentile(0.5)
+        if self.latency.total < MIN_SAMPLES:
+            median = DEFAULT_LATENCY
+        return self.success_rate * LATENCY_HALF_SCORE / (LATENCY_HALF_SCORE + median)
+
+    def to_dict(self) -> Dict:
+        return {
+            'samples': self.latency.total,
+            'successes': self.successes,
+            'failures': self.failures,
+            'success_rate': round(self.success_rate, 4),
+            'p50': self.latency.percentile(0.5),
+            'p90': self.latency.percentile(0.9),
+            'score': round(self.score, 4),
+        }
+
+
+class SourceHealthRegistry:
+    """进程内共享的数据源健康度（线程安全）"""
+
+    def __init__(self):
+        self._sources: Dict[str, SourceHealth] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, source: str) -> SourceHealth:
+        health = self._sources.get(source)
+        if health is None:
+            health = self._sources.setdefault(source, SourceHealth())
+        return health
+
+    def record(self, source: str, seconds: float, success: bool):
+        with self._lock:
+            self._get(source).record(seconds, success)
+
+    def latency_percentile(self, source: str, q: float, default: float = DEFAULT_LATENCY) -> float:
+        """延迟分位数，样本不足时返回 default"""
+        with self._lock:
+            health = self._sources.get(source)
+            if health is None or health.latency.total < MIN_SAMPLES:
+                return default
+            return health.latency.percentile(q)
+
+    def score(self, source: str) -> float:
+        with self._lock:
+            health = self._sources.get(source)
+            if health is None:
+                return LATENCY_HALF_SCORE / (LATENCY_HALF_SCORE + DEFAULT_LATENCY)
+            return health.score
+
+    def rank(self, sources: Iterable[str]) -> List[str]:
+        """按健康评分从高到低排序（评分相同时保持原有优先级）"""
+        sources = list(sources)
+        scores = {source: self.score(source) for source in sources}
+        return sorted(sources, key=lambda source: -scores[source])
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {source: health.to_dict() for source, health in self._sources.items()}
+
+
+_registry = SourceHealthRegistry()
+
+
+def get_source_health() -> SourceHealthRegistry:
+    """获取进程内共享的数据源健康度"""
+    return _registry
@@ -1,3 +1,1298 @@
-from django.test import TestCase
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
 
-# Create your tests here.
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase
+
+# 导入 data_hub.urls（含视图、序列化器、路由）的耗时预算，单位：毫秒
+IMPORT_TIME_BUDGET_MS = 1000
+
+# 只读API流量不应加载的重型依赖
+HEAVY_MODULES = ('akshare', 'WindPy', 'pandas')
+
+
+def _create_indicator(code, **fields):
+    """创建测试指标（分类按需创建）"""
+    from data_hub.models import Indicator, IndicatorCategory
+
+    category, _ = IndicatorCategory.objects.get_or_create(code='TEST', defaults={'name': '测试分类'})
+    fields.setdefault('name', code)
+    fields.setdefault('lead_lag_status', Indicator.LeadLag.SYNCHRONOUS)
+    fields.setdefault('source', 'test')
+    return Indicator.objects.create(code=code, category=category, **fields)
+
+
+class ImportTimeBudgetTest(SimpleTestCase):
+    """启动耗时测试：使用 python -X importtime 在子进程中测量"""
+
+    def _run_importtime(self, module):
+        code = (
+            "import sys, django; django.setup(); "
+            f"import {module}; "
+            f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+        )
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=str(settings.BASE_DIR),
+            env=os.environ.copy(),
+            capture_output=True,
+            text=True,
+            timeout=120,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr[-2000:])
+
+        # 输出格式: "import time: self [us] | cumulative | imported package"
+        cumulative = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or '|' not in line:
+                continue
+            parts = line[len('import time:'):].split('|')
+            try:
+                cumulative[parts[2].strip()] = int(parts[1])
+            except ValueError:
+                continue  # 表头
+        loaded = [m for m in proc.stdout.strip().split(',') if m]
+        return cumulative, loaded
+
+    def test_urls_do_not_load_heavy_dependencies(self):
+        _, loaded = self._run_importtime('data_hub.urls')
+        self.assertEqual(loaded, [], f"导入 data_hub.urls 时加载了重型依赖: {loaded}")
+
+    def test_urls_import_time_within_budget(self):
+        cumulative, _ = self._run_importtime('data_hub.urls')
+        elapsed_ms = cumulative.get('data_hub.urls', 0) / 1000
+        self.assertLess(
+            elapsed_ms, IMPORT_TIME_BUDGET_MS,
+            f"导入 data_hub.urls 耗时 {elapsed_ms:.0f}ms，超出预算 {IMPORT_TIME_BUDGET_MS}ms"
+        )
+
+
+class ReplayTest(SimpleTestCase):
+    """录制/回放：不依赖网络，经由采集器原有的抓取接口回放夹具"""
+
+    def setUp(self):
+        self.fixture_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.fixture_dir, True)
+
+    def test_replay_through_collector_fetch_interfaces(self):
+        import pandas as pd
+
+        from data_hub.circuit_breaker import CircuitBreakerRegistry
+        from data_hub.enhanced_data_collector import EnhancedDataCollector
+        from data_hub.replay import FixtureStore, RecordingWindPy, replay_upstreams
+        from data_hub.wind_session import FakeWindPy
+
+        store = FixtureStore(self.fixture_dir)
+        dates = pd.date_range('2020-01-01', periods=24, freq='MS').strftime('%Y-%m-%d')
+        store.save_akshare('index_zh_a_hist', {'symbol': '000001'}, pd.DataFrame({'日期': dates, '收盘': range(24)}))
+        fake_wind = FakeWindPy(periods=24)
+        fake_wind.start()
+        RecordingWindPy(fake_wind, store).edb('M0000612,M0001227', '2020-01-01', '2021-12-31')
+
+        with replay_upstreams(self.fixture_dir) as replay:
+            collector = EnhancedDataCollector()
+            collector.circuit_breakers = CircuitBreakerRegistry()
+            data_df = collector._fetch_data_from_akshare(
+                {'func': 'index_zh_a_hist', 'params': {'symbol': '000001'}}, '2021-01-01', '2021-06-30'
+            )
+            self.assertEqual(list(data_df['收盘']), [12, 13, 14, 15, 16, 17])
+
+            wind_collector = replay.wind_collector()
+            wind_collector.circuit_breakers = CircuitBreakerRegistry()
+            wind_df = wind_collector._fetch_data_from_wind(
+                {'wind_code': 'M0001227', 'data_type': 'macro'}, '2020-01-01', '2020-03-31'
+            )
+            self.assertEqual(len(wind_df), 3)
+            self.assertIsNone(collector._fetch_data_from_akshare({'func': 'macro_missing', 'params': {}}))
+            self.assertEqual(replay.stats()['akshare']['calls'], 2)
+
+
+class QualityEngineTest(SimpleTestCase):
+    """质量评分：合成月度序列（缺口、同期重复、跳变、非有限值、发布滞后）"""
+
+    def _monthly(self):
+        import numpy as np
+
+        dates = np.arange('2020-01', '2023-01', dtype='datetime64[M]').astype('datetime64[D]')
+        values = 100 + np.arange(36.0)
+        return dates, values
+
+    def test_clean_series_scores_full(self):
+        from datetime import date
+
+        from data_hub.quality_engine import measure_series
+        from data_hub.series_store import SeriesArrays
+
+        dates, values = self._monthly()
+        metrics = measure_series(SeriesArrays(dates, values), 'M', date(2023, 1, 20))
+        self.assertEqual(metrics.periods_expected, 36)
+        self.assertEqual(metrics.outlier_count, 0)
+        self.assertEqual(metrics.overall_score, 1.0)
+
+    def test_defects_lower_each_dimension(self):
+        from datetime import date
+
+        import numpy as np
+
+        from data_hub.frequency import normalize_frequency
+        from data_hub.quality_engine import measure_series
+        from data_hub.series_store import SeriesArrays
+
+        dates, values = self._monthly()
+        keep = ~np.isin(dates, np.array(['2021-03-01', '2021-04-01'], dtype='datetime64[D]'))
+        dates, values = dates[keep], values[keep]
+        values[10] += 50                                   # 跳变：上跳与回落两个变化量
+        dates = np.insert(dates, 6, np.datetime64('2020-06-15'))
+        values = np.insert(values, 6, values[5])           # 同月重复
+        values[20] = np.nan
+        series = SeriesArrays(dates, values)
+        self.assertEqual(normalize_frequency(None, dates), 'M')
+
+        metrics = measure_series(series, 'M', date(2023, 1, 20))
+        self.assertEqual((metrics.observations, metrics.periods_observed, metrics.periods_expected), (35, 34, 36))
+        self.assertEqual((metrics.gap_count, metrics.missing_periods, metrics.duplicate_periods), (1, 2, 1))
+        self.assertEqual((metrics.outlier_count, metrics.non_finite_count), (2, 1))
+        self.assertAlmostEqual(metrics.completeness_score, 34 / 36, places=4)
+        self.assertAlmostEqual(metrics.accuracy_score, 1 - 3 / 35, places=4)
+        self.assertAlmostEqual(metrics.consistency_score, 1 - 2 / 33, places=4)
+        self.assertEqual(metrics.timeliness_score, 1.0)
+
+        # 超过两个更新周期后及时性线性衰减
+        stale = measure_series(series, 'M', date(2023, 3, 1))
+        self.assertEqual(stale.staleness_days, 90)
+        self.assertAlmostEqual(stale.timeliness_score, 1 - (90 - 62) / 62, places=4)
+
+
+class AnomalyDetectionTest(TestCase):
+    """异常检测：尖峰只标记一次，随机游走基本不误报，状态写入不覆盖其他元数据"""
+
+    def test_spike_flags_only_the_spike(self):
+        import numpy as np
+
+        from data_hub.anomaly_detection import AnomalyDetectionConfig, detect_anomalies
+
+        values = np.random.default_rng(1).normal(size=120)
+        values[40] += 15
+        flags = detect_anomalies(values, AnomalyDetectionConfig(), check_stale=False)
+        self.assertEqual(list(np.flatnonzero(flags)), [40])
+
+    def test_level_shift_flags_only_the_break(self):
+        import numpy as np
+
+        from data_hub.anomaly_detection import AnomalyDetectionConfig, detect_anomalies
+
+        values = np.random.default_rng(1).normal(size=120) + 100
+        values[60:] += 15
+        flags = detect_anomalies(values, AnomalyDetectionConfig(), check_stale=False)
+        self.assertEqual(list(np.flatnonzero(flags)), [60])
+
+    def test_random_walk_has_few_false_flags(self):
+        import numpy as np
+
+        from data_hub.anomaly_detection import AnomalyDetectionConfig, detect_anomalies
+
+        config = AnomalyDetectionConfig()
+        flagged = sum(
+            int(detect_anomalies(np.cumsum(np.random.default_rng(seed).normal(size=250)), config, False).sum())
+            for seed in range(20)
+        )
+        self.assertLessEqual(flagged, 5)  # 20条 × 250点
+
+    def test_state_write_keeps_other_metadata_keys(self):
+        from datetime import date, timedelta
+
+        from data_hub.anomaly_detection import STATE_KEY, AnomalyDetectionResult, AnomalyDetector
+        from data_hub.models import Indicator, IndicatorData
+
+        indicator = _create_indicator('TEST_ANOMALY', metadata={'publication_lag_days': 30})
+        IndicatorData.objects.bulk_create([
+            IndicatorData(indicator=indicator, date=date(2020, 1, 1) + timedelta(days=i), value=float(i % 5))
+            for i in range(40)
+        ])
+
+        detector = AnomalyDetector()
+        selected = detector._select_indicators(['TEST_ANOMALY'], False, AnomalyDetectionResult())
+        # 检测期间其他模块写入元数据
+        Indicator.objects.filter(pk=indicator.pk).update(metadata={'publication_lag_days': 45, 'source_note': 'x'})
+        detector._process_chunk(selected, AnomalyDetectionResult())
+
+        metadata = Indicator.objects.get(pk=indicator.pk).metadata
+        self.assertEqual(metadata['publication_lag_days'], 45)
+        self.assertEqual(metadata['source_note'], 'x')
+        self.assertEqual(metadata[STATE_KEY]['last_date'], '2020-02-09')
+
+    def test_turning_point_state_merges_per_frequency(self):
+        from datetime import datetime
+
+        from data_hub.models import Indicator
+        from data_hub.turning_points import STATE_KEY, TurningPointDetector
+
+        indicator = _create_indicator('TEST_TP', metadata={STATE_KEY: {'Q': '2024-01-01T00:00:00'}})
+        stale = {'TEST_TP': {'id': indicator.pk, 'metadata': dict(indicator.metadata)}}
+        Indicator.objects.filter(pk=indicator.pk).update(
+            metadata={STATE_KEY: {'Q': '2024-01-01T00:00:00'}, 'publication_lag_days': 30}
+        )
+        TurningPointDetector(frequency='M')._save_state(stale, datetime(2024, 6, 1))
+
+        metadata = Indicator.objects.get(pk=indicator.pk).metadata
+        self.assertEqual(metadata['publication_lag_days'], 30)
+        self.assertEqual(metadata[STATE_KEY], {'Q': '2024-01-01T00:00:00', 'M': '2024-06-01T00:00:00'})
+
+
+class CycleEngineTest(SimpleTestCase):
+    """周期分解：HP带状求解与稠密解一致，日度频率与超长序列不构建超大权重矩阵"""
+
+    def test_banded_hp_matches_dense_solve(self):
+        import numpy as np
+
+        from data_hub.cycle_engine import hp_trend
+
+        n, lam = 120, 1600.0
+        second_diff = np.zeros((n - 2, n))
+        rows = np.arange(n - 2)
+        second_diff[rows, rows], second_diff[rows, rows + 1], second_diff[rows, rows + 2] = 1.0, -2.0, 1.0
+        values = np.cumsum(np.random.default_rng(0).normal(size=(n, 3)), axis=0)
+        dense = np.linalg.solve(np.eye(n) + lam * second_diff.T @ second_diff, values)
+        np.testing.assert_allclose(hp_trend(values, lam), dense, atol=1e-8)
+
+    def test_rejects_unsupported_frequency(self):
+        from data_hub.cycle_engine import analyze_cycles
+
+        with self.assertRaises(ValueError):
+            analyze_cycles(['GDP'], frequency='D')
+
+    def test_long_span_filters_only_recent_periods(self):
+        import numpy as np
+
+        from data_hub.cycle_engine import MAX_FILTER_PERIODS, bandpass_matrix
+
+        n = MAX_FILTER_PERIODS + 100
+        values = np.cumsum(np.random.default_rng(0).normal(size=(n, 2)), axis=0)
+        for method in ('cf', 'hp'):
+            cycles = bandpass_matrix(values, 18, 96, method)
+            self.assertTrue(np.isnan(cycles[:100]).all())
+            self.assertTrue(np.isfinite(cycles[101:-1]).all())
+
+
+class TurningPointsTest(SimpleTestCase):
+    """拐点识别：带噪正弦（周期48期）的峰谷交替、阶段/周期长度规则、首尾删失与确认标记"""
+
+    PERIOD = 48
+
+    def _matrix(self, n=190):
+        import numpy as np
+
+        from data_hub.series_matrix import AlignedMatrix
+
+        t = np.arange(n)
+        noisy = 10 * np.sin(2 * np.pi * t / self.PERIOD) + np.random.default_rng(0).normal(0, 1.0, n)
+        truncated = noisy.copy()
+        truncated[160:] = np.nan    # B 在第159期之后停止更新
+        return AlignedMatrix('M', np.arange(600, 600 + n), ['A', 'B'], np.column_stack([noisy, truncated]))
+
+    def test_noisy_sine_alternates_and_respects_rules(self):
+        from data_hub.turning_points import PEAK, TROUGH, BryBoschanRules, detect_turning_points
+
+        matrix = self._matrix()
+        params = BryBoschanRules().periods('M')
+        points = detect_turning_points(matrix)['A']
+
+        self.assertEqual([p.point_type for p in points], [PEAK, TROUGH] * 4)
+        for point in points:
+            # 峰在 12+48k 附近，谷在 36+48k 附近
+            phase = 12 if point.point_type == PEAK else 36
+            offset = (point.index - phase) % self.PERIOD
+            self.assertLessEqual(min(offset, self.PERIOD - offset), 3)
+        for previous, point in zip(points, points[1:]):
+            self.assertGreaterEqual(point.index - previous.index, params['min_phase'])
+            self.assertEqual(point.duration, point.index - previous.index)
+            self.assertAlmostEqual(point.amplitude, point.value - previous.value)
+        for previous, point in zip(points, points[2:]):
+            self.assertGreaterEqual(point.index - previous.index, params['min_cycle'])
+        self.assertIsNone(points[0].duration)
+
+    def test_end_censoring_and_confirmation(self):
+        from data_hub.turning_points import BryBoschanRules, detect_turning_points
+
+        matrix = self._matrix()
+        params = BryBoschanRules().periods('M')
+        detected = detect_turning_points(matrix)
+
+        for code, last_valid in (('A', len(matrix.periods) - 1), ('B', 159)):
+            points = detected[code]
+            for point in points:
+                self.assertGreaterEqual(point.index, params['censor'])
+                self.assertLessEqual(point.index, last_valid - params['censor'])
+                self.assertEqual(point.confirmed, last_valid - point.index >= params['confirm'])
+
+        # A 末个谷距序列末端不足15期，尚未确认
+        self.assertEqual(detected['A'][-1].index, 178)
+        self.assertFalse(detected['A'][-1].confirmed)
+        # B 在第156期附近的峰落入末端删失区间
+        self.assertEqual([p.index for p in detected['B']], [p.index for p in detected['A'][:6]])
+
+    def test_duration_rules_drop_short_phase_and_cycle(self):
+        import numpy as np
+
+        from data_hub.turning_points import PEAK, TROUGH, _apply_duration_rules
+
+        series = np.zeros(60)
+        series[[5, 24]], series[[20, 40]] = (10.0, 4.0), (-10.0, -8.0)
+        # 谷20与峰24只隔4期：阶段过短，整对删除
+        short_phase = [(5, PEAK), (20, TROUGH), (24, PEAK), (40, TROUGH)]
+        self.assertEqual(_apply_duration_rules(short_phase, series, 6, 15), [(5, PEAK), (40, TROUGH)])
+
+        series[[5, 18]], series[12] = (10.0, 8.0), -3.0
+        # 峰5与峰18只隔13期：周期过短，删除较弱的峰18及中间的谷12
+        short_cycle = [(5, PEAK), (12, TROUGH), (18, PEAK), (40, TROUGH)]
+        self.assertEqual(_apply_duration_rules(short_cycle, series, 6, 15), [(5, PEAK), (40, TROUGH)])
+
+    def test_rejects_unsupported_frequency(self):
+        import numpy as np
+
+        from data_hub.series_matrix import AlignedMatrix
+        from data_hub.turning_points import detect_turning_points
+
+        with self.assertRaises(ValueError):
+            detect_turning_points(AlignedMatrix('D', np.arange(30), ['A'], np.zeros((30, 1))))
+
+
+class LeadLagTest(SimpleTestCase):
+    """领先滞后：掩码FFT互相关与逐滞后期的成对Pearson相关一致，已知平移序列给出正确的最佳滞后与符号"""
+
+    def _series(self, n=150):
+        import numpy as np
+
+        rng = np.random.default_rng(0)
+        base = rng.normal(size=n + 20).cumsum()
+        target = base[10:10 + n]
+        candidates = np.column_stack([
+            base[16:16 + n] + 0.2 * rng.normal(size=n),     # 领先目标6期
+            -base[7:7 + n] + 0.2 * rng.normal(size=n),      # 滞后目标3期且反向
+            rng.normal(size=n).cumsum(),
+        ])
+        target[rng.random(n) < 0.1] = np.nan
+        candidates[rng.random(candidates.shape) < 0.15] = np.nan
+        candidates[:40, 2] = np.nan
+        return target, candidates
+
+    def test_matches_brute_force_pearson(self):
+        import numpy as np
+
+        from data_hub.lead_lag import masked_cross_correlation
+
+        target, candidates = self._series()
+        max_lag, min_overlap = 12, 85
+        lags, correlations, overlaps = masked_cross_correlation(target, candidates, max_lag, min_overlap)
+        np.testing.assert_array_equal(lags, np.arange(-max_lag, max_lag + 1))
+
+        for lag in (-12, -5, -3, 0, 4, 6, 12):
+            row = lag + max_lag
+            for j in range(candidates.shape[1]):
+                # 滞后期 lag：target[t] 与 candidates[t - lag] 配对
+                if lag >= 0:
+                    x, y = target[lag:], candidates[:len(target) - lag, j]
+                else:
+                    x, y = target[:lag], candidates[-lag:, j]
+                both = np.isfinite(x) & np.isfinite(y)
+                self.assertEqual(overlaps[row, j], both.sum())
+                if both.sum() < min_overlap:
+                    self.assertTrue(np.isnan(correlations[row, j]))
+                else:
+                    self.assertAlmostEqual(correlations[row, j], np.corrcoef(x[both], y[both])[0, 1], places=8)
+        # C 缺失前40期，部分滞后期重叠不足
+        self.assertTrue(np.isnan(correlations[:, 2]).any() and np.isfinite(correlations[:, 2]).any())
+
+    def test_shifted_series_best_lag_and_sign(self):
+        from data_hub.lead_lag import LeadLagProfile, masked_cross_correlation
+        from data_hub.models import Indicator
+
+        target, candidates = self._series()
+        lags, correlations, overlaps = masked_cross_correlation(target, candidates[:, :2], 12, 36)
+        best = LeadLagProfile('TARGET', 'M', 'level', lags, ['LEAD', 'LAG'], correlations, overlaps).best()
+
+        self.assertEqual(best['LEAD']['best_lag'], 6)
+        self.assertGreater(best['LEAD']['correlation'], 0.9)
+        self.assertEqual(best['LEAD']['estimated_status'], Indicator.LeadLag.LEADING)
+        self.assertEqual(best['LAG']['best_lag'], -3)
+        self.assertLess(best['LAG']['correlation'], -0.9)
+        self.assertEqual(best['LAG']['estimated_status'], Indicator.LeadLag.LAGGING)
+
+
+class CompositeEngineTest(SimpleTestCase):
+    """复合指标：扩展窗口标准化，缺失成分按剩余权重重新归一化，覆盖率不足的期为NaN"""
+
+    def _matrix(self):
+        import numpy as np
+
+        from data_hub.series_matrix import AlignedMatrix
+
+        rng = np.random.default_rng(0)
+        values = rng.normal(size=(24, 3)).cumsum(axis=0)
+        values[18:, 2] = np.nan    # C 最后6期缺失
+        return AlignedMatrix('M', np.arange(600, 624), ['A', 'B', 'C'], values)
+
+    def _zscore(self, column, min_history=12):
+        """逐期只用截至当期的数据标准化"""
+        import numpy as np
+
+        z = np.full(len(column), np.nan)
+        for t in range(len(column)):
+            history = column[:t + 1][np.isfinite(column[:t + 1])]
+            if np.isfinite(column[t]) and len(history) >= min_history:
+                z[t] = (column[t] - history.mean()) / history.std(ddof=1)
+        return z
+
+    def test_missing_component_renormalizes_weights(self):
+        import numpy as np
+
+        from data_hub.composite_engine import ComponentSpec, CompositeSpec, evaluate_composites
+        from data_hub.models import CompositeIndicator
+
+        matrix = self._matrix()
+        spec = CompositeSpec(
+            code='COMPOSITE',
+            method=CompositeIndicator.CalculationMethod.WEIGHTED_AVERAGE,
+            components=[ComponentSpec('A', 2.0), ComponentSpec('B', 1.0), ComponentSpec('C', 1.0)],
+            min_coverage=0.5,
+        )
+        series = evaluate_composites(matrix, [spec])['COMPOSITE']
+        za, zb, zc = (self._zscore(matrix.column(code)) for code in 'ABC')
+
+        # 月频至少12期历史，之前各成分都视为缺失
+        self.assertTrue(np.isnan(series.values[:11]).all())
+        np.testing.assert_allclose(series.coverage[:11], 0.0)
+        np.testing.assert_allclose(series.values[11:18], (2 * za + zb + zc)[11:18] / 4)
+        np.testing.assert_allclose(series.values[18:], (2 * za + zb)[18:] / 3)
+        np.testing.assert_allclose(series.coverage[11:18], 1.0)
+        np.testing.assert_allclose(series.coverage[18:], 0.75)
+
+    def test_new_observations_leave_history_unchanged(self):
+        import numpy as np
+
+        from data_hub.composite_engine import ComponentSpec, CompositeSpec, evaluate_composites
+        from data_hub.models import CompositeIndicator
+        from data_hub.series_matrix import AlignedMatrix
+
+        matrix = self._matrix()
+        spec = CompositeSpec(
+            code='COMPOSITE',
+            method=CompositeIndicator.CalculationMethod.WEIGHTED_AVERAGE,
+            components=[ComponentSpec('A', 1.0, 'diff'), ComponentSpec('B', -1.0, lag_periods=1)],
+        )
+        earlier = AlignedMatrix('M', matrix.periods[:20], matrix.codes, matrix.values[:20])
+        before = evaluate_composites(earlier, [spec])['COMPOSITE'].values
+        after = evaluate_composites(matrix, [spec])['COMPOSITE'].values
+        np.testing.assert_array_equal(after[:20], before)
+        self.assertTrue(np.isfinite(after[20:]).all())
+
+    def test_coverage_below_minimum_is_nan(self):
+        import numpy as np
+
+        from data_hub.composite_engine import ComponentSpec, CompositeSpec, evaluate_composites
+        from data_hub.models import CompositeIndicator
+
+        spec = CompositeSpec(
+            code='COMPOSITE',
+            method=CompositeIndicator.CalculationMethod.WEIGHTED_AVERAGE,
+            components=[ComponentSpec('C', 3.0), ComponentSpec('B', 1.0), ComponentSpec('MISSING', 1.0)],
+            min_coverage=0.7,
+        )
+        series = evaluate_composites(self._matrix(), [spec])['COMPOSITE']
+        np.testing.assert_allclose(series.coverage[11:18], 0.8)
+        self.assertTrue(np.isfinite(series.values[11:18]).all())
+        self.assertTrue(np.isnan(series.values[18:]).all())   # 只剩 B：覆盖率 0.2
+
+
+class RollingCorrelationTest(SimpleTestCase):
+    """滚动相关：逐期 push 更新的共矩与 pandas 按窗口重算的成对相关一致"""
+
+    def test_push_matches_pandas_corr(self):
+        import numpy as np
+        import pandas as pd
+
+        from data_hub.rolling_correlation import RollingCorrelation
+
+        window, min_periods = 60, 20
+        rng = np.random.default_rng(0)
+        rows = rng.normal(size=(200, 4)).cumsum(axis=0)
+        rows[:, 1] += 0.5 * rows[:, 0]
+        rows[rng.random(rows.shape) < 0.1] = np.nan   # 随机缺失
+        rows[100:170, 3] = np.nan                       # 长段缺失：重叠样本不足
+
+        engine = RollingCorrelation.from_rows(rows[:window], window, min_periods)
+        for t in range(window, len(rows)):
+            engine.push(rows[t])
+            if t % 20 == 0 or t == len(rows) - 1:
+                expected = pd.DataFrame(rows[t - window + 1:t + 1]).corr(min_periods=min_periods).to_numpy()
+                np.testing.assert_allclose(engine.correlation(), expected, atol=1e-9, err_msg=f'period {t}')
+
+
+class FactorEngineTest(SimpleTestCase):
+    """EM-PCA：新增一期后热启动与冷启动收敛到同一子空间，且迭代次数更少"""
+
+    def test_warm_start_matches_cold_start(self):
+        import numpy as np
+
+        from data_hub.factor_engine import FactorConfig, extract_factors
+
+        rng = np.random.default_rng(0)
+        periods, n_columns = 121, 12
+        factors = rng.normal(size=(periods, 2)).cumsum(axis=0)
+        values = factors @ rng.normal(size=(n_columns, 2)).T + 0.3 * rng.normal(size=(periods, n_columns))
+        values[rng.random(values.shape) < 0.1] = np.nan
+        codes = [f'C{i}' for i in range(n_columns)]
+        config = FactorConfig(n_factors=2)
+
+        previous = extract_factors(values[:-1], codes, config)
+        cold = extract_factors(values, codes, config)
+        warm = extract_factors(values, codes, config, previous=previous)
+
+        self.assertTrue(warm.warm_started)
+        self.assertFalse(cold.warm_started)
+        self.assertLess(warm.iterations, cold.iterations)
+        # 载荷同向（符号沿用上一次），与冷启动结果一致
+        self.assertTrue((np.sum(warm.loadings * previous.loadings, axis=0) > 0).all())
+        np.testing.assert_allclose(warm.loadings, cold.loadings, atol=0.05)
+        for k in range(2):
+            self.assertGreater(np.corrcoef(warm.scores[:, k], cold.scores[:, k])[0, 1], 0.999)
+
+    def test_changed_components_fall_back_to_cold_start(self):
+        import numpy as np
+
+        from data_hub.factor_engine import FactorConfig, extract_factors
+
+        values = np.random.default_rng(1).normal(size=(60, 5)).cumsum(axis=0)
+        config = FactorConfig(n_factors=2)
+        previous = extract_factors(values[:, :4], ['A', 'B', 'C', 'D'], config)
+        model = extract_factors(values, ['A', 'B', 'C', 'D', 'E'], config, previous=previous)
+        self.assertFalse(model.warm_started)
+        self.assertEqual(model.loadings.shape, (5, 2))
+
+
+class FactorModelStateTest(TestCase):
+    """因子模型状态只写入本模块的元数据键"""
+
+    def test_save_model_keeps_keys_written_meanwhile(self):
+        import numpy as np
+
+        from data_hub.factor_engine import STATE_KEY, FactorConfig, FactorEngine, extract_factors
+        from data_hub.models import Indicator
+
+        indicator = _create_indicator('TEST_FACTOR_PC1', metadata={'owner': 'catalogue'})
+        stale = Indicator.objects.get(pk=indicator.pk)
+        Indicator.update_metadata_key('anomaly_detection', {indicator.pk: {'last_date': '2024-01-31'}})
+
+        values = np.random.default_rng(2).normal(size=(30, 3)).cumsum(axis=0)
+        model = extract_factors(values, ['A', 'B', 'C'], FactorConfig(n_factors=1))
+        FactorEngine(FactorConfig(n_factors=1))._save_model(stale, model, 'v1')
+
+        metadata = Indicator.objects.get(pk=indicator.pk).metadata
+        self.assertEqual(metadata['owner'], 'catalogue')
+        self.assertEqual(metadata['anomaly_detection'], {'last_date': '2024-01-31'})
+        self.assertEqual((metadata[STATE_KEY]['version'], metadata[STATE_KEY]['codes']), ('v1', ['A', 'B', 'C']))
+
+
+class RegimeSummaryTest(TestCase):
+    """阶段序列接口只读取已保存的结果，不在请求中计算或写入"""
+
+    def test_summary_reads_stored_observations_only(self):
+        from datetime import date
+
+        from data_hub.models import RegimeObservation
+        from data_hub.regime_engine import REGIME_CODES, regime_summary
+
+        with self.assertRaises(ValueError):
+            regime_summary()
+        self.assertFalse(RegimeObservation.objects.exists())
+
+        for month, regime in enumerate([REGIME_CODES[0]] * 3 + [REGIME_CODES[1]] * 3, start=1):
+            RegimeObservation.objects.create(
+                frequency='M', date=date(2024, month, 1), regime=regime, confidence=0.8,
+                probabilities={code: 0.8 if code == regime else 0.2 / 3 for code in REGIME_CODES},
+                growth_score=0.5, inflation_score=0.1, growth_momentum=0.1, inflation_momentum=0.1,
+            )
+        summary = regime_summary()
+        self.assertEqual(summary['current']['regime'], REGIME_CODES[1])
+        self.assertEqual(len(summary['history']), 6)
+        self.assertEqual(RegimeObservation.objects.count(), 6)
+
+        # 新写入的阶段使缓存失效
+        RegimeObservation.objects.create(
+            frequency='M', date=date(2024, 7, 1), regime=REGIME_CODES[2], confidence=0.7,
+            probabilities={code: 0.25 for code in REGIME_CODES},
+            growth_score=-0.5, inflation_score=0.2, growth_momentum=-0.1, inflation_momentum=0.1,
+        )
+        self.assertEqual(regime_summary()['current']['regime'], REGIME_CODES[2])
+
+
+class SeriesStoreTest(TestCase):
+    """save_series：新增与修订的数据点都以 known_from 作为采集时间，并追加版本记录"""
+
+    def test_known_from_applies_to_created_and_revised_rows(self):
+        from datetime import datetime, timezone
+
+        import numpy as np
+
+        from data_hub.models import IndicatorData, IndicatorDataVintage
+        from data_hub.series_store import save_series
+
+        indicator = _create_indicator('TEST_STORE')
+        dates = np.array(['2024-01-01', '2024-02-01', '2024-03-01'], dtype='datetime64[D]')
+        first = datetime(2024, 4, 1, tzinfo=timezone.utc)
+        self.assertEqual(save_series(indicator.pk, dates, [1.0, 2.0, 3.0], known_from=first), (3, 0))
+        self.assertEqual(
+            set(IndicatorData.objects.filter(indicator=indicator).values_list('collection_time', flat=True)), {first}
+        )
+
+        second = datetime(2024, 5, 1, tzinfo=timezone.utc)
+        self.assertEqual(save_series(indicator.pk, dates, [1.0, 2.5, 3.0], known_from=second), (0, 1))
+        times = dict(IndicatorData.objects.filter(indicator=indicator).values_list('date', 'collection_time'))
+        self.assertEqual(times[dates[1].astype(object)], second)
+        self.assertEqual(times[dates[0].astype(object)], first)
+        self.assertEqual(IndicatorDataVintage.objects.filter(indicator=indicator).count(), 4)
+
+
+class FileIngestTest(TestCase):
+    """文件导入：跨块重复的日期与块内重复一样以最后一个值为准，说明行跳过，千分位逗号去除"""
+
+    def test_ingest_csv_with_repeated_date_across_chunks(self):
+        import os
+        import tempfile
+        from datetime import date
+
+        from data_hub.file_ingest import ingest_file
+        from data_hub.models import IndicatorData, IndicatorDataVintage
+
+        indicator = _create_indicator('TEST_INGEST')
+        content = (
+            '日期,TEST_INGEST,未知指标\n'
+            '频率,月,月\n'
+            '2024-01-31,1.0,x\n'
+            '2024-02-29,"1,200.5",y\n'
+            '2024-01-31,3.0,z\n'
+            '数据来源：Wind,,\n'
+        )
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', encoding='utf-8', delete=False) as f:
+            f.write(content)
+        self.addCleanup(os.remove, f.name)
+
+        result = ingest_file(f.name, chunk_rows=2)
+        self.assertEqual(result.columns, {'TEST_INGEST': 'TEST_INGEST'})
+        self.assertEqual(result.unmapped_columns, ['未知指标'])
+        self.assertEqual((result.rows_read, result.rows_skipped, result.chunks), (5, 2, 3))
+        self.assertEqual((result.created, result.revised), (2, 0))
+
+        values = dict(IndicatorData.objects.filter(indicator=indicator).values_list('date', 'value'))
+        self.assertEqual(values, {date(2024, 1, 31): 3.0, date(2024, 2, 29): 1200.5})
+        vintages = dict(IndicatorDataVintage.objects.filter(indicator=indicator).values_list('date', 'value'))
+        self.assertEqual(vintages, values)
+        self.assertEqual(IndicatorDataVintage.objects.filter(indicator=indicator).count(), 2)
+
+
+class UnifiedCollectorTest(TestCase):
+    """统一采集：按健康评分排序数据源；对冲只并发抓取，最先成功的数据只清洗保存一次"""
+
+    def _collector(self, hedged):
+        from data_hub.mapping_registry import DataSource
+        from data_hub.source_health import SourceHealthRegistry
+        from data_hub.unified_data_collector import UnifiedDataCollector
+
+        collector = UnifiedDataCollector(hedged=hedged, source_health=SourceHealthRegistry())
+        collector.unified_mappings = {
+            'TEST_UNIFIED': {
+                'primary_source': DataSource.AKSHARE,
+                'sources': {DataSource.AKSHARE: {}, DataSource.WIND: {}},
+                'data_type': 'macro',
+            }
+        }
+        _create_indicator('TEST_UNIFIED')
+        return collector
+
+    def _stub_sources(self, collector, delays, failing=()):
+        """替换上游抓取与写库：记录每个数据源的抓取次数与写库的数据源"""
+        import threading
+        import time
+
+        import pandas as pd
+
+        from data_hub.unified_data_collector import SourceFetch, UnifiedCollectionResult
+
+        fetched, stored = [], []
+        finished = threading.Event()
+
+        def fetch(indicator_code, source, start_date=None, end_date=None):
+            fetched.append(source)
+            time.sleep(delays.get(source, 0.0))
+            try:
+                if source in failing:
+                    return SourceFetch(source, error_message='上游错误')
+                return SourceFetch(source, {}, pd.DataFrame({'日期': ['2024-01-01'], '今值': [1.0]}))
+            finally:
+                if len(fetched) == len(delays):
+                    finished.set()
+
+        def store(indicator, fetch_result, start_date=None, end_date=None):
+            stored.append(fetch_result.source)
+            return UnifiedCollectionResult(success=True, records_count=1, data_source=fetch_result.source.value)
+
+        collector._fetch_from_source = fetch
+        collector._store_fetched = store
+        return fetched, stored, finished
+
+    def test_ranking_prefers_healthy_source(self):
+        from data_hub.mapping_registry import DataSource
+
+        collector = self._collector(hedged=False)
+        mapping = collector.unified_mappings['TEST_UNIFIED']
+        self.assertEqual(collector._ordered_sources(mapping), [DataSource.AKSHARE, DataSource.WIND])
+
+        for _ in range(5):
+            collector.source_health.record('akshare', 0.05, False)
+            collector.source_health.record('wind', 0.05, True)
+        self.assertEqual(collector._ordered_sources(mapping), [DataSource.WIND, DataSource.AKSHARE])
+
+    def test_failed_primary_falls_back_and_stores_once(self):
+        from data_hub.mapping_registry import DataSource
+
+        collector = self._collector(hedged=False)
+        fetched, stored, _ = self._stub_sources(
+            collector, {DataSource.AKSHARE: 0.0, DataSource.WIND: 0.0}, failing=(DataSource.AKSHARE,)
+        )
+        result = collector.collect_indicator_data('TEST_UNIFIED')
+        self.assertTrue(result.success)
+        self.assertEqual(fetched, [DataSource.AKSHARE, DataSource.WIND])
+        self.assertEqual(stored, [DataSource.WIND])
+
+    def test_hedge_stores_only_the_winning_frame(self):
+        import time
+
+        from data_hub.mapping_registry import DataSource
+
+        collector = self._collector(hedged=True)
+        for _ in range(5):
+            collector.source_health.record('akshare', 0.02, True)   # p90 约 0.02 秒后触发对冲
+        fetched, stored, finished = self._stub_sources(collector, {DataSource.AKSHARE: 0.5, DataSource.WIND: 0.0})
+
+        result = collector.collect_indicator_data('TEST_UNIFIED')
+        self.assertEqual(result.data_source, 'wind')
+        self.assertEqual(stored, [DataSource.WIND])
+
+        # 落后的请求完成后只记录耗时，不会再写库
+        self.assertTrue(finished.wait(2))
+        deadline = time.monotonic() + 2
+        while collector.source_health.snapshot()['akshare']['samples'] < 6 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(collector.source_health.snapshot()['akshare']['samples'], 6)
+        self.assertEqual(sorted(source.value for source in fetched), ['akshare', 'wind'])
+        self.assertEqual(stored, [DataSource.WIND])
+
+
+class AsyncWriteBatchTest(TestCase):
+    """异步写入：同一批次中每个指标使用独立的保存点，单个指标失败不影响其余指标"""
+
+    def test_failed_indicator_is_rolled_back_alone(self):
+        import pandas as pd
+
+        from data_hub.async_collection import AsyncCollectionRuntime
+        from data_hub.models import IndicatorData
+        from data_hub.series_store import save_series
+
+        class Collector:
+            def _write_series(self, indicator, data_df):
+                dates = pd.to_datetime(data_df['date']).values.astype('datetime64[D]')
+                created, _ = save_series(indicator.pk, dates, data_df['value'].to_numpy(dtype=float))
+                if indicator.code == 'TEST_WRITE_BAD':
+                    raise ValueError('写库错误')
+                return created
+
+        runtime = AsyncCollectionRuntime(akshare_collector=Collector())
+        runtime._indicators = {
+            code: _create_indicator(code) for code in ('TEST_WRITE_A', 'TEST_WRITE_BAD', 'TEST_WRITE_B')
+        }
+        frame = pd.DataFrame({'date': ['2024-01-01', '2024-02-01'], 'value': [1.0, 2.0]})
+        batch = [('akshare', code, frame, None) for code in runtime._indicators]
+
+        saved = runtime._write_batch(batch)
+        self.assertEqual([records for records, _ in saved], [2, 0, 2])
+        self.assertEqual([error is None for _, error in saved], [True, False, True])
+        counts = {
+            code: IndicatorData.objects.filter(indicator__code=code).count() for code in runtime._indicators
+        }
+        self.assertEqual(counts, {'TEST_WRITE_A': 2, 'TEST_WRITE_BAD': 0, 'TEST_WRITE_B': 2})
+
+
+class JobQueueTest(TestCase):
+    """持久化任务队列：领取、失败退避、租约过期重新领取与推迟"""
+
+    def _run(self, codes=('TEST_QUEUE_A', 'TEST_QUEUE_B')):
+        from data_hub.job_queue import create_run
+
+        return create_run([_create_indicator(code) for code in codes], '2024-01-01', '2024-12-31')
+
+    def test_claim_tasks_in_priority_order_once(self):
+        from data_hub.job_queue import claim_tasks
+        from data_hub.models import CollectionTask
+
+        run = self._run()
+        first = claim_tasks(run, 'worker-1')
+        self.assertEqual([task.indicator.code for task in first], ['TEST_QUEUE_A'])
+        self.assertEqual((first[0].state, first[0].attempts), (CollectionTask.State.RUNNING, 1))
+
+        second = claim_tasks(run, 'worker-2', limit=5)
+        self.assertEqual([task.indicator.code for task in second], ['TEST_QUEUE_B'])
+        self.assertEqual(claim_tasks(run, 'worker-3'), [])
+
+    def test_fail_task_backs_off_then_fails(self):
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        from data_hub.job_queue import RETRY_BACKOFF, claim_tasks, fail_task, next_available_in
+        from data_hub.models import CollectionTask
+
+        run = self._run(('TEST_QUEUE_A',))
+        task = claim_tasks(run, 'worker-1')[0]
+        before = timezone.now()
+        self.assertTrue(fail_task(task, '上游错误', max_attempts=2))
+        task.refresh_from_db()
+        self.assertEqual(task.state, CollectionTask.State.PENDING)
+        self.assertGreaterEqual(task.available_at, before + timedelta(seconds=RETRY_BACKOFF))
+        self.assertEqual(claim_tasks(run, 'worker-1'), [])
+        self.assertGreater(next_available_in(run), 0)
+
+        CollectionTask.objects.filter(pk=task.pk).update(available_at=timezone.now())
+        task = claim_tasks(run, 'worker-1')[0]
+        self.assertEqual(task.attempts, 2)
+        self.assertFalse(fail_task(task, '上游错误', max_attempts=2))
+        task.refresh_from_db()
+        self.assertEqual(task.state, CollectionTask.State.FAILED)
+        self.assertIsNone(next_available_in(run))
+
+    def test_expired_lease_is_reclaimed(self):
+        from datetime import timedelta
+
+        from data_hub.job_queue import LEASE_SECONDS, claim_tasks, complete_task
+        from data_hub.models import CollectionTask
+
+        run = self._run(('TEST_QUEUE_A',))
+        stale = claim_tasks(run, 'worker-1')[0]
+        self.assertEqual(claim_tasks(run, 'worker-2'), [])
+
+        CollectionTask.objects.filter(pk=stale.pk).update(
+            claimed_at=stale.claimed_at - timedelta(seconds=LEASE_SECONDS + 1)
+        )
+        reclaimed = claim_tasks(run, 'worker-2')
+        self.assertEqual([(task.pk, task.worker, task.attempts) for task in reclaimed], [(stale.pk, 'worker-2', 2)])
+
+        # 原进程的租约已失效，不能再更新任务
+        self.assertFalse(complete_task(stale, 10))
+        self.assertTrue(complete_task(reclaimed[0], 10))
+
+    def test_defer_task_does_not_count_attempt(self):
+        from data_hub.job_queue import claim_tasks, defer_task, next_available_in
+        from data_hub.models import CollectionTask
+
+        run = self._run(('TEST_QUEUE_A',))
+        task = claim_tasks(run, 'worker-1')[0]
+        self.assertTrue(defer_task(task, 60, '熔断'))
+        task.refresh_from_db()
+        self.assertEqual((task.state, task.attempts, task.last_error), (CollectionTask.State.PENDING, 0, '熔断'))
+        self.assertEqual(claim_tasks(run, 'worker-1'), [])
+        self.assertGreater(next_available_in(run), 55)
+
+
+class BatchCollectTest(TestCase):
+    """批量采集：分段任务按指标去重统计"""
+
+    def test_chunked_tasks_count_indicators_once(self):
+        from data_hub.enhanced_data_collector import CollectionResult
+        from data_hub.job_queue import create_run
+        from data_hub.management.commands.batch_collect_data import BatchDataCollector
+
+        class Collector:
+            def circuit_retry_after(self, indicator_code):
+                return 0.0
+
+            def collect_indicator_data(self, indicator_code, start_date=None, end_date=None):
+                if indicator_code == 'TEST_BATCH_BAD' and start_date >= '2024-07-01':
+                    return CollectionResult(success=False, error_message='上游错误')
+                return CollectionResult(success=True, records_count=3)
+
+        batch = BatchDataCollector()
+        batch.collector = Collector()
+        batch.worker = 'worker-1'
+        batch.run = create_run(
+            [_create_indicator('TEST_BATCH_OK'), _create_indicator('TEST_BATCH_BAD')],
+            '2024-01-01', '2024-12-31', chunk='Q',
+        )
+        batch._work_run(batch.run, max_attempts=1, delay_between_calls=0)
+
+        self.assertEqual(batch.collected_codes, {'TEST_BATCH_OK', 'TEST_BATCH_BAD'})
+        self.assertEqual((batch.success_count, batch.error_count), (1, 1))
+        self.assertEqual(len(batch.errors), 2)
+
+
+class SeriesFingerprintTest(SimpleTestCase):
+    """变更检测：清洗后序列按头部/尾部摘要比较，原始数据相同但映射配置变化时不跳过"""
+
+    def _series(self, rows=24):
+        import numpy as np
+
+        dates = np.arange('2022-01', rows + np.datetime64('2022-01'), dtype='datetime64[M]').astype('datetime64[D]')
+        return dates, np.arange(rows, dtype=float)
+
+    def _stored(self, dates, values, raw_hash='raw', config=None):
+        from data_hub.fingerprint import SeriesChange, config_hash
+        from data_hub.models import SeriesFingerprint
+
+        baseline = SeriesChange(raw_hash, config_hash=config_hash(config))
+        return SeriesFingerprint(**baseline.fingerprint(dates, values))
+
+    def test_compare_unchanged_tail_and_full(self):
+        import numpy as np
+
+        from data_hub.fingerprint import FULL, TAIL, TAIL_ROWS, UNCHANGED, SeriesChange
+
+        dates, values = self._series()
+        stored = self._stored(dates, values)
+        tail_start = dates[-TAIL_ROWS].astype(object)
+        self.assertEqual(stored.tail_start, tail_start)
+
+        change = SeriesChange('other', stored)
+        self.assertEqual(change.compare(dates, values), (UNCHANGED, None))
+        # 顺序不影响比较
+        self.assertEqual(change.compare(dates[::-1], values[::-1]), (UNCHANGED, None))
+
+        revised = values.copy()
+        revised[-1] += 1
+        self.assertEqual(change.compare(dates, revised), (TAIL, tail_start))
+
+        appended_dates = np.append(dates, np.datetime64('2024-01-01'))
+        self.assertEqual(change.compare(appended_dates, np.append(values, 24.0)), (TAIL, tail_start))
+
+        head_revised = values.copy()
+        head_revised[0] += 1
+        self.assertEqual(change.compare(dates, head_revised), (FULL, None))
+        self.assertEqual(SeriesChange('raw').compare(dates, values), (FULL, None))
+
+    def test_unchanged_requires_same_config(self):
+        from data_hub.fingerprint import SeriesChange, config_hash
+
+        dates, values = self._series()
+        config = {'func': 'macro_china_cpi', 'date_col': '月份', 'value_col': '全国-当月'}
+        stored = self._stored(dates, values, config=config)
+
+        self.assertTrue(SeriesChange('raw', stored, config_hash(dict(config))).unchanged)
+        self.assertFalse(SeriesChange('other', stored, config_hash(config)).unchanged)
+        self.assertFalse(SeriesChange('raw', stored, config_hash({**config, 'value_col': '全国-同比'})).unchanged)
+        self.assertFalse(SeriesChange('raw', None, config_hash(config)).unchanged)
+
+
+class BenchmarkResetTest(TestCase):
+    """采集基准：每次运行前只删除所选指标已写入的数据，各次运行都走完整的写库路径"""
+
+    def test_reset_indicators_only_touches_selected_codes(self):
+        import numpy as np
+
+        from data_hub.management.commands.benchmark_collection import Command
+        from data_hub.models import IndicatorData, IndicatorDataVintage, SeriesFingerprint
+        from data_hub.series_store import save_series
+
+        dates = np.array(['2024-01-01', '2024-02-01'], dtype='datetime64[D]')
+        selected, other = _create_indicator('TEST_BENCH_A'), _create_indicator('TEST_BENCH_B')
+        for indicator in (selected, other):
+            save_series(indicator.pk, dates, [1.0, 2.0])
+            SeriesFingerprint.objects.create(indicator=indicator, raw_hash='raw', head_hash='', tail_hash='')
+
+        Command()._reset_indicators(['TEST_BENCH_A'])
+        for model in (IndicatorData, IndicatorDataVintage, SeriesFingerprint):
+            self.assertFalse(model.objects.filter(indicator=selected).exists())
+            self.assertTrue(model.objects.filter(indicator=other).exists())
+        self.assertEqual(save_series(selected.pk, dates, [1.0, 2.0]), (2, 0))
+
+
+class WindGroupedCollectionTest(TestCase):
+    """Wind批量采集：按 (函数, 字段, 频率) 分组请求，结果按代码拆分，批量失败时逐个重试"""
+
+    MAPPINGS = {
+        'TEST_WIND_A': {'wind_code': 'M0000001', 'data_type': 'macro', 'frequency': 'M'},
+        'TEST_WIND_B': {'wind_code': 'M0000002', 'data_type': 'macro', 'frequency': 'M'},
+        'TEST_WIND_C': {'wind_code': 'M0000003', 'data_type': 'macro', 'frequency': 'M'},
+        'TEST_WIND_D': {'wind_code': 'M0000004', 'data_type': 'macro', 'frequency': 'Q'},
+        'TEST_WIND_E': {'wind_code': '000001.SH', 'data_type': 'index', 'frequency': 'D'},
+        'TEST_WIND_F': {'wind_code': '000300.SH', 'data_type': 'index', 'frequency': 'D'},
+    }
+
+    def _collector(self, fake):
+        from data_hub.circuit_breaker import CircuitBreakerRegistry
+        from data_hub.wind_data_collector import WindConnectionConfig, WindDataCollector
+        from data_hub.wind_session import WindSessionManager
+
+        config = WindConnectionConfig()
+        collector = WindDataCollector(config, session_manager=WindSessionManager(config, lambda: fake))
+        collector.circuit_breakers = CircuitBreakerRegistry(cooldown=0)
+        collector.wind_mappings = self.MAPPINGS
+        for code in self.MAPPINGS:
+            _create_indicator(code)
+        return collector
+
+    def test_indicators_grouped_into_one_request_per_type(self):
+        from data_hub.models import IndicatorData
+        from data_hub.wind_session import FakeWindPy
+
+        fake = FakeWindPy(periods=3)
+        results = self._collector(fake).collect_indicators_data(list(self.MAPPINGS), '2020-01-01', '2020-03-31')
+
+        self.assertTrue(all(result.success for result in results.values()))
+        self.assertEqual({code: result.records_count for code, result in results.items()},
+                         {code: 3 for code in self.MAPPINGS})
+        self.assertEqual(sorted(call[:2] for call in fake.calls), [
+            ('edb', 'M0000001,M0000002,M0000003'),
+            ('edb', 'M0000004'),
+            ('wsd', '000001.SH,000300.SH'),
+        ])
+        # Data 矩阵按代码拆分：每个指标取到自己代码的那一行
+        for code, config in self.MAPPINGS.items():
+            first = IndicatorData.objects.filter(indicator__code=code).order_by('date').first()
+            self.assertAlmostEqual(first.value, sum(map(ord, config['wind_code'])) % 100)
+
+    def test_failed_batch_falls_back_to_single_codes(self):
+        from data_hub.wind_session import FakeWindPy
+
+        fake = FakeWindPy(periods=3, fail_codes=('M0000002',))
+        collector = self._collector(fake)
+        codes = ['TEST_WIND_A', 'TEST_WIND_B', 'TEST_WIND_C']
+        results = collector.collect_indicators_data(codes, '2020-01-01', '2020-03-31')
+
+        self.assertEqual([results[code].success for code in codes], [True, False, True])
+        self.assertEqual([call[1] for call in fake.calls],
+                         ['M0000001,M0000002,M0000003', 'M0000001', 'M0000002', 'M0000003'])
+        # 只有单代码请求的失败计入熔断
+        snapshot = collector.circuit_breakers.snapshot()['wind:edb']
+        self.assertEqual((snapshot['state'], snapshot['failures']), ('closed', 1))
+
+    def test_chunked_windows_request_each_window_once(self):
+        from data_hub.wind_session import FakeWindPy
+
+        fake = FakeWindPy(periods=3)
+        codes = ['TEST_WIND_A', 'TEST_WIND_B']
+        results = self._collector(fake).collect_indicators_data(codes, '2020-01-01', '2020-12-31', chunk='Q')
+
+        self.assertEqual([call[2] for call in fake.calls], ['2020-01-01', '2020-04-01', '2020-07-01', '2020-10-01'])
+        self.assertTrue(all(call[1] == 'M0000001,M0000002' for call in fake.calls))
+        self.assertEqual([results[code].records_count for code in codes], [12, 12])
+
+
+class WindSessionTest(SimpleTestCase):
+    """Wind会话：多次调用复用一次握手，失效后重连，排队已满或等待超时立即拒绝"""
+
+    def _manager(self, fake, **kwargs):
+        from data_hub.wind_data_collector import WindConnectionConfig
+        from data_hub.wind_session import WindSessionManager
+
+        return WindSessionManager(WindConnectionConfig(), lambda: fake, **kwargs)
+
+    def test_calls_reuse_one_handshake(self):
+        from data_hub.wind_session import FakeWindPy
+
+        fake = FakeWindPy()
+        manager = self._manager(fake)
+        for _ in range(3):
+            with manager.session() as w:
+                self.assertEqual(w.edb('M0000001', '2020-01-01', '2020-12-31').ErrorCode, 0)
+        self.assertTrue(manager.connect())
+        self.assertEqual(fake.start_count, 1)
+        self.assertEqual((manager.stats['handshakes'], manager.stats['calls']), (1, 3))
+
+    def test_dead_session_reconnects_after_health_check(self):
+        from data_hub.wind_session import FakeWindPy
+
+        fake = FakeWindPy()
+        manager = self._manager(fake, health_check_interval=0)
+        self.assertTrue(manager.connect())
+        fake.stop()
+        with manager.session() as w:
+            self.assertTrue(w.isconnected())
+        self.assertEqual((fake.start_count, manager.stats['reconnects']), (2, 1))
+
+    def test_queue_limit_rejects_extra_callers(self):
+        from data_hub.wind_session import FakeWindPy, WindSessionBusyError
+
+        manager = self._manager(FakeWindPy(), max_queued=0)
+        with manager.session():
+            with self.assertRaises(WindSessionBusyError):
+                with manager.session():
+                    pass
+        with manager.session():
+            pass
+        self.assertEqual((manager.stats['rejected'], manager.stats['calls']), (1, 2))
+
+    def test_waiting_caller_times_out(self):
+        import threading
+
+        from data_hub.wind_session import FakeWindPy, WindSessionBusyError
+
+        manager = self._manager(FakeWindPy(), max_queued=1)
+        holding, release = threading.Event(), threading.Event()
+
+        def hold():
+            with manager.session():
+                holding.set()
+                release.wait(2)
+
+        thread = threading.Thread(target=hold)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(release.set)
+        self.assertTrue(holding.wait(2))
+        with self.assertRaisesRegex(WindSessionBusyError, '超时'):
+            with manager.session(timeout=0.05):
+                pass
+
+
+class CircuitBreakerTest(SimpleTestCase):
+    """熔断器：连续失败后打开，冷却结束后半开只放行一次试探，试探结果决定关闭或重新打开"""
+
+    def _expire_cooldown(self, registry, key):
+        breaker = registry._breakers[key]
+        breaker.opened_at -= breaker.cooldown
+
+    def test_closed_open_half_open_cycle(self):
+        from data_hub.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreakerRegistry
+
+        registry = CircuitBreakerRegistry(failure_threshold=2, cooldown=60)
+        key = 'akshare:macro_china_cpi'
+
+        registry.record(key, False)
+        self.assertTrue(registry.allow(key))
+        registry.record(key, False)
+        self.assertEqual(registry.snapshot()[key]['state'], OPEN)
+        self.assertTrue(registry.is_open(key))
+        self.assertFalse(registry.allow(key))
+        self.assertGreater(registry.retry_after(key), 0)
+
+        # 冷却结束：只放行一次试探，放弃结果后归还名额
+        self._expire_cooldown(registry, key)
+        self.assertFalse(registry.is_open(key))
+        self.assertTrue(registry.allow(key))
+        self.assertEqual(registry.snapshot()[key]['state'], HALF_OPEN)
+        self.assertFalse(registry.allow(key))
+        registry.release(key)
+        self.assertTrue(registry.allow(key))
+
+        # 试探失败重新打开
+        registry.record(key, False)
+        self.assertEqual(registry.snapshot()[key]['state'], OPEN)
+        self.assertFalse(registry.allow(key))
+
+        # 再次试探成功则关闭
+        self._expire_cooldown(registry, key)
+        self.assertTrue(registry.allow(key))
+        registry.record(key, True)
+        snapshot = registry.snapshot()[key]
+        self.assertEqual((snapshot['state'], snapshot['consecutive_failures'], snapshot['opened']), (CLOSED, 0, 2))
+        self.assertTrue(registry.allow(key) and registry.allow(key))
+
+    def test_success_resets_consecutive_failures(self):
+        from data_hub.circuit_breaker import CLOSED, CircuitBreakerRegistry
+
+        registry = CircuitBreakerRegistry(failure_threshold=2, cooldown=60)
+        key = 'wind:edb'
+        for success in (False, True, False):
+            registry.record(key, success)
+        self.assertEqual(registry.snapshot()[key]['state'], CLOSED)
+        registry.reset(key)
+        self.assertEqual(registry.snapshot(), {})
+
+    def test_zero_cooldown_allows_trial_immediately(self):
+        from data_hub.circuit_breaker import HALF_OPEN, CircuitBreakerRegistry
+
+        registry = CircuitBreakerRegistry(failure_threshold=1, cooldown=0)
+        registry.record('wind:wsd:close', False)
+        self.assertFalse(registry.is_open('wind:wsd:close'))
+        self.assertTrue(registry.allow('wind:wsd:close'))
+        self.assertEqual(registry.snapshot()['wind:wsd:close']['state'], HALF_OPEN)
+        self.assertFalse(registry.allow('wind:wsd:close'))
+
+
+class BacktestTest(TestCase):
+    """信号回测：5期价格与已知信号，收益、回撤、胜率与换手按手工计算核对"""
+
+    # 价格 100 → 110 → 99 → 118.8 → 112.86，每期收益 +10%, -10%, +20%, -5%
+    PRICES = [100.0, 110.0, 99.0, 118.8, 112.86]
+    SIGNAL = [1.0, 0.0, 1.0, 1.0, 0.0]
+
+    def _returns(self):
+        import numpy as np
+
+        prices = np.array(self.PRICES)
+        returns = np.full(len(prices), np.nan)
+        returns[1:] = prices[1:] / prices[:-1] - 1.0
+        return returns
+
+    def test_evaluate_grid_by_hand(self):
+        import numpy as np
+
+        from data_hub.backtest import evaluate_grid
+
+        signal = np.array(self.SIGNAL)
+        metrics = evaluate_grid(
+            signal, self._returns(), np.array([0.5, 0.5]), np.array([1, 2]), 'above', 'long_flat', 12
+        )
+        # 滞后1期: 持仓 [0,1,0,1,1]，收益 [0,+10%,0,+20%,-5%]，净值 1.1 → 1.32 → 1.254
+        # 滞后2期: 持仓 [0,0,1,0,1]，收益 [0,0,-10%,0,-5%]，净值 0.9 → 0.855
+        np.testing.assert_allclose(metrics['total_return'], [0.254, -0.145])
+        np.testing.assert_allclose(metrics['max_drawdown'], [1.254 / 1.32 - 1, -0.145])
+        np.testing.assert_allclose(metrics['hit_rate'], [2 / 3, 0.0])
+        np.testing.assert_allclose(metrics['exposure'], [0.6, 0.4])
+        np.testing.assert_allclose(metrics['trades'], [3, 3])
+
+        # 做多/做空: 持仓 [0,1,-1,1,1]，收益 [0,+10%,+10%,+20%,-5%]
+        long_short = evaluate_grid(signal, self._returns(), np.array([0.5]), np.array([1]), 'above', 'long_short', 12)
+        np.testing.assert_allclose(long_short['total_return'], [1.1 * 1.1 * 1.2 * 0.95 - 1])
+        np.testing.assert_allclose(long_short['hit_rate'], [0.75])
+        np.testing.assert_allclose(long_short['exposure'], [0.8])
+
+        # 'below' 与信号缺失：缺失期不持仓，持仓 [0,1,0,-1,1]，收益 [0,+10%,0,-20%,-5%]
+        below = evaluate_grid(np.array([0.0, np.nan, 1.0, 0.0, 1.0]), self._returns(),
+                              np.array([0.5]), np.array([1]), 'below', 'long_short', 12)
+        np.testing.assert_allclose(below['total_return'], [1.1 * 0.8 * 0.95 - 1])
+        np.testing.assert_allclose(below['exposure'], [0.6])
+
+    def test_parallel_grid_matches_serial(self):
+        import numpy as np
+
+        from data_hub.backtest import MIN_CHUNK_SIZE, evaluate_grid, evaluate_grid_parallel
+
+        rng = np.random.default_rng(0)
+        signal = rng.normal(size=120).cumsum()
+        returns = rng.normal(0.005, 0.04, size=120)
+        thresholds = np.repeat(np.linspace(-5, 5, MIN_CHUNK_SIZE * 2), 2)
+        lags = np.tile(np.array([1, 3]), MIN_CHUNK_SIZE * 2)
+        serial = evaluate_grid(signal, returns, thresholds, lags, 'above', 'long_short', 12)
+        parallel = evaluate_grid_parallel(signal, returns, thresholds, lags, 'above', 'long_short', 12, workers=2)
+        for name, values in serial.items():
+            np.testing.assert_allclose(parallel[name], values, err_msg=name)
+
+    def test_run_backtest_on_stored_series(self):
+        import numpy as np
+
+        from data_hub.backtest import SignalRule, run_backtest
+        from data_hub.series_store import save_series
+
+        dates = np.array(['2024-01-31', '2024-02-29', '2024-03-31', '2024-04-30', '2024-05-31'], dtype='datetime64[D]')
+        save_series(_create_indicator('TEST_BT_INDEX', frequency='M').pk, dates, self.PRICES)
+        save_series(_create_indicator('TEST_BT_SIGNAL', frequency='M').pk, dates, self.SIGNAL)
+
+        rule = SignalRule(expression='TEST_BT_SIGNAL', benchmark='TEST_BT_INDEX')
+        result = run_backtest(rule, thresholds=[0.5], lags=[1, 2], use_cache=False)
+        self.assertEqual((result.periods, result.start_date, result.end_date), (5, '2024-01-01', '2024-05-01'))
+        self.assertEqual(result.metrics['total_return'], [0.254, -0.145])
+        self.assertEqual(result.metrics['hit_rate'], [round(2 / 3, 6), 0.0])
+        self.assertAlmostEqual(result.benchmark['total_return'], 0.1286)
+        with self.assertRaises(ValueError):
+            run_backtest(rule, thresholds=[0.5], lags=[0], use_cache=False)
@@ -0,0 +1,388 @@
+# -*- coding: utf-8 -*-
+"""
+拐点识别（Bry-Boschan 方法）
+在对齐矩阵（期数 × 指标）上一次性计算局部极值窗口，再对每个指标的候选拐点执行
+峰谷交替、最短阶段、最短周期与首尾删失规则，结果持久化到 TurningPoint 表
+
+增量运行时只重新识别有新采集数据的指标，并且只写入与已有结果不同的拐点
+"""
+
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Indicator, TurningPoint
+from .series_matrix import PERIODS_PER_YEAR, AlignedMatrix, fill_interior_gaps, load_aligned_matrix
+
+logger = logging.getLogger(__name__)
+
+# Indicator.metadata 中保存识别状态的键
+STATE_KEY = 'turning_points'
+
+# 支持的分析频率（日度序列请先按周/月聚合）
+SUPPORTED_FREQUENCIES = ('W', 'M', 'Q')
+
+PEAK = 1
+TROUGH = -1
+
+
+@dataclass
+class BryBoschanRules:
+    """Bry-Boschan 规则参数（单位：年，按频率换算为期数）"""
+    window_years: float = 5 / 12       # 局部极值窗口半宽
+    censor_years: float = 6 / 12       # 序列首尾不识别拐点的区间
+    min_phase_years: float = 6 / 12    # 最短扩张/收缩阶段
+    min_cycle_years: float = 15 / 12   # 最短完整周期
+    confirm_years: float = 15 / 12     # 距序列末端超过该长度的拐点视为已确认
+
+    def periods(self, frequency: str) -> Dict[str, int]:
+        per_year = PERIODS_PER_YEAR[frequency]
+        return {
+            'window': max(1, int(round(self.window_years * per_year))),
+            'censor': max(1, int(round(self.censor_years * per_year))),
+            'min_phase': max(1, int(round(self.min_phase_years * per_year))),
+            'min_cycle': max(2, int(round(self.min_cycle_years * per_year))),
+            'confirm': max(1, int(round(self.confirm_years * per_year))),
+        }
+
+
+@dataclass
+class DetectedPoint:
+    """识别出的拐点"""
+    index: int
+    point_type: int
+    value: float
+    confirmed: bool
+    amplitude: Optional[float] = None
+    duration: Optional[int] = None
+
+
+@dataclass
+class TurningPointResult:
+    """拐点识别运行结果"""
+    indicators_evaluated: int = 0
+    indicators_skipped: int = 0
+    points_detected: int = 0
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
+    execution_time: float = 0.0
+    errors: List[Dict] = field(default_factory=list)
+
+
+def _rolling_extreme(values: np.ndarray, half_window: int, func) -> np.ndarray:
+    """
+    沿时间轴计算居中窗口 [t-k, t+k] 的极值（稀疏表倍增法，内存 O(T×N)）
+    """
+    n = values.shape[0]
+    width = 2 * half_window + 1
+    fill = -np.inf if func is np.maximum else np.inf
+    padded = np.concatenate([
+        np.full((half_window,) + values.shape[1:], fill),
+        values,
+        np.full((half_window,) + values.shape[1:], fill),
+    ])
+
+    table = padded
+    span = 1
+    while span * 2 <= width:
+        table = func(table[:-span], table[span:])
+        span *= 2
+    # table[i] 覆盖 padded[i : i+span]，两段重叠覆盖整个窗口
+    return func(table[:n], table[width - span:width - span + n])
+
+
+def find_candidates(values: np.ndarray, half_window: int, censor: int) -> np.ndarray:
+    """
+    向量化识别候选拐点
+
+    Returns:
+        np.ndarray: 与 values 同形状的 int8 矩阵，1=候选峰，-1=候选谷，0=无
+    """
+    finite = np.isfinite(values)
+    highs = np.where(finite, values, -np.inf)
+    lows = np.where(finite, values, np.inf)
+
+    is_peak = finite & (highs >= _rolling_extreme(highs, half_window, np.maximum))
+    is_trough = finite & (lows <= _rolling_extreme(lows, half_window, np.minimum))
+
+    # 首尾删失
+    index = np.arange(values.shape[0])[:, None]
+    has_data = finite.any(axis=0)
+    first = np.where(has_data, finite.argmax(axis=0), 0)
+    last = np.where(has_data, values.shape[0] - 1 - finite[::-1].argmax(axis=0), -1)
+    inside = (index >= first + censor) & (index <= last - censor)
+
+    candidates = np.zeros(values.shape, dtype=np.int8)
+    candidates[is_peak & inside] = PEAK
+    candidates[is_trough & inside & ~is_peak] = TROUGH
+    return candidates
+
+
+def _more_extreme(point_type: int, a: float, b: float) -> bool:
+    return a > b if point_type == PEAK else a < b
+
+
+def _enforce_alternation(points: List[Tuple[int, int]], series: np.ndarray) -> List[Tuple[int, int]]:
+    """连续同类拐点只保留最极端的一个"""
+    result: List[Tuple[int, int]] = []
+    for index, point_type in points:
+        if result and result[-1][1] == point_type:
+            if _more_extreme(point_type, series[index], series[result[-1][0]]):
+                result[-1] = (index, point_type)
+        else:
+            result.append((index, point_type))
+    return result
+
+
+def _apply_duration_rules(points: List[Tuple[int, int]],
+                          series: np.ndarray,
+                          min_phase: int,
+                          min_cycle: int) -> List[Tuple[int, int]]:
+    """反复应用最短周期与最短阶段规则，直到结果稳定"""
+    changed = True
+    while changed and len(points) >= 2:
+        changed = False
+
+        # 最短周期：同类拐点间隔过短时，删除较弱的拐点及其与另一拐点之间的反向拐点
+        for i in range(len(points) - 2):
+            (a, type_a), (c, _) = points[i], points[i + 2]
+            if c - a < min_cycle:
+                weaker = i + 2 if _more_extreme(type_a, series[a], series[c]) else i
+                drop = {weaker, i + 1}
+                points = [p for k, p in enumerate(points) if k not in drop]
+                points = _enforce_alternation(points, series)
+                changed = True
+                break
+        if changed:
+            continue
+
+        # 最短阶段：相邻峰谷间隔过短时删除这一对
+        for i in range(len(points) - 1):
+            if points[i + 1][0] - points[i][0] < min_phase:
+                points = points[:i] + points[i + 2:]
+                points = _enforce_alternation(points, series)
+                changed = True
+                break
+    return points
+
+
+def _apply_end_rules(points: List[Tuple[int, int]], series: np.ndarray) -> List[Tuple[int, int]]:
+    """首个/末个拐点须比其之前/之后的所有值更极端"""
+    finite = np.isfinite(series)
+    while points:
+        index, point_type = points[0]
+        before = series[:index][finite[:index]]
+        if len(before) and (before.max() > series[index] if point_type == PEAK else before.min() < series[index]):
+            points = points[1:]
+            continue
+        break
+    while points:
+        index, point_type = points[-1]
+        after = series[index + 1:][finite[index + 1:]]
+        if len(after) and (after.max() > series[index] if point_type == PEAK else after.min() < series[index]):
+            points = points[:-1]
+            continue
+        break
+    return points
+
+
+def detect_turning_points(matrix: AlignedMatrix,
+                          rules: BryBoschanRules = None) -> Dict[str, List[DetectedPoint]]:
+    """
+    对对齐矩阵中的所有指标识别拐点
+
+    Args:
+        matrix: 对齐矩阵（W/M/Q频率）
+        rules: Bry-Boschan 规则参数
+
+    Returns:
+        Dict[str, List[DetectedPoint]]: 指标代码 -> 按时间排序的拐点
+    """
+    if matrix.frequency not in SUPPORTED_FREQUENCIES:
+        raise ValueError(f"拐点识别不支持频率: {matrix.frequency}")
+
+    params = (rules or BryBoschanRules()).periods(matrix.frequency)
+    values = fill_interior_gaps(matrix.values)
+    candidates = find_candidates(values, params['window'], params['censor'])
+
+    finite = np.isfinite(values)
+    last_valid = values.shape[0] - 1 - finite[::-1].argmax(axis=0)
+
+    results: Dict[str, List[DetectedPoint]] = {}
+    for j, code in enumerate(matrix.codes):
+        series = values[:, j]
+        rows = np.flatnonzero(candidates[:, j])
+        points = [(int(i), int(candidates[i, j])) for i in rows]
+
+        points = _enforce_alternation(points, series)
+        points = _apply_duration_rules(points, series, params['min_phase'], params['min_cycle'])
+        points = _apply_end_rules(points, series)
+
+        detected = []
+        for k, (index, point_type) in enumerate(points):
+            point = DetectedPoint(
+                index=index,
+                point_type=point_type,
+                value=float(series[index]),
+                confirmed=bool(last_valid[j] - index >= params['confirm']),
+            )
+            if k > 0:
+                previous = points[k - 1][0]
+                point.amplitude = float(series[index] - series[previous])
+                point.duration = index - previous
+            detected.append(point)
+        results[code] = detected
+    return results
+
+
+class TurningPointDetector:
+    """拐点识别与持久化"""
+
+    def __init__(self, frequency: str = 'M', rules: BryBoschanRules = None, batch_size: int = 1000):
+        if frequency not in SUPPORTED_FREQUENCIES:
+            raise ValueError(f"拐点识别不支持频率: {frequency}")
+        self.frequency = frequency
+        self.rules = rules or BryBoschanRules()
+        self.batch_size = batch_size
+
+    def run(self, indicator_codes: Iterable[str] = None, full: bool = False) -> TurningPointResult:
+        """
+        识别拐点并同步到 TurningPoint 表
+
+        Args:
+            indicator_codes: 指标代码列表，None表示所有启用指标
+            full: 是否忽略增量状态重新识别全部指标
+        """
+        started = time.time()
+        result = TurningPointResult()
+
+        indicators = self._select_indicators(indicator_codes, full, result)
+        if indicators:
+            try:
+                evaluated_at = timezone.now()
+                matrix = load_aligned_matrix(indicators.keys(), self.frequency)
+                detected = detect_turning_points(matrix, self.rules)
+
+                with transaction.atomic():
+                    self._sync(indicators, detected, matrix.dates, result)
+                    self._save_state(indicators, evaluated_at)
+            except Exception as e:
+                logger.error(f"拐点识别失败: {e}")
+                result.errors.append({'indicators': list(indicators.keys()), 'error': str(e)})
+
+        result.execution_time = time.time() - started
+        logger.info(
+            f"拐点识别完成: 评估 {result.indicators_evaluated} 个指标, 识别 {result.points_detected} 个拐点, "
+            f"新增 {result.created}, 更新 {result.updated}, 删除 {result.deleted}, "
+            f"耗时 {result.execution_time:.2f}秒"
+        )
+        return result
+
+    def _select_indicators(self, indicator_codes, full: bool, result: TurningPointResult) -> Dict[str, Dict]:
+        """选择自上次识别后有新采集数据的指标"""
+        queryset = Indicator.objects.all()
+        if indicator_codes is not None:
+            queryset = queryset.filter(code__in=list(indicator_codes))
+        else:
+            queryset = queryset.filter(is_active=True)
+
+        rows = queryset.order_by().annotate(
+            last_collected=Max('data_points__collection_time')
+        ).values('id', 'code', 'metadata', 'last_collected')
+
+        selected = {}
+        for row in rows:
+            if row['last_collected'] is None:
+                result.indicators_skipped += 1
+                continue
+            state = (row['metadata'] or {}).get(STATE_KEY, {}).get(self.frequency)
+            if not full and state:
+                try:
+                    if datetime.fromisoformat(state) >= row['last_collected']:
+                        result.indicators_skipped += 1
+                        continue
+                except (TypeError, ValueError):
+                    pass
+            selected[row['code']] = row
+        return selected
+
+    def _sync(self, indicators: Dict[str, Dict], detected: Dict[str, List[DetectedPoint]],
+              dates: np.ndarray, result: TurningPointResult):
+        """与已有拐点比较，只写入差异"""
+        ids = [info['id'] for info in indicators.values()]
+        existing: Dict[Tuple[int, object], TurningPoint] = {
+            (tp.indicator_id, tp.date): tp
+            for tp in TurningPoint.objects.filter(indicator_id__in=ids, frequency=self.frequency)
+        }
+
+        to_create, to_update = [], []
+        seen = set()
+        for code, points in detected.items():
+            indicator_id = indicators[code]['id']
+            result.indicators_evaluated += 1
+            result.points_detected += len(points)
+
+            for point in points:
+                point_date = dates[point.index].astype(object)
+                values = {
+                    'point_type': 'peak' if point.point_type == PEAK else 'trough',
+                    'value': point.value,
+                    'amplitude': point.amplitude,
+                    'duration_periods': point.duration,
+                    'is_confirmed': point.confirmed,
+                }
+                key = (indicator_id, point_date)
+                seen.add(key)
+                current = existing.get(key)
+                if current is None:
+                    to_create.append(TurningPoint(
+                        indicator_id=indicator_id, frequency=self.frequency, date=point_date, **values
+                    ))
+                elif any(getattr(current, name) != value for name, value in values.items()):
+                    for name, value in values.items():
+                        setattr(current, name, value)
+                    to_update.append(current)
+
+        stale = [tp.pk for key, tp in existing.items() if key not in seen]
+
+        if stale:
+            TurningPoint.objects.filter(pk__in=stale).delete()
+        if to_create:
+            TurningPoint.objects.bulk_create(to_create, batch_size=self.batch_size)
+        if to_update:
+            now = timezone.now()
+            for tp in to_update:
+                tp.detected_at = now
+            TurningPoint.objects.bulk_update(
+                to_update,
+                ['point_type', 'value', 'amplitude', 'duration_periods', 'is_confirmed', 'detected_at'],
+                batch_size=self.batch_size,
+            )
+
+        result.created += len(to_create)
+        result.updated += len(to_update)
+        result.deleted += len(stale)
+
+    def _save_state(self, indicators: Dict[str, Dict], evaluated_at):
+        """记录识别时间（按频率），用于增量判断；只合并本模块的键，不覆盖其他元数据"""
+        Indicator.update_metadata_key(
+            STATE_KEY,
+            {info['id']: {self.frequency: evaluated_at.isoformat()} for info in indicators.values()},
+            merge=True,
+            batch_size=self.batch_size,
+        )
+
+
+def update_turning_points(indicator_codes: Iterable[str] = None,
+                          frequency: str = 'M',
+                          full: bool = False) -> TurningPointResult:
+    """更新拐点的便捷函数"""
+    return TurningPointDetector(frequency=frequency).run(indicator_codes=indicator_codes, full=full)
@@ -6,30 +6,46 @@
 """
 
 import logging
-import pandas as pd
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List, Tuple, Union
 from dataclasses import dataclass
-from enum import Enum
 
-from django.db import transaction, IntegrityError
-from django.utils import timezone
-from .models import Indicator, IndicatorData, DataQualityReport
+import pandas as pd
+from .models import Indicator
 
 # 导入各数据源收集器
 from .enhanced_data_collector import EnhancedDataCollector, CollectionResult
 from .wind_data_collector import WindDataCollector, WindConnectionConfig, WindCollectionResult
+from .circuit_breaker import akshare_circuit_key, wind_circuit_key
+from .mapping_registry import DataSource, SOURCE_PRIORITY, get_mapping_registry
+from .source_health import SourceHealthRegistry, get_source_health
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 对冲模式：主数据源超过该延迟分位数仍未返回时，并发请求备选数据源
+HEDGE_PERCENTILE = 0.9
+
+# 对冲请求共用的线程池（只做上游抓取；落后的请求在后台完成后丢弃，不阻塞调用方）
+HEDGE_MAX_WORKERS = 8
 
-class DataSource(Enum):
-    """数据源枚举"""
-    AKSHARE = "akshare"
-    WIND = "wind"
-    AUTO = "auto"  # 自动选择
+_hedge_executor = None
+_hedge_executor_lock = threading.Lock()
+
+
+def _get_hedge_executor() -> ThreadPoolExecutor:
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _hedge_executor_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=HEDGE_MAX_WORKERS, thread_name_prefix='source-hedge'
+                )
+    return _hedge_executor
 
 
 @dataclass
@@ -45,83 +61,59 @@ class UnifiedCollectionResult:
     akshare_function: str = ""
 
 
+@dataclass
+class SourceFetch:
+    """单个数据源的抓取结果（尚未清洗和写库）"""
+    source: DataSource
+    config: Optional[Dict] = None
+    data_df: Optional[pd.DataFrame] = None
+    error_message: str = ""
+    circuit_open: bool = False
+
+    @property
+    def success(self) -> bool:
+        return self.data_df is not None and not self.data_df.empty
+
+
 class UnifiedDataCollector:
     """统一数据收集器"""
     
-    def __init__(self, wind_config: WindConnectionConfig = None):
+    def __init__(self,
+                 wind_config: WindConnectionConfig = None,
+                 hedged: bool = False,
+                 hedge_percentile: float = HEDGE_PERCENTILE,
+                 source_health: SourceHealthRegistry = None):
+        """
+        Args:
+            wind_config: Wind连接配置，不指定则仅使用AkShare
+            hedged: 对冲模式，主数据源超过延迟分位数未返回时并发请求备选数据源，
+                    只清洗和保存最先成功返回的数据
+            hedge_percentile: 触发对冲请求的延迟分位数
+            source_health: 数据源健康度统计，默认使用进程内共享实例
+        """
         # 初始化各数据源收集器
         self.akshare_collector = EnhancedDataCollector()
         self.wind_collector = WindDataCollector(wind_config) if wind_config else None
         
-        # 数据源优先级策略
+        # 数据源优先级策略（采集时按健康评分动态调整）
         self.source_priority = self._build_source_priority()
+        self.source_health = source_health or get_source_health()
+        self.hedged = hedged
+        self.hedge_percentile = hedge_percentile
         
         # 支持的指标映射
         self.unified_mappings = self._build_unified_mappings()
     
     def _build_source_priority(self) -> Dict[str, List[DataSource]]:
         """构建数据源优先级策略"""
-        return {
-            # 宏观经济指标：优先使用Wind，备选AkShare
-            'macro': [DataSource.WIND, DataSource.AKSHARE],
-            
-            # 股票指数：优先使用Wind
-            'index': [DataSource.WIND, DataSource.AKSHARE],
-            'industry': [DataSource.WIND, DataSource.AKSHARE],
-            'us_index': [DataSource.WIND, DataSource.AKSHARE],
-            
-            # 债券利率：优先使用Wind
-            'bond': [DataSource.WIND, DataSource.AKSHARE],
-            
-            # 商品期货：优先使用Wind
-            'commodity': [DataSource.WIND, DataSource.AKSHARE],
-            
-            # 外汇：优先使用Wind
-            'fx': [DataSource.WIND, DataSource.AKSHARE],
-            
-            # 默认：自动选择
-            'default': [DataSource.WIND, DataSource.AKSHARE]
-        }
+        return {data_type: list(priority) for data_type, priority in SOURCE_PRIORITY.items()}
     
     def _build_unified_mappings(self) -> Dict[str, Dict]:
-        """构建统一指标映射"""
-        unified_mappings = {}
-        
-        # 添加AkShare映射
-        if hasattr(self.akshare_collector, 'akshare_mappings'):
-            for code, config in self.akshare_collector.akshare_mappings.items():
-                unified_mappings[code] = {
-                    'sources': {DataSource.AKSHARE: config},
-                    'primary_source': DataSource.AKSHARE,
-                    'data_type': config.get('data_type', 'unknown')
-                }
-        
-        # 添加Wind映射
-        if self.wind_collector and hasattr(self.wind_collector, 'wind_mappings'):
-            for code, config in self.wind_collector.wind_mappings.items():
-                if code in unified_mappings:
-                    # 如果已存在，添加Wind作为备选数据源
-                    unified_mappings[code]['sources'][DataSource.WIND] = config
-                else:
-                    # 新增Wind指标
-                    unified_mappings[code] = {
-                        'sources': {DataSource.WIND: config},
-                        'primary_source': DataSource.WIND,
-                        'data_type': config.get('data_type', 'unknown')
-                    }
-        
-        # 设置数据源优先级
-        for code, mapping in unified_mappings.items():
-            data_type = mapping['data_type']
-            priority = self.source_priority.get(data_type, self.source_priority['default'])
-            
-            # 根据优先级和可用性确定主数据源
-            for source in priority:
-                if source in mapping['sources']:
-                    mapping['primary_source'] = source
-                    break
-        
-        return unified_mappings
+        """获取统一指标映射（来自共享注册表，未配置Wind时仅包含AkShare）"""
+        registry = get_mapping_registry()
+        if self.wind_collector:
+            return registry.unified
+        return registry.unified_akshare_only
     
     def collect_indicator_data(self, 
                              indicator_code: str, 
@@ -156,43 +148,36 @@ class UnifiedDataCollector:
             
             # 确定数据源
             if data_source == DataSource.AUTO:
-                # 自动选择主数据源
-                selected_source = mapping['primary_source']
+                # 自动选择：按健康评分调整后的优先级
+                candidates = self._ordered_sources(mapping)
             else:
-                # 使用指定数据源
+                # 使用指定数据源，失败时再按优先级尝试其余数据源
                 if data_source not in mapping['sources']:
                     return UnifiedCollectionResult(
                         success=False,
                         error_message=f"指标 {indicator_code} 不支持数据源 {data_source.value}"
                     )
-                selected_source = data_source
-            
-            logger.info(f"选择数据源: {selected_source.value}")
+                candidates = [data_source] + [
+                    source for source in self._ordered_sources(mapping) if source != data_source
+                ]
             
-            # 尝试主数据源
-            result = self._collect_from_source(
-                indicator_code, selected_source, start_date, end_date
-            )
-            
-            if result.success:
-                return result
-            
-            # 如果主数据源失败，尝试备选数据源
-            logger.warning(f"主数据源 {selected_source.value} 失败，尝试备选数据源")
-            
-            data_type = mapping['data_type']
-            priority = self.source_priority.get(data_type, self.source_priority['default'])
+            logger.info(f"选择数据源: {candidates[0].value}")
             
-            for backup_source in priority:
-                if backup_source != selected_source and backup_source in mapping['sources']:
-                    logger.info(f"尝试备选数据源: {backup_source.value}")
-                    
-                    result = self._collect_from_source(
-                        indicator_code, backup_source, start_date, end_date
-                    )
-                    
+            if self.hedged and len(candidates) > 1:
+                fetch = self._fetch_hedged(indicator_code, candidates, start_date, end_date)
+                if fetch.success:
+                    result = self._store_fetched(indicator, fetch, start_date, end_date)
+                    if result.success:
+                        return result
+            else:
+                for i, source in enumerate(candidates):
+                    if i > 0:
+                        logger.info(f"尝试备选数据源: {source.value}")
+                    result = self._collect_from_source(indicator, source, start_date, end_date)
                     if result.success:
                         return result
+                    if i == 0:
+                        logger.warning(f"主数据源 {source.value} 失败，尝试备选数据源")
             
             # 所有数据源都失败
             return UnifiedCollectionResult(
@@ -208,16 +193,115 @@ class UnifiedDataCollector:
                 error_message=error_msg
             )
     
+    def _ordered_sources(self, mapping: Dict) -> List[DataSource]:
+        """
+        指标可用数据源的尝试顺序：静态优先级（主数据源在前）按健康评分稳定排序，
+        样本不足的数据源按默认延迟估计评分
+        """
+        priority = self.source_priority.get(mapping['data_type'], self.source_priority['default'])
+        ordered = [mapping['primary_source']]
+        ordered += [source for source in priority if source in mapping['sources'] and source not in ordered]
+        ordered += [source for source in mapping['sources'] if source not in ordered]
+        
+        ranked = self.source_health.rank(source.value for source in ordered)
+        by_name = {source.value: source for source in ordered}
+        return [by_name[name] for name in ranked]
+    
+    def _fetch_from_source(self,
+                           indicator_code: str,
+                           source: DataSource,
+                           start_date: str = None,
+                           end_date: str = None) -> SourceFetch:
+        """从指定数据源抓取原始数据（不清洗、不写库），熔断中的请求直接跳过"""
+        config = None
+        try:
+            if source == DataSource.AKSHARE:
+                collector = self.akshare_collector
+                config = collector.akshare_mappings.get(indicator_code)
+                if config is None:
+                    return SourceFetch(source, error_message=f"未找到指标 {indicator_code} 的AkShare映射配置")
+                if not collector.circuit_breakers.allow(akshare_circuit_key(config['func'])):
+                    return SourceFetch(
+                        source, config, error_message=f"AkShare函数 {config['func']} 熔断中", circuit_open=True
+                    )
+                data_df = collector._fetch_data_from_akshare(config, start_date, end_date)
+            
+            elif source == DataSource.WIND:
+                collector = self.wind_collector
+                if not collector:
+                    return SourceFetch(source, error_message="Wind收集器未初始化")
+                config = collector.wind_mappings.get(indicator_code)
+                if config is None:
+                    return SourceFetch(source, error_message=f"未找到指标 {indicator_code} 的Wind映射配置")
+                request_type = collector._request_type(config)
+                if request_type is not None and collector.circuit_breakers.is_open(wind_circuit_key(*request_type)):
+                    return SourceFetch(
+                        source, config, error_message=f"Wind请求 {wind_circuit_key(*request_type)} 熔断中",
+                        circuit_open=True
+                    )
+                data_df = collector._fetch_data_from_wind(config, start_date, end_date)
+            
+            else:
+                return SourceFetch(source, error_message=f"不支持的数据源: {source.value}")
+        
+        except Exception as e:
+            return SourceFetch(source, config, error_message=f"从数据源 {source.value} 获取数据时出错: {str(e)}")
+        
+        if data_df is None or data_df.empty:
+            return SourceFetch(source, config, error_message=f"数据源 {source.value} 未获取到指标 {indicator_code} 的数据")
+        return SourceFetch(source, config, data_df)
+    
+    def _timed_fetch(self,
+                     indicator_code: str,
+                     source: DataSource,
+                     start_date: str = None,
+                     end_date: str = None) -> SourceFetch:
+        """从指定数据源抓取并记录耗时与成败（熔断跳过的请求不计入健康度）"""
+        started = time.monotonic()
+        fetch = self._fetch_from_source(indicator_code, source, start_date, end_date)
+        if not fetch.circuit_open:
+            self.source_health.record(source.value, time.monotonic() - started, fetch.success)
+        return fetch
+    
+    def _store_fetched(self,
+                       indicator: Indicator,
+                       fetch: SourceFetch,
+                       start_date: str = None,
+                       end_date: str = None) -> UnifiedCollectionResult:
+        """由抓取到数据的数据源对应的采集器清洗并保存（每个指标只保存一次）"""
+        if fetch.source == DataSource.AKSHARE:
+            akshare_result = self.akshare_collector._store_indicator_frame(
+                indicator, fetch.config, fetch.data_df, start_date, end_date
+            )
+            return UnifiedCollectionResult(
+                success=akshare_result.success,
+                records_count=akshare_result.records_count,
+                error_message=akshare_result.error_message,
+                data_range=akshare_result.data_range,
+                data_source="akshare",
+                akshare_function=akshare_result.api_function
+            )
+        
+        wind_result = self.wind_collector._store_indicator_frame(indicator, fetch.config, fetch.data_df)
+        return UnifiedCollectionResult(
+            success=wind_result.success,
+            records_count=wind_result.records_count,
+            error_message=wind_result.error_message,
+            data_range=wind_result.data_range,
+            data_source="wind",
+            wind_code=wind_result.wind_code
+        )
+    
     def _collect_from_source(self, 
-                           indicator_code: str, 
+                           indicator: Indicator, 
                            source: DataSource, 
                            start_date: str = None, 
                            end_date: str = None) -> UnifiedCollectionResult:
         """
-        从指定数据源收集数据
+        从指定数据源收集数据：抓取（记录耗时与成败）后清洗并保存
         
         Args:
-            indicator_code: 指标代码
+            indicator: 指标对象
             source: 数据源
             start_date: 开始日期
             end_date: 结束日期
@@ -225,54 +309,64 @@ class UnifiedDataCollector:
         Returns:
             UnifiedCollectionResult: 采集结果
         """
-        try:
-            if source == DataSource.AKSHARE:
-                # 使用AkShare收集器
-                akshare_result = self.akshare_collector.collect_indicator_data(
-                    indicator_code, start_date, end_date
-                )
-                
-                return UnifiedCollectionResult(
-                    success=akshare_result.success,
-                    records_count=akshare_result.records_count,
-                    error_message=akshare_result.error_message,
-                    data_range=akshare_result.data_range,
-                    data_source="akshare",
-                    akshare_function=akshare_result.api_function
-                )
-                
-            elif source == DataSource.WIND:
-                # 使用Wind收集器
-                if not self.wind_collector:
-                    return UnifiedCollectionResult(
-                        success=False,
-                        error_message="Wind收集器未初始化"
-                    )
-                
-                wind_result = self.wind_collector.collect_indicator_data(
-                    indicator_code, start_date, end_date
-                )
-                
-                return UnifiedCollectionResult(
-                    success=wind_result.success,
-                    records_count=wind_result.records_count,
-                    error_message=wind_result.error_message,
-                    data_range=wind_result.data_range,
-                    data_source="wind",
-                    wind_code=wind_result.wind_code
-                )
-            
-            else:
-                return UnifiedCollectionResult(
-                    success=False,
-                    error_message=f"不支持的数据源: {source.value}"
-                )
-                
-        except Exception as e:
+        fetch = self._timed_fetch(indicator.code, source, start_date, end_date)
+        if not fetch.success:
             return UnifiedCollectionResult(
                 success=False,
-                error_message=f"从数据源 {source.value} 收集数据时出错: {str(e)}"
+                error_message=fetch.error_message,
+                data_source=source.value
             )
+        return self._store_fetched(indicator, fetch, start_date, end_date)
+    
+    def _fetch_hedged(self,
+                      indicator_code: str,
+                      candidates: List[DataSource],
+                      start_date: str = None,
+                      end_date: str = None) -> SourceFetch:
+        """
+        对冲抓取：先请求首选数据源，超过其延迟分位数仍未返回（或已失败）时
+        并发请求下一个数据源，返回最先成功的抓取结果；
+        只对冲上游请求，落后请求的数据在后台完成后直接丢弃，不会清洗或写库
+        """
+        executor = _get_hedge_executor()
+        pending = {}
+        remaining = list(candidates)
+        last_fetch = SourceFetch(candidates[0], error_message="没有可用的数据源")
+        
+        def launch():
+            source = remaining.pop(0)
+            future = executor.submit(self._timed_fetch, indicator_code, source, start_date, end_date)
+            pending[future] = source
+            return source
+        
+        launch()
+        while pending:
+            hedge_after = None
+            if remaining:
+                current = list(pending.values())[-1]
+                hedge_after = self.source_health.latency_percentile(current.value, self.hedge_percentile)
+            
+            done, _ = wait(list(pending), timeout=hedge_after, return_when=FIRST_COMPLETED)
+            if not done:
+                source = launch()
+                logger.info(f"数据源响应超过 {hedge_after:.2f} 秒，对冲请求: {source.value}")
+                continue
+            
+            for future in done:
+                source = pending.pop(future)
+                fetch = future.result()
+                if fetch.success:
+                    if pending:
+                        logger.info(f"数据源 {source.value} 先返回，忽略其余进行中的请求")
+                    return fetch
+                logger.warning(f"数据源 {source.value} 失败: {fetch.error_message}")
+                last_fetch = fetch
+            
+            if not pending and remaining:
+                source = launch()
+                logger.info(f"尝试备选数据源: {source.value}")
+        
+        return last_fetch
     
     def get_supported_indicators(self) -> Dict[str, Dict]:
         """获取所有支持的指标信息"""
@@ -302,7 +396,8 @@ class UnifiedDataCollector:
             'total_indicators': len(self.unified_mappings),
             'by_source': {},
             'by_data_type': {},
-            'dual_source_indicators': 0
+            'dual_source_indicators': 0,
+            'source_health': self.source_health.snapshot()
         }
         
         # 按数据源统计
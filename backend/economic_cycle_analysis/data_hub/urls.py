@@ -4,13 +4,18 @@ from .views import (
     IndicatorCategoryViewSet, 
     IndicatorViewSet, 
     IndicatorDataViewSet,
+    TurningPointViewSet,
     wind_status,
     wind_test_connection,
     wind_initialize_indicators,
     wind_collect_data,
     wind_sync_indicators,
     wind_supported_indicators,
-    wind_data_quality_report
+    wind_data_quality_report,
+    cycle_analysis,
+    lead_lag_analysis,
+    rolling_correlation_matrix,
+    regime_analysis
 )
 
 # 创建DRF路由器
@@ -18,6 +23,7 @@ router = DefaultRouter()
 router.register(r'categories', IndicatorCategoryViewSet, basename='category')
 router.register(r'indicators', IndicatorViewSet, basename='indicator')
 router.register(r'data', IndicatorDataViewSet, basename='data')
+router.register(r'turning-points', TurningPointViewSet, basename='turning-point')
 
 app_name = 'data_hub'
 
@@ -32,4 +38,10 @@ urlpatterns = [
     path('api/wind/sync-indicators/', wind_sync_indicators, name='wind-sync-indicators'),
     path('api/wind/supported-indicators/', wind_supported_indicators, name='wind-supported-indicators'),
     path('api/wind/quality-report/', wind_data_quality_report, name='wind-quality-report'),
+    
+    # 周期分析API端点
+    path('api/cycles/', cycle_analysis, name='cycle-analysis'),
+    path('api/lead-lag/', lead_lag_analysis, name='lead-lag-analysis'),
+    path('api/correlations/', rolling_correlation_matrix, name='rolling-correlation'),
+    path('api/regimes/', regime_analysis, name='regime-analysis'),
 ] 
\ No newline at end of file
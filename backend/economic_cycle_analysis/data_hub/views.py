@@ -11,14 +11,13 @@ from django.db.models import Q
 from rest_framework.decorators import api_view
 from rest_framework.pagination import PageNumberPagination
 
-from .models import IndicatorCategory, Indicator, IndicatorData
+from .models import IndicatorCategory, Indicator, IndicatorData, TurningPoint
 from .serializers import (
     IndicatorCategorySerializer, IndicatorSerializer, 
     IndicatorDataSerializer, IndicatorDataBulkSerializer,
-    IndicatorStatsSerializer
+    IndicatorStatsSerializer, TurningPointSerializer
 )
-from .wind_integration_service import wind_integration_service
-from .wind_data_collector import WindConnectionConfig
+from .mapping_registry import get_mapping_registry
 
 
 class IndicatorCategoryViewSet(viewsets.ReadOnlyModelViewSet):
@@ -198,6 +197,19 @@ class IndicatorDataViewSet(viewsets.ReadOnlyModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['get'])
+    def anomalies(self, request):
+        """获取被标记为异常的数据点（支持indicator_code与日期范围过滤）"""
+        queryset = self.get_queryset().filter(is_anomaly=True).order_by('indicator_id', '-date')
+        
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def latest_all(self, request):
         """获取所有指标的最新数据"""
@@ -254,11 +266,58 @@ class IndicatorDataViewSet(viewsets.ReadOnlyModelViewSet):
         })
 
 
+class TurningPointViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    指标拐点ViewSet - 只读
+    提供 Bry-Boschan 拐点的查询，支持指标、类型、确认状态与日期范围过滤
+    """
+    queryset = TurningPoint.objects.select_related('indicator').all()
+    serializer_class = TurningPointSerializer
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
+    filterset_fields = ['indicator', 'indicator__category', 'frequency', 'point_type', 'is_confirmed']
+    ordering_fields = ['date', 'value', 'amplitude']
+    ordering = ['indicator_id', 'date']
+
+    def get_queryset(self):
+        """根据查询参数过滤拐点"""
+        queryset = super().get_queryset()
+        
+        indicator_codes = self.request.query_params.get('indicator_code')
+        if indicator_codes:
+            codes = [code.strip() for code in indicator_codes.split(',') if code.strip()]
+            queryset = queryset.filter(indicator__code__in=codes)
+        
+        start_date = self.request.query_params.get('start_date')
+        end_date = self.request.query_params.get('end_date')
+        
+        if start_date:
+            try:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
+                queryset = queryset.filter(date__gte=start_date)
+            except ValueError:
+                pass
+        
+        if end_date:
+            try:
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
+                queryset = queryset.filter(date__lte=end_date)
+            except ValueError:
+                pass
+        
+        return queryset
+
+
+def _wind_service():
+    """延迟获取Wind集成服务，避免URL加载时导入WindPy/pandas"""
+    from .wind_integration_service import get_wind_integration_service
+    return get_wind_integration_service()
+
+
 @api_view(['GET'])
 def wind_status(request):
     """获取Wind数据源状态"""
     try:
-        status = wind_integration_service.get_integration_status()
+        status = _wind_service().get_integration_status()
         return Response({
             'success': True,
             'data': status
@@ -273,6 +332,8 @@ def wind_status(request):
 @api_view(['POST'])
 def wind_test_connection(request):
     """测试Wind连接"""
+    from .wind_data_collector import WindConnectionConfig
+    
     try:
         # 获取连接配置
         username = request.data.get('username', '17600806220')
@@ -285,7 +346,7 @@ def wind_test_connection(request):
         )
         
         # 测试连接
-        test_result = wind_integration_service.test_wind_connectivity()
+        test_result = _wind_service().test_wind_connectivity()
         
         return Response({
             'success': True,
@@ -302,7 +363,7 @@ def wind_test_connection(request):
 def wind_initialize_indicators(request):
     """初始化Wind指标"""
     try:
-        result = wind_integration_service.initialize_wind_indicators()
+        result = _wind_service().initialize_wind_indicators()
         
         return Response({
             'success': result.success,
@@ -332,7 +393,7 @@ def wind_collect_data(request):
         force_update = request.data.get('force_update', False)
         
         # 执行数据收集
-        result = wind_integration_service.collect_wind_data_batch(
+        result = _wind_service().collect_wind_data_batch(
             indicator_codes=indicator_codes,
             start_date=start_date,
             end_date=end_date,
@@ -361,7 +422,7 @@ def wind_collect_data(request):
 def wind_sync_indicators(request):
     """同步Wind指标与现有指标体系"""
     try:
-        result = wind_integration_service.sync_with_existing_indicators()
+        result = _wind_service().sync_with_existing_indicators()
         
         return Response({
             'success': result.success,
@@ -383,23 +444,7 @@ def wind_sync_indicators(request):
 def wind_supported_indicators(request):
     """获取Wind支持的指标列表"""
     try:
-        from .wind_data_collector import WindDataCollector
-        
-        collector = WindDataCollector()
-        mappings = collector.wind_mappings
-        
-        # 格式化返回数据
-        indicators = []
-        for code, config in mappings.items():
-            indicators.append({
-                'code': code,
-                'wind_code': config['wind_code'],
-                'description': config['description'],
-                'data_type': config['data_type'],
-                'frequency': config['frequency'],
-                'dimension': config.get('dimension', ''),
-                'industry': config.get('industry', '')
-            })
+        indicators = get_mapping_registry().wind_supported_list()
         
         return Response({
             'success': True,
@@ -456,3 +501,169 @@ def wind_data_quality_report(request):
             'success': False,
             'error': str(e)
         }, status=500)
+
+
+def _indicator_codes_param(request, default_limit: int = 200):
+    """解析 indicators 查询参数（逗号分隔），未指定时取重要程度较高的启用指标"""
+    codes = request.query_params.get('indicators')
+    if codes:
+        return [code.strip() for code in codes.split(',') if code.strip()]
+    return list(
+        Indicator.objects.filter(is_active=True, importance_level__gte=4)
+        .order_by('-importance_level', 'code')
+        .values_list('code', flat=True)[:default_limit]
+    )
+
+
+@api_view(['GET'])
+def cycle_analysis(request):
+    """
+    经济周期分解
+    参数: indicators, cycle(business/kitchin/juglar/kuznets/kondratieff/custom),
+         method(cf/bk/hp), frequency(M/Q/Y), start_date, end_date, detail
+    """
+    from .cycle_engine import analyze_cycles
+    
+    try:
+        result = analyze_cycles(
+            _indicator_codes_param(request),
+            cycle=request.query_params.get('cycle', 'business'),
+            method=request.query_params.get('method', 'cf'),
+            frequency=request.query_params.get('frequency', 'M'),
+            start_date=request.query_params.get('start_date'),
+            end_date=request.query_params.get('end_date'),
+            detail=request.query_params.get('detail', '').lower() in ('1', 'true', 'yes'),
+        )
+        return Response({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+def lead_lag_analysis(request):
+    """
+    领先滞后分析：候选指标相对目标指标的最佳滞后期排名（只读取已保存的结果）
+    参数: target(必填), frequency(M/Q/W), transform(level/diff/yoy), status(LEAD/SYNC/LAG), limit
+    结果由 python manage.py analyze_lead_lag --targets <target> 计算并保存
+    """
+    from .lead_lag import lead_lag_ranking
+    
+    target = request.query_params.get('target')
+    if not target:
+        return Response({
+            'success': False,
+            'error': '请提供target参数'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    frequency = request.query_params.get('frequency', 'M')
+    transform = request.query_params.get('transform', 'level')
+    
+    try:
+        ranking = lead_lag_ranking(
+            target_code=target,
+            frequency=frequency,
+            transform=transform,
+            status=request.query_params.get('status'),
+            limit=int(request.query_params.get('limit', 50)),
+        )
+        
+        return Response({
+            'success': True,
+            'data': {
+                'target': target,
+                'frequency': frequency,
+                'transform': transform,
+                'results': ranking
+            }
+        })
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+def rolling_correlation_matrix(request):
+    """
+    滚动相关矩阵（上三角按行展开）
+    参数: dimension(如 liquidity) 或 indicators, window(60/120/250), frequency(D/W/M),
+         date(窗口结束日期，默认最新), min_periods
+    """
+    from .rolling_correlation import group_indicator_codes, rolling_correlation
+    
+    try:
+        dimension = request.query_params.get('dimension')
+        if dimension:
+            codes = group_indicator_codes(dimension)
+        else:
+            codes = _indicator_codes_param(request, default_limit=50)
+        
+        min_periods = request.query_params.get('min_periods')
+        result = rolling_correlation(
+            codes,
+            window=int(request.query_params.get('window', 60)),
+            frequency=request.query_params.get('frequency', 'D'),
+            date=request.query_params.get('date'),
+            min_periods=int(min_periods) if min_periods else None,
+        )
+        return Response({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
+
+
+@api_view(['GET'])
+def regime_analysis(request):
+    """
+    投资时钟阶段（复苏/过热/滞胀/衰退）序列与转移概率
+    参数: start_date, end_date, frequency(M 或 D，D 为按工作日展开)
+    """
+    from .regime_engine import regime_summary
+    
+    try:
+        result = regime_summary(
+            start_date=request.query_params.get('start_date'),
+            end_date=request.query_params.get('end_date'),
+            daily=request.query_params.get('frequency', 'M').upper() == 'D',
+        )
+        return Response({
+            'success': True,
+            'data': result
+        })
+    except ValueError as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=500)
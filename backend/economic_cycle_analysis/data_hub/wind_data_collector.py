@@ -14,22 +14,52 @@ from dataclasses import dataclass
 import os
 import sys
 
-from django.db import transaction, IntegrityError
-from django.utils import timezone
-from .models import Indicator, IndicatorData, DataQualityReport
+from .models import Indicator
+from .mapping_registry import get_mapping_registry
+from .series_store import save_series
+from .wind_session import WindSessionBusyError, WindSessionManager, get_wind_session_manager
+from .circuit_breaker import get_circuit_breakers, wind_circuit_key
+from .frequency import date_windows
 
-# WindPy导入
-try:
-    from WindPy import w
-    WIND_AVAILABLE = True
-except ImportError:
-    WIND_AVAILABLE = False
-    w = None
+# WindPy延迟导入：首次使用时才加载，避免拖慢Django启动
+_wind_api = None
+_wind_import_attempted = False
+
+
+def get_wind_api():
+    """获取WindPy接口对象，未安装时返回None"""
+    global _wind_api, _wind_import_attempted
+    if not _wind_import_attempted:
+        _wind_import_attempted = True
+        try:
+            from WindPy import w
+            _wind_api = w
+        except ImportError:
+            _wind_api = None
+    return _wind_api
+
+
+def is_wind_available() -> bool:
+    """WindPy是否可用"""
+    return get_wind_api() is not None
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 单次 edb/wsd 请求的最大代码数
+MAX_CODES_PER_REQUEST = 100
+
+# 各数据类型使用的Wind函数与字段: data_type -> (函数, 字段)
+WIND_REQUEST_TYPES = {
+    'macro': ('edb', None),
+    'index': ('wsd', 'close'),
+    'industry': ('wsd', 'close'),
+    'us_index': ('wsd', 'close'),
+    'commodity': ('wsd', 'close'),
+    'fx': ('wsd', 'close'),
+}
+
 
 @dataclass
 class WindConnectionConfig:
@@ -49,423 +79,46 @@ class WindCollectionResult:
     data_range: Tuple[str, str] = ("", "")
     wind_code: str = ""
     error_code: int = 0
+    circuit_open: bool = False  # Wind请求类型熔断，未实际请求
 
 
 class WindDataCollector:
     """Wind数据采集器"""
     
-    def __init__(self, config: WindConnectionConfig = None):
+    def __init__(self, config: WindConnectionConfig = None, session_manager: WindSessionManager = None):
         self.config = config or WindConnectionConfig()
         self.connected = False
-        self.w = w
+        self._session_manager = session_manager
+        
+        # 按Wind请求类型的熔断器（进程内共享）
+        self.circuit_breakers = get_circuit_breakers()
         
-        # Wind代码映射表
-        self.wind_mappings = self._build_wind_mappings()
+        # Wind代码映射表（进程内共享）
+        self.wind_mappings = get_mapping_registry().wind
         
         # 数据标准化规则
         self.standardization_rules = self._build_standardization_rules()
     
+    @property
+    def session_manager(self) -> WindSessionManager:
+        """Wind会话（默认使用当前账号的进程内共享长连接）"""
+        if self._session_manager is not None:
+            return self._session_manager
+        return get_wind_session_manager(self.config)
+    
+    @property
+    def w(self):
+        """WindPy接口（延迟加载）"""
+        return self.session_manager.api
+    
     def connect(self) -> bool:
-        """连接到Wind数据库"""
-        if not WIND_AVAILABLE:
-            logger.error("WindPy未安装，请先安装: pip install WindPy")
-            return False
-        
-        try:
-            # 启动Wind接口
-            result = self.w.start()
-            
-            if result.ErrorCode == 0:
-                self.connected = True
-                logger.info("Wind数据库连接成功")
-                
-                # 登录验证
-                login_result = self.w.logon(self.config.username, self.config.password)
-                if hasattr(login_result, 'ErrorCode') and login_result.ErrorCode == 0:
-                    logger.info(f"Wind用户登录成功: {self.config.username}")
-                else:
-                    logger.warning("Wind登录状态未明确，但连接已建立")
-                
-                return True
-            else:
-                logger.error(f"Wind数据库连接失败，错误代码: {result.ErrorCode}")
-                return False
-                
-        except Exception as e:
-            logger.error(f"Wind连接异常: {str(e)}")
-            return False
+        """连接到Wind数据库（复用共享会话，已连接且健康时不重复握手）"""
+        self.connected = self.session_manager.connect()
+        return self.connected
     
     def disconnect(self):
-        """断开Wind连接"""
-        if self.connected and self.w:
-            try:
-                self.w.stop()
-                self.connected = False
-                logger.info("Wind数据库连接已断开")
-            except Exception as e:
-                logger.error(f"断开Wind连接时出错: {str(e)}")
-    
-    def _build_wind_mappings(self) -> Dict[str, Dict]:
-        """构建Wind代码映射表"""
-        return {
-            # ===== 宏观经济指标 =====
-            'WIND_CPI_YOY': {
-                'wind_code': 'M0000612',  # CPI当月同比
-                'data_type': 'macro',
-                'frequency': 'M',
-                'description': 'CPI当月同比(%)',
-                'dimension': '景气指数',
-                'industry': '宏观经济'
-            },
-            'WIND_CPI_MOM': {
-                'wind_code': 'M0000613',  # CPI当月环比
-                'data_type': 'macro',
-                'frequency': 'M',
-                'description': 'CPI当月环比(%)',
-                'dimension': '景气指数',
-                'industry': '宏观经济'
-            },
-            'WIND_PPI_YOY': {
-                'wind_code': 'M0001227',  # PPI当月同比
-                'data_type': 'macro',
-                'frequency': 'M',
-                'description': 'PPI当月同比(%)',
-                'dimension': '景气指数',
-                'industry': '宏观经济'
-            },
-            'WIND_GDP_YOY': {
-                'wind_code': 'M0000545',  # GDP当季同比
-                'data_type': 'macro',
-                'frequency': 'Q',
-                'description': 'GDP当季同比(%)',
-                'dimension': '景气指数',
-                'industry': '宏观经济'
-            },
-            'WIND_M2_YOY': {
-                'wind_code': 'M0001380',  # M2同比增长
-                'data_type': 'macro',
-                'frequency': 'M',
-                'description': 'M2同比增长(%)',
-                'dimension': '流动性',
-                'industry': '宏观经济'
-            },
-            'WIND_PMI_MFG': {
-                'wind_code': 'M0017126',  # 制造业PMI
-                'data_type': 'macro',
-                'frequency': 'M',
-                'description': '制造业PMI',
-                'dimension': '景气指数',
-                'industry': '制造业'
-            },
-            'WIND_PMI_NON_MFG': {
-                'wind_code': 'M0017127',  # 非制造业PMI
-                'data_type': 'macro',
-                'frequency': 'M',
-                'description': '非制造业PMI',
-                'dimension': '景气指数',
-                'industry': '服务业'
-            },
-            
-            # ===== 股票指数 =====
-            'WIND_CSI300': {
-                'wind_code': '000300.SH',  # 沪深300指数
-                'data_type': 'index',
-                'frequency': 'D',
-                'description': '沪深300指数',
-                'dimension': '技术面',
-                'industry': '股票市场'
-            },
-            'WIND_SSE_COMP': {
-                'wind_code': '000001.SH',  # 上证综指
-                'data_type': 'index',
-                'frequency': 'D',
-                'description': '上证综合指数',
-                'dimension': '技术面',
-                'industry': '股票市场'
-            },
-            'WIND_SZSE_COMP': {
-                'wind_code': '399001.SZ',  # 深证成指
-                'data_type': 'index',
-                'frequency': 'D',
-                'description': '深证成份指数',
-                'dimension': '技术面',
-                'industry': '股票市场'
-            },
-            'WIND_GEM': {
-                'wind_code': '399006.SZ',  # 创业板指数
-                'data_type': 'index',
-                'frequency': 'D',
-                'description': '创业板指数',
-                'dimension': '技术面',
-                'industry': '股票市场'
-            },
-            
-            # ===== 债券利率 =====
-            'WIND_10Y_TREASURY': {
-                'wind_code': 'M1004263',  # 10年期国债收益率
-                'data_type': 'bond',
-                'frequency': 'D',
-                'description': '10年期国债收益率(%)',
-                'dimension': '流动性',
-                'industry': '债券市场'
-            },
-            'WIND_1Y_TREASURY': {
-                'wind_code': 'M1004260',  # 1年期国债收益率
-                'data_type': 'bond',
-                'frequency': 'D',
-                'description': '1年期国债收益率(%)',
-                'dimension': '流动性',
-                'industry': '债券市场'
-            },
-            'WIND_SHIBOR_1M': {
-                'wind_code': 'M0017142',  # 1个月SHIBOR
-                'data_type': 'bond',
-                'frequency': 'D',
-                'description': '1个月SHIBOR(%)',
-                'dimension': '流动性',
-                'industry': '债券市场'
-            },
-            
-            # ===== 行业指数 =====
-            'WIND_CSI_CONSUMER': {
-                'wind_code': '000932.SH',  # 中证消费指数
-                'data_type': 'industry_index',
-                'frequency': 'D',
-                'description': '中证消费指数',
-                'dimension': '技术面',
-                'industry': '消费'
-            },
-            'WIND_CSI_FINANCE': {
-                'wind_code': '000934.SH',  # 中证金融指数
-                'data_type': 'industry_index',
-                'frequency': 'D',
-                'description': '中证金融指数',
-                'dimension': '技术面',
-                'industry': '金融'
-            },
-            'WIND_CSI_MATERIAL': {
-                'wind_code': '000935.SH',  # 中证材料指数
-                'data_type': 'industry_index',
-                'frequency': 'D',
-                'description': '中证材料指数',
-                'dimension': '技术面',
-                'industry': '材料'
-            },
-            'WIND_CSI_ENERGY': {
-                'wind_code': '000936.SH',  # 中证能源指数
-                'data_type': 'industry_index',
-                'frequency': 'D',
-                'description': '中证能源指数',
-                'dimension': '技术面',
-                'industry': '能源'
-            },
-            'WIND_CSI_HEALTHCARE': {
-                'wind_code': '000933.SH',  # 中证医药指数
-                'data_type': 'industry_index',
-                'frequency': 'D',
-                'description': '中证医药指数',
-                'dimension': '技术面',
-                'industry': '医药'
-            },
-            'WIND_CSI_TECH': {
-                'wind_code': '000937.SH',  # 中证科技指数
-                'data_type': 'industry_index',
-                'frequency': 'D',
-                'description': '中证科技指数',
-                'dimension': '技术面',
-                'industry': 'TMT'
-            },
-            
-            # ===== 商品期货 =====
-            'WIND_CRUDE_OIL': {
-                'wind_code': 'SC.INE',  # 原油期货主力合约
-                'data_type': 'commodity',
-                'frequency': 'D',
-                'description': '原油期货价格',
-                'dimension': '基本面',
-                'industry': '能源'
-            },
-            'WIND_COPPER': {
-                'wind_code': 'CU.SHF',  # 沪铜期货主力合约
-                'data_type': 'commodity',
-                'frequency': 'D',
-                'description': '铜期货价格',
-                'dimension': '基本面',
-                'industry': '有色金属'
-            },
-            'WIND_STEEL_REBAR': {
-                'wind_code': 'RB.SHF',  # 螺纹钢期货主力合约
-                'data_type': 'commodity',
-                'frequency': 'D',
-                'description': '螺纹钢期货价格',
-                'dimension': '基本面',
-                'industry': '钢铁'
-            },
-            'WIND_CORN': {
-                'wind_code': 'C.DCE',  # 玉米期货主力合约
-                'data_type': 'commodity',
-                'frequency': 'D',
-                'description': '玉米期货价格',
-                'dimension': '基本面',
-                'industry': '农业'
-            },
-            
-            # ===== 外汇汇率 =====
-            'WIND_USD_CNY': {
-                'wind_code': 'USDCNY.EX',  # 美元兑人民币即期汇率
-                'data_type': 'fx',
-                'frequency': 'D',
-                'description': '美元兑人民币汇率',
-                'dimension': '流动性',
-                'industry': '外汇'
-            },
-            'WIND_EUR_CNY': {
-                'wind_code': 'EURCNY.EX',  # 欧元兑人民币即期汇率
-                'data_type': 'fx',
-                'frequency': 'D',
-                'description': '欧元兑人民币汇率',
-                'dimension': '流动性',
-                'industry': '外汇'
-            },
-            
-            # ===== 房地产指标 =====
-            'WIND_HOUSE_PRICE_70': {
-                'wind_code': 'M0041652',  # 70个大中城市房价指数
-                'data_type': 'real_estate',
-                'frequency': 'M',
-                'description': '70个大中城市房价指数',
-                'dimension': '基本面',
-                'industry': '房地产'
-            },
-            'WIND_LAND_PREMIUM': {
-                'wind_code': 'M0041653',  # 土地成交溢价率
-                'data_type': 'real_estate',
-                'frequency': 'M',
-                'description': '土地成交溢价率(%)',
-                'dimension': '基本面',
-                'industry': '房地产'
-            },
-            
-            # ===== 社会融资指标 =====
-            'WIND_SOCIAL_FINANCING': {
-                'wind_code': 'M0017142',  # 社会融资规模存量
-                'data_type': 'finance',
-                'frequency': 'M',
-                'description': '社会融资规模存量(万亿元)',
-                'dimension': '流动性',
-                'industry': '金融'
-            },
-            'WIND_NEW_LOANS': {
-                'wind_code': 'M0001385',  # 新增人民币贷款
-                'data_type': 'finance',
-                'frequency': 'M',
-                'description': '新增人民币贷款(亿元)',
-                'dimension': '流动性',
-                'industry': '金融'
-            },
-            
-            # ===== 进出口贸易 =====
-            'WIND_EXPORT_YOY': {
-                'wind_code': 'M0000607',  # 出口金额当月同比
-                'data_type': 'trade',
-                'frequency': 'M',
-                'description': '出口金额当月同比(%)',
-                'dimension': '基本面',
-                'industry': '对外贸易'
-            },
-            'WIND_IMPORT_YOY': {
-                'wind_code': 'M0000608',  # 进口金额当月同比
-                'data_type': 'trade',
-                'frequency': 'M',
-                'description': '进口金额当月同比(%)',
-                'dimension': '基本面',
-                'industry': '对外贸易'
-            },
-            
-            # ===== 工业生产指标 =====
-            'WIND_INDUSTRIAL_PROD': {
-                'wind_code': 'M0000564',  # 工业增加值当月同比
-                'data_type': 'industrial',
-                'frequency': 'M',
-                'description': '工业增加值当月同比(%)',
-                'dimension': '景气指数',
-                'industry': '工业'
-            },
-            'WIND_ELECTRICITY_PROD': {
-                'wind_code': 'M0000565',  # 发电量当月同比
-                'data_type': 'industrial',
-                'frequency': 'M',
-                'description': '发电量当月同比(%)',
-                'dimension': '景气指数',
-                'industry': '电力'
-            },
-            
-            # ===== 消费指标 =====
-            'WIND_RETAIL_SALES': {
-                'wind_code': 'M0000566',  # 社会消费品零售总额当月同比
-                'data_type': 'consumption',
-                'frequency': 'M',
-                'description': '社会消费品零售总额当月同比(%)',
-                'dimension': '景气指数',
-                'industry': '消费'
-            },
-            'WIND_AUTO_SALES': {
-                'wind_code': 'M0000567',  # 汽车销量当月同比
-                'data_type': 'consumption',
-                'frequency': 'M',
-                'description': '汽车销量当月同比(%)',
-                'dimension': '景气指数',
-                'industry': '汽车'
-            },
-            
-            # ===== 投资指标 =====
-            'WIND_FAI_YTD': {
-                'wind_code': 'M0000570',  # 固定资产投资完成额累计同比
-                'data_type': 'investment',
-                'frequency': 'M',
-                'description': '固定资产投资完成额累计同比(%)',
-                'dimension': '景气指数',
-                'industry': '投资'
-            },
-            'WIND_REAL_ESTATE_INV': {
-                'wind_code': 'M0000571',  # 房地产开发投资完成额累计同比
-                'data_type': 'investment',
-                'frequency': 'M',
-                'description': '房地产开发投资完成额累计同比(%)',
-                'dimension': '景气指数',
-                'industry': '房地产'
-            },
-            
-            # ===== 就业指标 =====
-            'WIND_URBAN_UNEMPLOYMENT': {
-                'wind_code': 'M0000572',  # 城镇调查失业率
-                'data_type': 'employment',
-                'frequency': 'M',
-                'description': '城镇调查失业率(%)',
-                'dimension': '景气指数',
-                'industry': '劳动力市场'
-            },
-            
-            # ===== 波动率指标 =====
-            'WIND_VIX_CHINA': {
-                'wind_code': 'CVIX.SH',  # 中国波指
-                'data_type': 'volatility',
-                'frequency': 'D',
-                'description': '中国波指',
-                'dimension': '波动率',
-                'industry': '股票市场'
-            },
-            
-            # ===== ESG指标 =====
-            'WIND_CSI_ESG': {
-                'wind_code': '931151.CSI',  # 中证ESG指数
-                'data_type': 'esg',
-                'frequency': 'D',
-                'description': '中证ESG指数',
-                'dimension': 'ESG',
-                'industry': 'ESG'
-            }
-        }
+        """释放Wind会话（长连接由会话管理器保持，进程退出时关闭）"""
+        self.connected = False
     
     def _build_standardization_rules(self) -> Dict[str, Dict]:
         """构建数据标准化规则"""
@@ -522,53 +175,274 @@ class WindDataCollector:
                 )
             
             config = self.wind_mappings[indicator_code]
-            wind_code = config['wind_code']
+            
+            # 请求类型熔断中则直接跳过
+            request_type = self._request_type(config)
+            if request_type is not None and self.circuit_breakers.is_open(wind_circuit_key(*request_type)):
+                return self._circuit_open_result(indicator_code, config, request_type)
             
             # 调用Wind API获取数据
             data_df = self._fetch_data_from_wind(config, start_date, end_date)
             
+            # 数据清洗、标准化并保存到数据库
+            result = self._store_indicator_frame(indicator, config, data_df)
+            if result.success:
+                logger.info(f"指标 {indicator_code} 成功保存 {result.records_count} 条Wind数据")
+            return result
+            
+        except Exception as e:
+            error_msg = f"采集Wind指标 {indicator_code} 时出错: {str(e)}"
+            logger.error(error_msg)
+            return WindCollectionResult(
+                success=False,
+                error_message=error_msg
+            )
+    
+    def collect_indicators_data(self,
+                                indicator_codes: List[str],
+                                start_date: str = None,
+                                end_date: str = None,
+                                chunk: str = None) -> Dict[str, WindCollectionResult]:
+        """
+        批量采集多个指标的Wind数据
+        
+        按 (Wind函数, 字段, 频率) 对指标分组，每组发起一次多代码 edb/wsd 请求，
+        再将返回的 Data 矩阵按代码拆分为各指标的数据
+        
+        Args:
+            indicator_codes: 指标代码列表
+            start_date: 开始日期，格式：YYYY-MM-DD
+            end_date: 结束日期，格式：YYYY-MM-DD
+            chunk: 分段粒度 M/Q/Y，指定时按自然月/季/年分段请求并逐段提交
+            
+        Returns:
+            Dict[str, WindCollectionResult]: 指标代码 -> 采集结果
+        """
+        results: Dict[str, WindCollectionResult] = {}
+        
+        if not self.connected:
+            if not self.connect():
+                return {
+                    code: WindCollectionResult(success=False, error_message="无法连接到Wind数据库")
+                    for code in indicator_codes
+                }
+        
+        start_date, end_date = self._default_date_range(start_date, end_date)
+        windows = self._date_windows(start_date, end_date, chunk)
+        indicators = Indicator.objects.in_bulk(indicator_codes, field_name='code')
+        
+        groups: Dict[Tuple, List[str]] = {}
+        for indicator_code in indicator_codes:
+            config = self.wind_mappings.get(indicator_code)
+            if indicator_code not in indicators:
+                results[indicator_code] = WindCollectionResult(
+                    success=False, error_message=f"指标不存在: {indicator_code}"
+                )
+                continue
+            if config is None:
+                results[indicator_code] = WindCollectionResult(
+                    success=False, error_message=f"未找到指标 {indicator_code} 的Wind映射配置"
+                )
+                continue
+            request_type = self._request_type(config)
+            if request_type is None:
+                results[indicator_code] = WindCollectionResult(
+                    success=False,
+                    error_message=f"不支持的数据类型: {config['data_type']}",
+                    wind_code=config['wind_code']
+                )
+                continue
+            groups.setdefault((*request_type, config['frequency']), []).append(indicator_code)
+        
+        for (function, field, frequency), group_codes in groups.items():
+            if self.circuit_breakers.is_open(wind_circuit_key(function, field)):
+                for indicator_code in group_codes:
+                    results[indicator_code] = self._circuit_open_result(
+                        indicator_code, self.wind_mappings[indicator_code], (function, field)
+                    )
+                continue
+            
+            wind_codes = list(dict.fromkeys(self.wind_mappings[code]['wind_code'] for code in group_codes))
+            chunk_results: Dict[str, List[WindCollectionResult]] = {code: [] for code in group_codes}
+            for window_start, window_end in windows:
+                frames: Dict[str, pd.DataFrame] = {}
+                for i in range(0, len(wind_codes), MAX_CODES_PER_REQUEST):
+                    frames.update(self._fetch_group_from_wind(
+                        function, field, wind_codes[i:i + MAX_CODES_PER_REQUEST], window_start, window_end
+                    ))
+                
+                for indicator_code in group_codes:
+                    config = self.wind_mappings[indicator_code]
+                    chunk_results[indicator_code].append(self._store_indicator_frame(
+                        indicators[indicator_code], config, frames.get(config['wind_code'].upper())
+                    ))
+            
+            for indicator_code, parts in chunk_results.items():
+                results[indicator_code] = self._merge_chunk_results(parts, windows)
+        
+        return results
+    
+    def _date_windows(self, start_date: str, end_date: str, chunk: str = None) -> List[Tuple[str, str]]:
+        if not chunk:
+            return [(start_date, end_date)]
+        return [(start.isoformat(), end.isoformat()) for start, end in date_windows(start_date, end_date, chunk)]
+    
+    def _merge_chunk_results(self,
+                             results: List[WindCollectionResult],
+                             windows: List[Tuple[str, str]]) -> WindCollectionResult:
+        """合并分段采集结果：任一分段成功即视为成功，失败分段列在错误信息中"""
+        if len(results) == 1:
+            return results[0]
+        succeeded = [result for result in results if result.success]
+        failed = [
+            f"{start}~{end}: {result.error_message}"
+            for result, (start, end) in zip(results, windows) if not result.success
+        ]
+        ranges = [result.data_range for result in succeeded if result.data_range[0]]
+        return WindCollectionResult(
+            success=bool(succeeded),
+            records_count=sum(result.records_count for result in results),
+            error_message="; ".join(failed),
+            data_range=(min(r[0] for r in ranges), max(r[1] for r in ranges)) if ranges else ("", ""),
+            wind_code=results[0].wind_code,
+            circuit_open=any(result.circuit_open for result in results),
+        )
+    
+    def _store_indicator_frame(self,
+                               indicator: Indicator,
+                               config: Dict,
+                               data_df: Optional[pd.DataFrame]) -> WindCollectionResult:
+        """清洗并保存单个指标的数据"""
+        wind_code = config['wind_code']
+        try:
             if data_df is None or data_df.empty:
                 return WindCollectionResult(
                     success=False,
-                    error_message=f"指标 {indicator_code} 未获取到Wind数据",
+                    error_message=f"指标 {indicator.code} 未获取到Wind数据",
                     wind_code=wind_code
                 )
             
-            # 数据清洗和标准化
             cleaned_data = self._clean_and_standardize_data(data_df, config)
-            
             if cleaned_data.empty:
                 return WindCollectionResult(
                     success=False,
-                    error_message=f"指标 {indicator_code} 清洗后数据为空",
+                    error_message=f"指标 {indicator.code} 清洗后数据为空",
                     wind_code=wind_code
                 )
             
-            # 保存到数据库
             saved_count = self._save_to_database(indicator, cleaned_data)
-            
-            # 计算数据范围
             data_range = (
                 cleaned_data['date'].min().strftime('%Y-%m-%d'),
                 cleaned_data['date'].max().strftime('%Y-%m-%d')
             )
-            
-            logger.info(f"指标 {indicator_code} 成功保存 {saved_count} 条Wind数据")
-            
             return WindCollectionResult(
                 success=True,
                 records_count=saved_count,
                 data_range=data_range,
                 wind_code=wind_code
             )
-            
+        
         except Exception as e:
-            error_msg = f"采集Wind指标 {indicator_code} 时出错: {str(e)}"
+            error_msg = f"采集Wind指标 {indicator.code} 时出错: {str(e)}"
             logger.error(error_msg)
-            return WindCollectionResult(
-                success=False,
-                error_message=error_msg
-            )
+            return WindCollectionResult(success=False, error_message=error_msg, wind_code=wind_code)
+    
+    def _circuit_open_result(self, indicator_code: str, config: Dict,
+                             request_type: Tuple[str, Optional[str]]) -> WindCollectionResult:
+        """请求类型熔断时的跳过结果"""
+        return WindCollectionResult(
+            success=False,
+            error_message=f"Wind请求 {wind_circuit_key(*request_type)} 熔断中，跳过指标 {indicator_code}",
+            wind_code=config['wind_code'],
+            circuit_open=True
+        )
+    
+    def _request_type(self, config: Dict) -> Optional[Tuple[str, Optional[str]]]:
+        """指标对应的Wind函数与字段，不支持的数据类型返回None"""
+        data_type = config['data_type']
+        if data_type == 'bond':
+            # 宏观类债券数据走 edb，其余取收盘价
+            return ('edb', None) if config['wind_code'].startswith('M') else ('wsd', 'close')
+        return WIND_REQUEST_TYPES.get(data_type)
+    
+    def _default_date_range(self, start_date: str = None, end_date: str = None) -> Tuple[str, str]:
+        """默认时间范围：最近10年"""
+        if not end_date:
+            end_date = datetime.now().strftime('%Y-%m-%d')
+        if not start_date:
+            start_date = (datetime.now() - timedelta(days=10*365)).strftime('%Y-%m-%d')
+        return start_date, end_date
+    
+    def _call_wind(self, function: str, field: Optional[str], codes: str, start_date: str, end_date: str):
+        """调用 edb/wsd（codes 为逗号分隔的代码列表）"""
+        with self.session_manager.session() as w:
+            if function == 'edb':
+                return w.edb(codes, start_date, end_date)
+            return w.wsd(codes, field, start_date, end_date)
+    
+    def _fetch_group_from_wind(self,
+                               function: str,
+                               field: Optional[str],
+                               wind_codes: List[str],
+                               start_date: str,
+                               end_date: str) -> Dict[str, pd.DataFrame]:
+        """
+        一次请求获取多个Wind代码的数据
+        
+        Returns:
+            Dict[str, pd.DataFrame]: 大写Wind代码 -> 包含 date、value 列的数据
+        """
+        circuit_key = wind_circuit_key(function, field)
+        if not self.circuit_breakers.allow(circuit_key):
+            logger.warning(f"Wind请求 {circuit_key} 熔断中，跳过 {len(wind_codes)} 个代码")
+            return {}
+        
+        logger.info(f"调用Wind API {function}: {len(wind_codes)} 个代码, 时间范围: {start_date} ~ {end_date}")
+        try:
+            result = self._call_wind(function, field, ",".join(wind_codes), start_date, end_date)
+        except WindSessionBusyError as e:
+            logger.error(f"Wind会话不可用: {str(e)}")
+            self.circuit_breakers.release(circuit_key)
+            return {}
+        except ConnectionError as e:
+            logger.error(f"Wind会话不可用: {str(e)}")
+            self.circuit_breakers.record(circuit_key, False)
+            return {}
+        except Exception as e:
+            logger.error(f"调用Wind API失败: {str(e)}")
+            result = None
+        
+        if result is None or result.ErrorCode != 0 or not getattr(result, 'Data', None) or not getattr(result, 'Times', None):
+            if result is not None and result.ErrorCode != 0:
+                logger.error(f"Wind API调用失败，错误代码: {result.ErrorCode}")
+            if len(wind_codes) == 1:
+                # 单代码请求仍失败才计入熔断（批量失败可能只是个别代码无效）
+                self.circuit_breakers.record(circuit_key, False)
+                return {}
+            self.circuit_breakers.release(circuit_key)
+            # 批量请求失败时逐个重试，避免单个无效代码拖累整组
+            frames = {}
+            for wind_code in wind_codes:
+                frames.update(self._fetch_group_from_wind(function, field, [wind_code], start_date, end_date))
+            return frames
+        
+        self.circuit_breakers.record(circuit_key, True)
+        return self._split_wind_result(result, wind_codes)
+    
+    def _split_wind_result(self, result, wind_codes: List[str]) -> Dict[str, pd.DataFrame]:
+        """将多代码返回结果的 Data 矩阵（每个代码一行）拆分为各代码的数据"""
+        rows = result.Data if isinstance(result.Data[0], list) else [result.Data]
+        codes = [str(code).upper() for code in (getattr(result, 'Codes', None) or wind_codes)]
+        if len(codes) != len(rows):
+            logger.error(f"Wind返回结果格式异常: {len(codes)} 个代码, {len(rows)} 行数据")
+            return {}
+        
+        frames = {
+            code: pd.DataFrame({'date': result.Times, 'value': row})
+            for code, row in zip(codes, rows)
+        }
+        logger.info(f"成功获取 {len(frames)} 个代码、{len(result.Times)} 期Wind数据")
+        return frames
     
     def _fetch_data_from_wind(self, 
                              config: Dict, 
@@ -585,66 +459,15 @@ class WindDataCollector:
         Returns:
             pd.DataFrame: 获取的数据
         """
-        try:
-            wind_code = config['wind_code']
-            data_type = config['data_type']
-            frequency = config['frequency']
-            
-            # 设置默认日期范围
-            if not end_date:
-                end_date = datetime.now().strftime('%Y-%m-%d')
-            if not start_date:
-                start_date = (datetime.now() - timedelta(days=10*365)).strftime('%Y-%m-%d')
-            
-            logger.info(f"调用Wind API: {wind_code}, 时间范围: {start_date} ~ {end_date}")
-            
-            # 根据数据类型选择不同的Wind函数
-            if data_type in ['macro']:
-                # 宏观数据使用wsd函数
-                result = self.w.edb(wind_code, start_date, end_date)
-            elif data_type in ['index', 'industry', 'us_index']:
-                # 指数数据使用wsd函数
-                result = self.w.wsd(wind_code, "close", start_date, end_date)
-            elif data_type in ['bond']:
-                # 债券数据
-                if wind_code.startswith('M'):  # 宏观类债券数据
-                    result = self.w.edb(wind_code, start_date, end_date)
-                else:
-                    result = self.w.wsd(wind_code, "close", start_date, end_date)
-            elif data_type in ['commodity']:
-                # 商品期货数据
-                result = self.w.wsd(wind_code, "close", start_date, end_date)
-            elif data_type in ['fx']:
-                # 外汇数据
-                result = self.w.wsd(wind_code, "close", start_date, end_date)
-            else:
-                logger.error(f"不支持的数据类型: {data_type}")
-                return None
-            
-            # 检查返回结果
-            if result.ErrorCode != 0:
-                logger.error(f"Wind API调用失败，错误代码: {result.ErrorCode}")
-                return None
-            
-            # 转换为DataFrame
-            if hasattr(result, 'Data') and hasattr(result, 'Times'):
-                if result.Data and result.Times:
-                    df = pd.DataFrame({
-                        'date': result.Times,
-                        'value': result.Data[0] if isinstance(result.Data[0], list) else result.Data
-                    })
-                    logger.info(f"成功获取 {len(df)} 条Wind数据")
-                    return df
-                else:
-                    logger.warning("Wind返回数据为空")
-                    return None
-            else:
-                logger.error("Wind返回结果格式异常")
-                return None
-                
-        except Exception as e:
-            logger.error(f"调用Wind API失败: {str(e)}")
+        request_type = self._request_type(config)
+        if request_type is None:
+            logger.error(f"不支持的数据类型: {config['data_type']}")
             return None
+        
+        start_date, end_date = self._default_date_range(start_date, end_date)
+        wind_code = config['wind_code']
+        frames = self._fetch_group_from_wind(*request_type, [wind_code], start_date, end_date)
+        return frames.get(wind_code.upper())
     
     def _clean_and_standardize_data(self, 
                                    data_df: pd.DataFrame, 
@@ -690,7 +513,7 @@ class WindDataCollector:
     
     def _save_to_database(self, indicator: Indicator, data_df: pd.DataFrame) -> int:
         """
-        保存数据到数据库
+        保存数据到数据库（只写入新增或修订的数据点，并记录数据版本）
         
         Args:
             indicator: 指标对象
@@ -700,44 +523,21 @@ class WindDataCollector:
             int: 保存的记录数
         """
         try:
-            saved_count = 0
-            
-            with transaction.atomic():
-                for _, row in data_df.iterrows():
-                    try:
-                        data_point, created = IndicatorData.objects.get_or_create(
-                            indicator=indicator,
-                            date=row['date'],
-                            defaults={
-                                'value': float(row['value']),
-                                'source': 'wind',
-                                'created_at': timezone.now(),
-                                'updated_at': timezone.now()
-                            }
-                        )
-                        
-                        if not created:
-                            # 更新现有数据
-                            data_point.value = float(row['value'])
-                            data_point.source = 'wind'
-                            data_point.updated_at = timezone.now()
-                            data_point.save()
-                        
-                        saved_count += 1
-                        
-                    except (ValueError, TypeError) as e:
-                        logger.warning(f"跳过无效数据点 {row['date']}: {row['value']} - {str(e)}")
-                        continue
-                    except IntegrityError as e:
-                        logger.warning(f"数据完整性错误 {row['date']}: {str(e)}")
-                        continue
-            
-            return saved_count
-            
+            return self._write_series(indicator, data_df)
         except Exception as e:
             logger.error(f"保存Wind数据到数据库失败: {str(e)}")
             return 0
     
+    def _write_series(self, indicator: Indicator, data_df: pd.DataFrame) -> int:
+        """写入数据点，失败时抛出异常（由调用方决定如何处理）"""
+        created, revised = save_series(
+            indicator.id,
+            pd.to_datetime(data_df['date']).values.astype('datetime64[D]'),
+            pd.to_numeric(data_df['value'], errors='coerce').values,
+            source_system='Wind',
+        )
+        return created + revised
+    
     def get_supported_indicators(self) -> List[str]:
         """获取支持的指标列表"""
         return list(self.wind_mappings.keys())
@@ -760,7 +560,7 @@ class WindDataCollector:
         }
         
         try:
-            if not WIND_AVAILABLE:
+            if self.w is None:
                 result['error_message'] = "WindPy未安装"
                 return result
             
@@ -776,7 +576,8 @@ class WindDataCollector:
                 
                 # 测试简单数据获取
                 try:
-                    test_result = self.w.edb("M0000612", "2024-01-01", "2024-01-31")  # 测试CPI数据
+                    with self.session_manager.session() as w:
+                        test_result = w.edb("M0000612", "2024-01-01", "2024-01-31")  # 测试CPI数据
                     if test_result.ErrorCode == 0:
                         result['test_data'] = "数据获取测试成功"
                     else:
@@ -791,8 +592,3 @@ class WindDataCollector:
             result['error_message'] = f"连接测试异常: {str(e)}"
         
         return result
-    
-    def __del__(self):
-        """析构函数，确保断开连接"""
-        if hasattr(self, 'connected') and self.connected:
-            self.disconnect() 
\ No newline at end of file
@@ -6,7 +6,7 @@ Wind数据源集成服务
 """
 
 import logging
-import pandas as pd
+import threading
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple, Any
 from dataclasses import dataclass
@@ -19,6 +19,9 @@ from django.core.cache import cache
 from .models import Indicator, IndicatorData, DataQualityReport, IndicatorCategory
 from .wind_data_collector import WindDataCollector, WindConnectionConfig, WindCollectionResult
 from .indicators_config import get_all_indicators
+from .quality_engine import generate_quality_reports
+from .anomaly_detection import run_anomaly_detection
+from .circuit_breaker import get_circuit_breakers
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -179,8 +182,9 @@ class WindIntegrationService:
             result.success = result.failed_indicators == 0
             result.execution_time = (datetime.now() - start_time).total_seconds()
             
-            # 生成数据质量报告
+            # 异常检测与数据质量报告
             if self.integration_config.quality_check_enabled:
+                self._detect_batch_anomalies(indicator_codes)
                 self._generate_batch_quality_report(indicator_codes, start_date, end_date)
             
         except Exception as e:
@@ -190,7 +194,7 @@ class WindIntegrationService:
                 'timestamp': datetime.now().isoformat()
             })
         finally:
-            # 断开Wind连接
+            # 释放Wind会话（长连接由会话管理器保持，后续请求无需重新握手）
             self.wind_collector.disconnect()
         
         return result
@@ -200,61 +204,65 @@ class WindIntegrationService:
                                 start_date: str,
                                 end_date: str,
                                 force_update: bool) -> WindIntegrationResult:
-        """处理指标批次"""
+        """处理指标批次（未命中缓存的指标按Wind函数分组，每组一次多代码请求）"""
         batch_result = WindIntegrationResult(success=True)
         
+        # 检查缓存
+        pending_codes = []
         for indicator_code in indicator_codes:
-            try:
-                # 检查缓存
-                if not force_update and self.integration_config.cache_enabled:
-                    cache_key = f"{self.cache_prefix}:{indicator_code}:{start_date}:{end_date}"
-                    cached_result = cache.get(cache_key)
-                    if cached_result:
-                        self.stats['cache_hits'] += 1
-                        batch_result.successful_indicators += 1
-                        continue
-                    else:
-                        self.stats['cache_misses'] += 1
-                
-                # 收集数据
-                collection_result = self.wind_collector.collect_indicator_data(
-                    indicator_code, start_date, end_date
-                )
-                
-                if collection_result.success:
+            if not force_update and self.integration_config.cache_enabled:
+                cache_key = f"{self.cache_prefix}:{indicator_code}:{start_date}:{end_date}"
+                if cache.get(cache_key):
+                    self.stats['cache_hits'] += 1
                     batch_result.successful_indicators += 1
-                    batch_result.total_data_points += collection_result.records_count
-                    
-                    # 缓存结果
-                    if self.integration_config.cache_enabled:
-                        cache_key = f"{self.cache_prefix}:{indicator_code}:{start_date}:{end_date}"
-                        cache.set(cache_key, True, timeout=3600)  # 缓存1小时
-                    
-                    logger.debug(f"成功收集 {indicator_code}: {collection_result.records_count} 条数据")
-                else:
-                    batch_result.failed_indicators += 1
-                    batch_result.errors.append({
-                        'indicator_code': indicator_code,
-                        'error': collection_result.error_message,
-                        'wind_code': collection_result.wind_code,
-                        'timestamp': datetime.now().isoformat()
-                    })
-                    logger.warning(f"收集失败 {indicator_code}: {collection_result.error_message}")
+                    continue
+                self.stats['cache_misses'] += 1
+            pending_codes.append(indicator_code)
+        
+        if not pending_codes:
+            return batch_result
+        
+        # 收集数据
+        try:
+            collection_results = self.wind_collector.collect_indicators_data(
+                pending_codes, start_date, end_date
+            )
+        except Exception as e:
+            logger.error(f"批量收集Wind数据时出错: {e}")
+            collection_results = {
+                code: WindCollectionResult(success=False, error_message=str(e)) for code in pending_codes
+            }
+        
+        for indicator_code in pending_codes:
+            collection_result = collection_results.get(indicator_code) or WindCollectionResult(
+                success=False, error_message="未返回采集结果"
+            )
+            
+            if collection_result.success:
+                batch_result.successful_indicators += 1
+                batch_result.total_data_points += collection_result.records_count
                 
-                self.stats['total_requests'] += 1
-                if collection_result.success:
-                    self.stats['successful_requests'] += 1
-                else:
-                    self.stats['failed_requests'] += 1
+                # 缓存结果
+                if self.integration_config.cache_enabled:
+                    cache_key = f"{self.cache_prefix}:{indicator_code}:{start_date}:{end_date}"
+                    cache.set(cache_key, True, timeout=3600)  # 缓存1小时
                 
-            except Exception as e:
+                logger.debug(f"成功收集 {indicator_code}: {collection_result.records_count} 条数据")
+            else:
                 batch_result.failed_indicators += 1
                 batch_result.errors.append({
                     'indicator_code': indicator_code,
-                    'error': str(e),
+                    'error': collection_result.error_message,
+                    'wind_code': collection_result.wind_code,
                     'timestamp': datetime.now().isoformat()
                 })
-                logger.error(f"处理指标 {indicator_code} 时出错: {e}")
+                logger.warning(f"收集失败 {indicator_code}: {collection_result.error_message}")
+            
+            self.stats['total_requests'] += 1
+            if collection_result.success:
+                self.stats['successful_requests'] += 1
+            else:
+                self.stats['failed_requests'] += 1
         
         return batch_result
     
@@ -424,6 +432,13 @@ class WindIntegrationService:
         else:
             return 3  # 低重要性
     
+    def _detect_batch_anomalies(self, indicator_codes: List[str]):
+        """对本批指标做增量异常检测"""
+        try:
+            run_anomaly_detection(indicator_codes=indicator_codes)
+        except Exception as e:
+            logger.error(f"批量异常检测失败: {e}")
+    
     def _generate_batch_quality_report(self, 
                                      indicator_codes: List[str],
                                      start_date: str,
@@ -432,60 +447,11 @@ class WindIntegrationService:
         try:
             logger.info("生成Wind数据质量报告...")
             
-            for indicator_code in indicator_codes:
-                try:
-                    indicator = Indicator.objects.get(code=indicator_code)
-                    
-                    # 获取数据
-                    data_count = IndicatorData.objects.filter(
-                        indicator=indicator,
-                        date__gte=start_date,
-                        date__lte=end_date
-                    ).count()
-                    
-                    if data_count > 0:
-                        # 计算质量评分
-                        completeness_score = min(1.0, data_count / 365)  # 假设期望每日数据
-                        timeliness_score = 1.0  # Wind数据通常很及时
-                        accuracy_score = 0.95  # Wind数据准确性很高
-                        consistency_score = 0.9  # 一致性较好
-                        
-                        overall_score = (completeness_score + timeliness_score + 
-                                       accuracy_score + consistency_score) / 4
-                        
-                        # 确定质量等级
-                        if overall_score >= 0.9:
-                            quality_level = DataQualityReport.QualityLevel.EXCELLENT
-                        elif overall_score >= 0.75:
-                            quality_level = DataQualityReport.QualityLevel.GOOD
-                        elif overall_score >= 0.6:
-                            quality_level = DataQualityReport.QualityLevel.FAIR
-                        else:
-                            quality_level = DataQualityReport.QualityLevel.POOR
-                        
-                        # 创建质量报告
-                        DataQualityReport.objects.update_or_create(
-                            indicator=indicator,
-                            report_date=timezone.now().date(),
-                            defaults={
-                                'completeness_score': completeness_score,
-                                'timeliness_score': timeliness_score,
-                                'accuracy_score': accuracy_score,
-                                'consistency_score': consistency_score,
-                                'overall_quality': quality_level,
-                                'issues_found': [],
-                                'recommendations': 'Wind数据质量优秀' if overall_score >= 0.8 else '数据质量需要关注'
-                            }
-                        )
-                        
-                        # 更新指标质量评分
-                        indicator.data_quality_score = overall_score
-                        indicator.save(update_fields=['data_quality_score'])
-                
-                except Indicator.DoesNotExist:
-                    logger.warning(f"指标 {indicator_code} 不存在，跳过质量报告")
-                except Exception as e:
-                    logger.error(f"生成指标 {indicator_code} 质量报告时出错: {e}")
+            generate_quality_reports(
+                indicator_codes=indicator_codes,
+                start_date=start_date,
+                end_date=end_date
+            )
         
         except Exception as e:
             logger.error(f"生成批量质量报告失败: {e}")
@@ -534,6 +500,7 @@ class WindIntegrationService:
                 },
                 'quality': quality_stats,
                 'api_stats': self.stats,
+                'circuit_breakers': get_circuit_breakers().snapshot(),
                 'last_update': datetime.now().isoformat()
             }
             
@@ -710,5 +677,23 @@ class WindIntegrationService:
         return frequency_mapping.get(wind_frequency, 'M')
 
 
-# 全局Wind集成服务实例
-wind_integration_service = WindIntegrationService() 
\ No newline at end of file
+# 全局Wind集成服务实例（首次使用时创建）
+_wind_integration_service = None
+_service_lock = threading.Lock()
+
+
+def get_wind_integration_service() -> WindIntegrationService:
+    """获取全局Wind集成服务实例"""
+    global _wind_integration_service
+    if _wind_integration_service is None:
+        with _service_lock:
+            if _wind_integration_service is None:
+                _wind_integration_service = WindIntegrationService()
+    return _wind_integration_service
+
+
+def __getattr__(name):
+    # 兼容旧的模块级单例 `wind_integration_service`
+    if name == 'wind_integration_service':
+        return get_wind_integration_service()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+Wind会话管理
+进程内按账号共享一个长连接，所有采集调用复用同一会话：
+1. 延迟连接：首次使用时才执行 w.start() + w.logon()
+2. 健康检查：距上次检查超过间隔时调用 w.isconnected()，失效则自动重连
+3. 调用排队：WindPy 接口非线程安全，调用方串行使用会话，排队数量有上限，超出立即拒绝
+
+FakeWindPy 为不依赖Wind终端的替身，供测试与演示使用
+"""
+
+import atexit
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 会话健康检查间隔（秒）
+HEALTH_CHECK_INTERVAL = 300
+
+# 等待会话的调用方数量上限（不含正在使用会话的调用方）
+MAX_QUEUED_CALLERS = 8
+
+# 等待会话的最长时间（秒）
+ACQUIRE_TIMEOUT = 120
+
+
+class WindSessionBusyError(RuntimeError):
+    """等待Wind会话的调用方过多或等待超时"""
+
+
+class WindSessionManager:
+    """单个Wind账号的长连接会话"""
+
+    def __init__(self,
+                 config,
+                 api_factory: Callable[[], object],
+                 max_queued: int = MAX_QUEUED_CALLERS,
+                 acquire_timeout: float = ACQUIRE_TIMEOUT,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL):
+        self.config = config
+        self.api_factory = api_factory
+        self.acquire_timeout = acquire_timeout
+        self.health_check_interval = health_check_interval
+
+        self._api = None
+        self._connected = False
+        self._last_check = 0.0
+        self._lock = threading.RLock()
+        self._slots = threading.BoundedSemaphore(max_queued + 1)
+
+        self.stats = {'handshakes': 0, 'reconnects': 0, 'health_checks': 0, 'calls': 0, 'rejected': 0}
+
+    @property
+    def api(self):
+        """WindPy接口对象（未安装时为None）"""
+        if self._api is None:
+            self._api = self.api_factory()
+        return self._api
+
+    @property
+    def connected(self) -> bool:
+        return self._connected
+
+    def connect(self) -> bool:
+        """确保会话可用（已连接且健康时不重复握手）"""
+        with self._lock:
+            return self._ensure_connected()
+
+    @contextmanager
+    def session(self, timeout: Optional[float] = None):
+        """
+        独占使用会话，返回 WindPy 接口对象
+
+        Raises:
+            WindSessionBusyError: 排队已满或等待超时
+            ConnectionError: 无法连接到Wind数据库
+        """
+        if not self._slots.acquire(blocking=False):
+            self.stats['rejected'] += 1
+            raise WindSessionBusyError("等待Wind会话的调用方过多")
+        try:
+            if not self._lock.acquire(timeout=self.acquire_timeout if timeout is None else timeout):
+                self.stats['rejected'] += 1
+                raise WindSessionBusyError("等待Wind会话超时")
+            try:
+                if not self._ensure_connected():
+                    raise ConnectionError("无法连接到Wind数据库")
+                self.stats['calls'] += 1
+                try:
+                    yield self._api
+                except Exception:
+                    # 调用异常时下次使用前先做健康检查
+                    self._last_check = 0.0
+                    raise
+            finally:
+                self._lock.release()
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """关闭会话（进程退出或切换账号时调用）"""
+        with self._lock:
+            if self._connected and self._api is not None:
+                try:
+                    self._api.stop()
+                    logger.info("Wind数据库连接已断开")
+                except Exception as e:
+                    logger.error(f"断开Wind连接时出错: {str(e)}")
+            self._connected = False
+
+    def _ensure_connected(self) -> bool:
+        api = self.api
+        if api is None:
+            logger.error("WindPy未安装，请先安装: pip install WindPy")
+            return False
+
+        now = time.monotonic()
+        if self._connected:
+            if now - self._last_check < self.health_check_interval:
+                return True
+            self.stats['health_checks'] += 1
+            if self._is_alive(api):
+                self._last_check = now
+                return True
+            logger.warning("Wind会话已失效，重新连接")
+            self._connected = False
+            self.stats['reconnects'] += 1
+
+        return self._handshake(api)
+
+    def _is_alive(self, api) -> bool:
+        checker = getattr(api, 'isconnected', None)
+        if checker is None:
+            return True
+        try:
+            return bool(checker())
+        except Exception:
+            return False
+
+    def _handshake(self, api) -> bool:
+        try:
+            result = api.start(waitTime=self.config.timeout)
+            if result.ErrorCode != 0:
+                logger.error(f"Wind数据库连接失败，错误代码: {result.ErrorCode}")
+                return False
+
+            login_result = api.logon(self.config.username, self.config.password)
+            if getattr(login_result, 'ErrorCode', None) == 0:
+                logger.debug("Wind用户登录成功")
+            else:
+                logger.warning("Wind登录状态未明确，但连接已建立")
+        except Exception as e:
+            logger.error(f"Wind连接异常: {str(e)}")
+            return False
+
+        self._connected = True
+        self._last_check = time.monotonic()
+        self.stats['handshakes'] += 1
+        logger.info("Wind数据库连接成功")
+        return True
+
+
+_managers: Dict[Tuple[str, str], WindSessionManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_wind_session_manager(config, api_factory: Callable[[], object] = None) -> WindSessionManager:
+    """
+    获取账号对应的共享会话（同一进程内同一账号只建立一个连接）
+
+    Args:
+        config: WindConnectionConfig
+        api_factory: 返回 WindPy 接口对象的函数，默认加载 WindPy
+    """
+    key = (config.username, config.server)
+    manager = _managers.get(key)
+    if manager is None:
+        with _managers_lock:
+            manager = _managers.get(key)
+            if manager is None:
+                if api_factory is None:
+                    from .wind_data_collector import get_wind_api
+                    api_factory = get_wind_api
+                if not _managers:
+                    atexit.register(close_wind_sessions)
+                manager = WindSessionManager(config, api_factory)
+                _managers[key] = manager
+    return manager
+
+
+def close_wind_sessions():
+    """关闭全部共享会话"""
+    with _managers_lock:
+        for manager in _managers.values():
+            manager.close()
+        _managers.clear()
+
+
+class FakeWindPy:
+    """
+    WindPy 替身：接口与返回结构（ErrorCode/Codes/Times/Data）与 WindPy 一致，
+    按代码生成确定性的数据，并记录握手与调用次数
+    """
+
+    def __init__(self, periods: int = 12, fail_codes: Tuple[str, ...] = ()):
+        self.periods = periods
+        self.fail_codes = set(fail_codes)
+        self.connected = False
+        self.start_count = 0
+        self.calls: List[Tuple] = []
+
+    def start(self, waitTime: int = 120, **kwargs):
+        self.start_count += 1
+        self.connected = True
+        return SimpleNamespace(ErrorCode=0)
+
+    def logon(self, username, password):
+        return SimpleNamespace(ErrorCode=0)
+
+    def stop(self):
+        self.connected = False
+
+    def isconnected(self) -> bool:
+        return self.connected
+
+    def getVersionInfo(self) -> str:
+        return 'FakeWindPy'
+
+    def edb(self, codes: str, start_date: str, end_date: str, *args):
+        self.calls.append(('edb', codes, start_date, end_date))
+        return self._result(codes, start_date, 'MS')
+
+    def wsd(self, codes: str, fields: str, start_date: str, end_date: str, *args):
+        self.calls.append(('wsd', codes, fields, start_date, end_date))
+        return self._result(codes, start_date, 'B')
+
+    def _result(self, codes: str, start_date: str, step: str):
+        import pandas as pd
+
+        if not self.connected:
+            return SimpleNamespace(ErrorCode=-103, Codes=[], Times=[], Data=[])
+        code_list = [code.strip() for code in codes.split(',') if code.strip()]
+        if self.fail_codes.intersection(code_list):
+            return SimpleNamespace(ErrorCode=-40522017, Codes=code_list, Times=[], Data=[])
+
+        times = list(pd.date_range(start_date, periods=self.periods, freq=step).date)
+        data = [
+            [float(sum(map(ord, code)) % 100) + i * 0.1 for i in range(len(times))]
+            for code in code_list
+        ]
+        return SimpleNamespace(ErrorCode=0, Codes=code_list, Times=times, Data=data)